@@ -25,6 +25,13 @@ REFRESH_BLOCKS = 25
 
 DEFAULT_NAMESPACE = "id"
 
+# number of verified profile token files to keep in memory
+VERIFIED_PROFILE_CACHE_SIZE = 10000
+
+# how long (in seconds) to remember names that could not be resolved
+NEGATIVE_CACHE_TIMEOUT = 60
+NEGATIVE_CACHE_SIZE = 10000
+
 NAMES_FILENAME = "names.json"
 NEW_NAMES_FILENAME = 'new_names.json'
 CURRENT_DIR = os.path.abspath(os.path.dirname(__file__))
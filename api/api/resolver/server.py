@@ -9,7 +9,10 @@
 
 import re
 import json
+import hashlib
+import threading
 import collections
+import cachetools
 import pylibmc
 import logging
 import xmlrpclib
@@ -36,6 +39,8 @@ from .config import BLOCKSTACKD_IP, BLOCKSTACKD_PORT
 from .config import DHT_MIRROR_IP, DHT_MIRROR_PORT
 from .config import DEFAULT_NAMESPACE
 from .config import NAMES_FILE
+from .config import VERIFIED_PROFILE_CACHE_SIZE
+from .config import NEGATIVE_CACHE_TIMEOUT, NEGATIVE_CACHE_SIZE
 
 import requests
 requests.packages.urllib3.disable_warnings()
@@ -66,6 +71,64 @@ def get_mc_client():
 mc = get_mc_client()
 
 
+# (sha256(token records), address or public key) --> verified profile
+verified_profiles = cachetools.LRUCache(maxsize=VERIFIED_PROFILE_CACHE_SIZE)
+verified_profiles_lock = threading.Lock()
+
+
+# (fully-qualified name, value hash) --> failed lookup result.
+# value hash is None for names that do not exist.
+# a name's entry goes stale as soon as its value hash changes.
+# only confirmed failures (no such name, or no data for the value hash) are
+# remembered; timeouts and other transient errors are not.
+negative_results = cachetools.TTLCache(maxsize=NEGATIVE_CACHE_SIZE, ttl=NEGATIVE_CACHE_TIMEOUT)
+negative_results_lock = threading.Lock()
+
+
+def get_negative_result(fqu, value_hash):
+    """ Return the cached failed lookup for this name and value hash,
+        or None if there is none.
+    """
+
+    with negative_results_lock:
+        data = negative_results.get((fqu, value_hash))
+
+    if data is not None:
+        return json.loads(data)
+
+    return None
+
+
+def put_negative_result(fqu, value_hash, data):
+    """ Remember a failed lookup for this name and value hash
+    """
+
+    with negative_results_lock:
+        negative_results[(fqu, value_hash)] = json.dumps(data)
+
+
+def get_verified_profile_from_tokens(token_records, address_or_public_key):
+    """ Verify a list of profile tokens and return the profile.
+        Tokens that have been verified before are not verified again.
+    """
+
+    token_hash = hashlib.sha256(json.dumps(token_records, sort_keys=True)).hexdigest()
+    key = (token_hash, address_or_public_key)
+
+    with verified_profiles_lock:
+        profile = verified_profiles.get(key)
+
+    if profile is not None:
+        return json.loads(profile)
+
+    profile = get_profile_from_tokens(token_records, address_or_public_key)
+
+    with verified_profiles_lock:
+        verified_profiles[key] = json.dumps(profile)
+
+    return profile
+
+
 def validName(name):
     """ Return True if valid name
     """
@@ -81,6 +144,7 @@ def validName(name):
 
 def fetch_from_dht(profile_hash):
     """ Given a @profile_hash fetch full profile JSON
+        Return (profile JSON or {'error': ...}, whether or not the DHT confirmed it has no such data)
     """
 
     dht_client = Proxy(DHT_MIRROR_IP, DHT_MIRROR_PORT)
@@ -89,14 +153,14 @@ def fetch_from_dht(profile_hash):
         dht_resp = dht_client.get(profile_hash)
     except:
         #abort(500, "Connection to DHT timed out")
-        return {"error": "Data not saved in DHT yet."}
+        return {"error": "Data not saved in DHT yet."}, False
 
     dht_resp = dht_resp[0]
 
     if dht_resp is None:
-        return {"error": "Data not saved in DHT yet."}
+        return {"error": "Data not saved in DHT yet."}, True
 
-    return dht_resp['value']
+    return dht_resp['value'], False
 
 
 def fetch_proofs(profile, username, profile_ver=2, refresh=False):
@@ -195,7 +259,7 @@ def resolve_zone_file_from_rpc(zone_file, owner_address):
     pubkey = profile[0]['parentPublicKey']
 
     try:
-        profile = get_profile_from_tokens(profile, pubkey)
+        profile = get_verified_profile_from_tokens(profile, pubkey)
     except Exception as e:
         print e
 
@@ -216,7 +280,7 @@ def resolve_zone_file_to_profile(zone_file, address_or_public_key):
 
         profile_token_records = json.loads(r.text)
 
-        profile = get_profile_from_tokens(profile_token_records, address_or_public_key)
+        profile = get_verified_profile_from_tokens(profile_token_records, address_or_public_key)
     except Exception as e:
         profile = resolve_zone_file_from_rpc(zone_file, address_or_public_key)
         #return None, str(e)
@@ -298,22 +362,39 @@ def get_profile(username, refresh=False, namespace=DEFAULT_NAMESPACE):
         log.debug("Memcache disabled: %s" % username)
         dht_cache_reply = None
 
+    fqu = username + "." + namespace
+    value_hash = None
+
     if dht_cache_reply is None:
 
+        if not refresh and get_negative_result(fqu, None) is not None:
+            abort(404)
+
         try:
             bs_client = Proxy(BLOCKSTACKD_IP, BLOCKSTACKD_PORT, timeout=10)
-            bs_resp = bs_client.get_name_blockchain_record(username + "." + namespace)
+            bs_resp = bs_client.get_name_blockchain_record(fqu)
             bs_resp = bs_resp[0]
 
         except:
             abort(500, "Connection to blockstack-server %s:%s timed out" % (BLOCKSTACKD_IP, BLOCKSTACKD_PORT))
 
         if bs_resp is None or 'error' in bs_resp:
+            if bs_resp is not None and bs_resp['error'] == 'Not found.':
+                # confirmed to not exist
+                put_negative_result(fqu, None, {"error": "Not found"})
+
             abort(404)
 
         if 'value_hash' in bs_resp:
             profile_hash = bs_resp['value_hash']
-            dht_response = fetch_from_dht(profile_hash)
+            value_hash = profile_hash
+
+            if not refresh:
+                data = get_negative_result(fqu, value_hash)
+                if data is not None:
+                    return data
+
+            dht_response, dht_missing = fetch_from_dht(profile_hash)
 
             dht_data = {}
             dht_data['dht_response'] = dht_response
@@ -330,6 +411,10 @@ def get_profile(username, refresh=False, namespace=DEFAULT_NAMESPACE):
 
     data = format_profile(dht_data['dht_response'], username, dht_data['owner_address'])
 
+    if 'error' in data and value_hash is not None and dht_missing:
+        # the DHT has nothing for this value hash
+        put_negative_result(fqu, value_hash, data)
+
     return data
 
 
@@ -23,6 +23,7 @@ This file is part of Blockstack.
     along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import os
 import sys
 import json
 import requests
@@ -33,6 +34,7 @@ from .utils import validUsername
 from .utils import get_json, config_log
 
 from .config import BLOCKCHAIN_DATA_FILE, PROFILE_DATA_FILE
+from .config import PROFILE_STREAM_FILE
 
 from .db import namespace, profile_data
 from .db import search_profiles
@@ -78,6 +80,48 @@ def fetch_profile_data_from_file():
     return
 
 
+def fetch_profile_data_from_stream():
+    """ takes profile data from the newline-delimited stream written by
+        fetch_data.fetch_profiles, one line at a time,
+        and saves it in the profile_data DB
+    """
+
+    counter = 0
+
+    log.debug("-" * 5)
+    log.debug("Fetching profile data from stream")
+
+    with open(PROFILE_STREAM_FILE, 'r') as profile_stream:
+
+        for line in profile_stream:
+
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # partly-written line
+                log.debug("Skipping malformed line")
+                continue
+
+            if 'profile' not in entry:
+                # failed to fetch
+                continue
+
+            new_entry = {}
+            new_entry['key'] = entry['fqu']
+            new_entry['value'] = entry['profile']
+
+            profile_data.save(new_entry)
+
+            counter += 1
+
+            if counter % 1000 == 0:
+                log.debug("Processed entries: %s" % counter)
+
+    profile_data.ensure_index('key')
+
+    return
+
+
 def fetch_namespace_from_file():
 
     blockchain_file = open(BLOCKCHAIN_DATA_FILE, 'r')
@@ -260,7 +304,12 @@ if __name__ == "__main__":
 
     elif(option == '--refresh'):
         flush_db()
-        fetch_profile_data_from_file()
+
+        if os.path.exists(PROFILE_STREAM_FILE):
+            fetch_profile_data_from_stream()
+        else:
+            fetch_profile_data_from_file()
+
         fetch_namespace_from_file()
         create_search_index()
 
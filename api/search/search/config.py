@@ -36,15 +36,31 @@ DEFAULT_HOST = '127.0.0.1'
 BULK_INSERT_LIMIT = 1000
 DEFAULT_LIMIT = 50
 MEMCACHED_TIMEOUT = 6 * 60 * 60
+SEARCH_INDEX_REFRESH_INTERVAL = 60   # how often (in seconds) to check for a new search index
+
+SEARCH_WORKERS = 8   # number of threads running search sub-system queries
+SEARCH_RESULTS_CACHE_SIZE = 10000   # number of ranked results to keep in memory
+
+# how long (in seconds) to wait for each search sub-system
+SEARCH_TIMEOUTS = {
+    'username_search': 2,
+    'twitter_search': 2,
+    'people_search': 2,
+    'lucene_search': 5
+}
 
 
 BLOCKCHAIN_DATA_FILENAME = "data/blockchain_data.json"
 PROFILE_DATA_FILENAME = "data/profile_data.json"
+PROFILE_STREAM_FILENAME = "data/profile_data.ndjson"   # one {"fqu": ..., "profile": ...} per line
+
+PROFILE_FETCH_WORKERS = 8   # number of names whose profiles are fetched at once
 
 current_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = os.path.abspath(current_dir + "/../")
 BLOCKCHAIN_DATA_FILE = os.path.join(parent_dir, BLOCKCHAIN_DATA_FILENAME)
 PROFILE_DATA_FILE = os.path.join(parent_dir, PROFILE_DATA_FILENAME)
+PROFILE_STREAM_FILE = os.path.join(parent_dir, PROFILE_STREAM_FILENAME)
 
 SUPPORTED_PROOFS = ['twitter', 'facebook', 'github', 'domain']
 
@@ -23,13 +23,17 @@ This file is part of Blockstack.
     along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import os
 import sys
 import json
+import Queue
+import threading
 
 from .utils import validUsername
 from .utils import get_json, config_log
 
-from .config import BLOCKCHAIN_DATA_FILE, PROFILE_DATA_FILE
+from .config import BLOCKCHAIN_DATA_FILE
+from .config import PROFILE_STREAM_FILE, PROFILE_FETCH_WORKERS
 
 from blockstack_client.proxy import get_all_names
 from blockstack_client.profile import get_name_profile
@@ -52,13 +56,137 @@ def fetch_namespace():
     return
 
 
-def fetch_profiles():
+def fetch_profile(fqu):
+    """ return the profile of @fqu
+    """
+
+    return get_name_profile(fqu)[0]
+
+
+def stream_profiles(names, fout, fetch=fetch_profile, num_workers=PROFILE_FETCH_WORKERS):
+    """
+        Fetch the profiles of @names, up to @num_workers at a time,
+        and write one JSON line per name to @fout:
+        * {"fqu": ..., "profile": ...} if the fetch worked
+        * {"fqu": ..., "error": ...} if it did not
+
+        Lines are written in the order of @names, so the last line
+        is where to resume from.  At most 4 * @num_workers profiles
+        are held in memory.
+
+        Returns the number of lines written
+    """
+
+    jobs = Queue.Queue()
+    results = Queue.Queue()
+
+    def work():
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+
+            i, fqu = job
+            try:
+                record = {'fqu': fqu, 'profile': fetch(fqu)}
+            except Exception as e:
+                record = {'fqu': fqu, 'error': str(e)}
+
+            results.put((i, record))
+
+    workers = [threading.Thread(target=work) for i in xrange(num_workers)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    window = 4 * num_workers
+    names = iter(names)
+    no_more_names = False
+
+    pending = {}
+    num_submitted = 0
+    num_written = 0
+
+    while True:
+
+        while not no_more_names and num_submitted - num_written < window:
+            try:
+                fqu = names.next()
+            except StopIteration:
+                no_more_names = True
+                break
+
+            jobs.put((num_submitted, fqu))
+            num_submitted += 1
+
+        if num_written == num_submitted:
+            break
+
+        i, record = results.get()
+        pending[i] = record
+
+        while num_written in pending:
+            fout.write(json.dumps(pending.pop(num_written)) + '\n')
+            num_written += 1
+
+            if num_written % 100 == 0:
+                log.debug("Fetched profiles: %s" % num_written)
+
+        fout.flush()
+
+    for worker in workers:
+        jobs.put(None)
+
+    return num_written
+
+
+def get_resume_point(stream_file):
+    """
+        Find the last name in a profile stream.
+        A partly-written last line (from a crash) is cut off.
+        Returns the name, or None if there is none
+    """
+
+    if not os.path.exists(stream_file):
+        return None
+
+    last_fqu = None
+    offset = 0
+    valid_end = 0
+
+    with open(stream_file, 'r+') as fin:
+
+        for line in fin:
+
+            offset += len(line)
+            if not line.endswith('\n'):
+                break
+
+            try:
+                last_fqu = json.loads(line)['fqu']
+            except (ValueError, KeyError):
+                break
+
+            valid_end = offset
+
+        if valid_end < offset:
+            log.debug("Truncating partial profile stream at %s bytes" % valid_end)
+
+        fin.truncate(valid_end)
+
+    return last_fqu
+
+
+def fetch_profiles(resume=True, num_workers=PROFILE_FETCH_WORKERS):
     """
         Fetch profile data using Blockstack Core and save the data.
-        Data is saved in: data/profile_data.json
-        Format of the data is <fqu, profile>
+        Data is saved in: data/profile_data.ndjson
+        Each line is {"fqu": ..., "profile": ...}
         * fqu: fully-qualified name
         * profile: json profile data
+
+        If @resume is True, continue after the last name saved
+        by a previous (possibly crashed) run.
     """
 
     fin = open(BLOCKCHAIN_DATA_FILE, 'r')
@@ -67,27 +195,21 @@ def fetch_profiles():
 
     all_names = json.loads(file)
 
-    all_profiles = []
-
-    counter = 0
-
-    for fqu in all_names:
+    start = 0
 
-        resp = {}
-        resp['fqu'] = fqu
+    if resume:
+        last_fqu = get_resume_point(PROFILE_STREAM_FILE)
 
-        try:
-            resp['profile'] = get_name_profile(fqu)[0]
-            all_profiles.append(resp)
-        except:
-            pass
+        if last_fqu in all_names:
+            start = all_names.index(last_fqu) + 1
+            log.debug("Resuming after %s (%s of %s names)" % (last_fqu, start, len(all_names)))
 
-        counter += 1
-        if counter % 100 == 0:
-            print counter
+        elif last_fqu is not None:
+            log.debug("%s is no longer in the namespace; starting over" % last_fqu)
+            resume = False
 
-    fout = open(PROFILE_DATA_FILE, 'w')
-    fout.write(json.dumps(all_profiles))
+    fout = open(PROFILE_STREAM_FILE, 'a' if resume else 'w')
+    stream_profiles(all_names[start:], fout, num_workers=num_workers)
     fout.close()
 
     return
@@ -107,7 +229,7 @@ if __name__ == "__main__":
 
     elif(option == '--fetch_profiles'):
         # Step 2
-        fetch_profiles()
+        fetch_profiles(resume=('--restart' not in sys.argv[2:]))
 
     else:
         print "Usage error"
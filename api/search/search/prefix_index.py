@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Search
+    ~~~~~
+
+    copyright: (c) 2014-2017 by Blockstack Inc.
+    copyright: (c) 2017 by Blockstack.org
+
+This file is part of Search.
+
+    Search is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Search is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Search. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+""" in-memory word-prefix index for substring search
+"""
+
+import sys
+import threading
+
+from bisect import bisect_left, insort
+from heapq import merge
+
+
+def next_prefix(prefix):
+    """ return the smallest string that is greater than
+        every string that starts with @prefix,
+        or None if there is no such string
+    """
+
+    while len(prefix) > 0:
+
+        last = ord(prefix[-1])
+
+        if last < sys.maxunicode:
+            return prefix[:-1] + unichr(last + 1)
+
+        prefix = prefix[:-1]
+
+    return None
+
+
+class PrefixIndex(object):
+    """ index a set of strings by the prefixes of their words.
+
+        every (word, string id) pair is kept in one sorted array,
+        so the words that start with a given prefix form a
+        contiguous range that two binary searches can find.
+
+        a query matches a string if every query word is a prefix
+        of some word in the string (same as substring_search).
+    """
+
+    def __init__(self, strings=[]):
+
+        self.lock = threading.Lock()
+        self.build(strings)
+
+    def build(self, strings):
+        """ (re)build the index from scratch
+        """
+
+        strings = list(set(strings))
+        tokens = []
+
+        for string_id, s in enumerate(strings):
+            for word in set(s.split(' ')):
+                tokens.append((word, string_id))
+
+        tokens.sort()
+
+        with self.lock:
+            self.strings = strings
+            self.string_ids = dict([(s, i) for i, s in enumerate(strings)])
+            self.tokens = tokens
+            self.free_ids = []
+
+    def _assign_id(self, s):
+        """ give a new string an id.  must hold the lock.
+            return the string's (unsorted) tokens
+        """
+
+        if len(self.free_ids) > 0:
+            string_id = self.free_ids.pop()
+            self.strings[string_id] = s
+        else:
+            string_id = len(self.strings)
+            self.strings.append(s)
+
+        self.string_ids[s] = string_id
+
+        return [(word, string_id) for word in set(s.split(' '))]
+
+    def add(self, s):
+        """ add a string to the index.
+            return True if it was not already indexed
+        """
+
+        with self.lock:
+
+            if s in self.string_ids:
+                return False
+
+            for token in self._assign_id(s):
+                insort(self.tokens, token)
+
+        return True
+
+    def remove(self, s):
+        """ remove a string from the index.
+            return True if it was indexed
+        """
+
+        with self.lock:
+
+            string_id = self.string_ids.pop(s, None)
+            if string_id is None:
+                return False
+
+            for word in set(s.split(' ')):
+                i = bisect_left(self.tokens, (word, string_id))
+                del self.tokens[i]
+
+            self.strings[string_id] = None
+            self.free_ids.append(string_id)
+
+        return True
+
+    def update(self, strings):
+        """ make the index hold exactly @strings,
+            adding and removing only what changed.
+            return (number added, number removed)
+        """
+
+        strings = set(strings)
+
+        with self.lock:
+
+            indexed = set(self.string_ids.keys())
+
+            added = strings - indexed
+            removed = indexed - strings
+
+            # drop the removed strings' tokens in one pass
+            removed_ids = set()
+            for s in removed:
+                string_id = self.string_ids.pop(s)
+                self.strings[string_id] = None
+                self.free_ids.append(string_id)
+                removed_ids.add(string_id)
+
+            if len(removed_ids) > 0:
+                self.tokens = [token for token in self.tokens if token[1] not in removed_ids]
+
+            # merge in the added strings' tokens in one pass
+            if len(added) > 0:
+                new_tokens = []
+                for s in added:
+                    new_tokens.extend(self._assign_id(s))
+
+                new_tokens.sort()
+                self.tokens = list(merge(self.tokens, new_tokens))
+
+        return len(added), len(removed)
+
+    def __len__(self):
+        return len(self.string_ids)
+
+    def _prefix_range(self, prefix):
+        """ return the [start, end) range of tokens whose word starts with @prefix
+        """
+
+        start = bisect_left(self.tokens, (prefix,))
+
+        end_prefix = next_prefix(prefix)
+        if end_prefix is None:
+            end = len(self.tokens)
+        else:
+            end = bisect_left(self.tokens, (end_prefix,))
+
+        return start, end
+
+    def search(self, query, limit_results=None):
+        """ return the indexed strings that match every word in @query,
+            up to @limit_results of them.  strings are ordered by the word
+            that matched the query, so this costs O(log n + limit_results)
+            for single-word queries.
+        """
+
+        query_words = [word for word in set(query.split(' ')) if len(word) > 0]
+
+        with self.lock:
+
+            if len(query_words) == 0:
+                # everything matches
+                start, end = 0, len(self.tokens)
+                other_words = []
+
+            else:
+                ranges = [(self._prefix_range(word), word) for word in query_words]
+
+                # walk the rarest query word's range; check the others per string
+                ranges.sort(key=lambda r: r[0][1] - r[0][0])
+                start, end = ranges[0][0]
+                other_words = [word for (word_range, word) in ranges[1:]]
+
+            results = []
+            seen = set()
+
+            for i in xrange(start, end):
+
+                if limit_results is not None and len(results) >= limit_results:
+                    break
+
+                string_id = self.tokens[i][1]
+                if string_id in seen:
+                    continue
+
+                seen.add(string_id)
+
+                s = self.strings[string_id]
+                if len(other_words) == 0 or self._match_all(s, other_words):
+                    results.append(s)
+
+            return results
+
+    def _match_all(self, s, query_words):
+        """ return True if every query word is a prefix of a word in @s
+        """
+
+        target_words = s.split(' ')
+
+        for query_word in query_words:
+            for target_word in target_words:
+                if target_word.startswith(query_word):
+                    break
+            else:
+                return False
+
+        return True
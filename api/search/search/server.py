@@ -25,7 +25,9 @@ This file is part of Search.
 
 import sys
 import json
+import Queue
 import threading
+import collections
 import pylibmc
 
 from time import time
@@ -34,10 +36,11 @@ from flask import request, jsonify, Flask, make_response, render_template
 from .config import DEFAULT_HOST, DEFAULT_PORT, DEBUG, MEMCACHED_TIMEOUT
 from .config import DEFAULT_LIMIT
 from .config import MEMCACHED_ENABLED, LUCENE_ENABLED
+from .config import SEARCH_WORKERS, SEARCH_TIMEOUTS, SEARCH_RESULTS_CACHE_SIZE
 
 from .substring_search import search_people_by_name, search_people_by_twitter
 from .substring_search import search_people_by_username, search_people_by_bio
-from .substring_search import fetch_profiles
+from .substring_search import fetch_profiles, dedup_search_results
 
 from .attributes_index import search_proofs, validProofQuery
 
@@ -50,28 +53,141 @@ mc = pylibmc.Client(["127.0.0.1:11211"], binary=True,
 							   'no_block': True})
 
 
-class QueryThread(threading.Thread):
-	""" for performing multi-threaded search on three search sub-systems
+class QueryJob(object):
+	""" one sub-system query, run by the QueryPool.
+		a job that is still queued at its deadline is dropped.
 	"""
-	def __init__(self, query, query_type, limit_results):
-		threading.Thread.__init__(self)
+	def __init__(self, query, query_type, limit_results, deadline):
 		self.query = query
 		self.query_type = query_type
-		self.results = []
 		self.limit_results = limit_results
-		self.found_exact_match = False
+		self.deadline = deadline
+		self.results = []
+		self.complete = False
+		self.done = threading.Event()
 
 	def run(self):
+		if time() > self.deadline:
+			# the request gave up on us
+			return
+
 		if(self.query_type == 'people_search'):
 			self.results = query_people_database(self.query, self.limit_results)
 		elif(self.query_type == 'twitter_search'):
 			self.results = query_twitter_database(self.query, self.limit_results)
 		elif(self.query_type == 'username_search'):
 			self.results = query_username_database(self.query, self.limit_results)
-			#self.found_exact_match, self.results = query_company_database(self.query)
-		if(self.query_type == 'lucene_search'):
+		elif(self.query_type == 'lucene_search'):
 			self.results = query_lucene_index(self.query, self.limit_results)
 
+		self.complete = True
+
+
+class QueryPool(object):
+	""" persistent threads for performing multi-threaded search on the search sub-systems
+	"""
+	def __init__(self, num_workers=SEARCH_WORKERS):
+		self.jobs = Queue.Queue()
+		self.workers = []
+
+		for i in xrange(0, num_workers):
+			worker = threading.Thread(target=self.work)
+			worker.daemon = True
+			worker.start()
+			self.workers.append(worker)
+
+	def work(self):
+		while True:
+			job = self.jobs.get()
+			try:
+				job.run()
+			except Exception as e:
+				app.logger.exception(e)
+			finally:
+				job.done.set()
+
+	def run(self, query, query_types, limit_results):
+		""" run a query on each of the given sub-systems.
+			return ({query_type: results}, complete), where complete is
+			False if a sub-system failed or did not answer within its
+			timeout (it contributes no results).
+		"""
+		start = time()
+		jobs = [QueryJob(query, query_type, limit_results, start + SEARCH_TIMEOUTS[query_type]) for query_type in query_types]
+		for job in jobs:
+			self.jobs.put(job)
+
+		results = {}
+		complete = True
+
+		for job in jobs:
+			if job.done.wait(max(job.deadline - time(), 0)) and job.complete:
+				results[job.query_type] = job.results
+			else:
+				app.logger.warning("%s failed or timed out on '%s'" % (job.query_type, query))
+				results[job.query_type] = []
+				complete = False
+
+		return results, complete
+
+
+class ResultsCache(object):
+	""" in-process LRU of ranked search results, keyed like memcached.
+		entries expire after MEMCACHED_TIMEOUT, like the memcached ones.
+	"""
+	def __init__(self, max_entries=SEARCH_RESULTS_CACHE_SIZE):
+		self.max_entries = max_entries
+		self.cache = collections.OrderedDict()
+		self.lock = threading.Lock()
+
+	def get(self, key):
+		with self.lock:
+			entry = self.cache.pop(key, None)
+			if entry is None:
+				return None
+
+			if entry[1] < time():
+				return None
+
+			self.cache[key] = entry
+			return entry[0]
+
+	def set(self, key, results):
+		with self.lock:
+			self.cache.pop(key, None)
+			while len(self.cache) >= self.max_entries:
+				self.cache.popitem(last=False)
+
+			self.cache[key] = (results, time() + MEMCACHED_TIMEOUT)
+
+
+query_pool = QueryPool()
+results_cache = ResultsCache()
+
+
+def get_cached_results(cache_key):
+	""" check the in-process cache, then memcached
+	"""
+	cache_reply = results_cache.get(cache_key)
+	if cache_reply is not None:
+		return cache_reply
+
+	if MEMCACHED_ENABLED:
+		cache_reply = mc.get(cache_key)
+		if cache_reply is not None:
+			results_cache.set(cache_key, cache_reply)
+
+	return cache_reply
+
+
+def set_cached_results(cache_key, results):
+	""" save to the in-process cache, and memcached
+	"""
+	results_cache.set(cache_key, results)
+
+	if MEMCACHED_ENABLED:
+		mc.set(cache_key, results, int(time() + MEMCACHED_TIMEOUT))
+
 
 def error_reply(msg, code=-1):
 	reply = {}
@@ -98,7 +214,7 @@ def query_username_database(query, limit_results=DEFAULT_LIMIT):
 	return fetch_profiles(username_search_results, search_type="username")
 
 
-def query_lucene_index(query, index, limit_results=DEFAULT_LIMIT):
+def query_lucene_index(query, limit_results=DEFAULT_LIMIT):
 
 	username_search_results = search_people_by_bio(query, limit_results)
 	return fetch_profiles(username_search_results, search_type="username")
@@ -120,20 +236,19 @@ def search_by_name():
 	query = request.args.get('query')
 
 	results_people = []
+	complete = True
 
 	if query is None:
 		return error_reply("No query given")
 	elif query == '' or query == ' ':
 		return json.dumps({})
 
-	if MEMCACHED_ENABLED:
-
-		cache_key = str('search_cache_' + query.lower())
-		cache_reply = mc.get(cache_key)
+	cache_key = str('search_cache_' + query.lower())
+	cache_reply = get_cached_results(cache_key)
 
-		# if a cache hit, respond straight away
-		if(cache_reply is not None):
-			return jsonify(cache_reply)
+	# if a cache hit, respond straight away
+	if(cache_reply is not None):
+		return jsonify(cache_reply)
 
 	new_limit = DEFAULT_LIMIT
 
@@ -150,50 +265,26 @@ def search_by_name():
 
 	else:
 
-		threads = []
-
-		t1 = QueryThread(query, 'username_search', new_limit)
-		t2 = QueryThread(query, 'twitter_search', new_limit)
-		t3 = QueryThread(query, 'people_search', new_limit)
-
-		if LUCENE_ENABLED:
-			t4 = QueryThread(query, 'lucene_search', new_limit)
-
-		threads.append(t1)
-		threads.append(t2)
-		threads.append(t3)
+		query_types = ['people_search', 'username_search', 'twitter_search']
 
 		if LUCENE_ENABLED:
-			threads.append(t4)
-
-		# start all threads
-		[x.start() for x in threads]
+			query_types.append('lucene_search')
 
-		# wait for all of them to finish
-		[x.join() for x in threads]
+		results, complete = query_pool.run(query, query_types, new_limit)
 
-		# at this point all threads have finished and all queries have been performed
-
-		results_username = t1.results
-		results_twitter = t2.results
-		results_people = t3.results
-
-		if LUCENE_ENABLED:
-			results_bio = t4.results
-
-		results_people += results_username + results_twitter
-		if LUCENE_ENABLED:
-			results_people += results_bio
+		results_people = []
+		for query_type in query_types:
+			results_people += results[query_type]
 
 		# dedup all results before sending out
-		from substring_search import dedup_search_results
 		results_people = dedup_search_results(results_people)
 
 	results = {}
 	results['results'] = results_people[:new_limit]
 
-	if MEMCACHED_ENABLED:
-		mc.set(cache_key, results, int(time() + MEMCACHED_TIMEOUT))
+	# don't keep partial results around for hours
+	if complete:
+		set_cached_results(cache_key, results)
 
 	return jsonify(results)
 
@@ -209,19 +300,16 @@ def search_proofs_index(query):
 	elif query == '' or query == ' ':
 		return json.dumps({})
 
-	if MEMCACHED_ENABLED:
-
-		cache_key = str('search_cache_' + query.lower())
-		cache_reply = mc.get(cache_key)
+	cache_key = str('search_cache_' + query.lower())
+	cache_reply = get_cached_results(cache_key)
 
-		# if a cache hit, respond straight away
-		if(cache_reply is not None):
-			return jsonify(cache_reply)
+	# if a cache hit, respond straight away
+	if(cache_reply is not None):
+		return jsonify(cache_reply)
 
 	results['results'] = search_proofs(query)
 
-	if MEMCACHED_ENABLED:
-		mc.set(cache_key, results, int(time() + MEMCACHED_TIMEOUT))
+	set_cached_results(cache_key, results)
 
 	return jsonify(results)
 
@@ -30,6 +30,9 @@ This file is part of Search.
 import os
 import sys
 import json
+import threading
+
+from time import time
 
 
 current_dir =  os.path.abspath(os.path.dirname(__file__))
@@ -39,7 +42,70 @@ sys.path.insert(0, parent_dir)
 from search.db import search_db, search_profiles
 from search.db import search_cache
 
-from search.config import DEFAULT_LIMIT
+from search.config import DEFAULT_LIMIT, SEARCH_INDEX_REFRESH_INTERVAL
+from search.prefix_index import PrefixIndex
+
+
+class CachedSearchIndex(object):
+    """ a PrefixIndex over one of the mongodb caches written by
+        basic_index.create_search_index().
+
+        the index is built on first use.  after that, at most once every
+        SEARCH_INDEX_REFRESH_INTERVAL seconds, we check whether the cache
+        documents changed (create_search_index() writes new ones), and if so
+        only the added and removed strings are applied to the index.
+    """
+
+    def __init__(self, cache, field):
+
+        self.cache = cache
+        self.field = field
+        self.index = None
+        self.cache_ids = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def _load_strings(self):
+
+        strings = []
+        for i in self.cache.find():
+            strings += i[self.field]
+
+        return strings
+
+    def _refresh(self):
+
+        now = time()
+        if self.index is not None and now - self.checked_at < SEARCH_INDEX_REFRESH_INTERVAL:
+            return
+
+        self.checked_at = now
+
+        # only fetch the (small) document ids to see if anything changed
+        cache_ids = sorted([i['_id'] for i in self.cache.find({}, {'_id': 1})])
+        if self.index is not None and cache_ids == self.cache_ids:
+            return
+
+        strings = self._load_strings()
+
+        if self.index is None:
+            self.index = PrefixIndex(strings)
+        else:
+            self.index.update(strings)
+
+        self.cache_ids = cache_ids
+
+    def search(self, query, limit_results=DEFAULT_LIMIT):
+
+        with self.lock:
+            self._refresh()
+
+        return self.index.search(query, limit_results)
+
+
+people_index = CachedSearchIndex(search_cache.people_cache, 'name')
+twitter_index = CachedSearchIndex(search_cache.twitter_cache, 'twitter_handle')
+username_index = CachedSearchIndex(search_cache.username_cache, 'username')
 
 
 def anyword_substring_search_inner(query_word, target_words):
@@ -113,13 +179,7 @@ def search_people_by_name(query, limit_results=DEFAULT_LIMIT):
 
     query = query.lower()
 
-    people_names = []
-
-    # using mongodb as a cache, load data in people_names
-    for i in search_cache.people_cache.find():
-        people_names += i['name']
-
-    results = substring_search(query, people_names, limit_results)
+    results = people_index.search(query, limit_results)
 
     return order_search_results(query, results)
 
@@ -128,13 +188,7 @@ def search_people_by_twitter(query, limit_results=DEFAULT_LIMIT):
 
     query = query.lower()
 
-    twitter_handles = []
-
-    # using mongodb as a cache, load data
-    for i in search_cache.twitter_cache.find():
-        twitter_handles += i['twitter_handle']
-
-    results = substring_search(query, twitter_handles, limit_results)
+    results = twitter_index.search(query, limit_results)
 
     return results
 
@@ -143,13 +197,7 @@ def search_people_by_username(query, limit_results=DEFAULT_LIMIT):
 
     query = query.lower()
 
-    usernames = []
-
-    # using mongodb as a cache, load data
-    for i in search_cache.username_cache.find():
-        usernames += i['username']
-
-    results = substring_search(query, usernames, limit_results)
+    results = username_index.search(query, limit_results)
 
     return results
 
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Search
+    ~~~~~
+
+    copyright: (c) 2014-2017 by Blockstack Inc.
+    copyright: (c) 2017 by Blockstack.org
+
+This file is part of Search.
+
+    Search is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Search is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Search. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+""" tests for the streaming profile fetcher
+    usage: './fetch_data_tests.py'
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+import unittest
+
+from StringIO import StringIO
+
+# Hack around absolute paths
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(current_dir + "/../")
+sys.path.insert(0, parent_dir)
+
+from search.fetch_data import stream_profiles, get_resume_point
+
+NUM_WORKERS = 4
+
+
+class FakeFetcher(object):
+    """ slow, sometimes-failing profile lookups,
+        that track how many run at once
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, fqu):
+
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        time.sleep(random.random() * 0.01)
+
+        with self.lock:
+            self.running -= 1
+
+        if fqu.startswith('bad'):
+            raise Exception("no profile for %s" % fqu)
+
+        return {'name': fqu}
+
+
+class FetchDataTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.names = ['%s%s.id' % (random.choice(['good', 'good', 'bad']), i) for i in xrange(200)]
+
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_stream_order(self):
+
+        fetch = FakeFetcher()
+        fout = StringIO()
+
+        num_written = stream_profiles(self.names, fout, fetch=fetch, num_workers=NUM_WORKERS)
+
+        records = [json.loads(line) for line in fout.getvalue().splitlines()]
+
+        self.assertEqual(num_written, len(self.names))
+        self.assertEqual([r['fqu'] for r in records], self.names)
+
+        for r in records:
+            if r['fqu'].startswith('bad'):
+                self.assertTrue('error' in r and 'profile' not in r)
+            else:
+                self.assertEqual(r['profile'], {'name': r['fqu']})
+
+        self.assertTrue(1 < fetch.max_running <= NUM_WORKERS)
+
+    def test_resume(self):
+
+        with open(self.path, 'w') as fout:
+            stream_profiles(self.names[:50], fout, fetch=FakeFetcher(), num_workers=NUM_WORKERS)
+
+            # crash in the middle of a line
+            fout.write('{"fqu": "%s", "prof' % self.names[50])
+
+        self.assertEqual(get_resume_point(self.path), self.names[49])
+
+        with open(self.path, 'a') as fout:
+            stream_profiles(self.names[50:], fout, fetch=FakeFetcher(), num_workers=NUM_WORKERS)
+
+        with open(self.path, 'r') as fin:
+            records = [json.loads(line) for line in fin]
+
+        self.assertEqual([r['fqu'] for r in records], self.names)
+        self.assertEqual(get_resume_point(self.path), self.names[-1])
+
+    def test_resume_empty(self):
+
+        self.assertIsNone(get_resume_point(self.path))
+        self.assertIsNone(get_resume_point(self.path + '.missing'))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Search
+    ~~~~~
+
+    copyright: (c) 2014-2017 by Blockstack Inc.
+    copyright: (c) 2017 by Blockstack.org
+
+This file is part of Search.
+
+    Search is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Search is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Search. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+""" tests and benchmarks for the prefix index
+    usage: './prefix_index_tests.py' or './prefix_index_tests.py --benchmark [num profiles]'
+"""
+
+import os
+import sys
+import random
+import unittest
+
+from time import time
+
+# Hack around absolute paths
+current_dir = os.path.abspath(os.path.dirname(__file__))
+parent_dir = os.path.abspath(current_dir + "/../")
+sys.path.insert(0, parent_dir)
+
+from search.prefix_index import PrefixIndex, next_prefix
+
+SYLLABLES = [u'ka', u'mu', u'ne', u'eb', u'fre', u'd', u'wil', u'son', u'al', u'ic', u'e', u'bo', u'b', u'\xe9', u'中']
+
+
+def random_word(max_syllables=4):
+    return u''.join([random.choice(SYLLABLES) for i in xrange(random.randint(1, max_syllables))])
+
+
+def random_name():
+    return u' '.join([random_word() for i in xrange(random.randint(1, 3))])
+
+
+def scan_search(query, strings, limit_results=None):
+    """ the linear scan that the index replaces
+    """
+
+    query_words = query.split(' ')
+    matching = []
+
+    for s in strings:
+
+        target_words = s.split(' ')
+
+        if all([any([t.startswith(q) for t in target_words]) for q in query_words]):
+            matching.append(s)
+
+    return matching[:limit_results]
+
+
+class PrefixIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        self.strings = list(set([random_name() for i in xrange(2000)]))
+        self.index = PrefixIndex(self.strings)
+
+    def check_queries(self, strings):
+
+        for i in xrange(300):
+            query = random.choice([random_word(2), random_name(), random_word(1) + u' ' + random_word(1)])
+
+            expected = sorted(scan_search(query, strings))
+            found = sorted(self.index.search(query))
+
+            self.assertEqual(expected, found, msg="query %r" % query)
+
+    def test_next_prefix(self):
+
+        self.assertEqual(next_prefix(u'abc'), u'abd')
+        self.assertEqual(next_prefix(u'a' + unichr(sys.maxunicode)), u'b')
+        self.assertIsNone(next_prefix(unichr(sys.maxunicode)))
+
+    def test_matches_scan(self):
+
+        self.check_queries(self.strings)
+
+    def test_limit(self):
+
+        results = self.index.search(u'k', 7)
+        self.assertEqual(len(results), 7)
+        self.assertEqual(sorted(self.index.search(u'k', 7)), sorted(results))
+
+    def test_empty_query(self):
+
+        self.assertEqual(len(self.index.search(u'')), len(self.strings))
+        self.assertEqual(self.index.search(u'xyz'), [])
+
+    def test_incremental_update(self):
+
+        new_strings = self.strings[500:] + list(set([random_name() for i in xrange(500)]))
+        added, removed = self.index.update(new_strings)
+
+        self.assertEqual(len(self.index), len(set(new_strings)))
+        self.assertTrue(added > 0 and removed > 0)
+        self.assertEqual(self.index.tokens, sorted(self.index.tokens))
+
+        self.check_queries(list(set(new_strings)))
+
+        # nothing changes the second time
+        self.assertEqual(self.index.update(new_strings), (0, 0))
+
+    def test_add_remove(self):
+
+        removed = self.strings[:100]
+        for s in removed:
+            self.assertTrue(self.index.remove(s))
+            self.assertFalse(self.index.remove(s))
+
+        added = [s for s in set([random_name() for i in xrange(200)]) if s not in self.strings]
+        for s in added:
+            self.assertTrue(self.index.add(s))
+            self.assertFalse(self.index.add(s))
+
+        strings = self.strings[100:] + added
+        self.assertEqual(len(self.index), len(strings))
+        self.assertEqual(self.index.tokens, sorted(self.index.tokens))
+
+        self.check_queries(strings)
+
+
+def benchmark(num_profiles, num_queries=1000):
+    """ time building and querying the index, vs. a linear scan
+    """
+
+    random.seed(0)
+    strings = [random_name() for i in xrange(num_profiles)]
+    queries = [random_word(2) for i in xrange(num_queries)]
+
+    t1 = time()
+    index = PrefixIndex(strings)
+    t2 = time()
+    print "%s profiles: build %.2fs" % (num_profiles, t2 - t1)
+
+    t1 = time()
+    for query in queries:
+        index.search(query, 50)
+    t2 = time()
+    print "%s profiles: indexed query %.3fms" % (num_profiles, (t2 - t1) * 1000.0 / num_queries)
+
+    t1 = time()
+    for query in queries[:10]:
+        scan_search(query, strings, 50)
+    t2 = time()
+    print "%s profiles: scanned query %.3fms" % (num_profiles, (t2 - t1) * 1000.0 / 10)
+
+    t1 = time()
+    for i in xrange(100):
+        index.add(random_name())
+    t2 = time()
+    print "%s profiles: incremental add %.3fms" % (num_profiles, (t2 - t1) * 1000.0 / 100)
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+
+        if len(sys.argv) > 2:
+            sizes = [int(sys.argv[2])]
+        else:
+            sizes = [100000, 1000000]
+
+        for size in sizes:
+            benchmark(size)
+
+    else:
+        unittest.main()
@@ -42,6 +42,8 @@ import copy
 import atexit
 import threading
 import errno
+import Queue
+import bisect
 import blockstack_zones
 import keylib
 import base64
@@ -84,10 +86,21 @@ bitcoind = None
 rpc_server = None
 storage_pusher = None
 gc_thread = None
+analytics_thread = None
+rpc_stats = None
 has_indexer = True
 
 GC_EVENT_THRESHOLD = 15
 
+STORAGE_PUSH_WORKERS = 4           # default number of storage pusher worker threads
+STORAGE_PUSH_RETRY_INTERVAL = 1.0  # seconds to wait before retrying a failed push
+
+ANALYTICS_QUEUE_SIZE = 1000        # maximum number of pending analytics events
+
+# upper bounds (in seconds) of the RPC latency histogram buckets.
+# the last bucket holds everything slower.
+RPC_STATS_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0]
+
 def get_bitcoind( new_bitcoind_opts=None, reset=False, new=False ):
    """
    Get or instantiate our bitcoind client.
@@ -256,6 +269,42 @@ def get_name_cost( db, name ):
     return name_fee
 
 
+def get_names_cost( db, names ):
+    """
+    Get the costs of a list of fully-qualified names.
+    Each namespace is looked up once, no matter how many of its names are priced.
+    Return {name: cost}.  Names in undeclared namespaces are omitted.
+    """
+    lastblock = db.lastblock
+    namespaces = {}
+    ret = {}
+
+    for name in names:
+        namespace_id = get_namespace_from_name( name )
+        if namespace_id is None or len(namespace_id) == 0:
+            log.debug("No namespace '%s'" % namespace_id)
+            continue
+
+        if not namespaces.has_key(namespace_id):
+            namespace = db.get_namespace( namespace_id )
+            if namespace is None:
+                # maybe importing?
+                namespace = db.get_namespace_reveal( namespace_id )
+
+            namespaces[namespace_id] = namespace
+
+        namespace = namespaces[namespace_id]
+        if namespace is None:
+            # no such namespace
+            log.debug("No namespace '%s'" % namespace_id)
+            continue
+
+        ret[name] = price_name( get_name_from_fq_name( name ), namespace, lastblock )
+
+    log.debug("Priced %s of %s names at %s" % (len(ret), len(names), lastblock))
+    return ret
+
+
 def get_namespace_cost( db, namespace_id ):
     """
     Get the cost of a namespace.
@@ -268,6 +317,76 @@ def get_namespace_cost( db, namespace_id ):
 
 
 
+class RPCStats(object):
+    """
+    Per-RPC-method call counts, error counts, and latency histograms
+    (for both the handler and the JSON serialization of its reply).
+    """
+    def __init__(self, buckets=RPC_STATS_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.methods = {}
+        self.since = time.time()
+
+
+    def _new_method_stats(self):
+        return {
+            'count': 0,
+            'errors': 0,
+            'handler_time': 0.0,
+            'handler_max': 0.0,
+            'handler_histogram': [0] * (len(self.buckets) + 1),
+            'serialize_time': 0.0,
+            'serialize_max': 0.0,
+            'serialize_histogram': [0] * (len(self.buckets) + 1),
+        }
+
+
+    def record(self, method, handler_time, serialize_time, error):
+        """
+        Record one call to an RPC method
+        """
+        handler_bucket = bisect.bisect_left(self.buckets, handler_time)
+        serialize_bucket = bisect.bisect_left(self.buckets, serialize_time)
+
+        with self.lock:
+            method_stats = self.methods.get(method, None)
+            if method_stats is None:
+                method_stats = self._new_method_stats()
+                self.methods[method] = method_stats
+
+            method_stats['count'] += 1
+            if error:
+                method_stats['errors'] += 1
+
+            method_stats['handler_time'] += handler_time
+            method_stats['handler_max'] = max(method_stats['handler_max'], handler_time)
+            method_stats['handler_histogram'][handler_bucket] += 1
+
+            method_stats['serialize_time'] += serialize_time
+            method_stats['serialize_max'] = max(method_stats['serialize_max'], serialize_time)
+            method_stats['serialize_histogram'][serialize_bucket] += 1
+
+
+    def get_stats(self, reset=False):
+        """
+        Get a copy of the statistics so far, and optionally reset them.
+        Return {'since': ..., 'buckets': [...], 'methods': {method: {...}}}
+        """
+        with self.lock:
+            ret = {
+                'since': self.since,
+                'buckets': self.buckets[:],
+                'methods': copy.deepcopy(self.methods),
+            }
+
+            if reset:
+                self.methods = {}
+                self.since = time.time()
+
+        return ret
+
+
 class BlockstackdRPCHandler(SimpleXMLRPCRequestHandler):
     """
     Dispatcher to properly instrument calls and do
@@ -277,6 +396,10 @@ class BlockstackdRPCHandler(SimpleXMLRPCRequestHandler):
         global gc_thread
         gc_thread.gc_event()
 
+        # NOTE: None if statistics are disabled
+        stats = rpc_stats
+        method_start = None
+
         try: 
             con_info = {
                 "client_host": self.client_address[0],
@@ -315,16 +438,33 @@ class BlockstackdRPCHandler(SimpleXMLRPCRequestHandler):
                 else:
                     log.debug("RPC %s(%s)" % ("rpc_" + str(method), params))
 
-            res = self.server.funcs["rpc_" + str(method)](*params, **con_info)
+            if stats is None:
+                res = self.server.funcs["rpc_" + str(method)](*params, **con_info)
+
+                # lol jsonrpc within xmlrpc
+                ret = json.dumps(res)
+
+            else:
+                func = self.server.funcs["rpc_" + str(method)]
 
-            # lol jsonrpc within xmlrpc
-            ret = json.dumps(res)
+                method_start = time.time()
+                res = func(*params, **con_info)
+                handler_end = time.time()
+
+                # lol jsonrpc within xmlrpc
+                ret = json.dumps(res)
+                serialize_end = time.time()
+
+                stats.record( str(method), handler_end - method_start, serialize_end - handler_end, type(res) == dict and 'error' in res )
 
             if os.environ.get("BLOCKSTACK_ATLAS_NETWORK_SIMULATION", None) == "1":
                 log.debug("Inbound RPC end %s(%s)" % ("rpc_" + str(method), params))
 
             return ret
         except Exception, e:
+            if method_start is not None:
+                stats.record( str(method), time.time() - method_start, 0.0, True )
+
             print >> sys.stderr, "\n\n%s(%s)\n%s\n\n" % ("rpc_" + str(method), params, traceback.format_exc())
             return json.dumps( rpc_traceback() )
 
@@ -352,22 +492,11 @@ class BlockstackdRPC( SimpleXMLRPCServer):
 
     def analytics(self, event_type, event_payload):
         """
-        Report analytics information for this server
-        (uses this server's client handle)
+        Report analytics information for this server.
+        The event is queued and sent by the analytics thread,
+        so this never blocks the RPC.
         """
-        ak = None
-        conf = get_blockstack_opts()
-        if conf.has_key('analytics_key'):
-            ak = conf['analytics_key']
-
-        if ak is None or len(ak) == 0:
-            return
-
-        try:
-            blockstack_client.client.analytics_event( event_type, event_payload, analytics_key=ak, action_tag="Perform server action" )
-        except:
-            log.error("Failed to log analytics event")
-        
+        analytics_enqueue( event_type, event_payload )
         return
 
 
@@ -691,6 +820,40 @@ class BlockstackdRPC( SimpleXMLRPCServer):
         return self.success_response( {"satoshis": int(math.ceil(ret))} )
 
 
+    def rpc_get_names_cost( self, names, **con_info ):
+        """
+        Return the costs of a list of names, including fees.
+        Only price at most 100 names.
+        Return {'status': True, 'satoshis': {name: satoshis}} on success.
+        Names in unknown namespaces are omitted.
+        Return {'error': ...} on error
+        """
+
+        if not is_indexer():
+            return {'error': 'Method not supported'}
+
+        if type(names) != list:
+            return {'error': 'invalid names'}
+
+        if len(names) > 100:
+            log.error("Too many requests (%s)" % len(names))
+            return {'error': 'Too many requests'}
+
+        for name in names:
+            if type(name) not in [str, unicode]:
+                return {'error': 'invalid name'}
+
+            if not is_name_valid(name):
+                return {'error': 'invalid name'}
+
+        db = get_db_state()
+        costs = get_names_cost( db, names )
+        db.close()
+
+        ret = dict([(name, int(math.ceil(cost))) for (name, cost) in costs.items()])
+        return self.success_response( {"satoshis": ret} )
+
+
     def rpc_get_namespace_cost( self, namespace_id, **con_info ):
         """
         Return the cost of a given namespace, including fees.
@@ -1622,6 +1785,24 @@ class BlockstackdRPC( SimpleXMLRPCServer):
         return atlas_get_all_neighbors()
         
    
+    def rpc_get_rpc_stats(self, reset=False, **con_info):
+        """
+        Get per-RPC-method call counts, error counts, and latency
+        histograms (handler and JSON serialization time, in seconds).
+        Optionally reset them.
+        Return {'status': True, 'since': ..., 'buckets': [...], 'methods': {method: {...}}} on success
+        Return {'error': ...} if statistics are disabled
+        """
+        stats = rpc_stats
+        if stats is None:
+            return {'error': 'RPC statistics are disabled'}
+
+        if type(reset) != bool:
+            return {'error': 'Invalid reset'}
+
+        return self.success_response( stats.get_stats(reset=reset) )
+
+
     def rpc_get_analytics_key(self, client_uuid, **con_info ):
         """
         Get the analytics key
@@ -1692,10 +1873,161 @@ class GCThread( threading.Thread ):
         self.event_count += 1
 
 
+def send_analytics_event( event_type, event_payload ):
+    """
+    Report analytics information for this server
+    (uses this server's client handle)
+    """
+    ak = None
+    conf = get_blockstack_opts()
+    if conf.has_key('analytics_key'):
+        ak = conf['analytics_key']
+
+    if ak is None or len(ak) == 0:
+        return
+
+    try:
+        blockstack_client.client.analytics_event( event_type, event_payload, analytics_key=ak, action_tag="Perform server action" )
+    except:
+        log.error("Failed to log analytics event")
+
+    return
+
+
+class AnalyticsThread( threading.Thread ):
+    """
+    Worker thread that sends analytics events,
+    so a slow analytics sink never slows down the RPC server.
+
+    Events go into a bounded queue.  If the queue is full,
+    the event is dropped and counted.
+    """
+    def __init__(self, queue_size=ANALYTICS_QUEUE_SIZE, sink=send_analytics_event):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.events = Queue.Queue(maxsize=queue_size)
+        self.sink = sink
+        self.running = True
+        self.num_sent = 0
+        self.num_dropped = 0
+        self.lock = threading.Lock()
+
+
+    def run(self):
+        """
+        Send queued events until asked to stop
+        """
+        while self.running:
+            try:
+                event = self.events.get(timeout=1.0)
+            except Queue.Empty:
+                continue
+
+            if event is None:
+                # sentinel
+                break
+
+            event_type, event_payload = event
+            try:
+                self.sink( event_type, event_payload )
+            except Exception as e:
+                log.exception(e)
+                log.error("Failed to send analytics event '%s'" % event_type)
+
+            with self.lock:
+                self.num_sent += 1
+
+        log.debug("Analytics thread exit")
+
+
+    def enqueue(self, event_type, event_payload):
+        """
+        Queue an event to be sent.
+        Return True if queued
+        Return False if dropped
+        """
+        try:
+            self.events.put_nowait( (event_type, event_payload) )
+            return True
+        except Queue.Full:
+            with self.lock:
+                self.num_dropped += 1
+                num_dropped = self.num_dropped
+
+            if num_dropped == 1 or num_dropped % 100 == 0:
+                log.warning("Analytics queue is full; dropped %s event(s) so far" % num_dropped)
+
+            return False
+
+
+    def get_stats(self):
+        """
+        Get the number of events sent, pending, and dropped
+        """
+        with self.lock:
+            return {'sent': self.num_sent, 'pending': self.events.qsize(), 'dropped': self.num_dropped}
+
+
+    def signal_stop(self):
+        self.running = False
+        try:
+            self.events.put_nowait( None )
+        except Queue.Full:
+            # the thread will see self.running within a second
+            pass
+
+
+class BlockstackStorageWorker( threading.Thread ):
+    """
+    worker thread that stores queued zonefiles, profiles, and data
+    on behalf of the BlockstackStoragePusher.  All work for a given
+    name is handled by the same worker, so it is processed in order.
+    """
+    def __init__(self, pusher, worker_id):
+        threading.Thread.__init__(self)
+        self.pusher = pusher
+        self.worker_id = worker_id
+        self.work = Queue.Queue()
+        self.running = True
+
+
+    def run(self):
+        """
+        Process queued entries until asked to stop
+        """
+        while self.running:
+            try:
+                queue_id, entry = self.work.get(timeout=1.0)
+            except Queue.Empty:
+                continue
+
+            if queue_id is None:
+                # sentinel
+                break
+
+            try:
+                self.pusher.store_entry( queue_id, entry )
+            except Exception as e:
+                log.exception(e)
+                log.error("Worker {} failed to process {} entry for {}".format(self.worker_id, queue_id, entry['fqu']))
+                self.pusher.entry_finished( queue_id, entry, False )
+
+        log.debug("StorageWorker {} thread exit".format(self.worker_id))
+
+
+    def signal_stop(self):
+        self.running = False
+        self.work.put( (None, None) )
+
+
 class BlockstackStoragePusher( threading.Thread ):
     """
     worker thread to push data into storage providers,
     so we don't block the RPC server.
+
+    Queued entries are dispatched to a pool of BlockstackStorageWorker
+    threads, which push each entry to all of its storage drivers at once
+    (see blockstack_client.storage.put_immutable_data() and put_mutable_data()).
     """
     def __init__(self, conf, queue_path):
         threading.Thread.__init__(self)
@@ -1709,6 +2041,7 @@ class BlockstackStoragePusher( threading.Thread ):
         self.profile_storage_drivers = conf['profile_storage_drivers'].split(",")
         self.data_storage_drivers = conf['data_storage_drivers'].split(',')
         self.atlasdb_path = conf.get('atlasdb_path', None)
+        self.num_workers = max(1, int(conf.get('storage_push_workers', STORAGE_PUSH_WORKERS)))
 
         self.zonefile_queue_id = "push-zonefile"
         self.profile_queue_id = "push-profile"
@@ -1727,6 +2060,20 @@ class BlockstackStoragePusher( threading.Thread ):
             log.warn("Removing 'blockstack_server' from data storage drivers")
             self.data_storage_drivers.remove('blockstack_server')
 
+        self.workers = []
+
+        # entries handed off to workers, but not yet finished.
+        # maps (queue_id, fqu) to the time we can dispatch it again (None if in-flight)
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+
+        # set whenever there is new work
+        self.work_available = threading.Event()
+
+        # per-driver metrics
+        self.driver_stats = {}
+        self.driver_stats_lock = threading.Lock()
+
 
     def enqueue_zonefile( self, txid, zonefile_hash, zonefile_data ):
         """
@@ -1760,6 +2107,8 @@ class BlockstackStoragePusher( threading.Thread ):
             # NOTE: we don't use or rely on the name here, but use the zonefile hash instead
             res = queue_append( self.zonefile_queue_id, zonefile_hash, txid, block_height=0, zonefile_hash=zonefile_hash, zonefile_data=zonefile_data, path=self.queue_path )
             assert res
+
+            self.work_available.set()
             return True
         except Exception as e:
             log.exception(e)
@@ -1790,6 +2139,8 @@ class BlockstackStoragePusher( threading.Thread ):
             log.debug("Queue {}-byte datum for {}".format(len(data), blockchain_id))
             res = queue_append( queue_id, blockchain_id, "00" * 32, block_height=0, profile=data, path=self.queue_path )
             assert res
+
+            self.work_available.set()
             return True
         except Exception as e:
             log.exception(e)
@@ -1815,18 +2166,63 @@ class BlockstackStoragePusher( threading.Thread ):
         return self.enqueue_profile_or_data(blockchain_id, self.data_queue_id, json.dumps(data_payload))
 
 
-    def store_one_zonefile(self):
+    def record_driver_push( self, driver_name, elapsed, success ):
         """
-        Find and store one zonefile
+        Record the latency and outcome of a push to a driver
         """
-        # find a zonefile
-        entries = queue_findall( self.zonefile_queue_id, limit=1, path=self.queue_path )
-        if entries is None or len(entries) == 0:
-            # empty 
-            return False
+        with self.driver_stats_lock:
+            if not self.driver_stats.has_key(driver_name):
+                self.driver_stats[driver_name] = {
+                    'pushes': 0,
+                    'failures': 0,
+                    'total_time': 0.0,
+                    'max_time': 0.0,
+                }
+
+            stats = self.driver_stats[driver_name]
+            stats['pushes'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+            if not success:
+                stats['failures'] += 1
+
 
-        entry = entries[0]
-        res = store_zonefile_data_to_storage( str(entry['zonefile']), entry['tx_hash'], required=self.zonefile_storage_drivers, skip=['blockstack_server'], cache=False, zonefile_dir=self.zonefile_dir, tx_required=False )
+    def get_driver_stats( self ):
+        """
+        Get a copy of the per-driver push metrics.
+        Each driver maps to its number of pushes and failures,
+        and its total, average, and maximum push time (in seconds).
+        """
+        with self.driver_stats_lock:
+            ret = copy.deepcopy( self.driver_stats )
+
+        for driver_name in ret.keys():
+            pushes = ret[driver_name]['pushes']
+            ret[driver_name]['avg_time'] = ret[driver_name]['total_time'] / pushes if pushes > 0 else 0.0
+
+        return ret
+
+
+    def record_driver_pushes( self, timings, results ):
+        """
+        Record the latency and outcome of a push to each driver,
+        given the per-driver timings and results from blockstack_client.storage.
+        """
+        for driver_name in results.keys():
+            self.record_driver_push( driver_name, timings.get(driver_name, 0.0), results[driver_name] )
+
+
+    def store_zonefile_entry( self, entry ):
+        """
+        Store a queued zonefile
+        Return True on success
+        """
+        timings = {}
+        results = {}
+        res = store_zonefile_data_to_storage( str(entry['zonefile']), entry['tx_hash'], required=self.zonefile_storage_drivers, skip=['blockstack_server'], cache=False, zonefile_dir=self.zonefile_dir, tx_required=False,
+                                              concurrent=True, wait_all=True, timings=timings, results=results )
+
+        self.record_driver_pushes( timings, results )
         if not res:
             log.error("Failed to store zonefile {} ({} bytes)".format(entry['zonefile_hash'], len(entry['zonefile'])))
             return False
@@ -1837,21 +2233,15 @@ class BlockstackStoragePusher( threading.Thread ):
             # mark present in the atlas subsystem 
             atlasdb_set_zonefile_present( str(entry['zonefile_hash']), True, path=self.atlasdb_path )
 
-        queue_removeall( entries, path=self.queue_path )
+        queue_removeall( [entry], path=self.queue_path )
         return res
 
 
-    def store_one_profile_or_datum(self, queue_id, storage_drivers):
+    def store_profile_or_datum_entry( self, entry, storage_drivers ):
         """
-        Find and store one profile or datum
+        Store a queued profile or datum
+        Return True on success
         """
-        entries = queue_findall( queue_id, limit=1, path=self.queue_path )
-        if entries is None or len(entries) == 0:
-            # empty 
-            return False
-
-        entry = entries[0]
-        
         blockchain_id = str(entry['fqu'])
         fq_data_id = None
         data_txt = None
@@ -1881,53 +2271,132 @@ class BlockstackStoragePusher( threading.Thread ):
             log.exception(e)
             log.debug("entry = {}".format(entry))
             log.debug("Abandoning data from {}".format(blockchain_id))
-            queue_removeall( entries, path=self.queue_path )
+            queue_removeall( [entry], path=self.queue_path )
             return False
         
-        success = store_mutable_data_to_storage( blockchain_id, fq_data_id, data_txt, profile=profile, required=storage_drivers, skip=['blockstack_server'])
+        timings = {}
+        results = {}
+        success = store_mutable_data_to_storage( blockchain_id, fq_data_id, data_txt, profile=profile, required=storage_drivers, skip=['blockstack_server'],
+                                                 concurrent=True, wait_all=True, timings=timings, results=results )
+
+        self.record_driver_pushes( timings, results )
         if not success:
             log.error("Failed to store data for {} ({} bytes)".format(blockchain_id, len(data_txt)))
-            queue_removeall( entries, path=self.queue_path )
+            queue_removeall( [entry], path=self.queue_path )
             return False
 
         log.debug("Replicated data for {} ({} bytes)".format(blockchain_id, len(data_txt)))
-        queue_removeall( entries, path=self.queue_path )
+        queue_removeall( [entry], path=self.queue_path )
         return True
 
 
-    def store_one_profile(self):
+    def store_entry( self, queue_id, entry ):
+        """
+        Store a queued entry from the given queue.
+        Called from a worker thread.
+        """
+        if len(queue_findone( queue_id, entry['fqu'], path=self.queue_path )) == 0:
+            # already handled (we dispatched a stale read)
+            self.entry_finished( queue_id, entry, True )
+            return True
+
+        res = False
+        if queue_id == self.zonefile_queue_id:
+            res = self.store_zonefile_entry( entry )
+
+        elif queue_id == self.profile_queue_id:
+            res = self.store_profile_or_datum_entry( entry, self.profile_storage_drivers )
+
+        elif queue_id == self.data_queue_id:
+            res = self.store_profile_or_datum_entry( entry, self.data_storage_drivers )
+
+        else:
+            log.error("Unknown queue {}".format(queue_id))
+
+        self.entry_finished( queue_id, entry, res )
+        return res
+
+
+    def entry_finished( self, queue_id, entry, success ):
         """
-        Find and store one profile
+        Mark an entry as no longer in-flight.
+        Failed entries that are still queued get retried after STORAGE_PUSH_RETRY_INTERVAL seconds.
         """
-        return self.store_one_profile_or_datum(self.profile_queue_id, self.profile_storage_drivers)
+        key = (queue_id, entry['fqu'])
+        with self.inflight_lock:
+            if success:
+                del self.inflight[key]
+            else:
+                self.inflight[key] = time.time() + STORAGE_PUSH_RETRY_INTERVAL
+
+        global gc_thread
+        if gc_thread is not None:
+            gc_thread.gc_event()
 
 
-    def store_one_datum(self):
+    def dispatch(self):
         """
-        Find and store one mutable datum
+        Hand off queued entries that are not in-flight to the workers.
+        All entries for the same name go to the same worker.
+        Return the number of entries dispatched.
         """
-        return self.store_one_profile_or_datum(self.data_queue_id, self.data_storage_drivers)
+        count = 0
+        now = time.time()
+
+        with self.inflight_lock:
+            # failed entries can be retried now
+            for key, retry_at in self.inflight.items():
+                if retry_at is not None and retry_at <= now:
+                    del self.inflight[key]
+
+        for queue_id in [self.zonefile_queue_id, self.profile_queue_id, self.data_queue_id]:
+
+            with self.inflight_lock:
+                num_inflight = len(self.inflight)
+
+            entries = queue_findall( queue_id, limit=num_inflight + 2 * self.num_workers, path=self.queue_path )
+            for entry in entries:
+                key = (queue_id, entry['fqu'])
+                with self.inflight_lock:
+                    if self.inflight.has_key(key):
+                        # in-flight or waiting to retry
+                        continue
+
+                    self.inflight[key] = None
+
+                worker = self.workers[ hash(entry['fqu']) % len(self.workers) ]
+                worker.work.put( (queue_id, entry) )
+                count += 1
+
+        return count
 
 
     def run(self):
         """
         Push zonefiles and profiles
         """
-        global gc_thread
-
         self.running = True
+
+        self.workers = [BlockstackStorageWorker(self, i) for i in xrange(0, self.num_workers)]
+        for w in self.workers:
+            w.start()
+
+        log.debug("StoragePusher started {} workers".format(self.num_workers))
+
         while self.running:
-          
-            res_zonefile = self.store_one_zonefile()
-            res_profile = self.store_one_profile()
-            res_data = self.store_one_datum()
 
-            if not res_zonefile and not res_profile and not res_data:
-                time.sleep(1.0)
-                continue
+            # clear before looking for work, so work enqueued while we dispatch wakes us up right away
+            self.work_available.clear()
+            count = self.dispatch()
+            if count == 0:
+                # wait for new work (or for failed entries to become retryable)
+                self.work_available.wait(1.0)
 
-            else:
-                gc_thread.gc_event()                
+        for w in self.workers:
+            w.signal_stop()
+
+        for w in self.workers:
+            w.join()
 
         log.debug("StoragePusher thread exit")
         self.running = False
@@ -1935,6 +2404,7 @@ class BlockstackStoragePusher( threading.Thread ):
 
     def signal_stop(self):
         self.running = False
+        self.work_available.set()
         log.debug("StoragePusher signal stop")
 
 
@@ -1957,6 +2427,12 @@ def rpc_start( port ):
 
     rpc_server = BlockstackdRPCServer( port )
 
+    conf = get_blockstack_opts()
+    if conf.get('rpc_stats', False):
+        rpc_stats_start()
+
+    analytics_start()
+
     log.debug("Starting RPC")
     rpc_server.start()
 
@@ -1972,6 +2448,66 @@ def rpc_stop():
         rpc_server.join()
         log.debug("RPC joined")
 
+    analytics_stop()
+
+
+def rpc_stats_start():
+    """
+    Start collecting RPC statistics
+    """
+    global rpc_stats
+
+    log.debug("Collecting RPC statistics")
+    rpc_stats = RPCStats()
+
+
+def rpc_stats_stop():
+    """
+    Stop collecting RPC statistics
+    """
+    global rpc_stats
+    rpc_stats = None
+
+
+def analytics_start():
+    """
+    Start the global analytics thread
+    """
+    global analytics_thread
+
+    analytics_thread = AnalyticsThread()
+    log.debug("Starting analytics thread")
+    analytics_thread.start()
+
+
+def analytics_stop():
+    """
+    Stop the global analytics thread.
+    Pending events are discarded.
+    """
+    global analytics_thread
+
+    if analytics_thread is not None:
+        log.debug("Shutting down analytics thread")
+        analytics_thread.signal_stop()
+        analytics_thread.join()
+        log.debug("Analytics thread joined (%s)" % analytics_thread.get_stats())
+        analytics_thread = None
+
+
+def analytics_enqueue( event_type, event_payload ):
+    """
+    Queue an analytics event for the analytics thread.
+    Return True if queued
+    Return False if dropped (or if the thread isn't running)
+    """
+    global analytics_thread
+
+    if analytics_thread is None:
+        return False
+
+    return analytics_thread.enqueue( event_type, event_payload )
+
 
 def get_storage_queue_path():
    """
@@ -2034,6 +2570,17 @@ def storage_stop():
     log.debug("Storage pusher joined")
 
 
+def storage_driver_stats():
+    """
+    Get the storage pusher's per-driver metrics
+    """
+    global storage_pusher
+    if storage_pusher is None:
+        return {}
+
+    return storage_pusher.get_driver_stats()
+
+
 def storage_enqueue_zonefile( txid, zonefile_hash, zonefile_data ):
     """
     Queue a zonefile for replication
@@ -2638,6 +3185,19 @@ def load_expected_snapshots( snapshots_path ):
         return None
 
 
+def load_untrusted_checkpoints( db_path, untrusted_snapshots_path=None ):
+    """
+    Load an untrusted database's checkpointed consensus hashes.
+    If @untrusted_snapshots_path is not given, use the .snapshots file next to the database.
+    Return the snapshots as a dict on success
+    Return None on error
+    """
+    if untrusted_snapshots_path is None:
+        untrusted_snapshots_path = os.path.join( os.path.dirname( db_path ), os.path.basename( virtualchain.get_snapshots_filename() ) )
+
+    return load_expected_snapshots( untrusted_snapshots_path )
+
+
 def run_blockstackd():
    """
    run blockstackd
@@ -2730,6 +3290,12 @@ def run_blockstackd():
    parser.add_argument(
       '--expected-snapshots', action='store',
       help='path to a .snapshots file with the expected consensus hashes')
+   parser.add_argument(
+      '--workers', action='store',
+      help='verify the database\'s checkpointed consensus hashes in parallel with this many worker processes')
+   parser.add_argument(
+      '--untrusted-snapshots', action='store',
+      help='path to the untrusted database\'s .snapshots file (used with --workers; defaults to the one next to the database)')
 
    parser = subparsers.add_parser(
       'importdb',
@@ -2869,14 +3435,23 @@ def run_blockstackd():
    elif args.action == 'verifydb':
       db_path = virtualchain.get_db_filename()
       working_db_path = os.path.join( working_dir, os.path.basename( db_path ) )
-      expected_snapshots = None
+      expected_snapshots = {}
+      checkpoints = None
+      num_workers = None
       
       if args.expected_snapshots is not None:
           expected_snapshots = load_expected_snapshots( args.expected_snapshots )
           if expected_snapshots is None:
               sys.exit(1)
 
-      rc = verify_database( args.consensus_hash, int(args.block_id), args.db_path, working_db_path=working_db_path, expected_snapshots=expected_snapshots )
+      if args.workers is not None:
+          # verify the untrusted db's consensus hashes in parallel
+          num_workers = int(args.workers)
+          checkpoints = load_untrusted_checkpoints( args.db_path, untrusted_snapshots_path=args.untrusted_snapshots )
+          if checkpoints is None:
+              sys.exit(1)
+
+      rc = verify_database( args.consensus_hash, int(args.block_id), args.db_path, working_db_path=working_db_path, expected_snapshots=expected_snapshots, checkpoints=checkpoints, num_workers=num_workers )
       if rc:
           # success!
           print "Database is consistent with %s" % args.consensus_hash
@@ -424,6 +424,7 @@ PRICE_DROP_FOR_NON_ALPHABETIC = 10
 ALPHABETIC_PRICE_FLOOR = 10**4
 
 NAME_COST_UNIT = 100    # 100 satoshis
+NAME_PRICE_CACHE_SIZE = 100000      # number of name prices to memoize
 
 NAMESPACE_1_CHAR_COST = 400 * SATOSHIS_PER_BTC        # ~$96,000
 NAMESPACE_23_CHAR_COST = 40 * SATOSHIS_PER_BTC        # ~$9,600
@@ -876,6 +877,7 @@ def default_blockstack_opts( config_file=None, virtualchain_impl=None ):
    zonefile_storage_drivers = "disk,dht"
    profile_storage_drivers = "disk"
    data_storage_drivers = "disk"
+   storage_push_workers = 4
    redirect_data = False
    data_servers = None
    server_version = None
@@ -884,6 +886,7 @@ def default_blockstack_opts( config_file=None, virtualchain_impl=None ):
    atlasdb_path = os.path.join( os.path.dirname(config_file), "atlas.db" )
    atlas_blacklist = ""
    atlas_hostname = socket.gethostname()
+   rpc_stats = False
 
    if parser.has_section('blockstack'):
 
@@ -926,6 +929,9 @@ def default_blockstack_opts( config_file=None, virtualchain_impl=None ):
       if parser.has_option("blockstack", "profile_storage_drivers"):
           profile_storage_drivers = parser.get("blockstack", "profile_storage_drivers")
 
+      if parser.has_option("blockstack", "storage_push_workers"):
+          storage_push_workers = int(parser.get("blockstack", "storage_push_workers"))
+
       if parser.has_option("blockstack", "zonefiles"):
           zonefile_dir = parser.get("blockstack", "zonefiles")
     
@@ -999,6 +1005,13 @@ def default_blockstack_opts( config_file=None, virtualchain_impl=None ):
 
       if parser.has_option('blockstack', 'atlas_hostname'):
          atlas_hostname = parser.get('blockstack', 'atlas_hostname')
+
+      if parser.has_option('blockstack', 'rpc_stats'):
+         rpc_stats = parser.get('blockstack', 'rpc_stats')
+         if rpc_stats.lower() in ['1', 'yes', 'true', 'on']:
+            rpc_stats = True
+         else:
+            rpc_stats = False
         
 
    if os.path.exists( announce_path ):
@@ -1035,6 +1048,7 @@ def default_blockstack_opts( config_file=None, virtualchain_impl=None ):
        'profile_storage_drivers': profile_storage_drivers,
        'serve_data': serve_data,
        'data_storage_drivers': data_storage_drivers,
+       'storage_push_workers': storage_push_workers,
        'redirect_data': redirect_data,
        'data_servers': data_servers,
        'analytics_key': analytics_key,
@@ -1044,6 +1058,7 @@ def default_blockstack_opts( config_file=None, virtualchain_impl=None ):
        'atlasdb_path': atlasdb_path,
        'atlas_blacklist': atlas_blacklist,
        'atlas_hostname': atlas_hostname,
+       'rpc_stats': rpc_stats,
        'zonefiles': zonefile_dir,
    }
 
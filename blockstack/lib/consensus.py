@@ -36,6 +36,7 @@ import binascii
 import copy
 import threading
 import errno
+import multiprocessing
 
 import virtualchain
 import blockstack_client
@@ -102,23 +103,30 @@ def rec_to_virtualchain_op( name_rec, block_number, history_index, working_db, u
     return merged_ret_op
 
 
-def rec_restore_snv_consensus_fields( name_rec, block_id ):
+def rec_restore_snv_consensus_fields( name_rec, block_id, db=None ):
     """
     Given a name record at a given point in time, ensure
     that all of its consensus fields are present.
     Because they can be reconstructed directly from the record,
     but they are not always stored in the db, we have to do so here.
+
+    If @db is not given, a read-only handle to the
+    configured virtualchain db will be used.
     """
 
     opcode_name = op_get_opcode_name( name_rec['op'] )
     assert opcode_name is not None, "Unrecognized opcode '%s'" % name_rec['op']
 
     ret_op = {}
-    db = get_db_state()
+    close_db = False
+    if db is None:
+        db = get_db_state()
+        close_db = True
 
     ret_op = op_snv_consensus_extra( opcode_name, name_rec, block_id, db )
 
-    db.close()
+    if close_db:
+        db.close()
 
     if ret_op is None:
         raise Exception("Failed to derive extra consensus fields for '%s'" % opcode_name)
@@ -158,18 +166,19 @@ def block_to_virtualchain_ops( block_id, working_db, untrusted_db ):
     # record.
 
     history_index = {}
+    history_counts = {}
     for i in xrange(0, len(prior_recs)):
         rec = prior_recs[i]
 
-        if 'name' not in rec.keys():
+        if 'name' not in rec:
             continue
 
+        # track the number of updates per name, so we don't
+        # have to re-scan history_index[name] for each record
         name = str(rec['name'])
-        if name not in history_index.keys():
-            history_index[name] = { i: 0 }
-
-        else:
-            history_index[name][i] = max( history_index[name].values() ) + 1
+        h = history_counts.get(name, 0)
+        history_index.setdefault(name, {})[i] = h
+        history_counts[name] = h + 1
 
 
     for i in xrange(0, len(prior_recs)):
@@ -277,7 +286,7 @@ def rebuild_database( target_block_id, untrusted_db_path, working_db_path=None,
         consensus_hashes[block_id] = consensus_hash
         if block_id in expected_snapshots:
             if expected_snapshots[block_id] != consensus_hash:
-                log.error("DATABASE IS NOT CONSISTENT AT %s: %s != %s" % (block_id, expected_snashots[block_id], consensus_hash))
+                log.error("DATABASE IS NOT CONSISTENT AT %s: %s != %s" % (block_id, expected_snapshots[block_id], consensus_hash))
                 return None
 
 
@@ -285,7 +294,178 @@ def rebuild_database( target_block_id, untrusted_db_path, working_db_path=None,
     return consensus_hashes[ target_block_id ]
 
 
-def verify_database( trusted_consensus_hash, consensus_block_id, untrusted_db_path, working_db_path=None, start_block=None, expected_snapshots={} ):
+def checkpoint_prev_block_ids( block_id ):
+    """
+    Get the IDs of the prior blocks whose consensus hashes
+    go into the consensus hash at @block_id, in order.
+    """
+
+    prev_block_ids = []
+    i = 0
+    while block_id - (2 ** (i + 1) - 1) >= FIRST_BLOCK_MAINNET:
+        i += 1
+        prev_block_ids.append( block_id - (2 ** i - 1) )
+
+    return prev_block_ids
+
+
+def checkpoint_consensus_hash( block_id, ops_hash, checkpoints ):
+    """
+    Calculate the consensus hash at @block_id from the block's
+    ops hash and the prior consensus hashes in @checkpoints
+    (a dict that maps block IDs to consensus hashes).
+    This is the same Merkle skip-list construction used for SNV.
+
+    Return the consensus hash on success
+    Return None if a required prior consensus hash is missing
+    """
+
+    prev_consensus_hashes = []
+    for prev_block_id in checkpoint_prev_block_ids( block_id ):
+        if prev_block_id not in checkpoints:
+            log.error("Missing checkpointed consensus hash for %s" % prev_block_id)
+            return None
+
+        prev_consensus_hash = checkpoints[prev_block_id]
+        if prev_consensus_hash is None:
+            # no consensus hash for this block and all prior blocks
+            break
+
+        prev_consensus_hashes.append( str(prev_consensus_hash) )
+
+    return virtualchain.StateEngine.make_snapshot_from_ops_hash( ops_hash, prev_consensus_hashes )
+
+
+def range_checkpoints( range_start, range_end, checkpoints ):
+    """
+    Get the subset of @checkpoints needed to verify the blocks
+    from @range_start to @range_end (inclusive): each block's
+    own consensus hash, and the prior consensus hashes it is built from.
+    """
+
+    block_ids = set()
+    for block_id in xrange( range_start, range_end+1 ):
+        block_ids.add( block_id )
+        block_ids.update( checkpoint_prev_block_ids( block_id ) )
+
+    return dict( [(block_id, checkpoints[block_id]) for block_id in block_ids if block_id in checkpoints] )
+
+
+def _verify_block_range( range_info ):
+    """
+    Worker process entry point for verify_consensus_ranges().
+    Recalculate each block's ops hash from the untrusted database,
+    and check that it reproduces the checkpointed consensus hash.
+
+    @range_info is (untrusted_db_path, first block, last block, checkpoints),
+    where checkpoints covers only this range (see range_checkpoints())
+
+    Return (first block, last block, None) on success
+    Return (first block, last block, block ID) for the first block that fails verification
+    """
+
+    untrusted_db_path, range_start, range_end, checkpoints = range_info
+    untrusted_db = None
+
+    try:
+        # point virtualchain at the untrusted db's directory, so
+        # consensus fields get restored from its snapshots
+        blockstack_state_engine.working_dir = os.path.dirname( os.path.abspath(untrusted_db_path) )
+        virtualchain.setup_virtualchain( impl=blockstack_state_engine )
+
+        untrusted_db = BlockstackDB( untrusted_db_path, DISPOSITION_RO )
+
+        for block_id in xrange( range_start, range_end+1 ):
+            untrusted_db.lastblock = block_id
+
+            ops_hash = BlockstackDB.calculate_block_ops_hash( untrusted_db, block_id, consensus_db=untrusted_db )
+            consensus_hash = checkpoint_consensus_hash( block_id, ops_hash, checkpoints )
+
+            log.debug("VERIFY CONSENSUS(%s): %s" % (block_id, consensus_hash))
+            if consensus_hash is None or consensus_hash != checkpoints.get(block_id, None):
+                log.error("DATABASE IS NOT CONSISTENT AT %s: %s != %s" % (block_id, checkpoints.get(block_id, None), consensus_hash))
+                return (range_start, range_end, block_id)
+
+    except Exception, e:
+        log.exception(e)
+        log.error("Failed to verify blocks %s-%s" % (range_start, range_end))
+        return (range_start, range_end, range_start)
+
+    finally:
+        if untrusted_db is not None:
+            untrusted_db.close()
+
+    return (range_start, range_end, None)
+
+
+def verify_consensus_ranges( target_block_id, untrusted_db_path, checkpoints, start_block=None, num_workers=None, range_size=None, expected_snapshots={} ):
+    """
+    Given a target block ID, a path to an (untrusted) db, and the untrusted db's
+    checkpointed consensus hashes (i.e. its .snapshots, as a dict that maps block ID to consensus hash),
+    verify the db's operation history in parallel.
+
+    Each block's consensus hash depends only on the block's operations and on earlier
+    consensus hashes, so given the checkpoints, block ranges can be verified
+    independently in worker processes.  Once every range checks out, the chain of consensus
+    hashes from @start_block to @target_block_id is authentic, and the checkpoint at
+    @target_block_id can be compared against a trusted consensus hash.
+
+    NOTE: unlike rebuild_database(), this does not re-evaluate each operation against
+    the name database's prior state--it only checks that the history recorded in the
+    untrusted db is the history that produced the checkpointed consensus hashes.
+
+    Optionally check that the snapshots in @expected_snapshots match up as we verify.
+
+    Return the consensus hash at the target block.
+    Return None on verification failure
+    """
+
+    if start_block is None:
+        start_block = virtualchain.get_first_block_id()
+
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+
+    num_workers = max(1, num_workers)
+
+    if range_size is None:
+        # a few ranges per worker, to even out the load
+        range_size = max(1, (target_block_id - start_block + 1) / (num_workers * 4))
+
+    for block_id in xrange( start_block, target_block_id+1 ):
+        if block_id not in checkpoints:
+            log.error("No checkpointed consensus hash for %s" % block_id)
+            return None
+
+        if block_id in expected_snapshots:
+            if expected_snapshots[block_id] != checkpoints[block_id]:
+                log.error("DATABASE IS NOT CONSISTENT AT %s: %s != %s" % (block_id, expected_snapshots[block_id], checkpoints[block_id]))
+                return None
+
+    block_ranges = []
+    for range_start in xrange( start_block, target_block_id+1, range_size ):
+        range_end = min( range_start + range_size - 1, target_block_id )
+        block_ranges.append( (untrusted_db_path, range_start, range_end, range_checkpoints( range_start, range_end, checkpoints )) )
+
+    log.debug("Verifying database from %s to %s in %s ranges with %s workers" % (start_block, target_block_id, len(block_ranges), num_workers))
+
+    pool = multiprocessing.Pool( processes=num_workers )
+    try:
+        results = pool.map( _verify_block_range, block_ranges, chunksize=1 )
+    finally:
+        pool.close()
+        pool.join()
+
+    # stitch the ranges together
+    failed_blocks = sorted( [failed_block_id for (_, _, failed_block_id) in results if failed_block_id is not None] )
+    if len(failed_blocks) > 0:
+        log.error("Database verification failed at block %s" % failed_blocks[0])
+        return None
+
+    return checkpoints[ target_block_id ]
+
+
+def verify_database( trusted_consensus_hash, consensus_block_id, untrusted_db_path, working_db_path=None, start_block=None, expected_snapshots={}, checkpoints=None, num_workers=None ):
     """
     Verify that a database is consistent with a
     known-good consensus hash.
@@ -295,9 +475,17 @@ def verify_database( trusted_consensus_hash, consensus_block_id, untrusted_db_pa
     operations into the new database block-by-block.  If we
     derive the same consensus hash, then we can trust the
     database.
+
+    If @checkpoints (the untrusted db's consensus hashes) are given,
+    then verify the untrusted db's history in parallel instead
+    (see verify_consensus_ranges()).
     """
 
-    final_consensus_hash = rebuild_database( consensus_block_id, untrusted_db_path, working_db_path=working_db_path, start_block=start_block, expected_snapshots=expected_snapshots )
+    if checkpoints is not None:
+        final_consensus_hash = verify_consensus_ranges( consensus_block_id, untrusted_db_path, checkpoints, start_block=start_block, num_workers=num_workers, expected_snapshots=expected_snapshots )
+
+    else:
+        final_consensus_hash = rebuild_database( consensus_block_id, untrusted_db_path, working_db_path=working_db_path, start_block=start_block, expected_snapshots=expected_snapshots )
 
     # did we reach the consensus hash we expected?
     if final_consensus_hash is not None and final_consensus_hash == trusted_consensus_hash:
@@ -1710,9 +1710,11 @@ class BlockstackDB( virtualchain.StateEngine ):
 
 
     @classmethod 
-    def calculate_block_ops_hash( cls, db_state, block_id ):
+    def calculate_block_ops_hash( cls, db_state, block_id, consensus_db=None ):
         """
         Get the hash of the sequence of operations that occurred in a particular block.
+        If @consensus_db is given, use it to restore the ops' consensus fields
+        (instead of the configured virtualchain db).
         Return the hash on success.
         """
 
@@ -1729,7 +1731,7 @@ class BlockstackDB( virtualchain.StateEngine ):
                 log.debug("Strategic garbage collect at block %s op %s" % (block_id, i))
                 gc.collect()
 
-            restored_rec = rec_restore_snv_consensus_fields( prior_recs[i], block_id )
+            restored_rec = rec_restore_snv_consensus_fields( prior_recs[i], block_id, db=consensus_db )
             restored_recs.append( restored_rec )
 
         # NOTE: extracts only the operation-given fields, and ignores ancilliary record fields
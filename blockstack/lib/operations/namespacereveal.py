@@ -27,6 +27,7 @@ from ..scripts import *
 from ..nameset import *
 
 from binascii import hexlify, unhexlify 
+import re
 
 import blockstack_client
 from blockstack_client.operations import *
@@ -32,6 +32,8 @@ log = virtualchain.get_logger("blockstack-server")
 
 import bitcoin
 import json
+import threading
+import collections
 
 try:
     from .config import *
@@ -118,18 +120,54 @@ def get_name_from_fq_name( name ):
    return name.split(".")[0]
 
 
-def price_name( name, namespace, block_height ):
+class NamePriceCache(object):
    """
-   Calculate the price of a name (without its namespace ID), given the
-   namespace parameters.
+   Bounded LRU cache of name prices (before the epoch price multiplier),
+   keyed on the name and its namespace's pricing parameters.
+   """
+   def __init__(self, max_size=NAME_PRICE_CACHE_SIZE):
+      self.max_size = max_size
+      self.prices = collections.OrderedDict()
+      self.lock = threading.Lock()
+
+   def get(self, key):
+      """
+      Get a cached price.
+      Return None if not cached
+      """
+      with self.lock:
+         price = self.prices.pop(key, None)
+         if price is not None:
+            self.prices[key] = price
+
+         return price
+
+   def put(self, key, price):
+      """
+      Cache a price, evicting the least-recently-used entry if full
+      """
+      with self.lock:
+         self.prices.pop(key, None)
+         self.prices[key] = price
+         while len(self.prices) > self.max_size:
+            self.prices.popitem(last=False)
+
+   def clear(self):
+      with self.lock:
+         self.prices.clear()
+
+
+NAME_PRICE_CACHE = NamePriceCache()
+
+
+def _price_name_base( name, base, coeff, buckets, no_vowel_discount, nonalpha_discount ):
+   """
+   Calculate the price of a name from the namespace's pricing parameters,
+   without the epoch price multiplier.
 
    The minimum price is NAME_COST_UNIT
    """
 
-   base = namespace['base']
-   coeff = namespace['coeff']
-   buckets = namespace['buckets']
-
    bucket_exponent = 0
    discount = 1.0
 
@@ -141,17 +179,42 @@ def price_name( name, namespace, block_height ):
    # no vowel discount?
    if sum( [name.lower().count(v) for v in ["a", "e", "i", "o", "u", "y"]] ) == 0:
        # no vowels!
-       discount = max( discount, namespace['no_vowel_discount'] )
+       discount = max( discount, no_vowel_discount )
 
    # non-alpha discount?
    if sum( [name.lower().count(v) for v in ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "-", "_"]] ) > 0:
        # non-alpha!
-       discount = max( discount, namespace['nonalpha_discount'] )
+       discount = max( discount, nonalpha_discount )
 
    price = (float(coeff * (base ** bucket_exponent)) / float(discount)) * NAME_COST_UNIT
    if price < NAME_COST_UNIT:
        price = NAME_COST_UNIT
 
+   return price
+
+
+def price_name( name, namespace, block_height, use_cache=True ):
+   """
+   Calculate the price of a name (without its namespace ID), given the
+   namespace parameters.
+
+   Prices are cached by name and pricing parameters, so a change to the
+   namespace's parameters never returns a stale price.
+
+   The minimum price is NAME_COST_UNIT
+   """
+
+   pricing = (namespace['base'], namespace['coeff'], tuple(namespace['buckets']), namespace['no_vowel_discount'], namespace['nonalpha_discount'])
+
+   price = None
+   if use_cache:
+       price = NAME_PRICE_CACHE.get( (name,) + pricing )
+
+   if price is None:
+       price = _price_name_base( name, *pricing )
+       if use_cache:
+           NAME_PRICE_CACHE.put( (name,) + pricing, price )
+
    price_multiplier = get_epoch_price_multiplier( block_height, namespace['namespace_id'] )
    return price * price_multiplier
 
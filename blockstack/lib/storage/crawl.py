@@ -224,9 +224,10 @@ def remove_cached_zonefile_data( zonefile_hash, zonefile_dir=None ):
     return True
 
 
-def store_zonefile_data_to_storage( zonefile_text, txid, required=None, skip=None, cache=False, zonefile_dir=None, tx_required=True ):
+def store_zonefile_data_to_storage( zonefile_text, txid, required=None, skip=None, cache=False, zonefile_dir=None, tx_required=True, concurrent=False, wait_all=False, timings=None, results=None ):
     """
     Upload a zonefile to our storage providers.
+    @concurrent, @wait_all, @timings and @results are passed to blockstack_client.storage.put_immutable_data().
     Return True if at least one provider got it.
     Return False otherwise.
     """
@@ -242,7 +243,8 @@ def store_zonefile_data_to_storage( zonefile_text, txid, required=None, skip=Non
             log.debug("Failed to cache zonefile %s" % zonefile_hash)
 
     # NOTE: this can fail if one of the required drivers needs a non-null txid
-    res = blockstack_client.storage.put_immutable_data( None, txid, data_hash=zonefile_hash, data_text=zonefile_text, required=required, skip=skip )
+    res = blockstack_client.storage.put_immutable_data( None, txid, data_hash=zonefile_hash, data_text=zonefile_text, required=required, skip=skip,
+                                                        concurrent=concurrent, wait_all=wait_all, timings=timings, results=results )
     if res is None:
         log.error("Failed to store zonefile '%s' for '%s'" % (zonefile_hash, txid))
         return False
@@ -268,10 +270,11 @@ def store_zonefile_to_storage( zonefile_dict, required=None, skip=None, cache=Fa
     return store_zonefile_data_to_storage( zonefile_data, required=required, skip=skip, cache=cache, zonefile_dir=zonefile_dir, name=name )
 
 
-def store_mutable_data_to_storage( blockchain_id, data_id, data_txt, profile=False, required=None, skip=None ):
+def store_mutable_data_to_storage( blockchain_id, data_id, data_txt, profile=False, required=None, skip=None, concurrent=False, wait_all=False, timings=None, results=None ):
     """
     Store the given mutable datum to storage providers.
     Used by the storage gateway logic.
+    @concurrent, @wait_all, @timings and @results are passed to blockstack_client.storage.put_mutable_data().
     Return True on successful replication to all required drivers
     Return False on error
     """
@@ -283,7 +286,8 @@ def store_mutable_data_to_storage( blockchain_id, data_id, data_txt, profile=Fal
     else:
         nocollide_data_id = '{}-{}'.format(blockchain_id, data_id)
 
-    res = blockstack_client.storage.put_mutable_data(nocollide_data_id, data_txt, None, sign=False, required=required, skip=skip, blockchain_id=blockchain_id)
+    res = blockstack_client.storage.put_mutable_data(nocollide_data_id, data_txt, None, sign=False, required=required, skip=skip, blockchain_id=blockchain_id,
+                                                     concurrent=concurrent, wait_all=wait_all, timings=timings, results=results)
     return res
 
 
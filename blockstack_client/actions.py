@@ -83,7 +83,7 @@ from blockstack_client import (
     list_zonefile_history, lookup_snv, put_immutable, put_mutable, zonefile_data_replicate
 )
 
-from blockstack_client.profile import put_profile, delete_profile, get_profile
+from blockstack_client.profile import put_profile, delete_profile, get_profile, get_profiles
 
 from rpc import local_api_connect, local_api_status, local_api_stop 
 import rpc as local_rpc
@@ -141,7 +141,7 @@ from .app import app_publish, app_unpublish, app_get_config, app_get_resource, \
 from .data import datastore_mkdir, datastore_rmdir, make_datastore, get_datastore, put_datastore, delete_datastore, \
         datastore_getfile, datastore_putfile, datastore_deletefile, datastore_listdir, datastore_stat, \
         datastore_rmtree, datastore_get_id, datastore_get_privkey, _mutable_data_make_file, data_blob_serialize, \
-        data_blob_parse
+        data_blob_parse, datastore_getfiles, datastore_putfiles, datastore_listdir_recursive
 
 from .schemas import OP_URLENCODED_PATTERN, OP_NAME_PATTERN, OP_USER_ID_PATTERN, OP_BASE58CHECK_PATTERN
 
@@ -874,6 +874,46 @@ def cli_lookup(args, config_path=CONFIG_PATH):
     return result
 
 
+def cli_lookup_profiles(args, config_path=CONFIG_PATH):
+    """
+    command: lookup_profiles
+    help: Get the zone files and profiles for many names at once
+    arg: names (str) 'A comma-separated list of names to look up'
+    """
+    names = [str(name).strip() for name in str(args.names).split(',') if len(name.strip()) > 0]
+    if len(names) == 0:
+        return {'error': 'No names given'}
+
+    for name in names:
+        error = check_valid_name(name)
+        if error:
+            return {'error': '{}: {}'.format(name, error)}
+
+    try:
+        res = get_profiles(names, include_raw_zonefile=True, use_legacy=True, use_legacy_zonefile=True)
+    except socket_error:
+        return {'error': 'Error connecting to server.'}
+
+    ret = {}
+    for name in names:
+        if 'error' in res[name]:
+            ret[name] = {'error': res[name]['error'], 'timings': res[name]['timings']}
+            continue
+
+        if res[name]['name_record'].get('revoked', False):
+            ret[name] = {'error': 'Name is revoked. Use get_name_blockchain_record for details.', 'timings': res[name]['timings']}
+            continue
+
+        ret[name] = {
+            'profile': res[name]['profile'],
+            'zonefile': res[name]['raw_zonefile'],
+            'timings': res[name]['timings'],
+        }
+
+    analytics_event('Name lookup', {'count': len(names)})
+    return ret
+
+
 def cli_whois(args, config_path=CONFIG_PATH):
     """
     command: whois
@@ -4048,10 +4088,74 @@ def datastore_file_put(datastore_type, datastore_privkey, path, data, create=Tru
     return res
 
 
-def datastore_dir_list(datastore_type, datastore_id, path, config_path=CONFIG_PATH, proxy=None ):
+def datastore_files_get(datastore_type, datastore_id, paths, proxy=None, config_path=CONFIG_PATH ):
+    """
+    Get several files from a datastore or collection at once.
+    Return {'status': True, 'files': {path: ...}, 'errors': {path: ...}} on success
+    Return {'error': ...} on error
+    """
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    datastore_info = get_datastore_info( datastore_id=datastore_id, config_path=config_path, proxy=proxy)
+    if 'error' in datastore_info:
+        if 'errno' not in datastore_info:
+            datastore_info['errno'] = errno.EPERM
+
+        return datastore_info
+
+    datastore = datastore_info['datastore']
+    if datastore['type'] != datastore_type:
+        return {'error': '{} is a {}'.format(datastore_id, datastore['type'])}
+
+    res = datastore_getfiles( datastore, paths, config_path=config_path, proxy=proxy )
+    return res
+
+
+def datastore_files_put(datastore_type, datastore_privkey, files, create=False, app_domain=None, proxy=None, password=None, wallet_keys=None, config_path=CONFIG_PATH ):
+    """
+    Put several files into a datastore or collection at once.
+    @files maps each path to its data.
+    need either datastore_id, or access to the wallet and the app_domain
+    Return {'status': True, 'urls': {path: url}, 'errors': {path: ...}} on success
+    Return {'error': ...} on failure.
+    """
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    datastore_info = get_datastore_privkey_info( app_domain, wallet_keys, app_user_privkey=datastore_privkey, config_path=config_path, proxy=proxy )
+    if 'error' in datastore_info:
+        datastore_info['errno'] = errno.EPERM
+        return datastore_info
+    
+    datastore = datastore_info['datastore']
+    datastore_privkey = datastore_info['datastore_privkey']
+    datastore_id = datastore_info['datastore_id']
+
+    assert datastore_id == datastore_get_id(get_pubkey_hex(datastore_privkey))
+
+    log.debug("putfiles {} to {} (for {})".format(','.join(files.keys()), datastore_id, app_domain))
+
+    res = datastore_putfiles( datastore, files, datastore_privkey, create=create, config_path=config_path, proxy=proxy )
+    if 'error' in res:
+        return res
+
+    # make urls
+    res['urls'] = {}
+    for path in files.keys():
+        if path not in res['errors']:
+            res['urls'][path] = blockstack_datastore_url( datastore_id, app_domain, path )
+
+    return res
+
+
+def datastore_dir_list(datastore_type, datastore_id, path, recursive=False, config_path=CONFIG_PATH, proxy=None ):
     """
     List a directory in a datastore or collection
-    Return {'status': True, 'dir': ...} on success
+    If @recursive is True, list all of its subdirectories as well.
+    Return {'status': True, 'dir': ...} on success (with 'dirs': {path: ...} if @recursive is True)
     Return {'error': ...} on error
     """
 
@@ -4076,7 +4180,11 @@ def datastore_dir_list(datastore_type, datastore_id, path, config_path=CONFIG_PA
         if path != '/':
             return {'error': 'Invalid argument: collections do not have directories', 'errno': errno.EINVAL}
 
-    res = datastore_listdir( datastore, path, config_path=config_path, proxy=proxy )
+    if recursive:
+        res = datastore_listdir_recursive( datastore, path, config_path=config_path, proxy=proxy )
+    else:
+        res = datastore_listdir( datastore, path, config_path=config_path, proxy=proxy )
+
     return res
 
 
@@ -4286,6 +4394,7 @@ def cli_datastore_listdir(args, config_path=CONFIG_PATH, interactive=False, prox
     help: List a directory in the datastore.
     arg: app_user_id (str) 'The ID of the application user'
     arg: path (str) 'The path to the directory to list'
+    opt: recursive (str) 'If True, then list all subdirectories as well'
     """
 
     if proxy is None:
@@ -4293,8 +4402,32 @@ def cli_datastore_listdir(args, config_path=CONFIG_PATH, interactive=False, prox
 
     app_user_id = str(args.app_user_id)
     path = str(args.path)
+    recursive = (str(getattr(args, "recursive", "")).lower() in ['1', 'recursive', 'true', '-r'])
+
+    return datastore_dir_list('datastore', app_user_id, path, recursive=recursive, config_path=config_path, proxy=proxy)
+
+
+def cli_datastore_getfiles( args, config_path=CONFIG_PATH, interactive=False, proxy=None ):
+    """
+    command: datastore_getfiles advanced
+    help: Get several files from a datastore at once.
+    arg: app_user_id (str) 'The ID of the application user'
+    arg: paths (str) 'A JSON list of paths to the files to load'
+    """
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    app_user_id = str(args.app_user_id)
+    paths = None
+    try:
+        paths = json.loads(args.paths)
+        assert isinstance(paths, list)
+        paths = [str(p) for p in paths]
+    except:
+        return {'error': 'Invalid argument: paths must be a JSON list of strings', 'errno': errno.EINVAL}
 
-    return datastore_dir_list('datastore', app_user_id, path, config_path=config_path, proxy=proxy)
+    return datastore_files_get('datastore', app_user_id, paths, config_path=config_path, proxy=proxy)
 
 
 def cli_datastore_stat(args, config_path=CONFIG_PATH, interactive=False, proxy=None):
@@ -4342,6 +4475,46 @@ def cli_datastore_putfile(args, config_path=CONFIG_PATH, interactive=False, prox
     return datastore_file_put('datastore', app_user_privkey, path, data, create=create, app_domain=app_domain, wallet_keys=wallet_keys, password=password, force_data=force_data, proxy=proxy, config_path=config_path )
 
 
+def cli_datastore_putfiles(args, config_path=CONFIG_PATH, interactive=False, proxy=None, password=None, force_data=False, wallet_keys=None ):
+    """
+    command: datastore_putfiles advanced 
+    help: Put several files into the datastore at once.
+    arg: app_domain (str) 'The application for this datastore'
+    arg: files (str) 'A JSON object that maps each path to its base64-encoded data, or a path to a file with this object'
+    opt: create (str) 'If True, then only succeed for files that do not exist already'
+    opt: app_user_privkey (str) 'If given, then this is the application user private key'
+    """
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    password = get_default_password(password)
+
+    app_domain = str(args.app_domain)
+    files = args.files
+    create = (str(getattr(args, "create", "")).lower() in ['1', 'create', 'true'])
+    app_user_privkey = getattr(args, 'app_user_privkey', None)
+    if app_user_privkey is not None:
+        app_user_privkey = str(app_user_privkey)
+
+    if is_valid_path(files) and os.path.exists(files) and not force_data:
+        log.warning("Using files in {}".format(files))
+        try:
+            with open(files) as f:
+                files = f.read()
+        except:
+            return {'error': 'Failed to read "{}"'.format(files)}
+
+    try:
+        files = json.loads(files)
+        assert isinstance(files, dict)
+        files = dict([(str(path), base64.b64decode(data)) for (path, data) in files.items()])
+    except:
+        return {'error': 'Invalid argument: files must be a JSON object that maps paths to base64-encoded data', 'errno': errno.EINVAL}
+
+    return datastore_files_put('datastore', app_user_privkey, files, create=create, app_domain=app_domain, wallet_keys=wallet_keys, password=password, proxy=proxy, config_path=config_path )
+
+
 def cli_datastore_deletefile(args, config_path=CONFIG_PATH, interactive=False, proxy=None, password=None, wallet_keys=None ):
     """
     command: datastore_deletefile advanced
@@ -21,32 +21,70 @@
     along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
 """
 
-import re
 import string
 
 from binascii import hexlify, unhexlify
 
-from utilitybelt import charset_to_hex, hex_to_charset
-
 B16_CHARS = string.hexdigits[:16]
 B40_CHARS = string.digits + string.lowercase + '-_.+'
 B40_REGEX = '^[a-z0-9\-_.+]*$'
 
+# lookup tables, so we convert two base-40 digits per big-int operation
+B40_DIGITS = {c: i for i, c in enumerate(B40_CHARS)}
+B40_PAIRS = [B40_CHARS[i // 40] + B40_CHARS[i % 40] for i in xrange(40 * 40)]
+B40_PAIR_VALUES = {p: i for i, p in enumerate(B40_PAIRS)}
+
 
 def is_b40(s):
-    return isinstance(s, str) and re.match(B40_REGEX, s) is not None
+    if not isinstance(s, str):
+        return False
+
+    # B40_REGEX's '$' also matched before a single trailing newline
+    if s.endswith('\n'):
+        s = s[:-1]
+
+    return not s.translate(None, B40_CHARS)
 
 
 def b40_to_bin(s):
     if not is_b40(s):
         raise ValueError('{} must only contain characters in the b40 char set'.format(s))
-    return unhexlify(charset_to_hex(s, B40_CHARS))
+
+    try:
+        val = 0
+        start = len(s) % 2
+        if start == 1:
+            val = B40_DIGITS[s[0]]
+
+        for i in xrange(start, len(s), 2):
+            val = val * 1600 + B40_PAIR_VALUES[s[i:i + 2]]
+
+    except KeyError:
+        # trailing newline
+        raise ValueError('{} must only contain characters in the b40 char set'.format(s))
+
+    h = '{:x}'.format(val)
+    if len(h) % 2:
+        h = '0' + h
+
+    return unhexlify(h)
 
 
 def bin_to_b40(s):
     if not isinstance(s, str):
         raise ValueError('{} must be a string'.format(s))
-    return hex_to_charset(hexlify(s), B40_CHARS)
+
+    if not s:
+        raise ValueError('Value must be in hex format')
+
+    val = int(hexlify(s), 16)
+    pairs = []
+    while val > 0:
+        val, pair = divmod(val, 1600)
+        pairs.append(B40_PAIRS[pair])
+
+    pairs.reverse()
+    return ''.join(pairs).lstrip('0') or '0'
 
 
 def b40_to_hex(s):
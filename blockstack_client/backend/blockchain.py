@@ -27,12 +27,16 @@ import virtualchain
 import pybitcoin
 import json
 import traceback
+import time
+import threading
+import httplib
+import base64
 
 # Hack around absolute paths
 current_dir = os.path.abspath(os.path.dirname(__file__))
 parent_dir = os.path.abspath(current_dir + "/../")
 
-from ..config import TX_EXPIRED_INTERVAL, TX_CONFIRMATIONS_NEEDED, TX_MIN_CONFIRMATIONS
+from ..config import TX_EXPIRED_INTERVAL, TX_CONFIRMATIONS_NEEDED, TX_MIN_CONFIRMATIONS, TX_CONFIRMATIONS_CACHE_TTL
 from ..config import MAXIMUM_NAMES_PER_ADDRESS
 from ..config import BLOCKSTACKD_SERVER, BLOCKSTACKD_PORT
 
@@ -45,15 +49,26 @@ from ..utils import pretty_print as pprint
 from ..proxy import get_default_proxy
 from ..proxy import get_names_owned_by_address as blockstack_get_names_owned_by_address
 
-from ..scripts import tx_get_unspents
+from ..scripts import tx_get_unspents_multi
 
 log = get_logger() 
 
+# map (tx hash, block height) to (confirmations, time cached)
+TX_CONFIRMATIONS_CACHE = {}
+TX_CONFIRMATIONS_CACHE_LOCK = threading.Lock()
+
+def get_bitcoind_opts(config_path=CONFIG_PATH):
+    """
+    Get the bitcoind connection options
+    """
+    return virtualchain.get_bitcoind_config(config_file=config_path)
+
+
 def get_bitcoind_client(config_path=CONFIG_PATH):
     """
     Connect to bitcoind
     """
-    bitcoind_opts = virtualchain.get_bitcoind_config(config_file=config_path)
+    bitcoind_opts = get_bitcoind_opts(config_path=config_path)
     log.debug("Connect to bitcoind at %s:%s (%s)" % (bitcoind_opts['bitcoind_server'], bitcoind_opts['bitcoind_port'], config_path))
     client = virtualchain.connect_bitcoind( bitcoind_opts )
 
@@ -85,7 +100,7 @@ def get_block_height(config_path=CONFIG_PATH):
     return resp
 
 
-def get_tx_confirmations(tx_hash, config_path=CONFIG_PATH):
+def get_tx_confirmations(tx_hash, config_path=CONFIG_PATH, bitcoind_client=None):
     """
     Get the number of confirmations for a transaction
     Return None if not given
@@ -93,8 +108,9 @@ def get_tx_confirmations(tx_hash, config_path=CONFIG_PATH):
 
     resp = None
 
-    # get a fresh local client (needed after waking up from sleep)
-    bitcoind_client = get_bitcoind_client(config_path=config_path)
+    if bitcoind_client is None:
+        # get a fresh local client (needed after waking up from sleep)
+        bitcoind_client = get_bitcoind_client(config_path=config_path)
 
     try:
         # second argument of '1' asks for results in JSON
@@ -117,10 +133,141 @@ def get_tx_confirmations(tx_hash, config_path=CONFIG_PATH):
     return resp
 
 
-def get_tx_fee( tx_hex, config_path=CONFIG_PATH ):
+def bitcoind_batch_call(calls, config_path=CONFIG_PATH):
     """
-    Get the tx fee from bitcoind
-    Return the fee on success, in satoshis
+    Send a list of (method, params) calls to bitcoind
+    as a single JSON-RPC batch request.
+
+    Return a list of {'result': ..., 'error': ...} dicts,
+    in the same order as @calls, on success.
+    Return None on error.
+    """
+    if len(calls) == 0:
+        return []
+
+    bitcoind_opts = get_bitcoind_opts(config_path=config_path)
+    payload = [{'version': '1.1', 'method': method, 'params': params, 'id': i} for (i, (method, params)) in enumerate(calls)]
+    auth = base64.b64encode('{}:{}'.format(bitcoind_opts['bitcoind_user'], bitcoind_opts['bitcoind_passwd']))
+    timeout = bitcoind_opts.get('bitcoind_timeout', 300)
+
+    if bitcoind_opts.get('bitcoind_use_https', False):
+        conn = httplib.HTTPSConnection(bitcoind_opts['bitcoind_server'], int(bitcoind_opts['bitcoind_port']), timeout=timeout)
+    else:
+        conn = httplib.HTTPConnection(bitcoind_opts['bitcoind_server'], int(bitcoind_opts['bitcoind_port']), timeout=timeout)
+
+    try:
+        conn.request('POST', '/', json.dumps(payload), {'Authorization': 'Basic {}'.format(auth), 'Content-Type': 'application/json'})
+        resp = conn.getresponse()
+        data = resp.read()
+        if resp.status != 200:
+            log.debug("bitcoind batch request failed: HTTP {}".format(resp.status))
+            return None
+
+        responses = json.loads(data)
+
+    except Exception as e:
+        log.debug("ERROR: bitcoind batch request failed: {}".format(e))
+        return None
+
+    finally:
+        conn.close()
+
+    if not isinstance(responses, list):
+        log.debug("bitcoind does not support batch requests")
+        return None
+
+    ret = [None] * len(calls)
+    for response in responses:
+        try:
+            ret[int(response['id'])] = {'result': response.get('result', None), 'error': response.get('error', None)}
+        except (KeyError, ValueError, TypeError, IndexError):
+            log.debug("Invalid batch response {}".format(response))
+            return None
+
+    if None in ret:
+        log.debug("Missing responses from bitcoind batch request")
+        return None
+
+    return ret
+
+
+def get_tx_confirmations_bulk(tx_hashes, block_height=None, config_path=CONFIG_PATH):
+    """
+    Get the number of confirmations for a list of transactions.
+    Confirmation counts are cached by (tx hash, block height) for
+    TX_CONFIRMATIONS_CACHE_TTL seconds, and uncached transactions
+    are looked up with a single JSON-RPC batch request.
+
+    Return a dict that maps each tx hash to its number of confirmations
+    (None if it could not be determined).
+    """
+
+    global TX_CONFIRMATIONS_CACHE, TX_CONFIRMATIONS_CACHE_LOCK
+
+    ret = {}
+    tx_hashes = list(set(tx_hashes))
+    if len(tx_hashes) == 0:
+        return ret
+
+    if block_height is None:
+        block_height = get_block_height(config_path=config_path)
+
+    now = time.time()
+    to_fetch = []
+
+    with TX_CONFIRMATIONS_CACHE_LOCK:
+        # evict stale entries
+        for key, (_, cached_at) in TX_CONFIRMATIONS_CACHE.items():
+            if cached_at + TX_CONFIRMATIONS_CACHE_TTL < now or key[1] != block_height:
+                del TX_CONFIRMATIONS_CACHE[key]
+
+        for tx_hash in tx_hashes:
+            cached = TX_CONFIRMATIONS_CACHE.get((tx_hash, block_height), None)
+            if cached is not None:
+                ret[tx_hash] = cached[0]
+            else:
+                to_fetch.append(tx_hash)
+
+    if len(to_fetch) == 0:
+        return ret
+
+    log.debug("Query confirmations for %s transactions at %s (%s cached)" % (len(to_fetch), block_height, len(ret)))
+
+    fetched = {}
+    responses = bitcoind_batch_call([('getrawtransaction', [tx_hash, 1]) for tx_hash in to_fetch], config_path=config_path)
+    if responses is not None:
+        for tx_hash, response in zip(to_fetch, responses):
+            tx_data = response['result']
+            if response['error'] is not None:
+                log.debug("ERROR: failed to query tx details for %s: %s" % (tx_hash, response['error']))
+                fetched[tx_hash] = None
+
+            elif tx_data is None:
+                log.debug("No such tx %s" % tx_hash)
+                fetched[tx_hash] = 0
+
+            else:
+                fetched[tx_hash] = tx_data.get('confirmations', 0)
+
+    else:
+        # no batch support; fall back to one query per transaction
+        bitcoind_client = get_bitcoind_client(config_path=config_path)
+        for tx_hash in to_fetch:
+            fetched[tx_hash] = get_tx_confirmations(tx_hash, config_path=config_path, bitcoind_client=bitcoind_client)
+
+    with TX_CONFIRMATIONS_CACHE_LOCK:
+        for tx_hash, confirmations in fetched.items():
+            if confirmations is not None and block_height is not None:
+                TX_CONFIRMATIONS_CACHE[(tx_hash, block_height)] = (confirmations, now)
+
+    ret.update(fetched)
+    return ret
+
+
+def get_tx_fee_per_kb( config_path=CONFIG_PATH ):
+    """
+    Get the tx fee rate from bitcoind
+    Return the fee rate on success, in BTC per kb
     Return None on error
     """
     bitcoind_client = get_bitcoind_client(config_path=config_path)
@@ -136,36 +283,57 @@ def get_tx_fee( tx_hex, config_path=CONFIG_PATH ):
                 log.error("Failed to estimate tx fee")
                 return None
 
-        fee = float(fee) 
-
-        # / 2048, since tx_hex is a hex string (otherwise / 1024, since it's BTC per kb)
-        return round((fee * (len(tx_hex) / 2048.0)) * 10**8)
+        return float(fee)
     except Exception, e:
         log.exception(e)
         log.debug("Failed to estimate fee")
         return None
 
 
-def is_tx_accepted( tx_hash, num_needed=TX_CONFIRMATIONS_NEEDED, config_path=CONFIG_PATH ):
+def get_tx_fee( tx_hex, config_path=CONFIG_PATH, fee_per_kb=None ):
+    """
+    Get the tx fee from bitcoind.
+    If @fee_per_kb is given, use it instead of querying bitcoind.
+    Return the fee on success, in satoshis
+    Return None on error
+    """
+    if fee_per_kb is None:
+        fee_per_kb = get_tx_fee_per_kb(config_path=config_path)
+        if fee_per_kb is None:
+            return None
+
+    # / 2048, since tx_hex is a hex string (otherwise / 1024, since it's BTC per kb)
+    return round((fee_per_kb * (len(tx_hex) / 2048.0)) * 10**8)
+
+
+def is_tx_accepted( tx_hash, num_needed=TX_CONFIRMATIONS_NEEDED, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Determine whether or not a transaction was accepted.
+    If @tx_confirmations is given, use it instead of querying bitcoind.
     """
-    tx_confirmations = get_tx_confirmations(tx_hash, config_path=config_path)
+    if tx_confirmations is None:
+        tx_confirmations = get_tx_confirmations(tx_hash, config_path=config_path)
+
     if tx_confirmations > num_needed:
         return True
 
     return False
 
 
-def is_tx_rejected(tx_hash, tx_sent_at_height, config_path=CONFIG_PATH):
+def is_tx_rejected(tx_hash, tx_sent_at_height, config_path=CONFIG_PATH, current_height=None, tx_confirmations=None):
     """
     Determine whether or not a transaction was "rejected".
     That is, determine whether or not the transaction is still
     unconfirmed, so the caller can do something like e.g.
     resend it.
+    If @current_height or @tx_confirmations are given, use them
+    instead of querying bitcoind.
     """
-    current_height = get_block_height(config_path=config_path)
-    tx_confirmations = get_tx_confirmations(tx_hash, config_path=config_path)
+    if current_height is None:
+        current_height = get_block_height(config_path=config_path)
+
+    if tx_confirmations is None:
+        tx_confirmations = get_tx_confirmations(tx_hash, config_path=config_path)
 
     if (current_height - tx_sent_at_height) > TX_EXPIRED_INTERVAL and tx_confirmations == 0:
         # if no confirmations and retry limit hits
@@ -174,11 +342,12 @@ def is_tx_rejected(tx_hash, tx_sent_at_height, config_path=CONFIG_PATH):
     return False
 
 
-def get_utxos(address, config_path=CONFIG_PATH, utxo_client=None, min_confirmations=TX_MIN_CONFIRMATIONS):
-    """ 
-    Given an address get unspent outputs (UTXOs)
-    Return array of UTXOs on success
-    Return {'error': ...} on failure
+def get_utxos_multi(addresses, config_path=CONFIG_PATH, utxo_client=None, min_confirmations=TX_MIN_CONFIRMATIONS, use_cache=True):
+    """
+    Given a list of addresses, get their unspent outputs (UTXOs),
+    using as few UTXO provider queries as possible.
+    UTXOs are cached briefly, unless @use_cache is False.
+    Return {address: array of UTXOs}.  Addresses that could not be queried map to {'error': ...}
     """
 
     if min_confirmations != TX_MIN_CONFIRMATIONS:
@@ -186,26 +355,49 @@ def get_utxos(address, config_path=CONFIG_PATH, utxo_client=None, min_confirmati
 
     if utxo_client is None:
         utxo_client = get_utxo_provider_client(config_path=config_path)
-   
-    data = []
+
+    data = {}
     try:
-        data = tx_get_unspents( address, utxo_client )
+        data = tx_get_unspents_multi( addresses, utxo_client, use_cache=use_cache )
     except Exception, e:
         log.exception(e)
-        log.debug("Failed to get UTXOs for %s" % address)
-        data = {'error': 'Failed to get UTXOs for %s' % address}
-        return data
-   
-    # filter unconfirmed
-    ret = []
-    for utxo in data:
-        if 'confirmations' in utxo:
-            if int(utxo['confirmations']) >= min_confirmations:
-                ret.append(utxo)
+        log.debug("Failed to get UTXOs for %s addresses" % len(addresses))
+
+    ret = {}
+    for address in addresses:
+        if data.get(address, None) is None:
+            ret[address] = {'error': 'Failed to get UTXOs for %s' % address}
+            continue
+
+        # filter unconfirmed
+        ret[address] = []
+        for utxo in data[address]:
+            if 'confirmations' in utxo:
+                if int(utxo['confirmations']) >= min_confirmations:
+                    ret[address].append(utxo)
 
     return ret
 
 
+def get_utxos(address, config_path=CONFIG_PATH, utxo_client=None, min_confirmations=TX_MIN_CONFIRMATIONS, use_cache=False):
+    """ 
+    Given an address get unspent outputs (UTXOs).
+    Not cached by default, since callers build transactions from them.
+    Return array of UTXOs on success
+    Return {'error': ...} on failure
+    """
+    return get_utxos_multi([address], config_path=config_path, utxo_client=utxo_client, min_confirmations=min_confirmations, use_cache=use_cache)[address]
+
+
+def get_balances(addresses, config_path=CONFIG_PATH, utxo_client=None, min_confirmations=TX_MIN_CONFIRMATIONS):
+    """
+    Get the balances of a list of addresses
+    Returns {address: value in satoshis}.  Addresses whose balances could not be found map to None
+    """
+    utxos = get_utxos_multi(addresses, config_path=config_path, utxo_client=utxo_client, min_confirmations=min_confirmations)
+    return dict([(address, sum_utxo_values(address, utxos[address], min_confirmations)) for address in addresses])
+
+
 def get_balance(address, config_path=CONFIG_PATH, utxo_client=None, min_confirmations=TX_MIN_CONFIRMATIONS):
     """
     Check if BTC key being used has enough balance on unspents
@@ -213,7 +405,16 @@ def get_balance(address, config_path=CONFIG_PATH, utxo_client=None, min_confirma
     Return None on failure
     """
 
-    data = get_utxos(address, config_path=config_path, utxo_client=utxo_client, min_confirmations=min_confirmations)
+    data = get_utxos(address, config_path=config_path, utxo_client=utxo_client, min_confirmations=min_confirmations, use_cache=True)
+    return sum_utxo_values(address, data, min_confirmations)
+
+
+def sum_utxo_values(address, data, min_confirmations):
+    """
+    Add up the values of an address's confirmed UTXOs
+    Returns value in satoshis on success
+    Return None if @data is an error
+    """
     if 'error' in data:
         log.error("Failed to get UTXOs for %s: %s" % (address, data['error']))
         return None 
@@ -238,7 +439,7 @@ def is_address_usable(address, config_path=CONFIG_PATH, utxo_client=None, min_co
     Check if an address is usable (i.e. it has no unconfirmed transactions)
     """
     try:
-        unspents = get_utxos(address, config_path=config_path, utxo_client=None, min_confirmations=min_confirmations)
+        unspents = get_utxos(address, config_path=config_path, utxo_client=None, min_confirmations=min_confirmations, use_cache=True)
         if 'error' in unspents:
             log.error("Failed to get UTXOs for %s: %s" % (address, unspents['error']))
             return False
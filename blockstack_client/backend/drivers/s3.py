@@ -28,9 +28,14 @@ import boto
 import errno
 import zlib
 import time
+import socket
+import httplib
+import threading
 from ConfigParser import SafeConfigParser
 
 from boto.s3.key import Key
+from boto.s3.connection import OrdinaryCallingFormat
+from boto.exception import S3ResponseError
 
 import logging
 logging.getLogger('boto').setLevel(logging.CRITICAL)
@@ -45,15 +50,54 @@ AWS_BUCKET = 'blockstack-server-profiles'
 AWS_ACCESS_KEY_ID = None 
 AWS_SECRET_ACCESS_KEY = None
 AWS_COMPRESS = False
+AWS_COMPRESS_LEVEL = 6          # zlib compression level (1-9)
+AWS_COMPRESS_MIN_SIZE = 1024    # don't compress payloads smaller than this many bytes
+AWS_COMPRESS_MIN_SAVINGS = 0.1  # don't compress payloads that shrink by less than this fraction
+AWS_COMPRESS_SAMPLE_SIZE = 4096 # how much of the payload to trial-compress
+AWS_ENCODING_METADATA = 'blockstack-encoding'  # object metadata key that records how the data was stored
+AWS_ENCODING_ZLIB = 'zlib'
+AWS_ENCODING_RAW = 'raw'
+AWS_ENDPOINT = None     # host[:port] of a non-AWS (e.g. local test) S3 endpoint
+AWS_IS_SECURE = True
+AWS_POOL_MAX_IDLE = 16  # maximum number of idle connections to keep per bucket
 
 #-------------------------
-def compress_chunk( chunk_buf ):
+def compress_chunk( chunk_buf, level=None ):
     """
     compress a chunk of data
     """
-    data = zlib.compress(chunk_buf, 9)
+    level = AWS_COMPRESS_LEVEL if level is None else level
+    data = zlib.compress(chunk_buf, level)
     return data
 
+
+#-------------------------
+def encode_chunk( chunk_buf ):
+    """
+    Compress a chunk of data, unless it isn't worth it:
+    * it is smaller than AWS_COMPRESS_MIN_SIZE, or
+    * a fast trial compression of its first AWS_COMPRESS_SAMPLE_SIZE bytes
+    saves less than AWS_COMPRESS_MIN_SAVINGS (e.g. it is already compressed), or
+    * the compressed data saves less than AWS_COMPRESS_MIN_SAVINGS.
+
+    Return (encoding, data to store), where encoding is
+    AWS_ENCODING_ZLIB or AWS_ENCODING_RAW.
+    """
+    if len(chunk_buf) < AWS_COMPRESS_MIN_SIZE:
+        return (AWS_ENCODING_RAW, chunk_buf)
+
+    max_ratio = 1.0 - AWS_COMPRESS_MIN_SAVINGS
+
+    sample = chunk_buf[:AWS_COMPRESS_SAMPLE_SIZE]
+    if len(zlib.compress(sample, 1)) > len(sample) * max_ratio:
+        return (AWS_ENCODING_RAW, chunk_buf)
+
+    compressed_data = compress_chunk( chunk_buf )
+    if len(compressed_data) > len(chunk_buf) * max_ratio:
+        return (AWS_ENCODING_RAW, chunk_buf)
+
+    return (AWS_ENCODING_ZLIB, compressed_data)
+
 #-------------------------
 def decompress_chunk( chunk_buf ):
     """
@@ -63,24 +107,133 @@ def decompress_chunk( chunk_buf ):
     return data
 
 #-------------------------
-def get_bucket( bucket_name ):
+def decode_chunk( chunk_buf, encoding ):
     """
-    Get or create a reference to the given bucket.
-    
+    Decode a chunk of data read from S3, given the encoding
+    it was stored with (None if it was not recorded).
+
+    Objects written before the encoding was recorded are
+    decompressed if they can be, and returned as-is otherwise.
+    Return the data
+    Raise on invalid encoding or corrupt compressed data
+    """
+    if encoding == AWS_ENCODING_ZLIB:
+        return decompress_chunk( chunk_buf )
+
+    if encoding == AWS_ENCODING_RAW:
+        return chunk_buf
+
+    if encoding is not None:
+        raise ValueError("Unknown encoding '%s'" % encoding)
+
+    # legacy object
+    try:
+        return decompress_chunk( chunk_buf )
+    except:
+        return chunk_buf
+
+class S3ConnectionPool(object):
+    """
+    Per-process pool of S3 connections and bucket handles,
+    for each (bucket, key ID, endpoint).
+
+    boto connections are not safe to share between threads, so acquire()
+    lends a bucket handle to one thread at a time, and release() puts it
+    back for the next request to reuse, whichever thread makes it.
+    This way, callers that start a new thread for each request
+    (e.g. concurrent storage driver calls) reuse connections too.
+
+    invalidate() drops the pooled handles, and keeps handles that are
+    lent out from coming back, so the next request reconnects
+    (e.g. after an auth or endpoint error).
+    """
+    def __init__(self, max_idle=AWS_POOL_MAX_IDLE):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.generations = {}
+        self.idle = {}
+
+
+    def acquire(self, bucket_name, aws_id, aws_key, endpoint, is_secure):
+        """
+        Borrow a bucket handle from the pool, connecting if there are none to spare.
+        Return (pool key, generation, bucket) on success; pass it to release() when done.
+        Return None on error, and log an exception
+        """
+        key = (bucket_name, aws_id, endpoint, is_secure)
+        with self.lock:
+            generation = self.generations.setdefault(key, 0)
+            idle = self.idle.get(key, [])
+            if len(idle) > 0:
+                return (key, generation, idle.pop())
+
+        bucket = connect_bucket(bucket_name, aws_id, aws_key, endpoint, is_secure)
+        if bucket is None:
+            return None
+
+        return (key, generation, bucket)
+
+
+    def release(self, lease):
+        """
+        Return a borrowed bucket handle to the pool,
+        unless it was invalidated in the meantime.
+        """
+        key, generation, bucket = lease
+        with self.lock:
+            if self.generations.get(key, None) != generation:
+                return
+
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(bucket)
+
+
+    def invalidate(self, bucket_name=None):
+        """
+        Drop the pooled connections and bucket handles for a bucket
+        (or for all buckets, if bucket_name is None), including the ones lent out.
+        """
+        with self.lock:
+            for key in self.generations.keys():
+                if bucket_name is None or key[0] == bucket_name:
+                    self.generations[key] += 1
+                    self.idle.pop(key, None)
+
+
+S3_CONNECTIONS = S3ConnectionPool()
+
+
+#-------------------------
+def connect_bucket( bucket_name, aws_id, aws_key, endpoint, is_secure ):
+    """
+    Connect to S3, and get or create a reference to the given bucket.
+    Connect anonymously (read-only) if aws_id or aws_key are not given.
+
     Return the bucket on success
-    Return None on error, and log an exception 
+    Return None on error, and log an exception
     """
-    
-    global AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
-   
-    if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY:
+
+    conn_kw = {}
+    if endpoint is not None:
+        # non-AWS endpoint, probably without virtual-host bucket addressing
+        host, port = endpoint, None
+        if ':' in endpoint:
+            host, port = endpoint.rsplit(':', 1)
+            port = int(port)
+
+        conn_kw = {
+            'host': host,
+            'port': port,
+            'is_secure': is_secure,
+            'calling_format': OrdinaryCallingFormat(),
+        }
+
+    if aws_id and aws_key:
         log.debug("Read/write connect to S3")
 
-        aws_id = AWS_ACCESS_KEY_ID
-        aws_key = AWS_SECRET_ACCESS_KEY
-    
         try:
-            conn = boto.connect_s3(aws_id, aws_key)
+            conn = boto.connect_s3(aws_id, aws_key, **conn_kw)
         except Exception, e:
             log.error("Connection to S3 failed")
             log.exception(e)
@@ -99,7 +252,7 @@ def get_bucket( bucket_name ):
         # anonymous read-only 
         log.debug("Anonymous read-only connect to S3")
         try:
-            conn = boto.connect_s3()
+            conn = boto.connect_s3(**conn_kw)
         except Exception, e:
             log.error("Connection to S3 failed")
             log.exception(e)
@@ -115,6 +268,72 @@ def get_bucket( bucket_name ):
         return bucket
 
 
+#-------------------------
+def acquire_bucket( bucket_name ):
+    """
+    Borrow a (pooled) reference to the given bucket.
+    Give it back with S3_CONNECTIONS.release() when done.
+    
+    Return (pool key, generation, bucket) on success
+    Return None on error, and log an exception 
+    """
+    
+    global AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_ENDPOINT, AWS_IS_SECURE
+
+    return S3_CONNECTIONS.acquire( bucket_name, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_ENDPOINT, AWS_IS_SECURE )
+
+
+#-------------------------
+def is_connection_error( e ):
+    """
+    Is this exception due to a bad connection, bad credentials, or the wrong endpoint?
+    If so, the cached connection should not be reused.
+    """
+    if isinstance(e, S3ResponseError):
+        # 301/307: wrong endpoint or region; 400: bad token; 401/403: bad credentials
+        return e.status in [301, 307, 400, 401, 403]
+
+    return isinstance(e, (socket.error, httplib.HTTPException))
+
+
+#-------------------------
+def s3_call( bucket_name, chunk_path, method ):
+    """
+    Call method(key) on the key for chunk_path in the given bucket,
+    using a pooled connection.
+    If it fails because of the connection, drop the pooled connections
+    and try once more with a new one.
+
+    Return method's return value on success
+    Raise on error
+    """
+    for attempt in xrange(0, 2):
+        lease = acquire_bucket( bucket_name )
+        if lease is None:
+            raise Exception("Failed to get bucket '%s'" % bucket_name)
+
+        k = Key(lease[2])
+        k.key = chunk_path
+
+        try:
+            ret = method(k)
+        except Exception, e:
+            if not is_connection_error(e):
+                # connection is still good
+                S3_CONNECTIONS.release( lease )
+                raise
+
+            if attempt > 0:
+                raise
+
+            log.debug("Reconnecting to S3 after error: %s" % e)
+            S3_CONNECTIONS.invalidate( bucket_name )
+            continue
+
+        S3_CONNECTIONS.release( lease )
+        return ret
+
+
 #-------------------------
 def write_chunk( chunk_path, chunk_buf ):
     """
@@ -130,31 +349,27 @@ def write_chunk( chunk_path, chunk_buf ):
         log.debug("No AWS key set, cannot write")
         return False
 
-    bucket = get_bucket( AWS_BUCKET )
-    if bucket == None:
-        log.error("Failed to get bucket '%s'" % AWS_BUCKET )
-        return False
-
     # replace / with \x2f 
     chunk_path = chunk_path.replace( "/", r"\x2f" )
     
-    k = Key(bucket)
-    k.key = chunk_path
-
     rc = True
     begin = None
     end = None
     size = None
     try:
         if AWS_COMPRESS:
-            compressed_data = compress_chunk( chunk_buf )
+            encoding, compressed_data = encode_chunk( chunk_buf )
         else:
-            compressed_data = chunk_buf
+            encoding, compressed_data = AWS_ENCODING_RAW, chunk_buf
 
         size = len(compressed_data)
 
+        def _put( k ):
+            k.set_metadata( AWS_ENCODING_METADATA, encoding )
+            return k.set_contents_from_string( compressed_data )
+
         begin = time.time()
-        k.set_contents_from_string( compressed_data )
+        s3_call( AWS_BUCKET, chunk_path, _put )
         end = time.time()
         
     except Exception, e:
@@ -179,37 +394,29 @@ def read_chunk( chunk_path ):
 
     global AWS_BUCKET
     
-    bucket = get_bucket( AWS_BUCKET )
-    if bucket == None:
-        log.error("Failed to get bucket '%s'" % AWS_BUCKET)
-        return None
-
     # replace / with \x2f 
     chunk_path = chunk_path.replace( "/", r"\x2f" )
     
-    k = Key(bucket)
-    k.key = chunk_path
-
     data = None
     begin = None
     end = None
     size = None
     try:
+        def _get( k ):
+            return (k.get_contents_as_string(), k.get_metadata( AWS_ENCODING_METADATA ))
+
         begin = time.time()
-        compressed_data = k.get_contents_as_string()
+        compressed_data, encoding = s3_call( AWS_BUCKET, chunk_path, _get )
         end = time.time()
         size = len(compressed_data)
 
-        try:
-            data = decompress_chunk( compressed_data )
-        except:
-            data = compressed_data
+        data = decode_chunk( compressed_data, encoding )
         
     except Exception, e:
         log.error("Failed to read '%s'" % chunk_path)
         log.exception(e)
         
-    if os.environ.get("BLOCKSTACK_TEST") == "1":
+    if os.environ.get("BLOCKSTACK_TEST") == "1" and end is not None:
         log.debug("[BENCHMARK] s3.read_chunk %s: %s" % (size, end - begin))
 
     return data
@@ -230,20 +437,12 @@ def delete_chunk( chunk_path ):
         log.debug("No AWS key set, cannot write")
         return False
 
-    bucket = get_bucket( AWS_BUCKET )
-    if bucket == None:
-        log.error("Failed to get bucket '%s'" % AWS_BUCKET)
-        return False
-
     # replace / with \x2f 
     chunk_path = chunk_path.replace( "/", r"\x2f" )
     
-    k = Key(bucket)
-    k.key = chunk_path
-
     rc = True
     try:
-        k.delete()
+        s3_call( AWS_BUCKET, chunk_path, lambda k: k.delete() )
     except Exception, e:
         log.error("Failed to delete '%s'" % chunk_path)
         log.exception(e)
@@ -264,7 +463,8 @@ def storage_init(conf):
     Return True on success
     Return False on error 
     """
-    global AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_BUCKET, AWS_COMPRESS
+    global AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_BUCKET, AWS_COMPRESS, AWS_ENDPOINT, AWS_IS_SECURE
+    global AWS_COMPRESS_LEVEL, AWS_COMPRESS_MIN_SIZE, AWS_COMPRESS_MIN_SAVINGS
 
     config_path = conf['path']
     if os.path.exists( config_path ):
@@ -290,6 +490,31 @@ def storage_init(conf):
             
             if parser.has_option('s3', 'compress'):
                 AWS_COMPRESS = parser.get('s3', 'compress', 'false').lower() in ['true', '1']
+
+            try:
+                if parser.has_option('s3', 'compress_level'):
+                    AWS_COMPRESS_LEVEL = parser.getint('s3', 'compress_level')
+                    assert 0 <= AWS_COMPRESS_LEVEL <= 9, 'compress_level must be between 0 and 9'
+
+                if parser.has_option('s3', 'compress_min_size'):
+                    AWS_COMPRESS_MIN_SIZE = parser.getint('s3', 'compress_min_size')
+
+                if parser.has_option('s3', 'compress_min_savings'):
+                    AWS_COMPRESS_MIN_SAVINGS = parser.getfloat('s3', 'compress_min_savings')
+                    assert 0.0 <= AWS_COMPRESS_MIN_SAVINGS < 1.0, 'compress_min_savings must be between 0 and 1'
+
+            except (ValueError, AssertionError), e:
+                log.error("Config file '%s': invalid compression setting: %s" % (config_path, e))
+                return False
+
+            if parser.has_option('s3', 'endpoint'):
+                AWS_ENDPOINT = parser.get('s3', 'endpoint')
+
+            if parser.has_option('s3', 'is_secure'):
+                AWS_IS_SECURE = parser.get('s3', 'is_secure').lower() in ['true', '1']
+
+    # new settings; don't reuse connections made with the old ones
+    S3_CONNECTIONS.invalidate()
             
     # we can't proceed unless we have all three.
     if AWS_BUCKET is None:
@@ -27,6 +27,7 @@ import simplejson
 import pybitcoin
 import traceback
 import time
+import threading
 
 # Hack around absolute paths
 current_dir = os.path.abspath(os.path.dirname(__file__))
@@ -36,7 +37,7 @@ from .queue import in_queue, queue_append, queue_findone
 
 from .blockchain import get_tx_confirmations
 from .blockchain import is_address_usable
-from .blockchain import can_receive_name, get_balance, get_tx_fee, get_utxos
+from .blockchain import can_receive_name, get_balance, get_tx_fee, get_tx_fee_per_kb, get_utxos
 from .blockchain import get_block_height
 
 from crypto.utils import get_address_from_privkey, get_pubkey_from_privkey
@@ -100,6 +101,100 @@ class UTXOWrapper(object):
         return self.utxos[addr]
 
 
+class FeeEstimationUTXOClient(object):
+    """
+    Class for wrapping a UTXO client so that each address's
+    UTXOs are fetched at most once.
+    Compatible with pybitcoin's UTXO service class.
+    Requires get_unspents()
+    """
+    def __init__(self, utxo_client):
+        self.utxo_client = utxo_client
+        self.utxos = {}
+        self.address_locks = {}
+        self.lock = threading.Lock()
+        self.num_queries = 0
+
+    def get_unspents( self, addr ):
+        with self.lock:
+            if not self.address_locks.has_key(addr):
+                self.address_locks[addr] = threading.Lock()
+
+            address_lock = self.address_locks[addr]
+
+        # concurrent estimators wait on the first fetch
+        with address_lock:
+            if not self.utxos.has_key(addr):
+                self.num_queries += 1
+                self.utxos[addr] = pybitcoin.get_unspents( addr, self.utxo_client )
+
+            return self.utxos[addr]
+
+
+class FeeEstimationContext(object):
+    """
+    State shared by the fee estimators of a single flow
+    (e.g. preorder, register, and update of one name).
+    UTXOs, the tx fee rate, and name costs are fetched once
+    and reused by every estimator.
+    """
+    def __init__(self, utxo_client, config_path=CONFIG_PATH, proxy=None):
+        self.utxo_client = FeeEstimationUTXOClient( utxo_client )
+        self.config_path = config_path
+        self.proxy = proxy
+        self.fee_per_kb = None
+        self.fee_lock = threading.Lock()
+        self.name_costs = {}
+        self.name_locks = {}
+        self.lock = threading.Lock()
+        self.num_fee_queries = 0
+        self.num_name_cost_queries = 0
+
+    def get_tx_fee( self, tx_hex ):
+        """
+        Get the tx fee for a transaction, in satoshis.
+        Return None on error
+        """
+        with self.fee_lock:
+            if self.fee_per_kb is None:
+                self.num_fee_queries += 1
+                self.fee_per_kb = get_tx_fee_per_kb( config_path=self.config_path )
+
+            fee_per_kb = self.fee_per_kb
+
+        if fee_per_kb is None:
+            return None
+
+        return get_tx_fee( tx_hex, config_path=self.config_path, fee_per_kb=fee_per_kb )
+
+    def get_name_cost( self, name ):
+        """
+        Get the cost of a name.
+        Return the name cost info on success
+        Return {'error': ...} on error
+        """
+        with self.lock:
+            if not self.name_locks.has_key(name):
+                self.name_locks[name] = threading.Lock()
+
+            name_lock = self.name_locks[name]
+
+        # concurrent estimators wait on the first fetch of the same name,
+        # but not on the tx fee rate or on other names
+        with name_lock:
+            if not self.name_costs.has_key(name):
+                with self.lock:
+                    self.num_name_cost_queries += 1
+
+                res = blockstack_get_name_cost( name, proxy=self.proxy )
+                if 'error' in res:
+                    return res
+
+                self.name_costs[name] = res
+
+            return self.name_costs[name]
+
+
 def estimate_dust_fee( tx, fee_estimator ):
     """
     Estimate the dust fee of an operation.
@@ -239,7 +334,7 @@ def subsidize_or_pad_transaction( unsigned_tx, owner_address, owner_privkey_para
     return signed_subsidized_tx
 
 
-def estimate_preorder_tx_fee( name, name_cost, owner_address, payment_addr, utxo_client, min_payment_confs=TX_MIN_CONFIRMATIONS, owner_privkey_params=(None, None), config_path=CONFIG_PATH, include_dust=False ):
+def estimate_preorder_tx_fee( name, name_cost, owner_address, payment_addr, utxo_client, min_payment_confs=TX_MIN_CONFIRMATIONS, owner_privkey_params=(None, None), config_path=CONFIG_PATH, include_dust=False, fee_context=None ):
     """
     Estimate the transaction fee of a preorder.
     Optionally include the dust fees as well.
@@ -268,7 +363,10 @@ def estimate_preorder_tx_fee( name, name_cost, owner_address, payment_addr, utxo
 
     signed_subsidized_tx = subsidize_or_pad_transaction(unsigned_tx, owner_address, owner_privkey_params, None, fees_preorder, utxo_client, payment_address=payment_addr, config_path=config_path )
 
-    tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
+    if fee_context is not None:
+        tx_fee = fee_context.get_tx_fee( signed_subsidized_tx )
+    else:
+        tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
     if tx_fee is None:
         log.error("Failed to get tx fee")
         return None
@@ -284,7 +382,7 @@ def estimate_preorder_tx_fee( name, name_cost, owner_address, payment_addr, utxo
     return tx_fee
 
 
-def estimate_register_tx_fee( name, owner_addr, payment_addr, utxo_client, owner_privkey_params=(None, None), config_path=CONFIG_PATH, include_dust=False ):
+def estimate_register_tx_fee( name, owner_addr, payment_addr, utxo_client, owner_privkey_params=(None, None), config_path=CONFIG_PATH, include_dust=False, fee_context=None ):
     """
     Estimate the transaction fee of a register.
     Optionally include the dust fees as well.
@@ -313,7 +411,10 @@ def estimate_register_tx_fee( name, owner_addr, payment_addr, utxo_client, owner
 
     signed_subsidized_tx = subsidize_or_pad_transaction(unsigned_tx, owner_addr, owner_privkey_params, None, fees_registration, utxo_client, payment_address=payment_addr, config_path=config_path )
 
-    tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
+    if fee_context is not None:
+        tx_fee = fee_context.get_tx_fee( signed_subsidized_tx )
+    else:
+        tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
     if tx_fee is None:
         log.error("Failed to get tx fee")
         return None
@@ -329,7 +430,7 @@ def estimate_register_tx_fee( name, owner_addr, payment_addr, utxo_client, owner
     return tx_fee
 
 
-def estimate_renewal_tx_fee( name, renewal_fee, payment_privkey_info, owner_privkey_info, utxo_client, config_path=CONFIG_PATH, include_dust=False ):
+def estimate_renewal_tx_fee( name, renewal_fee, payment_privkey_info, owner_privkey_info, utxo_client, config_path=CONFIG_PATH, include_dust=False, fee_context=None ):
     """
     Estimate the transaction fee of a renewal.
     Optionally include the dust fees as well.
@@ -353,7 +454,10 @@ def estimate_renewal_tx_fee( name, renewal_fee, payment_privkey_info, owner_priv
 
     signed_subsidized_tx = subsidize_or_pad_transaction(unsigned_tx, owner_address, owner_privkey_params, payment_privkey_info, fees_registration, utxo_client, payment_address=payment_address, config_path=config_path )
 
-    tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
+    if fee_context is not None:
+        tx_fee = fee_context.get_tx_fee( signed_subsidized_tx )
+    else:
+        tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
     if tx_fee is None:
         log.error("Failed to get tx fee")
         return None
@@ -369,7 +473,7 @@ def estimate_renewal_tx_fee( name, renewal_fee, payment_privkey_info, owner_priv
     return tx_fee
 
 
-def estimate_update_tx_fee( name, payment_privkey_info, owner_address, utxo_client, owner_privkey_params=(None, None), config_path=CONFIG_PATH, payment_address=None, include_dust=False ):
+def estimate_update_tx_fee( name, payment_privkey_info, owner_address, utxo_client, owner_privkey_params=(None, None), config_path=CONFIG_PATH, payment_address=None, include_dust=False, fee_context=None ):
     """
     Estimate the transaction fee of an update.
     Optionally include the dust fees as well.
@@ -425,7 +529,10 @@ def estimate_update_tx_fee( name, payment_privkey_info, owner_address, utxo_clie
 
         return None
 
-    tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
+    if fee_context is not None:
+        tx_fee = fee_context.get_tx_fee( signed_subsidized_tx )
+    else:
+        tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
     if tx_fee is None:
         log.error("Failed to get tx fee")
         return None
@@ -441,7 +548,7 @@ def estimate_update_tx_fee( name, payment_privkey_info, owner_address, utxo_clie
     return tx_fee
 
 
-def estimate_transfer_tx_fee( name, payment_privkey_info, owner_address, utxo_client, owner_privkey_params=(None, None), payment_address=None, config_path=CONFIG_PATH, include_dust=False ):
+def estimate_transfer_tx_fee( name, payment_privkey_info, owner_address, utxo_client, owner_privkey_params=(None, None), payment_address=None, config_path=CONFIG_PATH, include_dust=False, fee_context=None ):
     """
     Estimate the transaction fee of a transfer.
     Optionally include the dust fees as well.
@@ -491,7 +598,10 @@ def estimate_transfer_tx_fee( name, payment_privkey_info, owner_address, utxo_cl
 
         return None
 
-    tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
+    if fee_context is not None:
+        tx_fee = fee_context.get_tx_fee( signed_subsidized_tx )
+    else:
+        tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
     if tx_fee is None:
         log.error("Failed to get tx fee")
         return None
@@ -507,7 +617,7 @@ def estimate_transfer_tx_fee( name, payment_privkey_info, owner_address, utxo_cl
     return tx_fee
 
 
-def estimate_revoke_tx_fee( name, payment_privkey_info, owner_address, utxo_client, owner_privkey_params=(None, None), config_path=CONFIG_PATH, include_dust=False ):
+def estimate_revoke_tx_fee( name, payment_privkey_info, owner_address, utxo_client, owner_privkey_params=(None, None), config_path=CONFIG_PATH, include_dust=False, fee_context=None ):
     """
     Estimate the transaction fee of a revoke.
     Optionally include the dust fees as well.
@@ -554,7 +664,10 @@ def estimate_revoke_tx_fee( name, payment_privkey_info, owner_address, utxo_clie
 
         return None
 
-    tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
+    if fee_context is not None:
+        tx_fee = fee_context.get_tx_fee( signed_subsidized_tx )
+    else:
+        tx_fee = get_tx_fee( signed_subsidized_tx, config_path=config_path )
     if tx_fee is None:
         log.error("Failed to get tx fee")
         return None
@@ -26,8 +26,7 @@ import os
 import sys
 import json
 import base64
-import time
-import random
+import threading
 
 from ..config import DEFAULT_QUEUE_PATH, QUEUE_LENGTH_TO_MONITOR, PREORDER_MAX_CONFIRMATIONS, CONFIG_PATH
 from ..proxy import get_default_proxy
@@ -35,16 +34,26 @@ from ..proxy import get_default_proxy
 from ..storage import get_zonefile_data_hash
 from ..profile import get_name_zonefile
 from ..proxy import is_name_registered, is_name_owner, has_zonefile_hash
-from .blockchain import get_block_height, get_tx_confirmations, is_tx_rejected, is_tx_accepted
+from .blockchain import get_block_height, get_tx_confirmations, get_tx_confirmations_bulk, is_tx_rejected, is_tx_accepted
 
+# applied to every queue db on open, so that concurrent first opens
+# (from several threads or processes) all see the same schema
 QUEUE_SQL = """
-CREATE TABLE entries( fqu STRING NOT NULL,
+CREATE TABLE IF NOT EXISTS entries( fqu STRING NOT NULL,
                       queue_id STRING NOT NULL,
                       tx_hash TEXT NOT NULL,
                       data NOT NULL,
                       PRIMARY KEY(fqu,queue_id) );
 """
 
+# existing dbs get these too
+QUEUE_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS entries_queue_id_fqu ON entries(queue_id,fqu);
+"""
+
+# how long (in seconds) to wait for another writer to release the db lock
+QUEUEDB_BUSY_TIMEOUT = 60.0
+
 
 from ..utils import pretty_print as pprint
 
@@ -53,22 +62,38 @@ from ..config import get_logger
 
 log = get_logger()
 
-def queuedb_create( path ):
+# per-thread connections, keyed by (pid, path)
+QUEUEDB_CONNECTIONS = threading.local()
+
+def queuedb_sql_lines( sql ):
     """
-    Create a sqlite3 db at the given path.
-    Create all the tables and indexes we need.
+    Split a SQL script into its statements
     """
+    return [l.strip() + ";" for l in sql.split(";") if len(l.strip()) > 0]
 
-    global QUEUE_SQL
 
-    if os.path.exists( path ):
-        raise Exception("Database '%s' already exists" % path)
+def queuedb_connect( path ):
+    """
+    Make a new connection to the queue db, creating the db and
+    its tables and indexes if need be.
+    The db is put into write-ahead-log mode, so readers do not block the writer,
+    and lock contention is handled by sqlite's busy timeout.
+    """
+    # NOTE: sqlite3's timeout sets the connection's busy timeout
+    con = sqlite3.connect( path, isolation_level=None, timeout=QUEUEDB_BUSY_TIMEOUT )
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("PRAGMA synchronous=NORMAL;")
 
-    lines = [l + ";" for l in QUEUE_SQL.split(";")]
-    con = sqlite3.connect( path, isolation_level=None )
+    con.execute("BEGIN IMMEDIATE;")
+    try:
+        for line in queuedb_sql_lines(QUEUE_SQL) + queuedb_sql_lines(QUEUE_INDEXES_SQL):
+            con.execute(line)
 
-    for line in lines:
-        con.execute(line)
+        con.execute("COMMIT;")
+    except:
+        con.execute("ROLLBACK;")
+        con.close()
+        raise
 
     con.row_factory = queuedb_row_factory
     return con
@@ -76,16 +101,45 @@ def queuedb_create( path ):
 
 def queuedb_open( path ):
     """
-    Open a connection to our database 
+    Get this thread's connection to our database,
+    creating the database if need be.
+    The connection is shared by all queue db calls on this thread;
+    do not close it.
     """
-    if not os.path.exists( path ):
-        con = queuedb_create( path )
-    else:
-        con = sqlite3.connect( path, isolation_level=None )
-        con.row_factory = queuedb_row_factory
+    path = os.path.abspath(path)
+    key = (os.getpid(), path)
+
+    if not hasattr(QUEUEDB_CONNECTIONS, 'cons'):
+        QUEUEDB_CONNECTIONS.cons = {}
+
+    con = QUEUEDB_CONNECTIONS.cons.get(key, None)
+    if con is not None:
+        if os.path.exists( path ):
+            return con
+
+        # db was removed out from under us
+        con.close()
+
+    con = queuedb_connect( path )
+    QUEUEDB_CONNECTIONS.cons[key] = con
     return con
 
 
+def queuedb_close( path ):
+    """
+    Close this thread's connection to the given database, if it is open.
+    """
+    path = os.path.abspath(path)
+    key = (os.getpid(), path)
+
+    cons = getattr(QUEUEDB_CONNECTIONS, 'cons', {})
+    con = cons.pop(key, None)
+    if con is not None:
+        con.close()
+
+    return True
+
+
 def queuedb_row_factory( cursor, row ):
     """
     Row factor to enforce some additional types:
@@ -107,34 +161,63 @@ def queuedb_row_factory( cursor, row ):
     return d
 
 
-def queuedb_query_execute( cur, query, values ):
+def queuedb_query_execute( cur, query, values, many=False ):
     """
-    Execute a query.  If it fails, exit.
+    Execute a query (or, if @many is True, execute it once per tuple in @values).
+    Waiting on a locked db is handled by the connection's busy timeout.
+    Raise if the db stays locked for longer than that.
+    If it fails otherwise, exit.
 
     DO NOT CALL THIS DIRECTLY.
     """
-    timeout = 1.0
-    while True:
-        try:
+    try:
+        if many:
+            ret = cur.executemany( query, values )
+        else:
             ret = cur.execute( query, values )
-            return ret
-        except sqlite3.OperationalError as oe:
-            if oe.message == "database is locked":
-                timeout = timeout * 2 + timeout * random.random()
-                log.error("Query timed out due to lock; retrying in %s: %s" % (timeout, namedb_format_query( query, values )))
-                time.sleep(timeout)
-            
-            else:
-                log.exception(oe)
-                log.error("FATAL: failed to execute query (%s, %s)" % (query, values))
-                log.error("\n".join(traceback.format_stack()))
-                os.abort()
 
-        except Exception, e:
-            log.exception(e)
-            log.error("FATAL: failed to execute query (%s, %s)" % (query, values))
-            log.error("\n".join(traceback.format_stack()))
-            os.abort()
+        return ret
+
+    except sqlite3.OperationalError as oe:
+        if 'database is locked' in str(oe):
+            log.error("Query timed out due to lock after %s seconds: (%s, %s)" % (QUEUEDB_BUSY_TIMEOUT, query, values))
+            raise
+
+        log.exception(oe)
+        log.error("FATAL: failed to execute query (%s, %s)" % (query, values))
+        log.error("\n".join(traceback.format_stack()))
+        os.abort()
+
+    except Exception, e:
+        log.exception(e)
+        log.error("FATAL: failed to execute query (%s, %s)" % (query, values))
+        log.error("\n".join(traceback.format_stack()))
+        os.abort()
+
+
+def queuedb_write( path, query, values, many=False ):
+    """
+    Run a write query in its own transaction.
+    Return True on success
+    Raise on error
+    """
+    db = queuedb_open(path)
+    if db is None:
+        raise Exception("Failed to open %s" % path)
+
+    cur = db.cursor()
+
+    # take the write lock up front, so we wait on the busy timeout
+    # instead of failing to upgrade a read lock
+    cur.execute("BEGIN IMMEDIATE;")
+    try:
+        queuedb_query_execute( cur, query, values, many=many )
+        cur.execute("COMMIT;")
+    except:
+        cur.execute("ROLLBACK;")
+        raise
+
+    return True
 
 
 def queuedb_find( queue_id, fqu, limit=None, path=DEFAULT_QUEUE_PATH ):
@@ -143,8 +226,14 @@ def queuedb_find( queue_id, fqu, limit=None, path=DEFAULT_QUEUE_PATH ):
     Return the rows on success (empty list if not found)
     Raise on error
     """
-    sql = "SELECT * FROM entries WHERE queue_id = ? AND fqu = ?;"
+    sql = "SELECT * FROM entries WHERE queue_id = ? AND fqu = ?"
     args = (queue_id,fqu)
+
+    if limit is not None:
+        sql += " LIMIT ?"
+        args += (limit,)
+
+    sql += ";"
     
     db = queuedb_open(path)
     if db is None:
@@ -153,19 +242,12 @@ def queuedb_find( queue_id, fqu, limit=None, path=DEFAULT_QUEUE_PATH ):
     cur = db.cursor()
     rows = queuedb_query_execute( cur, sql, args )
 
-    count = 0
     ret = []
     for row in rows:
         dat = {}
         dat.update(row)
         ret.append(dat)
 
-        count += 1
-        if limit is not None and count == limit:
-            break
-
-    db.commit()
-    db.close()
     return ret
 
 
@@ -175,8 +257,14 @@ def queuedb_findall( queue_id, limit=None, path=DEFAULT_QUEUE_PATH ):
     Return the rows on success (empty list if not found)
     Raise on error
     """
-    sql = "SELECT * FROM entries WHERE queue_id = ?;"
+    sql = "SELECT * FROM entries WHERE queue_id = ?"
     args = (queue_id,)
+
+    if limit is not None:
+        sql += " LIMIT ?"
+        args += (limit,)
+
+    sql += ";"
     
     db = queuedb_open(path)
     if db is None:
@@ -185,19 +273,12 @@ def queuedb_findall( queue_id, limit=None, path=DEFAULT_QUEUE_PATH ):
     cur = db.cursor()
     rows = queuedb_query_execute( cur, sql, args )
 
-    count = 0
     ret = []
     for row in rows:
         dat = {}
         dat.update(row)
         ret.append(dat)
 
-        count += 1
-        if limit is not None and count == limit:
-            break
-
-    db.commit()
-    db.close()
     return ret
 
 
@@ -207,19 +288,23 @@ def queuedb_insert( queue_id, fqu, tx_hash, data_json, path=DEFAULT_QUEUE_PATH )
     Return True on success
     Raise on error
     """
-    sql = "INSERT INTO entries VALUES (?,?,?,?);"
-    args = (fqu, queue_id, tx_hash, json.dumps(data_json,sort_keys=True)) 
+    return queuedb_insertall( [(queue_id, fqu, tx_hash, data_json)], path=path )
 
-    db = queuedb_open(path)
-    if db is None:
-        raise Exception("Failed to open %s" % path)
 
-    cur = db.cursor()
-    res = queuedb_query_execute( cur, sql, args )
+def queuedb_insertall( entries, path=DEFAULT_QUEUE_PATH ):
+    """
+    Insert a list of (queue_id, fqu, tx_hash, data_json) elements
+    into their queues, in a single transaction.
+    Return True on success
+    Raise on error
+    """
+    if len(entries) == 0:
+        return True
 
-    db.commit()
-    db.close()
-    return True
+    sql = "INSERT INTO entries VALUES (?,?,?,?);"
+    args = [(fqu, queue_id, tx_hash, json.dumps(data_json,sort_keys=True)) for (queue_id, fqu, tx_hash, data_json) in entries]
+
+    return queuedb_write( path, sql, args, many=True )
 
 
 def queuedb_remove( queue_id, fqu, tx_hash, path=DEFAULT_QUEUE_PATH ):
@@ -228,19 +313,23 @@ def queuedb_remove( queue_id, fqu, tx_hash, path=DEFAULT_QUEUE_PATH ):
     Return True on success
     Raise on error
     """
-    sql = "DELETE FROM entries WHERE queue_id = ? AND fqu = ? AND tx_hash = ?;"
-    args = (queue_id, fqu, tx_hash)
+    return queuedb_removeall( [(queue_id, fqu, tx_hash)], path=path )
 
-    db = queuedb_open(path)
-    if db is None:
-        raise Exception("Failed to open %s" % path)
 
-    cur = db.cursor()
-    res = queuedb_query_execute( cur, sql, args )
+def queuedb_removeall( entries, path=DEFAULT_QUEUE_PATH ):
+    """
+    Remove a list of (queue_id, fqu, tx_hash) elements
+    from their queues, in a single transaction.
+    Return True on success
+    Raise on error
+    """
+    if len(entries) == 0:
+        return True
 
-    db.commit()
-    db.close()
-    return True
+    sql = "DELETE FROM entries WHERE queue_id = ? AND fqu = ? AND tx_hash = ?;"
+    args = [(queue_id, fqu, tx_hash) for (queue_id, fqu, tx_hash) in entries]
+
+    return queuedb_write( path, sql, args, many=True )
 
 
 def in_queue( queue_id, fqu, path=DEFAULT_QUEUE_PATH ):
@@ -311,75 +400,88 @@ def extract_entry( rowdata ):
     return entry
 
 
-def is_entry_accepted( entry, config_path=CONFIG_PATH ):
+def queue_entries_confirmations( entries, block_height=None, config_path=CONFIG_PATH ):
+    """
+    Get the number of confirmations for each entry's transaction,
+    using a single bulk (cached) query.
+    Return a dict that maps each entry's tx hash to its number of confirmations
+    """
+    return get_tx_confirmations_bulk( [entry['tx_hash'] for entry in entries], block_height=block_height, config_path=config_path )
+
+
+def is_entry_accepted( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Given a queue entry, determine if it was
     accepted onto the blockchain.
     Return True if so.
     Return False on error.
     """
-    return is_tx_accepted( entry['tx_hash'], config_path=config_path )
+    return is_tx_accepted( entry['tx_hash'], config_path=config_path, tx_confirmations=tx_confirmations )
 
 
-def is_entry_rejected( entry, config_path=CONFIG_PATH ):
+def is_entry_rejected( entry, config_path=CONFIG_PATH, current_height=None, tx_confirmations=None ):
     """
     Given a queue entry, determine if it has 
     been pending for long enough that we can
     safely assume it won't be incorporated.
     """
-    return is_tx_rejected( entry['tx_hash'], config_path=config_path )
+    return is_tx_rejected( entry['tx_hash'], entry['block_height'], config_path=config_path, current_height=current_height, tx_confirmations=tx_confirmations )
 
 
-def is_preorder_expired( entry, config_path=CONFIG_PATH ):
+def is_preorder_expired( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Given a preorder entry, determine whether or
     not it is expired
     """
-    tx_confirmations = get_tx_confirmations(entry['tx_hash'], config_path=config_path)
+    if tx_confirmations is None:
+        tx_confirmations = get_tx_confirmations(entry['tx_hash'], config_path=config_path)
+
     if tx_confirmations > PREORDER_MAX_CONFIRMATIONS:
         return True
 
     return False
 
 
-def is_register_expired( entry, config_path=CONFIG_PATH ):
+def is_register_expired( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Is a registration expired?
     as in, is it older than its preorder?
     """
-    return is_preorder_expired( entry, config_path=config_path )
+    return is_preorder_expired( entry, config_path=config_path, tx_confirmations=tx_confirmations )
 
 
-def is_update_expired( entry, config_path=CONFIG_PATH ):
+def is_update_expired( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Is an update expired?
     """
-    confirmations = get_tx_confirmations(entry['tx_hash'], config_path=config_path)
-    if confirmations > MAX_TX_CONFIRMATIONS:
+    if tx_confirmations is None:
+        tx_confirmations = get_tx_confirmations(entry['tx_hash'], config_path=config_path)
+
+    if tx_confirmations > MAX_TX_CONFIRMATIONS:
         return True
 
     return False
 
 
-def is_transfer_expired( entry, config_path=CONFIG_PATH ):
+def is_transfer_expired( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Is a transfer expired?
     """
-    return is_update_expired(entry, config_path=config_path)
+    return is_update_expired(entry, config_path=config_path, tx_confirmations=tx_confirmations)
 
 
-def is_renew_expired( entry, config_path=CONFIG_PATH ):
+def is_renew_expired( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Is a renew expired?
     """
-    return is_update_expired(entry, config_path=config_path)
+    return is_update_expired(entry, config_path=config_path, tx_confirmations=tx_confirmations)
 
 
-def is_revoke_expired( entry, config_path=CONFIG_PATH ):
+def is_revoke_expired( entry, config_path=CONFIG_PATH, tx_confirmations=None ):
     """
     Is a revoke expired?
     """
-    return is_update_expired(entry, config_path=CONFIG_PATH)
+    return is_update_expired(entry, config_path=config_path, tx_confirmations=tx_confirmations)
 
 
 def cleanup_preorder_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
@@ -389,13 +491,13 @@ def cleanup_preorder_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
     Return True on success.
     Raise on error
     """
-    rows = queuedb_findall("preorder", path=path)
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall("preorder", path=path)]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
+    for entry in entries:
 
         # clear stale preorder
-        if is_preorder_expired( entry, config_path=config_path ):
+        if is_preorder_expired( entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']] ):
             log.debug("Removing stale preorder: %s" % entry['fqu'])
             to_remove.append(entry)
             continue
@@ -411,13 +513,13 @@ def cleanup_register_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
     Return True on success
     Raise on error.
     """
-    rows = queuedb_findall("register", path=path)
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall("register", path=path)]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
+    for entry in entries:
 
         # clear stale register
-        if is_register_expired( entry, config_path=config_path ):
+        if is_register_expired( entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']] ):
             log.debug("Removing stale register: %s" % entry['fqu'])
             to_remove.append(entry)
             continue
@@ -437,11 +539,11 @@ def cleanup_update_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
     TODO: add integration test to ensure our failsafe works
     """
     
-    rows = queuedb_findall("update", path=path)
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall("update", path=path)]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
-        if not is_update_expired(entry, config_path=config_path):
+    for entry in entries:
+        if not is_update_expired(entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']]):
             # not expired yet
             continue
 
@@ -476,10 +578,10 @@ def cleanup_transfer_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
     Return True on success
     Raise on error.
     """
-    rows = queuedb_findall("transfer", path=path)
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall("transfer", path=path)]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
+    for entry in entries:
         
         fqu = entry['fqu']
         try:
@@ -489,9 +591,9 @@ def cleanup_transfer_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
             exit(0)
 
         # clear stale transfer
-        if is_transfer_expired(entry, config_path=config_path):
+        if is_transfer_expired(entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']]):
             log.debug("Removing tx with > max confirmations: (%s, %s, confirmations %s)"
-                      % (fqu, transfer_address, confirmations))
+                      % (fqu, transfer_address, confirmations[entry['tx_hash']]))
 
             to_remove.append(entry)
             continue
@@ -507,15 +609,15 @@ def cleanup_renew_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
     Return True on success
     Raise on error
     """
-    rows = queuedb_findall("renew", path=path)
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall("renew", path=path)]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
+    for entry in entries:
         
         # clear stale renew
-        if is_renew_expired(entry, config_path=config_path):
+        if is_renew_expired(entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']]):
             log.debug("Removing tx with > max confirmations: (%s, confirmations %s)"
-                      % (fqu, confirmations))
+                      % (entry['fqu'], confirmations[entry['tx_hash']]))
 
             to_remove.append(entry)
             continue
@@ -531,15 +633,15 @@ def cleanup_revoke_queue(path=DEFAULT_QUEUE_PATH, config_path=CONFIG_PATH):
     Return True on success
     Raise on error
     """
-    rows = queuedb_findall("revoke", path=path)
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall("revoke", path=path)]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
+    for entry in entries:
         
         # clear stale renew
-        if is_revoke_expired(entry, config_path=config_path):
+        if is_revoke_expired(entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']]):
             log.debug("Removing tx with > max confirmations: (%s, confirmations %s)"
-                      % (fqu, confirmations))
+                      % (entry['fqu'], confirmations[entry['tx_hash']]))
 
             to_remove.append(entry)
             continue
@@ -597,11 +699,15 @@ def queue_remove_expired(queue_id, path=DEFAULT_QUEUE_PATH, config_path=CONFIG_P
     Return True on success
     Raise on error
     """
-    rows = queuedb_findall( queue_id, path=path )
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall( queue_id, path=path )]
+    if len(entries) == 0:
+        return True
+
+    current_height = get_block_height(config_path=config_path)
+    confirmations = queue_entries_confirmations( entries, block_height=current_height, config_path=config_path )
     to_remove = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
-        if is_entry_rejected( entry, config_path=config_path ):
+    for entry in entries:
+        if is_entry_rejected( entry, config_path=config_path, current_height=current_height, tx_confirmations=confirmations[entry['tx_hash']] ):
             log.debug("TX rejected by network, removing TX: %s" % entry['tx_hash'])
             to_remove.append(entry)
 
@@ -613,10 +719,9 @@ def queue_removeall( entries, path=DEFAULT_QUEUE_PATH ):
     """
     Remove all given entries form their given queues
     """
-    for entry in entries:
-        rc = queuedb_remove( entry['type'], entry['fqu'], entry['tx_hash'], path=path )
-        if not rc:
-            raise Exception("Failed to remove %s.%s.%s" % (entry['type'], entry['fqu'], entry['tx_hash']))
+    rc = queuedb_removeall( [(entry['type'], entry['fqu'], entry['tx_hash']) for entry in entries], path=path )
+    if not rc:
+        raise Exception("Failed to remove %s entries" % len(entries))
 
     return True
 
@@ -626,11 +731,11 @@ def queue_find_accepted( queue_id, path=DEFAULT_QUEUE_PATH, config_path=CONFIG_P
     Find all pending operations in the given queue
     that have been accepted.
     """
-    rows = queuedb_findall( queue_id, path=path )
+    entries = [extract_entry(rowdata) for rowdata in queuedb_findall( queue_id, path=path )]
+    confirmations = queue_entries_confirmations( entries, config_path=config_path )
     accepted = []
-    for rowdata in rows:
-        entry = extract_entry(rowdata)
-        if is_entry_accepted( entry, config_path=config_path ):
+    for entry in entries:
+        if is_entry_accepted( entry, config_path=config_path, tx_confirmations=confirmations[entry['tx_hash']] ):
             accepted.append(entry)
 
     return accepted
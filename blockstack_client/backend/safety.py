@@ -31,7 +31,7 @@ from ..config import get_logger, get_utxo_provider_client
 
 from .blockchain import (
     get_balance, is_address_usable, get_utxos,
-    can_receive_name, get_tx_confirmations, get_tx_fee
+    can_receive_name, get_tx_confirmations
 )
 
 from ..scripts import UTXOException, is_name_valid
@@ -372,7 +372,8 @@ def interpret_operation_sanity_checks( name, operations, scatter_gather ):
 
 def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, owner_privkey_info,
                        proxy=None, config_path=CONFIG_PATH, payment_address=None,
-                       min_payment_confs=TX_MIN_CONFIRMATIONS, owner_address=None, transfer_address=None):
+                       min_payment_confs=TX_MIN_CONFIRMATIONS, owner_address=None, transfer_address=None,
+                       fee_context=None):
     """
     Given a list of operations and a scatter/gather context,
     go prime it to fetch the cost of each operation.
@@ -392,6 +393,10 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
 
     Task results will be named after their operations.
 
+    The estimators share @fee_context (a FeeEstimationContext), so UTXOs,
+    the tx fee rate, and the name cost are only fetched once.  One will be
+    created if not given.
+
     Return {'status': True} on success
     Return {'error': ...} on failure
     Raise on invalid argument
@@ -400,7 +405,8 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
     from .nameops import (
         estimate_preorder_tx_fee, estimate_register_tx_fee,
         estimate_update_tx_fee, estimate_transfer_tx_fee,
-        estimate_renewal_tx_fee, estimate_revoke_tx_fee
+        estimate_renewal_tx_fee, estimate_revoke_tx_fee,
+        FeeEstimationContext
     )
 
     if payment_privkey_info is not None:
@@ -426,13 +432,17 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
     if 'transfer' in operations:
         assert transfer_address, "Transfer address required"
 
+    if fee_context is None:
+        utxo_client = get_utxo_provider_client(config_path=config_path)
+        fee_context = FeeEstimationContext(utxo_client, config_path=config_path, proxy=proxy)
+
     log.debug("Get total operation fees for running '{}' on {} owned by {} paid by {}".format(','.join(operations), name, owner_address, payment_address))
 
     def _get_balance():
         """
         get payment address balance (scatter/gather worker)
         """
-        balance = get_balance(payment_address, config_path=config_path)
+        balance = get_balance(payment_address, config_path=config_path, utxo_client=fee_context.utxo_client)
         if balance is None:
             msg = 'Failed to get balance'
             return {'error': msg}
@@ -447,7 +457,7 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
         """
         name_cost = None
         try:
-            res = get_name_cost(name, proxy=proxy)
+            res = fee_context.get_name_cost(name)
             if 'error' in res:
                 return {'error': 'Failed to get name cost'}
 
@@ -458,20 +468,20 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
 
         try:
             owner_privkey_params = get_privkey_info_params(owner_privkey_info)
-            utxo_client = get_utxo_provider_client(config_path=config_path)
+            utxo_client = fee_context.utxo_client
 
             insufficient_funds = False
             preorder_tx_fee = estimate_preorder_tx_fee(
                 name, name_cost, owner_address, payment_address, utxo_client,
                 owner_privkey_params=owner_privkey_params, min_payment_confs=min_payment_confs,
-                config_path=config_path, include_dust=True
+                config_path=config_path, include_dust=True, fee_context=fee_context
             )
 
             if preorder_tx_fee is not None:
                 preorder_tx_fee = int(preorder_tx_fee)
             else:
                 # do our best
-                preorder_tx_fee = get_tx_fee('00' * APPROX_PREORDER_TX_LEN, config_path=config_path)
+                preorder_tx_fee = fee_context.get_tx_fee('00' * APPROX_PREORDER_TX_LEN)
                 insufficient_funds = True
 
             return {'status': True, 'name_cost': name_cost, 'tx_fee': preorder_tx_fee, 'insufficient': insufficient_funds}
@@ -493,19 +503,19 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
         
         try:
             owner_privkey_params = get_privkey_info_params(owner_privkey_info)
-            utxo_client = get_utxo_provider_client(config_path=config_path)
+            utxo_client = fee_context.utxo_client
 
             insufficient_funds = False
             register_tx_fee = estimate_register_tx_fee(
                 name, owner_address, payment_address, utxo_client,
                 owner_privkey_params=owner_privkey_params,
-                config_path=config_path, include_dust=True
+                config_path=config_path, include_dust=True, fee_context=fee_context
             )
 
             if register_tx_fee is not None:
                 register_tx_fee = int(register_tx_fee)
             else:
-                register_tx_fee = get_tx_fee('00' * APPROX_REGISTER_TX_LEN, config_path=config_path)
+                register_tx_fee = fee_context.get_tx_fee('00' * APPROX_REGISTER_TX_LEN)
                 insufficient_funds = True
             
             return {'status': True, 'tx_fee': register_tx_fee, 'insufficient': insufficient_funds}
@@ -526,21 +536,21 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
         """
         try:
             owner_privkey_params = get_privkey_info_params(owner_privkey_info)
-            utxo_client = get_utxo_provider_client(config_path=config_path)
+            utxo_client = fee_context.utxo_client
 
             insufficient_funds = False
             estimate = False
             update_tx_fee = estimate_update_tx_fee(
                 name, payment_privkey_info, owner_address, utxo_client,
                 owner_privkey_params=owner_privkey_params,
-                config_path=config_path, payment_address=payment_address, include_dust=True
+                config_path=config_path, payment_address=payment_address, include_dust=True, fee_context=fee_context
             )
 
             if update_tx_fee is not None:
                 update_tx_fee = int(update_tx_fee)
             
             else:
-                update_tx_fee = get_tx_fee('00' * APPROX_UPDATE_TX_LEN, config_path=config_path)
+                update_tx_fee = fee_context.get_tx_fee('00' * APPROX_UPDATE_TX_LEN)
                 insufficient_funds = True
 
             if payment_privkey_info is None:
@@ -566,7 +576,7 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
 
             if transfer_address is not None:
                 owner_privkey_params = get_privkey_info_params(owner_privkey_info)
-                utxo_client = get_utxo_provider_client(config_path=config_path)
+                utxo_client = fee_context.utxo_client
 
                 insufficient_funds = False
                 estimate = False
@@ -574,14 +584,14 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
                 transfer_tx_fee = estimate_transfer_tx_fee(
                     name, payment_privkey_info, owner_address, utxo_client,
                     owner_privkey_params=owner_privkey_params,
-                    config_path=config_path, payment_address=payment_address, include_dust=True
+                    config_path=config_path, payment_address=payment_address, include_dust=True, fee_context=fee_context
                 )
                 
                 if transfer_tx_fee is not None:
                     transfer_tx_fee = int(transfer_tx_fee)
                 
                 else:
-                    transfer_tx_fee = get_tx_fee('00' * APPROX_TRANSFER_TX_LEN, config_path=config_path)
+                    transfer_tx_fee = fee_context.get_tx_fee('00' * APPROX_TRANSFER_TX_LEN)
                     insufficient_funds = True
 
                 if payment_privkey_info is None:
@@ -608,7 +618,7 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
         """
         try:
             owner_privkey_params = get_privkey_info_params(owner_privkey_info)
-            utxo_client = get_utxo_provider_client(config_path=config_path)
+            utxo_client = fee_context.utxo_client
 
             insufficient_funds = False
             estimate = False
@@ -616,14 +626,14 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
             tx_fee = estimate_revoke_tx_fee(
                 name, payment_privkey_info, owner_address, utxo_client,
                 owner_privkey_params=owner_privkey_params,
-                config_path=config_path, include_dust=True
+                config_path=config_path, include_dust=True, fee_context=fee_context
             )
 
             if tx_fee is not None:
                 tx_fee = int(tx_fee)
             
             else:
-                tx_fee = get_tx_fee('00' * APPROX_REVOKE_TX_LEN, config_path=config_path)
+                tx_fee = fee_context.get_tx_fee('00' * APPROX_REVOKE_TX_LEN)
                 insufficient_funds = True
 
             if payment_privkey_info is None:
@@ -647,7 +657,7 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
         """
         name_cost = None
         try:
-            res = get_name_cost(name, proxy=proxy)
+            res = fee_context.get_name_cost(name)
             name_cost = res['satoshis']
         except Exception as e:
             log.exception(e)
@@ -655,21 +665,21 @@ def get_operation_fees(name, operations, scatter_gather, payment_privkey_info, o
 
         try:
             owner_privkey_params = get_privkey_info_params(owner_privkey_info)
-            utxo_client = get_utxo_provider_client(config_path=config_path)
+            utxo_client = fee_context.utxo_client
 
             insufficient_funds = False
             estimate = False
 
             tx_fee = estimate_renewal_tx_fee(
                 name, name_cost, payment_privkey_info, owner_privkey_info, utxo_client,
-                config_path=config_path, include_dust=True
+                config_path=config_path, include_dust=True, fee_context=fee_context
             )
 
             if tx_fee is not None:
                 tx_fee = int(tx_fee)
             
             else:
-                tx_fee = get_tx_fee('00' * APPROX_RENEWAL_TX_LEN, config_path=config_path)
+                tx_fee = fee_context.get_tx_fee('00' * APPROX_RENEWAL_TX_LEN)
                 insufficient_funds = True
 
             if payment_privkey_info is None:
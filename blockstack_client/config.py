@@ -764,6 +764,7 @@ def read_config_file(path=CONFIG_PATH):
             'advanced_mode',
             'anonymous_statistics',
             'authenticate_api',
+            'storage_concurrent_writes',
         ]
     }
 
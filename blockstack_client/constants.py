@@ -57,6 +57,7 @@ DEFAULT_BLOCKSTACKD_PORT = 6264  # blockstackd port
 DEFAULT_BLOCKSTACKD_SERVER = 'node.blockstack.org'
 
 DEFAULT_API_PORT = 6270  # RPC endpoint port
+DEFAULT_API_WORKERS = 8     # number of requests the RPC endpoint serves at once
 
 # initialize to default settings
 BLOCKSTACKD_SERVER = DEFAULT_BLOCKSTACKD_SERVER
@@ -305,11 +306,23 @@ METADATA_DIRNAME = 'metadata'
 APP_ACCOUNT_DIRNAME = 'accounts'
 USER_DIRNAME = 'accounts'
 DATASTORE_DIRNAME = 'datastores'
+DATASTORE_INODE_CACHE_BYTES = 16 * 1024 * 1024     # maximum size of all cached serialized inodes
+MUTABLE_DATA_FETCH_DEADLINE = DEFAULT_TIMEOUT     # how long to wait for all drivers when fetching mutable data from all of them
+DATASTORE_IO_WORKERS = 8     # number of inodes to fetch or store at once in batched datastore operations
+DATASTORE_INODE_CACHE_TTL = 30   # cache lifetime (in seconds) for an inode, so writes from other devices become visible
 LOCAL_PRIVKEY_INDEX_NAME = 'local_privkey.idx'
 
 BLOCKCHAIN_ID_MAGIC = 'id'
 
 USER_ZONEFILE_TTL = 3600    # cache lifetime for a user's zonefile
+PROFILE_FETCH_WORKERS = 8    # number of names to resolve at once in batched profile lookups
+ZONEFILE_BATCH_SIZE = 100     # maximum number of zonefiles a blockstack server will serve in one request
+VERIFIED_DATA_CACHE_BYTES = 32 * 1024 * 1024     # maximum size of all signed data whose verified payloads are cached
+NEGATIVE_RESULT_CACHE_TTL = 60     # how long (in seconds) to remember that a name's zonefile or profile could not be loaded
+NEGATIVE_RESULT_CACHE_SIZE = 10000     # maximum number of remembered failed lookups
+if BLOCKSTACK_TEST is not None:
+    # test environment: zonefiles and profiles change every few seconds
+    NEGATIVE_RESULT_CACHE_TTL = 1
 
 SLEEP_INTERVAL = 20  # in seconds
 TX_EXPIRED_INTERVAL = 10  # if a tx is not picked up by x blocks
@@ -317,9 +330,15 @@ PREORDER_CONFIRMATIONS = 6
 PREORDER_MAX_CONFIRMATIONS = 130  # no. of blocks after which preorder should be removed
 TX_CONFIRMATIONS_NEEDED = 10
 MAX_TX_CONFIRMATIONS = 130
+UTXO_CACHE_TTL = 10  # cache lifetime (in seconds) for an address's UTXOs; dropped early when we spend from the address
+UTXO_QUERY_WORKERS = 8  # number of concurrent UTXO queries, for providers that can't batch them
+if BLOCKSTACK_TEST is not None:
+    # test environment: blocks (and confirmations) change every few seconds
+    UTXO_CACHE_TTL = 1
 QUEUE_LENGTH_TO_MONITOR = 50
 MINIMUM_BALANCE = 0.002
 DEFAULT_POLL_INTERVAL = 300
+TX_CONFIRMATIONS_CACHE_TTL = 2 * DEFAULT_POLL_INTERVAL  # cache lifetime (in seconds) for a tx's confirmation count at a given block height; outlives a poll cycle
 
 # approximate transaction sizes, for when the user has no balance.
 # over-estimations, to avoid stalled registrations.
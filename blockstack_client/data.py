@@ -37,6 +37,9 @@ import errno
 import hashlib
 import jsontokens
 import collections
+import threading
+import Queue
+import sqlite3
 from keylib import *
 
 from .keys import *
@@ -46,55 +49,147 @@ from .storage import hash_zonefile
 from .zonefile import get_name_zonefile, load_name_zonefile, url_to_uri_record, store_name_zonefile
 
 from .config import get_logger, get_config, get_local_device_id, get_all_device_ids
-from .constants import BLOCKSTACK_TEST, BLOCKSTACK_DEBUG, DATASTORE_SIGNING_KEY_INDEX
+from .utils import run_parallel
+from .constants import BLOCKSTACK_TEST, BLOCKSTACK_DEBUG, DATASTORE_SIGNING_KEY_INDEX, DATASTORE_INODE_CACHE_BYTES, DATASTORE_INODE_CACHE_TTL, \
+        MUTABLE_DATA_FETCH_DEADLINE, DATASTORE_IO_WORKERS
 from .schemas import *
 
 log = get_logger()
 
-DIR_CACHE = None      # cached directories (maps inode uuid to dir data)
+DIR_CACHE = None      # cached inodes (maps (datastore ID, inode uuid) to serialized inode data)
 
 class InodeCache(object):
     """
-    Cache inode-uuid --> inode data
-    in an LRU style
+    Cache (datastore ID, inode uuid, version) --> serialized inode header and data,
+    in an LRU style, bounded by the total size of the serialized data.
+
+    Entries are stored serialized, so callers always get back a fresh
+    copy they can modify.  Only the latest cached version of an inode
+    is kept.
     """
-    def __init__(self, capacity=10000):
-        self.capacity = capacity
+    def __init__(self, max_bytes=DATASTORE_INODE_CACHE_BYTES, ttl=DATASTORE_INODE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
         self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+
 
-    def get(self, inode_uuid):
+    def _entry_size(self, entry):
         """
-        Get cached inode data
+        How many bytes does an entry take up?
         """
-        try:
-            value = self.cache.pop(inode_uuid)
-            self.cache[inode_uuid] = value
-            return value
+        return sum([len(entry[k]) for k in ['hdr', 'data'] if entry[k] is not None])
+
+
+    def _evict_entry(self, key):
+        """
+        Evict an entry.  Must hold the lock.
+        """
+        entry = self.cache.pop(key, None)
+        if entry is not None:
+            self.size -= self._entry_size(entry)
+
 
-        except KeyError:
+    def get(self, datastore_id, inode_uuid, version):
+        """
+        Get cached inode data at the given version.
+        Return {'inode': inode header or full inode, 'drivers': drivers, 'version': version} on hit.
+        Return None on miss, or if the cached data is stale.
+        """
+        key = (datastore_id, inode_uuid)
+        with self.lock:
+            entry = self.cache.pop(key, None)
+            if entry is None:
+                return None
+
+            if entry['version'] != version or entry['cached_at'] + self.ttl < time.time():
+                # stale
+                self.size -= self._entry_size(entry)
+                return None
+
+            self.cache[key] = entry
+
+        return entry
+
+
+    def get_inode(self, datastore_id, inode_uuid, version):
+        """
+        Get a cached full inode at the given version.
+        Return {'status': True, 'inode': ..., 'version': ...} on hit
+        Return None on miss
+        """
+        entry = self.get(datastore_id, inode_uuid, version)
+        if entry is None or entry['data'] is None:
             return None
 
-    def put(self, inode_uuid, inode_data):
+        return {'status': True, 'inode': data_blob_parse(entry['data']), 'version': entry['version']}
+
+
+    def get_header(self, datastore_id, inode_uuid, version):
         """
-        Cache inode data
+        Get a cached inode header at the given version.
+        Return {'status': True, 'inode': ..., 'version': ..., 'drivers': ...} on hit
+        Return None on miss
         """
-        try:
-            self.cache.pop(inode_uuid)
-        except KeyError:
-            if len(self.cache) >= self.capacity:
-                self.cache.popitem(last=False)
+        entry = self.get(datastore_id, inode_uuid, version)
+        if entry is None or entry['hdr'] is None:
+            return None
 
-        self.cache[inode_uuid] = inode_data
+        return {'status': True, 'inode': data_blob_parse(entry['hdr']), 'version': entry['version'], 'drivers': entry['drivers'][:]}
 
 
-    def evict(self, inode_uuid):
+    def put(self, datastore_id, inode_uuid, version, inode_hdr_str=None, inode_data_str=None, drivers=None):
+        """
+        Cache serialized inode header and/or inode data at the given version.
+        If we already have this version, then merge the new data into it.
+        Older versions get replaced.
+        """
+        key = (datastore_id, inode_uuid)
+        entry = {
+            'version': version,
+            'hdr': inode_hdr_str,
+            'data': inode_data_str,
+            'drivers': drivers[:] if drivers is not None else [],
+            'cached_at': time.time(),
+        }
+
+        with self.lock:
+            old_entry = self.cache.get(key, None)
+            if old_entry is not None:
+                if old_entry['version'] > version:
+                    # have newer data already
+                    return
+
+                if old_entry['version'] == version:
+                    # fill in whatever we're missing
+                    for k in ['hdr', 'data']:
+                        if entry[k] is None:
+                            entry[k] = old_entry[k]
+
+                    if drivers is None:
+                        entry['drivers'] = old_entry['drivers']
+
+                self._evict_entry(key)
+
+            entry_size = self._entry_size(entry)
+            if entry_size > self.max_bytes:
+                # won't fit
+                return
+
+            while self.size + entry_size > self.max_bytes and len(self.cache) > 0:
+                self._evict_entry(next(iter(self.cache)))
+
+            self.cache[key] = entry
+            self.size += entry_size
+
+
+    def evict(self, datastore_id, inode_uuid):
         """
         Evict inode data
         """
-        try:
-            self.cache.pop(inode_uuid)
-        except KeyError:
-            pass
+        with self.lock:
+            self._evict_entry((datastore_id, inode_uuid))
 
 
 def serialize_mutable_data_id(data_id):
@@ -118,38 +213,310 @@ def get_metadata_dir(conf):
     return metadata_dir
 
 
-def load_mutable_data_version(conf, device_id, data_id, config_path=CONFIG_PATH):
+MUTABLE_DATA_VERSIONS_DB = 'versions.db'
+MUTABLE_DATA_VERSIONS_BUSY_TIMEOUT = 60.0
+
+MUTABLE_DATA_VERSIONS_SQL = """
+CREATE TABLE IF NOT EXISTS versions( data_id TEXT NOT NULL,
+                                     device_id TEXT NOT NULL,
+                                     version INTEGER NOT NULL,
+                                     PRIMARY KEY(data_id, device_id) );
+CREATE TABLE IF NOT EXISTS legacy_imports( data_id TEXT NOT NULL PRIMARY KEY );
+"""
+
+VERSION_STORES = {}     # maps (pid, metadata directory) to MutableDataVersionStore
+VERSION_STORES_LOCK = threading.Lock()
+
+
+class MutableDataVersionStore(object):
     """
-    Get the version field of a piece of mutable data from local cache.
+    Single-file store for the version vectors of mutable data,
+    i.e. (data ID, device ID) --> version.
+
+    Reads are served from an in-memory cache, which is dropped
+    whenever another connection (i.e. another process) commits to the db.
+    Versions only ever move forward; writes are atomic read-compare-writes.
+
+    Versions stored in the legacy one-file-per-(data ID, device ID)
+    layout are imported the first time their data ID is read.  Versions
+    are no longer written to the legacy files.
     """
+    def __init__(self, metadata_dir):
+        self.metadata_dir = metadata_dir
+        self.path = os.path.join(metadata_dir, MUTABLE_DATA_VERSIONS_DB)
+        self.lock = threading.Lock()
+        self.cache = {}         # maps data ID to {device ID: version}
+        self.legacy_imported = set()    # data IDs whose legacy versions have been imported
+        self.db_version = None
+
+        if not os.path.isdir(metadata_dir):
+            log.debug("Make metadata directory {}".format(metadata_dir))
+            os.makedirs(metadata_dir)
+
+        self.db = sqlite3.connect(self.path, isolation_level=None, timeout=MUTABLE_DATA_VERSIONS_BUSY_TIMEOUT, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL;")
+        self.db.execute("PRAGMA synchronous=NORMAL;")
+        self.db.executescript(MUTABLE_DATA_VERSIONS_SQL)
+
+
+    def _check_cache(self):
+        """
+        Drop the cache if another connection has written to the db.
+        Must hold the lock.
+        """
+        row = self.db.execute("PRAGMA data_version;").fetchone()
+        if row is None or row[0] != self.db_version:
+            self.cache = {}
+            self.db_version = row[0] if row is not None else None
+
+
+    def _begin(self):
+        """
+        Start a write transaction.
+        Must hold the lock.
+        """
+        self.db.execute("BEGIN IMMEDIATE;")
+
+
+    def _end(self, commit=True):
+        """
+        Finish a write transaction.
+        Must hold the lock.
+        """
+        self.db.execute("COMMIT;" if commit else "ROLLBACK;")
+
+
+    def _write(self, query, values):
+        """
+        Run a write query over a list of value tuples in one transaction.
+        Must hold the lock.
+        """
+        self._begin()
+        try:
+            self.db.executemany(query, values)
+            self._end()
+        except:
+            self._end(commit=False)
+            raise
+
+
+    def _select(self, data_id):
+        """
+        Read the {device ID: version} dict for a data ID from the db.
+        Must hold the lock.
+        """
+        return dict(self.db.execute("SELECT device_id, version FROM versions WHERE data_id = ?;", (data_id,)).fetchall())
+
+
+    def _advance(self, data_id, versions):
+        """
+        Advance the versions of a data ID to at least the given {device ID: version}.
+        Must hold the lock, and be in a write transaction.
+        """
+        cur_versions = self._select(data_id)
+        new_versions = [(data_id, device_id, ver) for (device_id, ver) in versions.items() if ver > cur_versions.get(device_id, -1)]
+        if len(new_versions) > 0:
+            self.db.executemany("INSERT OR REPLACE INTO versions (data_id, device_id, version) VALUES (?,?,?);", new_versions)
+
+        for (_, device_id, ver) in new_versions:
+            cur_versions[device_id] = ver
+
+        return cur_versions
+
+
+    def _legacy_versions(self, data_id):
+        """
+        Read the versions of a data ID from the legacy per-device version files.
+        Return {device ID: version}
+        """
+        ver_dir = os.path.join(self.metadata_dir, serialize_mutable_data_id(data_id))
+        if not os.path.isdir(ver_dir):
+            return {}
+
+        versions = {}
+        for name in os.listdir(ver_dir):
+            if not name.endswith('.ver'):
+                continue
+
+            ver_path = os.path.join(ver_dir, name)
+            try:
+                with open(ver_path, 'r') as f:
+                    versions[urllib.unquote(name[:-len('.ver')].replace(r'\x2f', '/')).replace('\\0', '\0')] = int(f.read().strip())
+
+            except ValueError as ve:
+                log.warn("Not an integer: {}".format(ver_path))
+            except Exception as e:
+                log.warn("Failed to read; {}".format(ver_path))
+
+        return versions
+
+
+    def _import_legacy(self, data_id):
+        """
+        Import the legacy versions of a data ID, if this has not been done already.
+        Must hold the lock.
+        """
+        if data_id in self.legacy_imported:
+            return
+
+        if self.db.execute("SELECT 1 FROM legacy_imports WHERE data_id = ?;", (data_id,)).fetchone() is None:
+            legacy_versions = self._legacy_versions(data_id)
+
+            self._begin()
+            try:
+                if len(legacy_versions) > 0:
+                    log.debug("Import {} legacy version(s) for {}".format(len(legacy_versions), data_id))
+                    self._advance(data_id, legacy_versions)
+
+                self.db.execute("INSERT OR REPLACE INTO legacy_imports (data_id) VALUES (?);", (data_id,))
+                self._end()
+            except:
+                self._end(commit=False)
+                raise
+
+        self.legacy_imported.add(data_id)
+
+
+    def _load(self, data_id):
+        """
+        Get the {device ID: version} dict for a data ID.
+        Must hold the lock.
+        """
+        self._check_cache()
+        versions = self.cache.get(data_id, None)
+        if versions is not None:
+            return versions
+
+        self._import_legacy(data_id)
+        versions = self._select(data_id)
+
+        self.cache[data_id] = versions
+        return versions
+
+
+    def get_versions(self, data_id, device_ids):
+        """
+        Get the versions of a data ID for each of the given devices.
+        Return {device ID: version}, omitting devices with no known version.
+        """
+        with self.lock:
+            versions = self._load(data_id)
+            return dict([(device_id, versions[device_id]) for device_id in device_ids if device_id in versions])
+
+
+    def put_versions(self, data_id, versions):
+        """
+        Store the versions of a data ID, given as {device ID: version}.
+        A device's version is only stored if it is newer than the one in the db.
+        All versions are written in one transaction.
+        """
+        with self.lock:
+            self._check_cache()
+            self._import_legacy(data_id)
+
+            self._begin()
+            try:
+                self._advance(data_id, versions)
+                self._end()
+            except:
+                self._end(commit=False)
+                raise
+
+            self.cache.pop(data_id, None)
+
+
+    def advance_versions(self, data_id, device_ids, new_version):
+        """
+        Advance the versions of a data ID for each of the given devices
+        to the greater of new_version and the newest of their current versions,
+        in one transaction.
+        Return the version they were advanced to.
+        """
+        with self.lock:
+            self._check_cache()
+            self._import_legacy(data_id)
+
+            self._begin()
+            try:
+                cur_versions = self._select(data_id)
+                new_version = max([new_version] + [cur_versions[device_id] for device_id in device_ids if device_id in cur_versions])
+                self._advance(data_id, dict([(device_id, new_version) for device_id in device_ids]))
+                self._end()
+            except:
+                self._end(commit=False)
+                raise
+
+            self.cache.pop(data_id, None)
+
+            return new_version
+
+
+    def delete_versions(self, data_id, device_ids):
+        """
+        Forget the versions of a data ID for each of the given devices.
+        """
+        with self.lock:
+            self._check_cache()
+            self._write("DELETE FROM versions WHERE data_id = ? AND device_id = ?;", [(data_id, device_id) for device_id in device_ids])
+            self.cache.pop(data_id, None)
+
+            # don't re-import legacy versions
+            ver_dir = os.path.join(self.metadata_dir, serialize_mutable_data_id(data_id))
+            for device_id in device_ids:
+                ver_path = os.path.join(ver_dir, '{}.ver'.format(serialize_mutable_data_id(device_id)))
+                if os.path.exists(ver_path):
+                    os.unlink(ver_path)
 
-    # try to get the current, locally-cached version
-    conf = get_config(path=config_path) if conf is None else conf
 
+def get_mutable_data_version_store(conf=None, config_path=CONFIG_PATH):
+    """
+    Get the version store for the metadata directory in the config.
+    Return the MutableDataVersionStore on success
+    Return None on error
+    """
+    conf = get_config(path=config_path) if conf is None else conf
     if conf is None:
-        msg = 'No config found; cannot load version for "{}"'
-        log.debug(msg.format(data_id))
+        log.warning('No config found; cannot load version store')
         return None
 
     metadata_dir = get_metadata_dir(conf)
-    dev_id = serialize_mutable_data_id(device_id)
-    d_id = serialize_mutable_data_id(data_id)
+    key = (os.getpid(), metadata_dir)
+
+    with VERSION_STORES_LOCK:
+        store = VERSION_STORES.get(key, None)
+        if store is None:
+            try:
+                store = MutableDataVersionStore(metadata_dir)
+            except Exception as e:
+                if BLOCKSTACK_DEBUG:
+                    log.exception(e)
+
+                log.warning('Failed to open version store in {}'.format(metadata_dir))
+                return None
+
+            VERSION_STORES[key] = store
 
-    ver_dir = os.path.join(metadata_dir, d_id)
-    if not os.path.exists(ver_dir):
-        log.debug("No version path found for {}:{}".format(device_id, data_id))
+    return store
+
+
+def load_mutable_data_version(conf, device_id, data_id, config_path=CONFIG_PATH):
+    """
+    Get the version field of a piece of mutable data from local cache.
+    """
+
+    # try to get the current, locally-cached version
+    store = get_mutable_data_version_store(conf, config_path=config_path)
+    if store is None:
+        log.debug('Cannot load version for "{}"'.format(data_id))
         return None
 
-    ver_path = os.path.join(ver_dir, '{}.ver'.format(dev_id))
     try:
-        with open(ver_path, 'r') as f:
-            ver_txt = f.read()
-            return int(ver_txt.strip())
-
-    except ValueError as ve:
-        log.warn("Not an integer: {}".format(ver_path))
+        return store.get_versions(data_id, [device_id]).get(device_id, None)
     except Exception as e:
-        log.warn("Failed to read; {}".format(ver_path))
+        if BLOCKSTACK_DEBUG:
+            log.exception(e)
+
+        log.warn("Failed to load version of {}:{}".format(device_id, data_id))
 
     return None
 
@@ -164,47 +531,13 @@ def store_mutable_data_version(conf, device_id, data_id, ver, config_path=CONFIG
     Return False if not
     """
 
-    conf = get_config(path=config_path) if conf is None else conf
-
-    if conf is None:
-        msg = 'No config found; cannot store version for "{}"'
-        log.warning(msg.format(data_id))
+    store = get_mutable_data_version_store(conf, config_path=config_path)
+    if store is None:
+        log.warning('Cannot store version for "{}"'.format(data_id))
         return False
 
-    metadata_dir = get_metadata_dir(conf)
-
-    if not os.path.isdir(metadata_dir):
-        try:
-            log.debug("Make metadata directory {}".format(metadata_dir))
-            os.makedirs(metadata_dir)
-        except Exception, e:
-            if BLOCKSTACK_DEBUG:
-                log.exception(e)
-
-            msg = 'No metadata directory created; cannot store version of "{}"'
-            log.warning(msg.format(data_id))
-            return False
-
-    d_id = serialize_mutable_data_id(data_id)
-    dev_id = serialize_mutable_data_id(device_id)
-
-    ver_dir = os.path.join(metadata_dir, d_id)
-    if not os.path.isdir(ver_dir):
-        try:
-            log.debug("Make metadata directory {}".format(ver_dir))
-            os.makedirs(ver_dir)
-        except Exception, e:
-            if BLOCKSTACK_DEBUG:
-                log.exception(e)
-
-            log.warning("No metadata directory created for {}:{}".format(device_id, data_id))
-            return False
-
-    ver_path = os.path.join(ver_dir, '{}.ver'.format(dev_id))
     try:
-        with open(ver_path, 'w') as f:
-            f.write(str(ver))
-            f.flush()
+        store.put_versions(data_id, {device_id: ver})
         return True
 
     except Exception as e:
@@ -224,33 +557,20 @@ def delete_mutable_data_version(conf, device_id, data_id, config_path=CONFIG_PAT
     Return False if not
     """
 
-    conf = get_config(path=config_path) if conf is None else conf
-
-    if conf is None:
-        msg = 'No config found; cannot delete version for "{}"'
+    store = get_mutable_data_version_store(conf, config_path=config_path)
+    if store is None:
         return False
 
-    metadata_dir = get_metadata_dir(conf)
-
-    if not os.path.isdir(metadata_dir):
-        return True
-
-    d_id = serialize_mutable_data_id(data_id)
-    dev_id = serialize_mutable_data_id(device_id)
-
-    ver_dir = os.path.join(metadata_dir, d_id)
-    if not os.path.isdir(ver_dir):
-        return True
-
-    ver_path = os.path.join(ver_dir, '{}.ver'.format(dev_id))
     try:
-        if os.path.exists(ver_path):
-            os.unlink(ver_path)
+        store.delete_versions(data_id, [device_id])
+        return True
 
     except Exception as e:
         # failed for whatever reason
-        msg = 'Failed to remove version file "{}"'
-        log.warn(msg.format(ver_file_path))
+        if BLOCKSTACK_DEBUG:
+            log.exception(e)
+
+        log.warn('Failed to remove version of {}:{}'.format(device_id, data_id))
 
     return False
 
@@ -515,166 +835,291 @@ def load_user_data_pubkey_addr( name, storage_drivers=None, proxy=None, config_p
     return {'pubkey': data_pubkey, 'address': data_address}
 
 
-def _data_blob_chomp( s ):
+DATA_BLOB_TYPES = ['d', 's', 'i', 'l']
+
+
+def _data_blob_parse_at( data_blob_payload, offset, end ):
     """
-    Given "len(s):type:s,remainder", return (type, s, remainder)
+    Parse the serialized data blob "len:type:payload," that starts at
+    data_blob_payload[offset], and does not extend past data_blob_payload[end].
+    Nested blobs are parsed in place by offset; only leaf values are copied out.
+    Return (parsed data, offset of the next blob)
+    Raise ValueError on malformed input
     """
-    # grab length and remainder
-    parts = s.split(":", 1)
-    s_len = None
-    s_type = None
-    try:
-        s_len = int(parts[0])
-        assert parts[1][s_len] == ','
-    except:
-        raise ValueError("Invalid length field {} (from {})".format(parts[0], s))
+    colon = data_blob_payload.find(':', offset, end)
+    if colon < 0:
+        raise ValueError("Missing length field at offset {}".format(offset))
 
-    type_payload = parts[1][:s_len]
-    s_remainder = ""
-    if s_len < len(parts[1]):
-        s_remainder = parts[1][s_len+1:]
-
-    # grab type and payload
-    parts = type_payload.split(':', 1)
-    s_type = parts[0]
     try:
-        assert s_type in ['d', 's', 'i', 'l']
+        s_len = int(data_blob_payload[offset:colon])
+        assert s_len >= 2
     except:
-        raise ValueError("Invalid type field (from {})".format(s))
-    
-    s_payload = parts[1]
-    return s_type, s_payload, s_remainder
+        raise ValueError("Invalid length field {} at offset {}".format(data_blob_payload[offset:colon], offset))
 
+    payload_start = colon + 1
+    payload_end = payload_start + s_len
+    if payload_end >= end or data_blob_payload[payload_end] != ',':
+        raise ValueError("Invalid length field {} at offset {}".format(s_len, offset))
 
-def _data_blob_parse_work( data_blob_payload ):
-    """
-    Parse a serialized data blob back into a structure
-    Return (parsed data, remainder)
-    """
+    p_type = data_blob_payload[payload_start]
+    if p_type not in DATA_BLOB_TYPES or data_blob_payload[payload_start+1] != ':':
+        raise ValueError("Invalid type field at offset {}".format(payload_start))
 
-    p_type, payload, remainder = _data_blob_chomp( data_blob_payload )
-    
-    if p_type is None:
-        # empty 
-        return '', ''
+    pos = payload_start + 2
 
     if p_type == 'i':
-        return int(payload), remainder
+        return int(data_blob_payload[pos:payload_end]), payload_end + 1
 
     elif p_type == 's':
-        return str(payload), remainder 
+        return str(data_blob_payload[pos:payload_end]), payload_end + 1
 
-    elif p_type in ['l', 'd']:
-        # payload is "blob,blob,blob..." string
-        parts = None
-        if p_type == 'l':
-            parts = []
-        else:
-            parts = {}
+    elif p_type == 'l':
+        parts = []
+        while pos < payload_end:
+            part, pos = _data_blob_parse_at(data_blob_payload, pos, payload_end)
+            parts.append(part)
 
-        if len(payload) == 0:
-            # empty 
-            return parts, remainder
+        return parts, payload_end + 1
 
-        if p_type == 'l':
-            # list
-            while True:
-                p_type, p_payload, p_remainder = _data_blob_chomp( payload )
+    else:
+        parts = {}
+        while pos < payload_end:
+            k_part, pos = _data_blob_parse_at(data_blob_payload, pos, payload_end)
+            if pos >= payload_end:
+                raise ValueError("Dict underrun at offset {}".format(pos))
 
-                # parse just this blob
-                part, r = _data_blob_parse_work('{}:{}:{},'.format(len(p_payload) + 2, p_type, p_payload))
-                assert len(r) == 0
+            if isinstance(k_part, (list, dict)):
+                raise ValueError("Invalid dict key type {} at offset {}".format(type(k_part).__name__, pos))
 
-                parts.append(part)
+            v_part, pos = _data_blob_parse_at(data_blob_payload, pos, payload_end)
+            parts[k_part] = v_part
 
-                if len(p_remainder) == 0:
-                    break
+        return parts, payload_end + 1
 
-                payload = p_remainder
 
-            return parts, remainder
+def data_blob_parse( data_blob_payload ):
+    """
+    Parse a serialized data structure.
+    @data_blob_payload can be a string, or a buffer/memoryview/bytearray
+    (which gets copied once).
+    Raise ValueError on malformed input
+    """
+    if isinstance(data_blob_payload, memoryview):
+        data_blob_payload = data_blob_payload.tobytes()
+
+    elif isinstance(data_blob_payload, (buffer, bytearray)):
+        data_blob_payload = str(data_blob_payload)
+
+    data_blob, r = _data_blob_parse_at(data_blob_payload, 0, len(data_blob_payload))
+    if r != len(data_blob_payload):
+        raise ValueError("Underrun while parsing")
+
+    return data_blob
 
-        elif p_type == 'd':
-            # dict
-            while True:
-                k_type, k_payload, k_remainder = _data_blob_chomp( payload )
-                assert len(k_remainder) > 0, "dict underrun from '{}'".format(payload)
 
-                v_type, v_payload, v_remainder = _data_blob_chomp( k_remainder )
-                 
-                k_part, r = _data_blob_parse_work('{}:{}:{},'.format(len(k_payload) + 2, k_type, k_payload))
-                assert len(r) == 0
+def _data_blob_serialize_work( data_blob, parts ):
+    """
+    Append the serialized form of data_blob to parts.
+    Container length prefixes are filled in once their payloads are written.
+    Return the number of bytes appended
+    """
+    if isinstance(data_blob, (int, long)):
+        data_blob = str(data_blob)
+        data_blob = '%d:i:%s,' % (len(data_blob) + 2, data_blob)
+        parts.append(data_blob)
+        return len(data_blob)
 
-                v_part, r = _data_blob_parse_work('{}:{}:{},'.format(len(v_payload) + 2, v_type, v_payload))
-                assert len(r) == 0
+    if isinstance(data_blob, (str, unicode)):
+        data_blob = str(data_blob)
+        data_blob = '%d:s:%s,' % (len(data_blob) + 2, data_blob)
+        parts.append(data_blob)
+        return len(data_blob)
 
-                parts[k_part] = v_part
+    if isinstance(data_blob, list):
+        hdr_idx = len(parts)
+        parts.append(None)
+        parts.append('l:')
+        payload_len = 2
 
-                if len(v_remainder) == 0:
-                    break
+        for x in data_blob:
+            payload_len += _data_blob_serialize_work(x, parts)
 
-                payload = v_remainder
+    elif isinstance(data_blob, dict):
+        hdr_idx = len(parts)
+        parts.append(None)
+        parts.append('d:')
+        payload_len = 2
 
-            return parts, remainder
+        for k in sorted(data_blob.keys()):
+            payload_len += _data_blob_serialize_work(k, parts)
+            payload_len += _data_blob_serialize_work(data_blob[k], parts)
 
-        else:
-            # unreachable
-            assert False
-    
     else:
-        raise ValueError("Invalid type {}".format(p_type))
+        raise ValueError('Unserializable type {}'.format(type(data_blob)))
 
+    parts[hdr_idx] = '{}:'.format(payload_len)
+    parts.append(',')
+    return len(parts[hdr_idx]) + payload_len + 1
 
-def data_blob_parse( data_blob_payload ):
+
+def data_blob_serialize( data_blob ):
     """
-    Parse a serialized data structure
+    Serialize a data blob (conformant to DATA_BLOB_SCHEMA) into a string
     """
-    
-    data_blob, r = _data_blob_parse_work(data_blob_payload)
-    assert len(r) == 0, "Underrun while parsing"
-    return data_blob
+    parts = []
+    _data_blob_serialize_work(data_blob, parts)
+    return ''.join(parts)
 
 
-def data_blob_serialize( data_blob ):
+def _get_mutable_check(data_str, fq_data_id, driver, ver_min=None, ver_max=None, expected_version=0):
     """
-    Serialize a data blob (conformant to DATA_BLOB_SCHEMA) into a string
+    Parse and validate mutable data returned by a driver.
+    Return the data blob on success
+    Return None if it is malformed, or if its version is out of range
     """
+    data = None
+    try:
+        data = data_blob_parse(data_str)
+        jsonschema.validate(data, DATA_BLOB_SCHEMA)
+    except (ValueError, ValidationError) as ve:
+        if BLOCKSTACK_DEBUG:
+            log.exception(ve)
 
-    if isinstance(data_blob, (int, long)):
-        data_blob = str(data_blob)
-        return '{}:i:{},'.format(len(data_blob) + 2, data_blob)
+        log.warn("Invalid mutable data from {} for {}".format(driver, fq_data_id))
+        return None
 
-    if isinstance(data_blob, (str, unicode)):
-        data_blob = str(data_blob)
-        return '{}:s:{},'.format(len(data_blob) + 2, data_blob)
+    if data['fq_data_id'] != fq_data_id:
+        log.warn("Got back an unexpected fq_data_id")
+        return None
 
-    if isinstance(data_blob, list):
-        data_blob_parts = [data_blob_serialize(x) for x in data_blob]
-        data_blob = ''.join(data_blob_parts)
-        data_blob = 'l:{}'.format(data_blob)
+    # check consistency
+    version = data['version']
+    if ver_min is not None and ver_min > version:
+        log.warn("Invalid (stale) data version from {} for {}: ver_min = {}, version = {}".format(driver, fq_data_id, ver_min, version))
+        return None
+
+    elif ver_max is not None and ver_max <= version:
+        log.warn("Invalid (future) data version from {} for {}: ver_max = {}, version = {}".format(driver, fq_data_id, ver_max, version))
+        return None
+
+    elif expected_version > version:
+        log.warn("Invalid (stale) data version from {} for {}: expected = {}, version = {}".format(driver, fq_data_id, expected_version, version))
+        return None
 
-        return '{}:{},'.format(len(data_blob), data_blob)
+    return data
 
-    if isinstance(data_blob, dict):
-        payload_parts = []
 
-        for k in sorted(data_blob.keys()):
-            k_part = data_blob_serialize(k)
-            v_part = data_blob_serialize(data_blob[k])
-            payload_parts.append(k_part)
-            payload_parts.append(v_part)
+def _get_mutable_all_drivers(fq_data_ids, storage_drivers, data_pubkey, data_address, data_hash, blockchain_id, urls=None,
+                             ver_min=None, ver_max=None, expected_version=0, quorum=None, deadline=MUTABLE_DATA_FETCH_DEADLINE):
+    """
+    Fetch mutable data from every (fq_data_id, driver) pair at once, and
+    keep the latest valid version as results arrive.
+
+    A driver counts towards @quorum once it has answered for every fq_data_id
+    (i.e. every device), and at least one answer had data.  This way a newer
+    version from a slower device is never skipped.  Stale or invalid data is
+    ignored, but does not fail the driver; a driver fails only if it had no
+    data at all.
+
+    Return as soon as @quorum distinct drivers (default: all of them) have
+    done so.  Requests that are still running are abandoned to finish in the
+    background.
+
+    Return {'status': True, 'data': the latest data blob, 'drivers': drivers that served it} on success
+    Return {'error': ...} if too many drivers fail to reach quorum, or if quorum is not reached by the deadline
+    """
+    if quorum is None:
+        quorum = len(storage_drivers)
+
+    quorum = max(1, min(quorum, len(storage_drivers)))
+    results = Queue.Queue()
+
+    def _fetch(fq_data_id, driver):
+        data_str = None
+        data = None
+        try:
+            data_str = storage.get_mutable_data(fq_data_id, data_pubkey, urls=urls, drivers=[driver], data_address=data_address, data_hash=data_hash, blockchain_id=blockchain_id)
+            if data_str is not None:
+                data = _get_mutable_check(data_str, fq_data_id, driver, ver_min=ver_min, ver_max=ver_max, expected_version=expected_version)
+            else:
+                log.error("Failed to get mutable datum {} from {}".format(fq_data_id, driver))
+
+        except Exception as e:
+            log.exception(e)
+
+        results.put((fq_data_id, driver, data_str is not None, data))
+
+    for fq_data_id in fq_data_ids:
+        for driver in storage_drivers:
+            t = threading.Thread(target=_fetch, args=(fq_data_id, driver))
+            t.daemon = True
+            t.start()
+
+    num_pending = len(fq_data_ids) * len(storage_drivers)
+    num_pending_per_driver = dict([(driver, len(fq_data_ids)) for driver in storage_drivers])
+    drivers_with_data = set()
+    valid_drivers = set()
+    failed_drivers = set()
+    latest_data = None
+    latest_drivers = []
+    deadline_time = time.time() + deadline
+
+    while num_pending > 0 and (len(valid_drivers) < quorum or latest_data is None):
+        try:
+            fq_data_id, driver, fetched, data = results.get(timeout=max(0, deadline_time - time.time()))
+        except Queue.Empty:
+            log.error("Timed out waiting for mutable data from {} drivers".format(max(1, quorum - len(valid_drivers))))
+            return {'error': 'Timed out fetching mutable data'}
+
+        num_pending -= 1
+        num_pending_per_driver[driver] -= 1
+
+        if not fetched:
+            log.debug("No mutable datum {} from {}".format(fq_data_id, driver))
+
+        else:
+            drivers_with_data.add(driver)
+
+        if data is not None:
+            if latest_data is None or data['version'] > latest_data['version']:
+                # got a later version
+                # discard all prior drivers; they gave stale data
+                latest_data = data
+                latest_drivers = [driver]
+
+            elif data['version'] == latest_data['version'] and driver not in latest_drivers:
+                latest_drivers.append(driver)
 
-        values = ''.join(payload_parts)
-        payload = 'd:{}'.format(values)
+        if num_pending_per_driver[driver] > 0:
+            # still waiting on other devices' data from this driver
+            continue
+
+        if driver in drivers_with_data:
+            valid_drivers.add(driver)
+
+        else:
+            failed_drivers.add(driver)
+            if len(storage_drivers) - len(failed_drivers) < quorum:
+                # can't reach quorum
+                return {'error': 'Failed to look up mutable datum'}
+
+    if len(valid_drivers) < quorum:
+        log.error("Only {} of {} drivers gave back data".format(len(valid_drivers), quorum))
+        return {'error': 'Failed to fetch mutable data'}
+
+    if latest_data is None:
+        log.error("No valid mutable data for {}".format(', '.join(fq_data_ids)))
+        return {'error': 'Failed to fetch mutable data'}
 
-        return '{}:{},'.format(len(payload), payload)
+    if num_pending > 0:
+        log.debug("Leaving {} mutable data requests to finish in the background".format(num_pending))
 
-    raise ValueError('Unserializable type {}'.format(type(data_blob)))
+    return {'status': True, 'data': latest_data, 'drivers': latest_drivers}
 
 
 def get_mutable(data_id, blockchain_id=None, data_pubkey=None, data_address=None, data_hash=None, storage_drivers=None,
                          proxy=None, ver_min=None, ver_max=None, urls=None, device_ids=None, fully_qualified_data_id=False,
-                         config_path=CONFIG_PATH, all_drivers=False):
+                         config_path=CONFIG_PATH, all_drivers=False, quorum=None, deadline=MUTABLE_DATA_FETCH_DEADLINE):
     """
     get_mutable 
 
@@ -682,6 +1127,10 @@ def get_mutable(data_id, blockchain_id=None, data_pubkey=None, data_address=None
 
     If @ver_min is given, ensure the data's version is greater or equal to it.
     If @ver_max is given, ensure the data's version is less than it.
+
+    If @all_drivers is True, then query every driver for every device concurrently,
+    and return the latest version once @quorum drivers (default: all of them) have
+    given back valid data.  Fail if this does not happen within @deadline seconds.
     
     If data_pubkey or data_address is given, then blockchain_id will be ignored (but it will be passed as a hint to the drivers)
     If data_hash is given, then all three will be ignored
@@ -740,9 +1189,22 @@ def get_mutable(data_id, blockchain_id=None, data_pubkey=None, data_address=None
 
     mutable_data = None
     mutable_drivers = []
-    latest_version = expected_version
+    version = None
+
+    if all_drivers:
+        res = _get_mutable_all_drivers(fq_data_ids, storage_drivers, data_pubkey, data_address, data_hash, blockchain_id, urls=urls,
+                                       ver_min=ver_min, ver_max=ver_max, expected_version=expected_version, quorum=quorum, deadline=deadline)
+        if 'error' in res:
+            return res
+
+        mutable_data = res['data']
+        mutable_drivers = res['drivers']
+        version = mutable_data['version']
 
     for fq_data_id in fq_data_ids:
+        if mutable_data is not None:
+            # success!
+            break
 
         # which storage drivers and/or URLs will we use?
         for driver in storage_drivers: 
@@ -753,57 +1215,18 @@ def get_mutable(data_id, blockchain_id=None, data_pubkey=None, data_address=None
                 log.error("Failed to get mutable datum {}".format(fq_data_id))
                 return {'error': 'Failed to look up mutable datum'}
             
-            data = None
-            try:
-                data = data_blob_parse(data_str)
-                jsonschema.validate(data, DATA_BLOB_SCHEMA)
-            except ValidationError as ve:
-                if BLOCKSTACK_DEBUG:
-                    log.exception(ve)
-
-                log.warn("Invalid mutable data from {} for {}".format(driver, fq_data_id))
-                continue
-
-            if data['fq_data_id'] != fq_data_id:
-                log.warn("Got back an unexpected fq_data_id")
-                continue
-
-            # check consistency
-            version = data['version']
-            if ver_min is not None and ver_min > version:
-                log.warn("Invalid (stale) data version from {} for {}: ver_min = {}, version = {}".format(driver, fq_data_id, ver_min, version))
-                continue
-
-            elif ver_max is not None and ver_max <= version:
-                log.warn("Invalid (future) data version from {} for {}: ver_max = {}, version = {}".format(driver, fq_data_id, ver_max, version))
-                continue
-
-            elif expected_version > version:
-                log.warn("Invalid (stale) data version from {} for {}: expected = {}, version = {}".format(driver, fq_data_id, expected_version, version))
-                continue
-
-            if not all_drivers:
-                # success!
-                mutable_data = data
-                mutable_drivers.append(driver)
-                break
-
-            # keep searching 
-            if version < latest_version:
+            data = _get_mutable_check(data_str, fq_data_id, driver, ver_min=ver_min, ver_max=ver_max, expected_version=expected_version)
+            if data is None:
                 continue
 
-            # got a later version
-            # discard all prior drivers; they gave stale data
-            version = latest_version
-            mutable_data = data
-            mutable_drivers = [driver]
-
-        if mutable_data is not None:
             # success!
+            mutable_data = data
+            mutable_drivers.append(driver)
+            version = data['version']
             break
 
     if mutable_data is None:
-        log.error("Failed to fetch mutable data for {}".format(fq_data_id))
+        log.error("Failed to fetch mutable data for {}".format(data_id))
         return {'error': 'Failed to fetch mutable data'}
 
     rc = _put_mutable_data_versions(data_id, version, device_ids, config_path=config_path)
@@ -987,6 +1410,9 @@ def put_mutable(data_id, data_payload, blockchain_id=None, data_privkey=None, pr
     Replication is best-effort.  If one storage provider driver succeeds, the put_mutable succeeds.  If they all fail, then put_mutable fails.
     More complex behavior can be had by creating a "meta-driver" that calls existing drivers' methods in the desired manner.
 
+    If `storage_concurrent_writes` is set in the config file, all storage drivers are written to at once,
+    and put_mutable returns as soon as the required ones succeed.
+
     Notes on usage:
     * wallet_keys is only needed if data_privkey is None
     * if storage_drivers is None, each storage driver under `storage_drivers_required_write=` will be attempted.
@@ -1058,7 +1484,11 @@ def put_mutable(data_id, data_payload, blockchain_id=None, data_privkey=None, pr
     result = {}
 
     log.debug("put_mutable({}, blockchain_id={}, lookup_privkey={}, version={}, storage_drivers={}, exclusive={})".format(fq_data_id, blockchain_id, lookup, version, ','.join(storage_drivers), storage_drivers_exclusive))
-    rc = storage.put_mutable_data(fq_data_id, data, data_privkey, blockchain_id=blockchain_id, required=storage_drivers, required_exclusive=storage_drivers_exclusive)
+    timings = {}
+    rc = storage.put_mutable_data(fq_data_id, data, data_privkey, blockchain_id=blockchain_id, required=storage_drivers, required_exclusive=storage_drivers_exclusive,
+                                  concurrent=conf.get('storage_concurrent_writes', False), timings=timings)
+
+    log.debug("put_mutable({}) driver times: {}".format(fq_data_id, ', '.join(['{}: {:.3f}s'.format(d, t) for (d, t) in timings.items()])))
     if not rc:
         log.error("failed to put mutable data {}".format(fq_data_id))
         result['error'] = 'Failed to store mutable data'
@@ -1240,7 +1670,8 @@ def delete_mutable(data_id, data_privkey=None, proxy=None, storage_drivers=None,
 
     # remove the data itself
     for fq_data_id in fq_data_ids:
-        rc = storage.delete_mutable_data(fq_data_id, data_privkey, required=storage_drivers, required_exclusive=storage_drivers_exclusive, blockchain_id=blockchain_id)
+        rc = storage.delete_mutable_data(fq_data_id, data_privkey, required=storage_drivers, required_exclusive=storage_drivers_exclusive, blockchain_id=blockchain_id,
+                                         concurrent=conf.get('storage_concurrent_writes', False))
         if not rc:
             log.error("Failed to delete {} from storage providers".format(fq_data_id))
             worst_rc = False
@@ -1571,12 +2002,32 @@ def delete_datastore( datastore_privkey, force=False, config_path=CONFIG_PATH, p
 
 def _is_cacheable(inode_info):
     """
-    Can we cache this inode?
+    Can we cache this inode's data?
+    Only directories are cached; the cache itself bounds their size.
     """
-    if inode_info['type'] == MUTABLE_DATUM_DIR_TYPE and len(inode_info['idata']) < 1024:
-        return True
-    else:
-        return False
+    return inode_info['type'] == MUTABLE_DATUM_DIR_TYPE
+
+
+def _get_inode_local_version(datastore_id, inode_uuid, device_ids, config_path=CONFIG_PATH):
+    """
+    Get the latest locally-known version of an inode and its header.
+    Return {'status': True, 'version': version} on success
+    Return {'error': ...} on error
+    """
+    inode_id = '{}.{}'.format(datastore_id, inode_uuid)
+    inode_hdr_id = '{}.{}.hdr'.format(datastore_id, inode_uuid)
+
+    res = _get_mutable_data_versions( inode_id, device_ids, config_path=config_path )
+    if 'error' in res:
+        return res
+
+    inode_version = res['version']
+
+    res = _get_mutable_data_versions( inode_hdr_id, device_ids, config_path=config_path )
+    if 'error' in res:
+        return res
+
+    return {'status': True, 'version': max(inode_version, res['version'])}
 
 
 def _get_inode(datastore_id, inode_uuid, inode_type, data_pubkey_hex, drivers, device_ids, config_path=CONFIG_PATH, proxy=None, cache=None ):
@@ -1585,7 +2036,8 @@ def _get_inode(datastore_id, inode_uuid, inode_type, data_pubkey_hex, drivers, d
     equal or later version number than the one we have locally.
 
     If cache is not None, and if the inode is a directory, then check
-    the cache for the data and add it if it is not present
+    the cache for the data and add it if it is not present.  Cached data
+    is only used if its version matches the locally-stored version.
 
     # TODO: check data hash against inode header
 
@@ -1599,16 +2051,16 @@ def _get_inode(datastore_id, inode_uuid, inode_type, data_pubkey_hex, drivers, d
     conf = get_config(config_path)
     assert conf
 
-    '''
     # cached?
     if cache is not None and inode_type == MUTABLE_DATUM_DIR_TYPE:
-        inode_data = cache.get(inode_uuid)
-        if inode_data is not None:
-            # already-fetched
+        res = _get_inode_local_version(datastore_id, inode_uuid, device_ids, config_path=config_path)
+        if 'error' in res:
+            return res
+
+        res = cache.get_inode(datastore_id, inode_uuid, res['version'])
+        if res is not None:
             log.debug("Cache HIT on {}".format(inode_uuid))
-            inode_version = max(inode_data[
-            return {'status': True, 'inode': inode_data}
-    '''
+            return res
 
     header_version = 0
     inode_header = None
@@ -1668,18 +2120,15 @@ def _get_inode(datastore_id, inode_uuid, inode_type, data_pubkey_hex, drivers, d
         log.error("Inode {} not owned by {} (but by {})".format(inode_info['uuid'], data_address, inode_info['owner']))
         return {'error': 'Invalid owner'}
 
-    '''
-    # yup!
-    # cache small directories
-    if cache is not None and _is_cacheable(inode_info):
-        log.debug("Cache PUT {}".format(inode_uuid))
-        cache.put( inode_uuid, inode_info )
-    '''
-
     res = _put_inode_consistency_info(datastore_id, inode_uuid, max(inode_version, header_version), device_ids, config_path=config_path)
     if 'error' in res:
         return res
 
+    # cache directories
+    if cache is not None and _is_cacheable(inode_info):
+        log.debug("Cache PUT {}".format(inode_uuid))
+        cache.put(datastore_id, inode_uuid, max(inode_version, header_version), inode_data_str=inode_info_str)
+
     return {'status': True, 'inode': inode_info, 'version': max(inode_version, header_version)}
 
 
@@ -1689,16 +2138,22 @@ def _get_mutable_data_versions( data_id, device_ids, config_path=CONFIG_PATH ):
     Return {'status': True, 'version': version} on success
     Return {'error': ...} on error
     """
-    new_version = 0
     conf = get_config(config_path)
     assert conf
 
-    for device_id in device_ids:
-        cur_ver = load_mutable_data_version(conf, device_id, data_id, config_path=config_path)
-        if cur_ver is not None:
-            new_version = max(new_version, cur_ver)
+    store = get_mutable_data_version_store(conf, config_path=config_path)
+    if store is None:
+        return {'error': 'Failed to open version store'}
 
-    return {'status': True, 'version': new_version}
+    try:
+        versions = store.get_versions(data_id, device_ids)
+    except Exception as e:
+        if BLOCKSTACK_DEBUG:
+            log.exception(e)
+
+        return {'error': 'Failed to load mutable data versions for {}'.format(data_id)}
+
+    return {'status': True, 'version': max([0] + versions.values())}
 
 
 def _put_mutable_data_versions( data_id, new_version, device_ids, config_path=CONFIG_PATH ):
@@ -1712,16 +2167,17 @@ def _put_mutable_data_versions( data_id, new_version, device_ids, config_path=CO
     conf = get_config(config_path)
     assert conf
 
-    res = _get_mutable_data_versions(data_id, device_ids, config_path=CONFIG_PATH)
-    if 'error' in res:
-        return res
+    store = get_mutable_data_version_store(conf, config_path=config_path)
+    if store is None:
+        return {'error': 'Failed to open version store'}
 
-    new_version = max(res['version'], new_version)
+    try:
+        new_version = store.advance_versions(data_id, device_ids, new_version)
+    except Exception as e:
+        if BLOCKSTACK_DEBUG:
+            log.exception(e)
 
-    for device_id in device_ids:
-        rc = store_mutable_data_version(conf, device_id, data_id, new_version, config_path=config_path)
-        if not rc:
-            return {'error': 'Failed to advance mutable data version {} to {}'.format(data_id, new_version)}
+        return {'error': 'Failed to advance mutable data version {} to {}'.format(data_id, new_version)}
 
     return {'status': True, 'version': new_version}
 
@@ -1759,7 +2215,8 @@ def _put_inode_consistency_info(datastore_id, inode_uuid, new_version, device_id
 def _get_inode_header(datastore_id, inode_uuid, data_pubkey_hex, drivers, device_ids, inode_hdr_version=None, config_path=CONFIG_PATH, proxy=None, cache=None):
     """
     Get an inode's header data.  Verify it matches the inode info.
-    Fetch the header from *all* drivers
+    Fetch the header from *all* drivers, unless the cache has it at the
+    locally-stored version.
 
     Return {'status': True, 'inode': inode_full_info, 'version': version, 'drivers': drivers that were used} on success.
     Return {'error': ...} on error.
@@ -1776,7 +2233,6 @@ def _get_inode_header(datastore_id, inode_uuid, data_pubkey_hex, drivers, device
     inode_hdr_id = '{}.{}.hdr'.format(datastore_id, inode_uuid)
 
     inode_version = 0
-    inode_hdr_version = 0
 
     res = _get_mutable_data_versions( inode_id, device_ids, config_path=CONFIG_PATH )
     if 'error' in res:
@@ -1791,19 +2247,11 @@ def _get_inode_header(datastore_id, inode_uuid, data_pubkey_hex, drivers, device
 
         inode_hdr_version = res['version']
         
-    '''
     if cache is not None:
-        inode_data = cache.get(inode_uuid)
-        if inode_data is not None:
-            # reconstruct header 
-            inode_hdr = {}
-            for k in inode_data.keys():
-                if k != 'idata':
-                    inode_hdr[k] = copy.deepcopy(inode_data[k])
-
-            log.debug("Cache HIT on {}".format(inode_uuid))
-            return {'status': True, 'inode': inode_hdr}
-    '''
+        res = cache.get_header(datastore_id, inode_uuid, max(inode_version, inode_hdr_version))
+        if res is not None:
+            log.debug("Cache HIT on header {}".format(inode_uuid))
+            return res
 
     # get from *all* drivers so we know that if we succeed, we have a fresh version
     data_id = '{}.{}.hdr'.format(datastore_id, inode_uuid)
@@ -1838,13 +2286,17 @@ def _get_inode_header(datastore_id, inode_uuid, data_pubkey_hex, drivers, device
     if 'error' in res:
         return res
 
+    if cache is not None:
+        log.debug("Cache PUT header {}".format(inode_uuid))
+        cache.put(datastore_id, inode_uuid, max(inode_hdr_version, inode_version), inode_hdr_str=inode_hdr_str, drivers=inode_drivers)
+
     return {'status': True, 'inode': inode_hdr, 'version': max(inode_hdr_version, inode_version), 'drivers': inode_drivers}
 
 
 def _put_inode(datastore_id, _inode, data_privkey, drivers, device_ids, config_path=CONFIG_PATH, proxy=None, create=False, cache=None ):
     """
     Store an inode and its associated idata
-    If cache is given, invalidate the cache.
+    If cache is given, invalidate the cache and then cache the new version.
     Return {'status': True} on success
     Return {'error': ...} on error
     """
@@ -1852,6 +2304,10 @@ def _put_inode(datastore_id, _inode, data_privkey, drivers, device_ids, config_p
     if proxy is None:
         proxy = get_default_proxy(config_path=config_path)
 
+    # the old version is no longer valid, even if we fail
+    if cache is not None:
+        cache.evict(datastore_id, _inode['uuid'])
+
     # separate data from metadata.
     # put metadata as a separate record.
     data_id = '{}.{}'.format(datastore_id, _inode['uuid'])
@@ -1884,7 +2340,7 @@ def _put_inode(datastore_id, _inode, data_privkey, drivers, device_ids, config_p
     inode_hdr_data = data_blob_serialize(inode_hdr)
     res = put_mutable(data_hdr_id, inode_hdr_data, data_privkey=data_privkey, storage_drivers=drivers, storage_drivers_exclusive=True, config_path=config_path, proxy=proxy, create=create )
     if 'error' in res:
-        log.error("Failed to replicate inode header for {}: {}".format(inode['uuid'], res['error']))
+        log.error("Failed to replicate inode header for {}: {}".format(_inode['uuid'], res['error']))
         return {'error': 'Failed to replicate inode header'}
 
     inode_hdr_version = res['version']
@@ -1893,12 +2349,11 @@ def _put_inode(datastore_id, _inode, data_privkey, drivers, device_ids, config_p
     if 'error' in res:
         return res
 
-    '''
     # coherently cache
-    if cache is not None and _is_cacheable(_inode):
+    if cache is not None:
         log.debug("Cache PUT {}".format(_inode['uuid']))
-        cache.put(_inode['uuid'], _inode)
-    '''
+        inode_data_str = inode_data if _is_cacheable(_inode) else None
+        cache.put(datastore_id, _inode['uuid'], max(inode_version, inode_hdr_version), inode_hdr_str=inode_hdr_data, inode_data_str=inode_data_str, drivers=drivers)
 
     return {'status': True}
 
@@ -1930,7 +2385,7 @@ def _delete_inode(datastore_id, inode_uuid, data_privkey, drivers, device_ids, c
 
     # invalidate cache 
     if cache is not None:
-        cache.evict(inode_uuid)
+        cache.evict(datastore_id, inode_uuid)
 
     return {'status': True}
     
@@ -2055,7 +2510,7 @@ def _resolve_path( datastore, path, data_pubkey, get_idata=True, config_path=CON
     if child_type == MUTABLE_DATUM_DIR_TYPE or (get_idata and child_type == MUTABLE_DATUM_FILE_TYPE):
         # get file data too 
         assert ret.has_key(prefix + name), "BUG: missing {}".format(prefix + name) 
-        child_entry = _get_inode(datastore_id, child_uuid, child_type, data_pubkey, drivers, device_ids, config_path=CONFIG_PATH, proxy=proxy )
+        child_entry = _get_inode(datastore_id, child_uuid, child_type, data_pubkey, drivers, device_ids, config_path=CONFIG_PATH, proxy=proxy, cache=DIR_CACHE)
 
     else:
         # get only inode header.
@@ -2079,6 +2534,111 @@ def _resolve_path( datastore, path, data_pubkey, get_idata=True, config_path=CON
     return ret
 
 
+def _datastore_run_parallel( calls, num_workers=DATASTORE_IO_WORKERS ):
+    """
+    Run a list of (key, callable) pairs on a pool of threads (see utils.run_parallel()).
+    Return {key: callable's return value}.
+    If a callable raises an exception, its value is {'error': ..., 'errno': EIO}
+    """
+    return run_parallel(calls, num_workers, error=lambda key: {'error': 'Failed to run datastore operation', 'errno': errno.EIO})
+
+
+def _resolve_paths( datastore, dir_paths, data_pubkey, config_path=CONFIG_PATH, proxy=None ):
+    """
+    Given a list of directory paths, resolve all of them at once.
+    Each directory is fetched only once, no matter how many of the given
+    paths it is a prefix of.  Directories at the same depth are fetched
+    in parallel.
+
+    Return {'status': True, 'dirs': {path: path entry}, 'errors': {path: {'error': ..., 'errno': ...}}}.
+    'dirs' has an entry (in the format of _resolve_path) for each given path and each of its ancestors
+    that could be resolved.  'errors' has an entry for each given path that could not be resolved.
+
+    Return {'error': ..., 'errno': ...} if the root directory cannot be loaded
+    """
+    global DIR_CACHE
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    if DIR_CACHE is None:
+        DIR_CACHE = InodeCache()
+
+    datastore_id = datastore_get_id(datastore['pubkey'])
+    drivers = datastore['drivers']
+    device_ids = datastore['device_ids']
+    root_uuid = datastore['root_uuid']
+
+    root_inode = _get_inode(datastore_id, root_uuid, MUTABLE_DATUM_DIR_TYPE, data_pubkey, drivers, device_ids, config_path=config_path, proxy=proxy, cache=DIR_CACHE)
+    if 'error' in root_inode:
+        log.error("Failed to get root inode: {}".format(root_inode['error']))
+        return {'error': root_inode['error'], 'errno': errno.EIO}
+
+    resolved = {
+        '/': {'uuid': root_uuid, 'name': '', 'parent': '', 'inode': root_inode['inode']}
+    }
+    failed = {}
+
+    # every prefix of every path, grouped by depth
+    dir_paths = [_parse_data_path(p)['data_path'] for p in dir_paths]
+    prefixes_by_depth = {}
+    for dir_path in dir_paths:
+        parts = dir_path.strip('/').split('/')
+        if parts == ['']:
+            continue
+
+        for i in xrange(0, len(parts)):
+            prefixes_by_depth.setdefault(i+1, set()).add('/' + '/'.join(parts[:i+1]))
+
+    for depth in sorted(prefixes_by_depth.keys()):
+        calls = []
+        for prefix in sorted(prefixes_by_depth[depth]):
+            info = _parse_data_path(prefix)
+            parent_path = info['parent_path']
+            name = info['iname']
+
+            if parent_path in failed:
+                failed[prefix] = failed[parent_path]
+                continue
+
+            parent_dir = resolved[parent_path]['inode']
+            child_dirent = parent_dir['idata'].get(name, None)
+            if child_dirent is None:
+                failed[prefix] = {'error': 'No such file or directory', 'errno': errno.ENOENT}
+                continue
+
+            if child_dirent['type'] != MUTABLE_DATUM_DIR_TYPE:
+                failed[prefix] = {'error': 'Not a directory', 'errno': errno.ENOTDIR}
+                continue
+
+            def _fetch(child_uuid=child_dirent['uuid']):
+                return _get_inode(datastore_id, child_uuid, MUTABLE_DATUM_DIR_TYPE, data_pubkey, drivers, device_ids, config_path=config_path, proxy=proxy, cache=DIR_CACHE)
+
+            calls.append((prefix, _fetch))
+
+        results = _datastore_run_parallel(calls)
+        for prefix, res in results.items():
+            if 'error' in res:
+                log.error("Failed to get directory {}: {}".format(prefix, res['error']))
+                failed[prefix] = {'error': res['error'], 'errno': errno.EIO}
+                continue
+
+            info = _parse_data_path(prefix)
+            resolved[prefix] = {
+                'uuid': res['inode']['uuid'],
+                'name': info['iname'],
+                'parent': info['parent_path'],
+                'inode': res['inode'],
+            }
+
+    errors = {}
+    for dir_path in dir_paths:
+        if dir_path in failed:
+            errors[dir_path] = failed[dir_path]
+
+    return {'status': True, 'dirs': resolved, 'errors': errors}
+
+
 def _mutable_data_make_inode( inode_type, owner_address, inode_uuid, data_hash=None ):
     """
     Set up the basic properties of an inode.
@@ -2725,6 +3285,255 @@ def datastore_rmtree(datastore, data_path, data_privkey_hex, config_path=CONFIG_
     return {'status': True}
 
 
+def datastore_getfiles(datastore, data_paths, config_path=CONFIG_PATH, proxy=None ):
+    """
+    Get several files at once.  Directories along the paths are
+    resolved only once, and the files are fetched in parallel.
+    Return {'status': True, 'files': {path: inode and data}, 'errors': {path: {'error': ..., 'errno': ...}}} on success
+    Return {'error': ..., 'errno': ...} if the datastore cannot be read at all
+    """
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    datastore_id = datastore_get_id(datastore['pubkey'])
+    drivers = datastore['drivers']
+    device_ids = datastore['device_ids']
+    data_pubkey = str(datastore['pubkey'])
+
+    data_paths = [_parse_data_path(p)['data_path'] for p in data_paths]
+
+    log.debug("getfiles {}:{}".format(datastore_id, ','.join(data_paths)))
+
+    path_infos = dict([(p, _parse_data_path(p)) for p in data_paths])
+    res = _resolve_paths(datastore, [info['parent_path'] for info in path_infos.values()], data_pubkey, config_path=config_path, proxy=proxy)
+    if 'error' in res:
+        return res
+
+    dirs = res['dirs']
+    errors = {}
+    calls = []
+
+    for data_path, info in path_infos.items():
+        parent_path = info['parent_path']
+        if parent_path in res['errors']:
+            errors[data_path] = res['errors'][parent_path]
+            continue
+
+        child_dirent = dirs[parent_path]['inode']['idata'].get(info['iname'], None)
+        if child_dirent is None:
+            errors[data_path] = {'error': 'No such file or directory', 'errno': errno.ENOENT}
+            continue
+
+        if child_dirent['type'] != MUTABLE_DATUM_FILE_TYPE:
+            errors[data_path] = {'error': 'Not a file', 'errno': errno.EISDIR}
+            continue
+
+        def _fetch(child_uuid=child_dirent['uuid']):
+            return _get_inode(datastore_id, child_uuid, MUTABLE_DATUM_FILE_TYPE, data_pubkey, drivers, device_ids, config_path=config_path, proxy=proxy)
+
+        calls.append((data_path, _fetch))
+
+    files = {}
+    results = _datastore_run_parallel(calls)
+    for data_path, res in results.items():
+        if 'error' in res:
+            log.error("Failed to get file {}: {}".format(data_path, res['error']))
+            errors[data_path] = {'error': res['error'], 'errno': errno.EIO}
+            continue
+
+        files[data_path] = res['inode']
+
+    return {'status': True, 'files': files, 'errors': errors}
+
+
+def datastore_putfiles(datastore, files, data_privkey_hex, create=False, config_path=CONFIG_PATH, proxy=None ):
+    """
+    Store several files at once.  @files maps each path to its data.
+    Parent directories must exist; they are resolved only once, the files are
+    uploaded in parallel, and each affected directory is written only once.
+    Existing files are replaced, unless @create is True.
+    Return {'status': True, 'errors': {path: {'error': ..., 'errno': ...}}} on success
+    Return {'error': ..., 'errno': ...} if the datastore cannot be read at all
+    """
+
+    global DIR_CACHE
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    if DIR_CACHE is None:
+        DIR_CACHE = InodeCache()
+
+    datastore_id = datastore_get_id(datastore['pubkey'])
+    drivers = datastore['drivers']
+    device_ids = datastore['device_ids']
+
+    data_pubkey = get_pubkey_hex(str(data_privkey_hex))
+    data_address = keylib.public_key_to_address(data_pubkey)
+
+    path_infos = {}
+    file_data = {}
+    for data_path, data in files.items():
+        info = _parse_data_path(data_path)
+        path_infos[info['data_path']] = info
+        file_data[info['data_path']] = data
+
+    log.debug("putfiles {}:{}".format(datastore_id, ','.join(path_infos.keys())))
+
+    res = _resolve_paths(datastore, [path_info['parent_path'] for path_info in path_infos.values()], data_pubkey, config_path=config_path, proxy=proxy)
+    if 'error' in res:
+        return res
+
+    dirs = res['dirs']
+    errors = {}
+    new_dirents = {}     # maps data path to (child uuid, old child uuid)
+    calls = []
+
+    for data_path, info in path_infos.items():
+        parent_path = info['parent_path']
+        if parent_path in res['errors']:
+            errors[data_path] = res['errors'][parent_path]
+            continue
+
+        old_dirent = dirs[parent_path]['inode']['idata'].get(info['iname'], None)
+        if old_dirent is not None:
+            if create:
+                log.error('Already exists: {}'.format(data_path))
+                errors[data_path] = {'error': 'Already exists', 'errno': errno.EEXIST}
+                continue
+
+            if old_dirent['type'] != MUTABLE_DATUM_FILE_TYPE:
+                log.error('Is a directory: {}'.format(data_path))
+                errors[data_path] = {'error': 'Is a directory', 'errno': errno.EISDIR}
+                continue
+
+        # make a file!
+        child_uuid = str(uuid.uuid4())
+        child_file_inode = _mutable_data_make_file( data_address, child_uuid, file_data[data_path] )
+        new_dirents[data_path] = (child_uuid, old_dirent['uuid'] if old_dirent is not None else None)
+
+        def _put(child_file_inode=child_file_inode):
+            # replicate the new child (but don't cache files)
+            return _put_inode(datastore_id, child_file_inode, str(data_privkey_hex), drivers, device_ids, config_path=config_path, proxy=proxy, create=True)
+
+        calls.append((data_path, _put))
+
+    # link each stored file into its parent
+    parents = {}
+    results = _datastore_run_parallel(calls)
+    for data_path, res in results.items():
+        if 'error' in res:
+            log.error("Failed to replicate file {}: {}".format(data_path, res['error']))
+            errors[data_path] = {'error': 'Failed to store file', 'errno': errno.EIO}
+            continue
+
+        info = path_infos[data_path]
+        child_uuid, old_child_uuid = new_dirents[data_path]
+        parent_dir_inode = dirs[info['parent_path']]['inode']
+
+        if old_child_uuid is not None:
+            parent_dir_inode = _mutable_data_dir_unlink( parent_dir_inode, info['iname'] )
+
+        child_file_links = _mutable_data_make_links( datastore_id, child_uuid, driver_names=drivers )
+        parent_dir_inode, child_dirent = _mutable_data_dir_link( parent_dir_inode, MUTABLE_DATUM_FILE_TYPE, info['iname'], child_uuid, child_file_links )
+        parents.setdefault(info['parent_path'], []).append(data_path)
+
+    # replicate each new parent once
+    calls = []
+    for parent_path in parents.keys():
+        def _put(parent_dir_inode=dirs[parent_path]['inode']):
+            return _put_inode(datastore_id, parent_dir_inode, str(data_privkey_hex), drivers, device_ids, config_path=config_path, proxy=proxy, cache=DIR_CACHE )
+
+        calls.append((parent_path, _put))
+
+    replaced = []
+    results = _datastore_run_parallel(calls)
+    for parent_path, res in results.items():
+        if 'error' in res:
+            log.error("Failed to update directory {}: {}".format(parent_path, res['error']))
+            for data_path in parents[parent_path]:
+                errors[data_path] = {'error': 'Failed to update directory', 'errno': errno.EIO}
+
+            continue
+
+        for data_path in parents[parent_path]:
+            old_child_uuid = new_dirents[data_path][1]
+            if old_child_uuid is not None:
+                replaced.append((data_path, old_child_uuid))
+
+    # clean up replaced files
+    calls = []
+    for data_path, old_child_uuid in replaced:
+        def _delete(old_child_uuid=old_child_uuid):
+            return _delete_inode(datastore_id, old_child_uuid, str(data_privkey_hex), drivers, device_ids, config_path=config_path, proxy=proxy )
+
+        calls.append((data_path, _delete))
+
+    results = _datastore_run_parallel(calls)
+    for data_path, res in results.items():
+        if 'error' in res:
+            log.warn("Failed to delete replaced file {}: {}".format(data_path, res['error']))
+
+    return {'status': True, 'errors': errors}
+
+
+def datastore_listdir_recursive(datastore, data_path, config_path=CONFIG_PATH, proxy=None ):
+    """
+    List a directory and all of its subdirectories.
+    Subdirectories at the same depth are fetched in parallel.
+    Return {'status': True, 'dir': inode and data, 'dirs': {path: inode and data}} on success
+    Return {'error': ..., 'errno': ...} on error
+    """
+
+    global DIR_CACHE
+
+    if proxy is None:
+        proxy = get_default_proxy(config_path)
+
+    if DIR_CACHE is None:
+        DIR_CACHE = InodeCache()
+
+    res = datastore_listdir(datastore, data_path, config_path=config_path, proxy=proxy)
+    if 'error' in res:
+        return res
+
+    datastore_id = datastore_get_id(datastore['pubkey'])
+    drivers = datastore['drivers']
+    device_ids = datastore['device_ids']
+    data_pubkey = str(datastore['pubkey'])
+
+    data_path = _parse_data_path(data_path)['data_path']
+    dirs = {data_path: res['dir']}
+    frontier = [data_path]
+
+    log.debug("listdir -R {}:{}".format(datastore_id, data_path))
+
+    while len(frontier) > 0:
+        calls = []
+        for dir_path in frontier:
+            for name, dirent in dirs[dir_path]['idata'].items():
+                if dirent['type'] != MUTABLE_DATUM_DIR_TYPE:
+                    continue
+
+                def _fetch(child_uuid=dirent['uuid']):
+                    return _get_inode(datastore_id, child_uuid, MUTABLE_DATUM_DIR_TYPE, data_pubkey, drivers, device_ids, config_path=config_path, proxy=proxy, cache=DIR_CACHE)
+
+                calls.append((posixpath.join(dir_path, name), _fetch))
+
+        frontier = []
+        results = _datastore_run_parallel(calls)
+        for child_path, res in results.items():
+            if 'error' in res:
+                log.error("Failed to list {}: {}".format(child_path, res['error']))
+                return {'error': res['error'], 'errno': errno.EIO}
+
+            dirs[child_path] = res['inode']
+            frontier.append(child_path)
+
+    return {'status': True, 'dir': dirs[data_path], 'dirs': dirs}
+
+
 def get_nonlocal_storage_drivers(config_path, key='storage_drivers'):
     """
     Get the list of non-local storage drivers.
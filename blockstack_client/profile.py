@@ -35,10 +35,11 @@ from blockstack_client import storage
 from blockstack_client import user as user_db
 
 from .config import get_logger, get_config
-from .constants import USER_ZONEFILE_TTL, CONFIG_PATH, BLOCKSTACK_TEST, BLOCKSTACK_DEBUG
+from .constants import USER_ZONEFILE_TTL, CONFIG_PATH, BLOCKSTACK_TEST, BLOCKSTACK_DEBUG, PROFILE_FETCH_WORKERS, ZONEFILE_BATCH_SIZE
 
-from .zonefile import load_data_pubkey_for_new_zonefile, get_name_zonefile, make_empty_zonefile
+from .zonefile import load_data_pubkey_for_new_zonefile, get_name_zonefile, make_empty_zonefile, load_name_zonefile, decode_name_zonefile
 from .keys import get_data_privkey_info, get_pubkey_hex 
+from .utils import run_parallel
 
 log = get_logger()
 
@@ -148,6 +149,8 @@ def put_profile(name, new_profile, blockchain_id=None, user_data_privkey=None, u
     )
 
     if rc:
+        # don't remember any past failures to load it
+        storage.NEGATIVE_RESULT_CACHE.evict(name)
         ret['status'] = True
     else:
         ret['error'] = 'Failed to update profile'
@@ -227,6 +230,8 @@ def get_profile(name, zonefile_storage_drivers=None, profile_storage_drivers=Non
         if include_raw_zonefile:
             raw_zonefile = user_zonefile.pop('raw_zonefile')
 
+        # don't look up the name record again
+        name_record = user_zonefile['name_record']
         user_zonefile = user_zonefile['zonefile']
 
     # is this really a legacy profile?
@@ -279,10 +284,19 @@ def get_profile(name, zonefile_storage_drivers=None, profile_storage_drivers=Non
         if use_zonefile_urls and user_zonefile is not None:
             urls = user_db.user_zonefile_urls(user_zonefile)
 
+        # did we recently fail to load this profile (from this zonefile)?
+        value_hash = name_record.get('value_hash', None)
+        error = storage.NEGATIVE_RESULT_CACHE.get(name, value_hash, 'profile') if value_hash is not None else None
+        if error is not None:
+            log.debug('Profile for "{}" recently failed to load'.format(name))
+            return None, error
+
+        errors = []
         user_profile = storage.get_mutable_data(
             name, user_data_pubkey,
             data_address=data_address, owner_address=owner_address,
             urls=urls, drivers=profile_storage_drivers, decode=decode_profile,
+            errors=errors
         )
 
         if user_profile is None or json_is_error(user_profile):
@@ -291,7 +305,12 @@ def get_profile(name, zonefile_storage_drivers=None, profile_storage_drivers=Non
             else:
                 log.debug('WARN: failed to load profile for {}: {}'.format(name, user_profile['error']))
 
-            return None, {'error': 'Failed to load user profile'}
+            error = {'error': 'Failed to load user profile'}
+            if len(errors) == 0 and value_hash is not None:
+                # no driver has it for this zonefile
+                storage.NEGATIVE_RESULT_CACHE.put(name, value_hash, 'profile', error)
+
+            return None, error
 
     # finally, if the caller asked for the name record, and we didn't get a chance to look it up,
     # then go get it.
@@ -312,3 +331,151 @@ def get_profile(name, zonefile_storage_drivers=None, profile_storage_drivers=Non
     return user_profile, user_zonefile
 
 
+def get_profiles(names, zonefile_storage_drivers=None, profile_storage_drivers=None, proxy=None,
+                 include_raw_zonefile=False, use_zonefile_urls=True, use_legacy=False,
+                 use_legacy_zonefile=True, decode_profile=True, num_workers=PROFILE_FETCH_WORKERS):
+    """
+    Given a list of names, look up all of their profiles at once.
+    This is the batched version of get_profile():
+    * the names' blockchain records are queried in parallel, and each is queried only once
+    * the zonefiles are fetched from the Atlas node in batches, and only the ones it
+    does not have are fetched from the storage drivers
+    * the profiles are fetched and verified in parallel.
+
+    Returns {name: {'status': True, 'profile': ..., 'zonefile': ..., 'name_record': ..., 'timings': {...}}} on success.
+    'raw_zonefile' will be set if include_raw_zonefile is True.
+    Each name that could not be resolved maps to {'error': ..., 'timings': {...}} instead.
+    'timings' has the seconds spent getting the name record, the zonefile, and the profile.
+    """
+
+    proxy = get_default_proxy() if proxy is None else proxy
+    conf = proxy.conf
+
+    names = list(set(names))
+    ret = dict([(name, {'timings': {}}) for name in names])
+
+    def _fail(name, msg):
+        ret[name]['error'] = msg
+
+    def _lookup_error(name):
+        return {'error': 'Failed to look up {}'.format(name)}
+
+    # stage 1: name records
+    durations = {}
+    res = run_parallel([(name, lambda name=name: get_name_blockchain_record(name, proxy=proxy)) for name in names], num_workers, error=_lookup_error, timings=durations)
+
+    name_records = {}
+    for name in names:
+        name_record = res[name]
+        ret[name]['timings']['name_record'] = durations[name]
+
+        if name_record is None or 'error' in name_record:
+            log.error('Failed to look up name record for "{}"'.format(name))
+            _fail(name, 'Failed to look up name record')
+            continue
+
+        if name_record.get('value_hash', None) in [None, 'null', '']:
+            log.error('Failed to load zone file for "{}": no value hash'.format(name))
+            _fail(name, 'No zone file hash for name')
+            continue
+
+        name_records[name] = name_record
+
+    # stage 2: zonefiles.  Get as many as we can from the Atlas node, in batches.
+    hostport = '{}:{}'.format(conf['server'], conf['port'])
+    zonefile_hashes = list(set([str(name_records[name]['value_hash']) for name in name_records.keys()]))
+    zonefile_txts = {}
+
+    t1 = time.time()
+    for i in xrange(0, len(zonefile_hashes), ZONEFILE_BATCH_SIZE):
+        res = get_zonefiles(hostport, zonefile_hashes[i:i+ZONEFILE_BATCH_SIZE], proxy=proxy)
+        if 'error' in res:
+            log.debug('Failed to get zonefiles from {}: {}'.format(hostport, res['error']))
+            continue
+
+        zonefile_txts.update(res['zonefiles'])
+
+    batch_duration = time.time() - t1
+
+    # fall back to the storage drivers for the ones the Atlas node did not have,
+    # unless we recently failed to load them
+    missing = []
+    for name in name_records.keys():
+        if str(name_records[name]['value_hash']) in zonefile_txts:
+            continue
+
+        error = storage.NEGATIVE_RESULT_CACHE.get(name, name_records[name]['value_hash'], 'zonefile')
+        if error is not None:
+            _fail(name, error['error'])
+            continue
+
+        missing.append(name)
+
+    zonefile_errors = dict([(name, []) for name in missing])
+    durations = {}
+    res = run_parallel([(name, lambda name=name: load_name_zonefile(
+                            name, name_records[name]['value_hash'], storage_drivers=zonefile_storage_drivers,
+                            raw_zonefile=True, allow_legacy=True, proxy=proxy, errors=zonefile_errors[name])) for name in missing], num_workers, error=_lookup_error, timings=durations)
+
+    zonefiles = {}
+    raw_zonefiles = {}
+    for name in name_records.keys():
+        ret[name]['timings']['zonefile'] = batch_duration
+        if 'error' in ret[name]:
+            continue
+
+        if name in res:
+            zonefile_txt = res[name]
+            ret[name]['timings']['zonefile'] += durations[name]
+            if zonefile_txt is None or isinstance(zonefile_txt, dict):
+                _fail(name, 'Failed to load raw name zonefile')
+                if zonefile_txt is None and len(zonefile_errors[name]) == 0:
+                    # no one has it
+                    storage.NEGATIVE_RESULT_CACHE.put(name, name_records[name]['value_hash'], 'zonefile', {'error': 'Failed to load raw name zonefile'})
+
+                continue
+
+        else:
+            zonefile_txt = zonefile_txts[str(name_records[name]['value_hash'])]
+
+        user_zonefile = decode_name_zonefile(name, zonefile_txt, allow_legacy=True)
+        if user_zonefile is None or 'error' in user_zonefile:
+            _fail(name, 'Failed to decode name zonefile')
+            continue
+
+        zonefiles[name] = user_zonefile
+        raw_zonefiles[name] = zonefile_txt
+
+    # stage 3: profiles
+    durations = {}
+    res = run_parallel([(name, lambda name=name: get_profile(
+                            name, profile_storage_drivers=profile_storage_drivers, proxy=proxy,
+                            user_zonefile=zonefiles[name], name_record=name_records[name],
+                            use_zonefile_urls=use_zonefile_urls, use_legacy=use_legacy,
+                            use_legacy_zonefile=use_legacy_zonefile, decode_profile=decode_profile)) for name in zonefiles.keys()], num_workers, error=_lookup_error, timings=durations)
+
+    for name in zonefiles.keys():
+        profile_res = res[name]
+        ret[name]['timings']['profile'] = durations[name]
+
+        if isinstance(profile_res, dict):
+            # get_profile() raised
+            _fail(name, profile_res['error'])
+            continue
+
+        user_profile, user_zonefile = profile_res
+        if user_profile is None:
+            _fail(name, user_zonefile.get('error', 'Failed to load user profile'))
+            continue
+
+        ret[name].update({
+            'status': True,
+            'profile': user_profile,
+            'zonefile': user_zonefile,
+            'name_record': name_records[name],
+        })
+
+        if include_raw_zonefile:
+            ret[name]['raw_zonefile'] = raw_zonefiles[name]
+
+    return ret
@@ -474,6 +474,56 @@ def get_name_cost(name, proxy=None):
     return resp
 
 
+def get_names_cost(names, proxy=None):
+    """
+    names_cost
+    Get the costs of up to 100 names in one round trip.
+    Returns {'status': True, 'satoshis': {name: satoshis}} on success.
+    Names in unknown namespaces are omitted.
+    Returns {'error': ...} on error
+    """
+
+    schema = {
+        'type': 'object',
+        'properties': {
+            'status': {
+                'type': 'boolean',
+            },
+            'satoshis': {
+                'type': 'object',
+                'patternProperties': {
+                    OP_NAME_PATTERN: {
+                        'type': 'integer',
+                    },
+                },
+            },
+        },
+        'required': [
+            'status',
+            'satoshis'
+        ]
+    }
+
+    proxy = get_default_proxy() if proxy is None else proxy
+
+    resp = {}
+    try:
+        resp = proxy.get_names_cost(names)
+        resp = json_validate( schema, resp )
+        if json_is_error(resp):
+            return resp
+
+    except ValidationError as e:
+        resp = json_traceback(resp.get('error'))
+
+    except Exception as ee:
+        log.exception(ee)
+        resp = {'error': 'Failed to contact Blockstack node.  Try again with `--debug`.'}
+        return resp
+
+    return resp
+
+
 def get_namespace_cost(namespace_id, proxy=None):
     """
     namespace_cost
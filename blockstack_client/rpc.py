@@ -46,6 +46,8 @@ import base64
 import jsonschema
 import jsontokens
 import subprocess
+import threading
+import Queue
 from jsonschema import ValidationError
 from schemas import *
 
@@ -61,7 +63,7 @@ import backend
 import proxy
 from proxy import json_is_error, json_is_exception
 
-from .constants import BLOCKSTACK_DEBUG, RPC_MAX_ZONEFILE_LEN, CONFIG_PATH, WALLET_FILENAME, TX_MIN_CONFIRMATIONS
+from .constants import BLOCKSTACK_DEBUG, RPC_MAX_ZONEFILE_LEN, CONFIG_PATH, WALLET_FILENAME, TX_MIN_CONFIRMATIONS, DEFAULT_API_WORKERS
 from .method_parser import parse_methods
 import app
 import assets
@@ -79,6 +81,9 @@ running = False
 RPC_INTERNAL_METHODS = None
 RPC_CLI_METHOD_INFO = None
 
+# guards building the compiled route table
+ROUTE_TABLE_LOCK = threading.Lock()
+
 
 class RPCInternalProxy(object):
     pass
@@ -323,11 +328,11 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         return request_str
 
 
-    def _read_json(self, schema=None):
+    def _read_json(self, schema=None, maxlen=JSONRPC_MAX_SIZE):
         """
         Read a JSON payload from the requester
         Return the parsed payload on success
-        Return None on error
+        Return None on error, or if maxlen is not None and the payload is too big
         """
         # JSON post?
         request_type = self.headers.get('content-type', None)
@@ -337,7 +342,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             log.error("Invalid request of type {} from {}".format(request_type, client_address_str))
             return None
 
-        request_str = self._read_payload(maxlen=self.JSONRPC_MAX_SIZE)
+        request_str = self._read_payload(maxlen=maxlen)
         if request_str is None:
             log.error("Failed to read request")
             return None
@@ -456,17 +461,14 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
 
     def _route_match( self, method_name, path_info, route_table ):
         """
-        Look up the method to call
+        Look up the method to call, given the compiled route table.
         Return the route info and its arguments on success:
         Return None on error
         """
         path = path_info['path']
 
-        for route_path, route_info in route_table.items():
-            if method_name not in route_info['routes'].keys():
-                continue
-
-            grps = re.match(route_path, path)
+        for route_regex, route_info in route_table.get(method_name, []):
+            grps = route_regex.match(path)
             if grps is None:
                 continue
 
@@ -1141,6 +1143,28 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         return
 
 
+    def GET_users( self, ses, path_info ):
+        """
+        Get many user profiles at once.
+        Takes ?names=name1,name2,...
+        Reply {name: {'profile': ..., 'zonefile': ..., 'timings': ...} or {'error': ...}} on success
+        Reply 401 if no names are given
+        Reply 500 on failure to look up the names
+        """
+        names = path_info['qs_values'].get('names', None)
+        if names is None or len(names) == 0:
+            return self._reply_json({'error': 'No names given'}, status_code=401)
+
+        internal = self.server.get_internal_proxy()
+        resp = internal.cli_lookup_profiles( names )
+        if json_is_error(resp):
+            self._reply_json({'error': resp['error']}, status_code=500)
+            return
+
+        self._reply_json(resp)
+        return
+
+
     def GET_user_profile( self, ses, path_info, user_id ):
         """
         Get a user profile.
@@ -1218,7 +1242,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             app_user_id = app_user_id_res['datastore_id']
 
         if app_user_id != ses['app_user_id']:
-            return self._reply_json({'error': 'Invalid datastore ID'}, status=403)
+            return self._reply_json({'error': 'Invalid datastore ID'}, status_code=403)
 
         internal = self.server.get_internal_proxy()
         res = internal.cli_get_datastore(app_user_id, config_path=self.server.config_path)
@@ -1251,7 +1275,9 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         internal = self.server.get_internal_proxy()
 
         # does it exist?
-        res = internal.cli_create_datastore(app_domain, drivers, wallet_keys=self.server.wallet_keys, config_path=self.server.config_path)
+        with self.server.get_datastore_lock(ses['app_user_id']):
+            res = internal.cli_create_datastore(app_domain, drivers, wallet_keys=self.server.wallet_keys, config_path=self.server.config_path)
+
         if json_is_error(res):
             if res.has_key('errno'):
                 # propagate an error code, if possible
@@ -1293,7 +1319,9 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         app_domain = ses['app_domain']
        
         internal = self.server.get_internal_proxy()
-        res = internal.cli_delete_datastore(app_domain, force)
+        with self.server.get_datastore_lock(ses['app_user_id']):
+            res = internal.cli_delete_datastore(app_domain, force)
+
         if json_is_error(res):
             if res.has_key('errno'):
                 # propagate an error code, if possible
@@ -1321,7 +1349,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         # TODO see if we can load cached app user private key
         """
         if app_user_id != ses['app_user_id']:
-            return self._reply_json({'error': 'Invalid user'}, status=403)
+            return self._reply_json({'error': 'Invalid user'}, status_code=403)
 
         if inode_type not in ['files', 'directories', 'inodes']:
             self._reply_json({'error': 'Invalid request'}, status_code=401)
@@ -1339,7 +1367,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         if inode_type == 'files':
             res = internal.cli_datastore_getfile(app_user_id, path, config_path=self.server.config_path)
         elif inode_type == 'directories':
-            res = internal.cli_datastore_listdir(app_user_id, path, config_path=self.server.config_path)
+            recursive = qs.get('recursive', '0')
+            res = internal.cli_datastore_listdir(app_user_id, path, recursive, config_path=self.server.config_path)
         else:
             res = internal.cli_datastore_stat(app_user_id, path, config_path=self.server.config_path)
 
@@ -1358,7 +1387,11 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             self.wfile.write(res['file']['idata'])
 
         elif inode_type == 'directories':
-            self._reply_json(res['dir']['idata'])
+            if res.has_key('dirs'):
+                # recursive listing
+                self._reply_json(dict([(dir_path, dir_inode['idata']) for (dir_path, dir_inode) in res['dirs'].items()]))
+            else:
+                self._reply_json(res['dir']['idata'])
 
         else:
             self._reply_json(res['inode'])
@@ -1366,6 +1399,119 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         return
 
 
+    def POST_store_getfiles( self, ses, path_info, app_user_id ):
+        """
+        Get several files from a store at once.
+        Only works on the session's user ID.
+        The payload is {'paths': [path, ...]}
+        Reply 200 on success, with {'files': {path: base64-encoded data}, 'errors': {path: error message}}
+        Reply 401 on invalid payload
+        Reply 403 on invalid user ID
+        Reply 500 if we fail to load the datastore record
+        """
+        if app_user_id != ses['app_user_id']:
+            return self._reply_json({'error': 'Invalid user'}, status_code=403)
+
+        request_schema = {
+            'type': 'object',
+            'properties': {
+                'paths': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'string',
+                    },
+                },
+            },
+            'required': [
+                'paths'
+            ],
+            'additionalProperties': False,
+        }
+
+        request = self._read_json(schema=request_schema)
+        if request is None:
+            self._reply_json({'error': 'Invalid request'}, status_code=401)
+            return
+
+        internal = self.server.get_internal_proxy()
+        res = internal.cli_datastore_getfiles(app_user_id, json.dumps(request['paths']), config_path=self.server.config_path)
+        if json_is_error(res):
+            if res.has_key('errno'):
+                # propagate an error code, if possible
+                if res['errno'] in self.http_errors:
+                    return self._send_headers(status_code=self.http_errors[res['errno']], content_type='text/plain')
+
+            self._reply_json({'error': 'Failed to read files: {}'.format(res['error'])}, status_code=500)
+            return
+
+        files = dict([(path, base64.b64encode(file_inode['idata'])) for (path, file_inode) in res['files'].items()])
+        errors = dict([(path, err['error']) for (path, err) in res['errors'].items()])
+
+        self._reply_json({'files': files, 'errors': errors})
+        return
+
+
+    def POST_store_putfiles( self, ses, path_info, app_user_id ):
+        """
+        Create or replace several files in a store at once.
+        Only works on the session's user ID.
+        The payload is {'files': {path: base64-encoded data}}.
+        If the query string has create=1, then only create new files.
+        Reply 200 on success, with {'status': True, 'errors': {path: error message}}
+        Reply 401 on invalid payload
+        Reply 403 on invalid user ID
+        Reply 503 if we fail to load the datastore
+        """
+        if app_user_id != ses['app_user_id']:
+            return self._reply_json({'error': 'Invalid user'}, status_code=403)
+
+        request_schema = {
+            'type': 'object',
+            'properties': {
+                'files': {
+                    'type': 'object',
+                    'patternProperties': {
+                        '.+': {
+                            'type': 'string',
+                        },
+                    },
+                },
+            },
+            'required': [
+                'files',
+            ],
+            'additionalProperties': False,
+        }
+
+        # file data is not limited to JSONRPC_MAX_SIZE
+        request = self._read_json(schema=request_schema, maxlen=None)
+        if request is None:
+            self._reply_json({'error': 'Invalid request'}, status_code=401)
+            return
+
+        qs = path_info['qs_values']
+        do_create = qs.get('create', '0')
+
+        internal = self.server.get_internal_proxy()
+        with self.server.get_datastore_lock(app_user_id):
+            res = internal.cli_datastore_putfiles(ses['app_domain'], json.dumps(request['files']), do_create, force_data=True, wallet_keys=self.server.wallet_keys)
+
+        if 'error' in res:
+            if res.has_key('errno'):
+                # propagate an error code, if possible
+                if res['errno'] in self.http_errors:
+                    return self._send_headers(status_code=self.http_errors[res['errno']], content_type='text/plain')
+
+            log.error("Failed to store files: {}".format(res['error']))
+            self._reply_json({'error': 'Failed to store files'}, status_code=503)
+            return
+
+        errors = dict([(path, err['error']) for (path, err) in res['errors'].items()])
+
+        self._reply_json({'status': True, 'errors': errors})
+        return
+
+
     def POST_store_item( self, ses, path_info, app_user_id, inode_type ):
         """
         Create a store item.
@@ -1402,7 +1548,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         """
         
         if app_user_id != ses['app_user_id']:
-            return self._reply_json({'error': 'Invalid user'}, status=403)
+            return self._reply_json({'error': 'Invalid user'}, status_code=403)
 
         if inode_type not in ['files', 'directories']:
             log.debug("Invalid request: unrecognized inode type")
@@ -1431,10 +1577,12 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             else:
                 do_create = "False"
 
-            res = internal.cli_datastore_putfile(ses['app_domain'], path, data, do_create, force_data=True, wallet_keys=self.server.wallet_keys)
+            with self.server.get_datastore_lock(app_user_id):
+                res = internal.cli_datastore_putfile(ses['app_domain'], path, data, do_create, force_data=True, wallet_keys=self.server.wallet_keys)
 
         elif create:
-            res = internal.cli_datastore_mkdir(ses['app_domain'], path, wallet_keys=self.server.wallet_keys)
+            with self.server.get_datastore_lock(app_user_id):
+                res = internal.cli_datastore_mkdir(ses['app_domain'], path, wallet_keys=self.server.wallet_keys)
 
         else:
             log.error("Invalid request: cannot update directory {}".format(path))
@@ -1470,7 +1618,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         # TODO see if we can load cached app user private key
         """
         if app_user_id != ses['app_user_id']:
-            return self._reply_json({'error': 'Invalid user'}, status=403)
+            return self._reply_json({'error': 'Invalid user'}, status_code=403)
 
         if inode_type not in ['files', 'directories']:
             self._reply_json({'error': 'Invalid request'}, status_code=401)
@@ -1485,11 +1633,12 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
 
         res = None
 
-        if inode_type == 'files':
-            res = internal.cli_datastore_deletefile(ses['app_domain'], path, wallet_keys=self.server.wallet_keys)
+        with self.server.get_datastore_lock(app_user_id):
+            if inode_type == 'files':
+                res = internal.cli_datastore_deletefile(ses['app_domain'], path, wallet_keys=self.server.wallet_keys)
 
-        else:
-            res = internal.cli_datastore_rmdir(ses['app_domain'], path, wallet_keys=self.server.wallet_keys)
+            else:
+                res = internal.cli_datastore_rmdir(ses['app_domain'], path, wallet_keys=self.server.wallet_keys)
 
         if 'error' in res:
             log.error("Failed to remove {} {}: {}".format(inode_type, path, res['error']))
@@ -2164,9 +2313,12 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         return
 
 
-    def _dispatch(self, method_name):
+    @classmethod
+    def _make_route_table(cls):
         """
-        Top-level dispatch method
+        Make the table of routes.
+        Route handlers are unbound methods; call them with the request handler.
+        Return {path regex: {'routes': {method name: handler}, 'whitelist': {method name: whitelist info}}}
         """
 
         URLENCODING_CLASS = r'[a-zA-Z0-9\-_.~%]+'
@@ -2177,7 +2329,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         routes = {
             r'^/v1/ping$': {
                 'routes': {
-                    'GET': self.GET_ping,
+                    'GET': cls.GET_ping,
                 },
                 'whitelist': {
                     'GET': {
@@ -2192,7 +2344,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/auth$': {
                 'routes': {
-                    'GET': self.GET_auth,
+                    'GET': cls.GET_auth,
                 },
                 'whitelist': {
                     'GET': {
@@ -2207,7 +2359,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             # TODO: change to /v1/addresses/{blockchain}/{address}
             r'^/v1/addresses/({})$'.format(BASE58CHECK_CLASS): {
                 'routes': {
-                    'GET': self.GET_names_owned_by_address,
+                    'GET': cls.GET_names_owned_by_address,
                 },
                 'whitelist': {
                     'GET': {
@@ -2221,7 +2373,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/blockchains/({})/operations/([0-9]+)$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_blockchain_ops
+                    'GET': cls.GET_blockchain_ops
                 },
                 'whitelist': {
                     'GET': {
@@ -2235,7 +2387,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/blockchains/({})/names/({})/history$'.format(URLENCODING_CLASS, NAME_CLASS): {
                 'routes': {
-                    'GET': self.GET_blockchain_name_history
+                    'GET': cls.GET_blockchain_name_history
                 },
                 'whitelist': {
                     'GET': {
@@ -2249,7 +2401,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/blockchains/({})/consensus$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_blockchain_consensus,
+                    'GET': cls.GET_blockchain_consensus,
                 },
                 'whitelist': {
                     'GET': {
@@ -2263,7 +2415,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/blockchains/({})/pending$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_blockchain_pending,
+                    'GET': cls.GET_blockchain_pending,
                 },
                 'whitelist': {
                     'GET': {
@@ -2277,8 +2429,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names$': {
                 'routes': {
-                    'GET': self.GET_names,
-                    'POST': self.POST_names,    # accepts: name, address, zonefile.  Returns: HTTP 202 with txid
+                    'GET': cls.GET_names,
+                    'POST': cls.POST_names,    # accepts: name, address, zonefile.  Returns: HTTP 202 with txid
                 },
                 'whitelist': {
                     'GET': {
@@ -2299,8 +2451,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names/({})$'.format(NAME_CLASS): {
                 'routes': {
-                    'GET': self.GET_name_info,
-                    'DELETE': self.DELETE_name,     # revoke
+                    'GET': cls.GET_name_info,
+                    'DELETE': cls.DELETE_name,     # revoke
                 },
                 'whitelist': {
                     'GET': {
@@ -2321,7 +2473,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names/({})/history$'.format(NAME_CLASS): {
                 'routes': {
-                    'GET': self.GET_name_history,
+                    'GET': cls.GET_name_history,
                 },
                 'whitelist': {
                     'GET': {
@@ -2335,7 +2487,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names/({})/owner$'.format(NAME_CLASS): {
                 'routes': {
-                    'PUT': self.PUT_name_transfer,     # accepts: recipient address.  Returns: HTTP 202 with txid
+                    'PUT': cls.PUT_name_transfer,     # accepts: recipient address.  Returns: HTTP 202 with txid
                 },
                 'whitelist': {
                     'PUT': {
@@ -2349,8 +2501,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names/({})/zonefile$'.format(NAME_CLASS): {
                 'routes': {
-                    'GET': self.GET_name_zonefile,
-                    'PUT': self.PUT_name_zonefile,
+                    'GET': cls.GET_name_zonefile,
+                    'PUT': cls.PUT_name_zonefile,
                 },
                 'whitelist': {
                     'GET': {
@@ -2371,7 +2523,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names/({})/zonefile/([0-9a-fA-F]{{40}})$'.format(NAME_CLASS): {
                 'routes': {
-                    'GET': self.GET_name_zonefile_by_hash,     # returns a zonefile
+                    'GET': cls.GET_name_zonefile_by_hash,     # returns a zonefile
                 },
                 'whitelist': {
                     'GET': {
@@ -2385,7 +2537,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/names/({})/zonefile/zonefileHash$'.format(NAME_CLASS): {
                 'routes': {
-                    'PUT': self.PUT_name_zonefile_hash,     # accepts: zonefile hash.  Returns: HTTP 202 with txid
+                    'PUT': cls.PUT_name_zonefile_hash,     # accepts: zonefile hash.  Returns: HTTP 202 with txid
                 },
                 'whitelist': {
                     'PUT': {
@@ -2399,8 +2551,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/namespaces$': {
                 'routes': {
-                    'GET': self.GET_namespaces,
-                    'POST': self.POST_namespaces,       # accepts: namespace-reveal info.  Returns: HTTP 202 with txid (NAMESPACE_PREORDER)
+                    'GET': cls.GET_namespaces,
+                    'POST': cls.POST_namespaces,       # accepts: namespace-reveal info.  Returns: HTTP 202 with txid (NAMESPACE_PREORDER)
                 },
                 'whitelist': {
                     'GET': {
@@ -2421,8 +2573,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/namespaces/({})$'.format(NAMESPACE_CLASS): {
                 'routes': {
-                    'GET': self.GET_namespace_info,
-                    'PUT': self.PUT_namespace_ready,     # accepts: {'launched': True}, Returns: HTTP 202 with txid (NAMESPACE_READY)
+                    'GET': cls.GET_namespace_info,
+                    'PUT': cls.PUT_namespace_ready,     # accepts: {'launched': True}, Returns: HTTP 202 with txid (NAMESPACE_READY)
                 },
                 'whitelist': {
                     'GET': {
@@ -2443,8 +2595,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/namespaces/({})/names$'.format(NAMESPACE_CLASS): {
                 'routes': {
-                    'GET': self.GET_namespace_names,
-                    'POST': self.POST_namespace_name_import,    # accepts name, owner, zonefile; returns HTTP 202 with txid (NAME_IMPORT)
+                    'GET': cls.GET_namespace_names,
+                    'POST': cls.POST_namespace_name_import,    # accepts name, owner, zonefile; returns HTTP 202 with txid (NAME_IMPORT)
                 },
                 'whitelist': {
                     'GET': {
@@ -2465,7 +2617,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/namespaces/({})/names/({})$'.format(NAMESPACE_CLASS, NAME_CLASS): {
                 'routes': {
-                    'PUT': self.PUT_namespace_name_import,       # re-imports a name
+                    'PUT': cls.PUT_namespace_name_import,       # re-imports a name
                 },
                 'whitelist': {
                     'PUT': {
@@ -2479,7 +2631,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/wallet/payment_address$': {
                 'routes': {
-                    'GET': self.GET_wallet_payment_address,
+                    'GET': cls.GET_wallet_payment_address,
                 },
                 'whitelist': {
                     'GET': {
@@ -2493,7 +2645,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/wallet/owner_address$': {
                 'routes': {
-                    'GET': self.GET_wallet_owner_address,
+                    'GET': cls.GET_wallet_owner_address,
                 },
                 'whitelist': {
                     'GET': {
@@ -2507,7 +2659,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/wallet/data_pubkey$': {
                 'routes': {
-                    'GET': self.GET_wallet_data_pubkey,
+                    'GET': cls.GET_wallet_data_pubkey,
                 },
                 'whitelist': {
                     'GET': {
@@ -2521,8 +2673,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/wallet/balance$': {
                 'routes': {
-                    'GET': self.GET_wallet_balance,
-                    'POST': self.POST_wallet_balance,
+                    'GET': cls.GET_wallet_balance,
+                    'POST': cls.POST_wallet_balance,
                 },
                 'whitelist': {
                     'GET': {
@@ -2543,7 +2695,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/wallet/password$': {
                 'routes': {
-                    'PUT': self.PUT_wallet_password,
+                    'PUT': cls.PUT_wallet_password,
                 },
                 'whitelist': {
                     'PUT': {
@@ -2557,8 +2709,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/wallet/keys$': {
                 'routes': {
-                    'GET': self.GET_wallet_keys,
-                    'PUT': self.PUT_wallet_keys,
+                    'GET': cls.GET_wallet_keys,
+                    'PUT': cls.PUT_wallet_keys,
                 },
                 'whitelist': {
                     'GET': {
@@ -2579,7 +2731,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/node/ping$': {
                 'routes': {
-                    'GET': self.GET_ping,
+                    'GET': cls.GET_ping,
                 },
                 'whitelist': {
                     'GET': {
@@ -2593,7 +2745,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/node/registrar/state$': {
                 'routes': {
-                    'GET': self.GET_registrar_state,
+                    'GET': cls.GET_registrar_state,
                 },
                 'whitelist': {
                     'GET': {
@@ -2607,7 +2759,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/node/reboot$': {
                 'routes': {
-                    'POST': self.POST_reboot,
+                    'POST': cls.POST_reboot,
                 },
                 'whitelist': {
                     'POST': {
@@ -2621,7 +2773,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/node/config$': {
                 'routes': {
-                    'GET': self.GET_node_config,
+                    'GET': cls.GET_node_config,
                 },
                 'whitelist': {
                     'GET': {
@@ -2635,8 +2787,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/node/config/({})$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'POST': self.POST_node_config,
-                    'DELETE': self.DELETE_node_config_section,
+                    'POST': cls.POST_node_config,
+                    'DELETE': cls.DELETE_node_config_section,
                 },
                 'whitelist': {
                     'POST': {
@@ -2657,7 +2809,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/node/config/({})/({})$'.format(URLENCODING_CLASS, URLENCODING_CLASS): {
                 'routes': {
-                    'DELETE': self.DELETE_node_config_field,
+                    'DELETE': cls.DELETE_node_config_field,
                 },
                 'whitelist': {
                     'DELETE': {
@@ -2671,7 +2823,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/prices/namespaces/({})$'.format(NAMESPACE_CLASS): {
                 'routes': {
-                    'GET': self.GET_prices_namespace,
+                    'GET': cls.GET_prices_namespace,
                 },
                 'whitelist': {
                     'GET': {
@@ -2686,7 +2838,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             r'^/v1/prices/names/({})$'.format(NAME_CLASS): {
                 'need_data_key': False,
                 'routes': {
-                    'GET': self.GET_prices_name,
+                    'GET': cls.GET_prices_name,
                 },
                 'whitelist': {
                     'GET': {
@@ -2700,9 +2852,17 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/users$': {
                 'routes': {
-                    'POST': self.POST_users,
+                    'GET': cls.GET_users,
+                    'POST': cls.POST_users,
                 },
                 'whitelist': {
+                    'GET': {
+                        'name': 'user_read',
+                        'desc': 'read many user profiles',
+                        'auth_session': True,
+                        'auth_pass': True,
+                        'need_data_key': True,
+                    },
                     'POST': {
                         'name': 'user_admin',
                         'desc': 'create new users',
@@ -2721,9 +2881,9 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/users/({})$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_user_profile,
-                    'PATCH': self.PATCH_user_profile,
-                    'DELETE': self.DELETE_user_profile,
+                    'GET': cls.GET_user_profile,
+                    'PATCH': cls.PATCH_user_profile,
+                    'DELETE': cls.DELETE_user_profile,
                 },
                 'whitelist': {
                     'GET': {
@@ -2751,8 +2911,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/collections$': {
                 'routes': {
-                    'GET': self.GET_collections,
-                    'POST': self.POST_collections,
+                    'GET': cls.GET_collections,
+                    'POST': cls.POST_collections,
                 },
                 'whitelist': {
                     'GET': {
@@ -2773,8 +2933,8 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/collections/({})$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_collection_info,
-                    'POST': self.POST_collection_item,
+                    'GET': cls.GET_collection_info,
+                    'POST': cls.POST_collection_item,
                 },
                 'whitelist': {
                     'GET': {
@@ -2795,7 +2955,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/collections/({})/({})$'.format(URLENCODING_CLASS, URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_collection_item,
+                    'GET': cls.GET_collection_item,
                 },
                 'whitelist': {
                     'GET': {
@@ -2809,9 +2969,9 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/stores$': {
                 'routes': {
-                    'POST': self.POST_store,
-                    'PUT': self.PUT_store,
-                    'DELETE': self.DELETE_store,
+                    'POST': cls.POST_store,
+                    'PUT': cls.PUT_store,
+                    'DELETE': cls.DELETE_store,
                 },
                 'whitelist': {
                     'POST': {
@@ -2839,7 +2999,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/stores/({})$'.format(URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_store,
+                    'GET': cls.GET_store,
                 },
                 'whitelist': {
                     'GET': {
@@ -2853,10 +3013,10 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/stores/({})/(files|directories|inodes)$'.format(URLENCODING_CLASS, URLENCODING_CLASS, URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_store_item,
-                    'POST': self.POST_store_item,
-                    'PUT': self.PUT_store_item,
-                    'DELETE': self.DELETE_store_item,
+                    'GET': cls.GET_store_item,
+                    'POST': cls.POST_store_item,
+                    'PUT': cls.PUT_store_item,
+                    'DELETE': cls.DELETE_store_item,
                 },
                 'whitelist': {
                     'GET': {
@@ -2889,9 +3049,37 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
                     },
                 },
             },
+            r'^/v1/stores/({})/batch/getfiles$'.format(URLENCODING_CLASS): {
+                'routes': {
+                    'POST': cls.POST_store_getfiles,
+                },
+                'whitelist': {
+                    'POST': {
+                        'name': 'store_read',
+                        'desc': 'read several files at once from the app user\'s data store',
+                        'auth_session': True,
+                        'auth_pass': True,
+                        'need_data_key': True,
+                    },
+                },
+            },
+            r'^/v1/stores/({})/batch/putfiles$'.format(URLENCODING_CLASS): {
+                'routes': {
+                    'POST': cls.POST_store_putfiles,
+                },
+                'whitelist': {
+                    'POST': {
+                        'name': 'store_write',
+                        'desc': 'write several files at once to the app user\'s data store',
+                        'auth_session': True,
+                        'auth_pass': True,
+                        'need_data_key': True,
+                    },
+                },
+            },
             r'^/v1/resources/({})/({})$'.format(NAME_CLASS, URLENCODING_CLASS): {
                 'routes': {
-                    'GET': self.GET_app_resource,
+                    'GET': cls.GET_app_resource,
                 },
                 'whitelist': {
                     'GET': {
@@ -2905,7 +3093,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
             r'^/v1/.*$': {
                 'routes': {
-                    'OPTIONS': self.OPTIONS_preflight,
+                    'OPTIONS': cls.OPTIONS_preflight,
                 },
                 'whitelist': {
                     'OPTIONS': {
@@ -2919,6 +3107,39 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
             },
         }
 
+        return routes
+
+
+    @classmethod
+    def get_route_table(cls):
+        """
+        Get the route table, compiled once per process (and per handler class).
+        Return {method name: [(compiled path regex, route info), ...]}
+        """
+        route_table = cls.__dict__.get('_compiled_route_table', None)
+        if route_table is not None:
+            return route_table
+
+        with ROUTE_TABLE_LOCK:
+            route_table = cls.__dict__.get('_compiled_route_table', None)
+            if route_table is None:
+                route_table = {}
+                for route_path, route_info in cls._make_route_table().items():
+                    route_regex = re.compile(route_path)
+                    for method_name in route_info['routes'].keys():
+                        route_table.setdefault(method_name, []).append((route_regex, route_info))
+
+                cls._compiled_route_table = route_table
+
+        return route_table
+
+
+    def _dispatch(self, method_name):
+        """
+        Top-level dispatch method
+        """
+        routes = self.get_route_table()
+
         path_info = self.get_path_and_qs()
         if 'error' in path_info:
             self._send_headers(status_code=401, content_type='text/plain')
@@ -2929,7 +3150,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         route_info = self._route_match( method_name, path_info, routes )
         if route_info is None:
             log.debug("Unmatched route: {} '{}'".format(method_name, path_info['path']))
-            print(json.dumps( routes.keys(), sort_keys=True, indent=4 ))
+            print(json.dumps( sorted(set(route_regex.pattern for route_regex, _ in routes.get(method_name, []))), indent=4 ))
             self._send_headers(status_code=404, content_type='text/plain')
             return
 
@@ -2987,7 +3208,7 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
 
         # good to go!
         try:
-            return route_method( session, path_info, *route_args )
+            return route_method( self, session, path_info, *route_args )
         except Exception as e:
             if BLOCKSTACK_DEBUG:
                 log.exception(e)
@@ -3038,7 +3259,79 @@ class BlockstackAPIEndpointHandler(SimpleHTTPRequestHandler):
         return self._dispatch("PATCH")
 
 
-class BlockstackAPIEndpoint(SocketServer.TCPServer):
+class WorkerPoolMixIn:
+    """
+    Mix-in for a SocketServer.TCPServer that hands each accepted request
+    to a fixed pool of worker threads, so a slow request does not
+    hold up the others.  At most num_workers requests are served at once;
+    the rest wait in the queue.
+
+    Call start_workers() before serving, and stop_workers() when done.
+    """
+
+    num_workers = DEFAULT_API_WORKERS
+
+    def start_workers(self, num_workers=None):
+        """
+        Start the worker threads
+        """
+        if num_workers is not None:
+            self.num_workers = num_workers
+
+        self.request_queue = Queue.Queue()
+        self.workers = []
+
+        for i in xrange(0, self.num_workers):
+            worker = threading.Thread(target=self.worker_main)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+
+    def stop_workers(self):
+        """
+        Stop the worker threads, once they finish their current requests
+        """
+        workers = getattr(self, 'workers', [])
+        for worker in workers:
+            self.request_queue.put(None)
+
+        for worker in workers:
+            worker.join()
+
+        self.workers = []
+
+
+    def worker_main(self):
+        """
+        Serve queued requests until told to stop
+        """
+        while True:
+            item = self.request_queue.get()
+            if item is None:
+                return
+
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+
+    def process_request(self, request, client_address):
+        """
+        Queue the request for a worker.
+        Serve it in this thread if there are no workers.
+        """
+        if len(getattr(self, 'workers', [])) == 0:
+            return SocketServer.TCPServer.process_request(self, request, client_address)
+
+        self.request_queue.put((request, client_address))
+
+
+class BlockstackAPIEndpoint(WorkerPoolMixIn, SocketServer.TCPServer):
     """
     Lightweight API endpoint to Blockstack server:
     exposes all of the client methods via a RESTful interface,
@@ -3103,11 +3396,26 @@ class BlockstackAPIEndpoint(SocketServer.TCPServer):
         return self.app_configs.get("{}:{}".format(name, appname), None)
 
 
+    def get_datastore_lock(self, datastore_id):
+        """
+        Get the lock to hold while modifying a datastore.
+        Requests that modify the same datastore each read, modify, and write
+        back its directory inodes, so they must not run at the same time.
+        """
+        with self.datastore_locks_lock:
+            if not self.datastore_locks.has_key(datastore_id):
+                self.datastore_locks[datastore_id] = threading.Lock()
+
+            return self.datastore_locks[datastore_id]
+
+
     def __init__(self, api_pass, wallet_keys, host='localhost', port=blockstack_constants.DEFAULT_API_PORT,
-                 handler=BlockstackAPIEndpointHandler, config_path=CONFIG_PATH, server=True):
+                 handler=BlockstackAPIEndpointHandler, config_path=CONFIG_PATH, server=True, num_workers=DEFAULT_API_WORKERS):
 
         """
         wallet_keys is only needed if server=True
+        num_workers is the number of requests to serve at once (if server=True).
+        If it is 0, requests are served one at a time in the serving thread.
         """
 
         if server:
@@ -3133,6 +3441,8 @@ class BlockstackAPIEndpoint(SocketServer.TCPServer):
         self.port = port
         self.api_pass = api_pass
         self.app_configs = {}   # cached app config state
+        self.datastore_locks = {}   # maps datastore ID to the lock held while modifying it
+        self.datastore_locks_lock = threading.Lock()
 
         conf = blockstack_config.get_config(path=config_path)
         assert conf
@@ -3148,6 +3458,12 @@ class BlockstackAPIEndpoint(SocketServer.TCPServer):
 
         self.register_api_functions(config_path)
 
+        # compile the routes now, instead of on the first request
+        handler.get_route_table()
+
+        if server:
+            self.start_workers(num_workers)
+
 
 class BlockstackAPIEndpointClient(object):
     """
@@ -3429,6 +3745,7 @@ def local_api_server_stop(srv):
     """
     log.debug("Server shutdown")
     srv.socket.close()
+    srv.stop_workers()
 
     # stop the registrar too
     backend.registrar.registrar_shutdown(srv.config_path)    
@@ -27,14 +27,20 @@ from decimal import *
 import bitcoin
 import ecdsa
 import hashlib
+import re
+import time
+import threading
+import Queue
 import pybitcoin
 import virtualchain
 
 from pybitcoin.transactions.outputs import calculate_change_amount
+from pybitcoin.services.bitcoind import format_unspents as bitcoind_format_unspents
 from virtualchain import tx_serialize, tx_deserialize, tx_script_to_asm, tx_output_parse_scriptPubKey
 
 from .b40 import *
 from .constants import MAGIC_BYTES, NAME_OPCODES, LENGTH_MAX_NAME, LENGTH_MAX_NAMESPACE_ID, TX_MIN_CONFIRMATIONS, BLOCKSTACK_TEST
+from .constants import UTXO_CACHE_TTL, UTXO_QUERY_WORKERS
 from .keys import *
 
 log = virtualchain.get_logger('blockstack-client')
@@ -43,6 +49,11 @@ class UTXOException(Exception):
     pass
 
 
+# map (UTXO provider ID, address) to (unspents, time cached)
+UTXO_CACHE = {}
+UTXO_CACHE_LOCK = threading.Lock()
+
+
 def add_magic_bytes(hex_script):
     return '{}{}'.format(hexlify(MAGIC_BYTES), hex_script)
 
@@ -544,7 +555,17 @@ def tx_get_unspents(address, utxo_client, min_confirmations=TX_MIN_CONFIRMATIONS
         log.warning("Using UTXOs with {} confirmations instead of the default {}".format(min_confirmations, TX_MIN_CONFIRMATIONS))
 
     data = pybitcoin.get_unspents(address, utxo_client)
+    tx_check_unspents(address, data)
+
+    # filter minimum confirmations
+    return [d for d in data if d.get('confirmations', 0) >= min_confirmations]
 
+
+def tx_check_unspents(address, data):
+    """
+    Verify that a UTXO provider gave back a well-formed list of UTXOs
+    Raise UTXOException on error
+    """
     try:
         assert type(data) == list, "No UTXO list returned"
         for d in data:
@@ -555,5 +576,204 @@ def tx_get_unspents(address, utxo_client, min_confirmations=TX_MIN_CONFIRMATIONS
         log.exception(ae)
         raise UTXOException()
 
+
+def utxo_client_id(utxo_client):
+    """
+    Identify a UTXO provider in the UTXO cache.
+    Clients for a known provider are identified by their connection parameters,
+    so clients instantiated from the same config share cached UTXOs.
+    Any other client (e.g. one that wraps a known set of UTXOs) is identified by itself.
+    """
+    client_type = getattr(utxo_client, 'type', None)
+
+    if client_type == 'bitcoind':
+        service_url = getattr(getattr(utxo_client, 'bitcoind', None), '_AuthServiceProxy__service_url', None)
+        if service_url is not None:
+            return (client_type, service_url)
+
+    elif client_type == 'blockstack_utxo':
+        return (client_type, utxo_client.server, utxo_client.port)
+
+    elif client_type in ['blockcypher.com', 'blockchain.info', 'chain.com']:
+        return (client_type, getattr(utxo_client, 'auth', None))
+
+    return utxo_client
+
+
+def tx_fetch_unspents_multi(addresses, utxo_client, num_workers=UTXO_QUERY_WORKERS):
+    """
+    Get the unspent outputs for a list of addresses, without filtering or caching.
+    * if the UTXO client has a get_unspents_multi() method, use it.
+    * if the UTXO client is bitcoind, ask for all addresses in one listunspent.
+    * otherwise, query up to @num_workers addresses at a time.
+
+    Return {address: [UTXOs]}.  Addresses that could not be queried map to None.
+    """
+    ret = dict([(addr, None) for addr in addresses])
+    if len(addresses) == 0:
+        return ret
+
+    if hasattr(utxo_client, 'get_unspents_multi'):
+        try:
+            data = utxo_client.get_unspents_multi(addresses)
+            for addr in addresses:
+                tx_check_unspents(addr, data.get(addr, None))
+                ret[addr] = data[addr]
+
+        except Exception as e:
+            log.exception(e)
+            log.error('Failed to get UTXOs for {} addresses'.format(len(addresses)))
+
+        return ret
+
+    if isinstance(utxo_client, pybitcoin.BitcoindClient):
+        try:
+            data = utxo_client.bitcoind.listunspent(0, 2000000000, [str(addr) for addr in addresses])
+            for addr in addresses:
+                ret[addr] = bitcoind_format_unspents([d for d in data if d.get('address', None) == addr])
+
+        except Exception as e:
+            log.exception(e)
+            log.error('Failed to get UTXOs for {} addresses'.format(len(addresses)))
+
+        return ret
+
+    # no batch support; query them concurrently
+    work = Queue.Queue()
+    for addr in addresses:
+        work.put(addr)
+
+    def worker():
+        while True:
+            try:
+                addr = work.get_nowait()
+            except Queue.Empty:
+                return
+
+            try:
+                data = pybitcoin.get_unspents(addr, utxo_client)
+                tx_check_unspents(addr, data)
+                ret[addr] = data
+
+            except Exception as e:
+                log.exception(e)
+                log.error('Failed to get UTXOs for {}'.format(addr))
+
+    workers = [threading.Thread(target=worker) for i in xrange(0, min(num_workers, len(addresses)))]
+    for w in workers:
+        w.start()
+
+    for w in workers:
+        w.join()
+
+    return ret
+
+
+def tx_get_unspents_multi(addresses, utxo_client, min_confirmations=TX_MIN_CONFIRMATIONS, use_cache=True, cache_ttl=None):
+    """
+    Given a list of addresses, get their unspent outputs (UTXOs).
+    Each address's UTXOs are cached for @cache_ttl seconds (UTXO_CACHE_TTL by default),
+    or until we broadcast a transaction that spends from it (see utxo_cache_invalidate_tx).
+    If @use_cache is False, always query the UTXO provider (but still refresh the cache).
+
+    Return {address: [UTXOs]} on success.  Addresses that could not be queried map to None.
+    """
+    global UTXO_CACHE, UTXO_CACHE_LOCK
+
+    if min_confirmations is None:
+        min_confirmations = TX_MIN_CONFIRMATIONS
+
+    if cache_ttl is None:
+        cache_ttl = UTXO_CACHE_TTL
+
+    addresses = list(set(addresses))
+    client_id = utxo_client_id(utxo_client)
+    now = time.time()
+    data = {}
+    to_fetch = []
+
+    with UTXO_CACHE_LOCK:
+        # evict stale entries
+        for key, (_, cached_at) in UTXO_CACHE.items():
+            if cached_at + cache_ttl < now:
+                del UTXO_CACHE[key]
+
+        for addr in addresses:
+            cached = UTXO_CACHE.get((client_id, addr), None)
+            if use_cache and cached is not None:
+                data[addr] = cached[0]
+            else:
+                to_fetch.append(addr)
+
+    if len(to_fetch) > 0:
+        log.debug('Query UTXOs for {} addresses ({} cached)'.format(len(to_fetch), len(data)))
+
+        fetched = tx_fetch_unspents_multi(to_fetch, utxo_client)
+        fetched_at = time.time()
+
+        with UTXO_CACHE_LOCK:
+            for addr, unspents in fetched.items():
+                if unspents is not None:
+                    UTXO_CACHE[(client_id, addr)] = (unspents, fetched_at)
+
+        data.update(fetched)
+
     # filter minimum confirmations
-    return [d for d in data if d.get('confirmations', 0) >= min_confirmations]
+    ret = {}
+    for addr in addresses:
+        if data[addr] is None:
+            ret[addr] = None
+        else:
+            ret[addr] = [d for d in data[addr] if d.get('confirmations', 0) >= min_confirmations]
+
+    return ret
+
+
+def utxo_cache_invalidate(addresses):
+    """
+    Drop cached UTXOs for a list of addresses, from every UTXO provider
+    """
+    global UTXO_CACHE, UTXO_CACHE_LOCK
+
+    addresses = set(addresses)
+    with UTXO_CACHE_LOCK:
+        for key in UTXO_CACHE.keys():
+            if key[1] in addresses:
+                del UTXO_CACHE[key]
+
+
+def utxo_cache_invalidate_tx(tx_hex):
+    """
+    Drop cached UTXOs for the addresses a transaction spends from and sends to.
+    """
+    global UTXO_CACHE, UTXO_CACHE_LOCK
+
+    try:
+        inputs, outputs, _, _ = pybitcoin.deserialize_transaction(tx_hex)
+    except Exception as e:
+        log.exception(e)
+        log.error('Failed to parse transaction; clearing UTXO cache')
+        with UTXO_CACHE_LOCK:
+            UTXO_CACHE.clear()
+
+        return
+
+    spent = set([(inp['transaction_hash'], inp['output_index']) for inp in inputs])
+    addresses = set()
+
+    for out in outputs:
+        addr = virtualchain.script_hex_to_address(out['script_hex'])
+        if addr is not None:
+            addresses.add(addr)
+
+    with UTXO_CACHE_LOCK:
+        # spending addresses are the ones whose cached UTXOs this tx consumes
+        for key, (unspents, _) in UTXO_CACHE.items():
+            for unspent in unspents:
+                if (unspent.get('transaction_hash', None), unspent.get('output_index', None)) in spent:
+                    addresses.add(key[1])
+                    break
+
+        for key in UTXO_CACHE.keys():
+            if key[1] in addresses:
+                del UTXO_CACHE[key]
@@ -33,6 +33,11 @@ import urllib
 import urllib2
 import base64
 import posixpath
+import time
+import threading
+import Queue
+import copy
+import collections
 
 import blockstack_zones
 
@@ -43,7 +48,7 @@ from keylib import ECPrivateKey, ECPublicKey
 import blockstack_profiles
 
 from config import get_logger
-from constants import CONFIG_PATH, BLOCKSTACK_TEST, BLOCKSTACK_DEBUG
+from constants import CONFIG_PATH, BLOCKSTACK_TEST, BLOCKSTACK_DEBUG, VERIFIED_DATA_CACHE_BYTES, NEGATIVE_RESULT_CACHE_TTL, NEGATIVE_RESULT_CACHE_SIZE
 from scripts import is_name_valid
 import schemas
 from keys import *
@@ -55,6 +60,11 @@ import string
 # global list of registered data handlers
 storage_handlers = []
 
+# map (driver name, fq data ID) to an Event that gets set once the last write to it finishes,
+# so writes to the same data through the same driver are applied in the order they were issued
+STORAGE_PENDING_WRITES = {}
+STORAGE_PENDING_WRITES_LOCK = threading.Lock()
+
 
 class UnhandledURLException(Exception):
     def __init__(self, url):
@@ -62,6 +72,130 @@ class UnhandledURLException(Exception):
         self.unhandled_url = url
 
 
+class VerifiedDataCache(object):
+    """
+    Cache (sha256(signed data), public key, public key hash, data hash) --> verified payload,
+    in an LRU style, bounded by the total size of the signed data.
+    Only successful verifications are cached.
+    """
+    def __init__(self, max_bytes=VERIFIED_DATA_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def get(self, key):
+        """
+        Get a verified payload.
+        Return a copy of the payload on hit
+        Return None on miss
+        """
+        with self.lock:
+            entry = self.cache.pop(key, None)
+            if entry is None:
+                return None
+
+            self.cache[key] = entry
+
+        return copy.deepcopy(entry[0])
+
+
+    def put(self, key, payload, size):
+        """
+        Cache a verified payload, given the size of the signed data it came from.
+        """
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old_entry = self.cache.pop(key, None)
+            if old_entry is not None:
+                self.size -= old_entry[1]
+
+            while self.size + size > self.max_bytes and len(self.cache) > 0:
+                _, evicted = self.cache.popitem(last=False)
+                self.size -= evicted[1]
+
+            self.cache[key] = (copy.deepcopy(payload), size)
+            self.size += size
+
+
+    def clear(self):
+        """
+        Drop all cached payloads
+        """
+        with self.lock:
+            self.cache.clear()
+            self.size = 0
+
+
+# verified mutable data, shared by every reader in this process
+VERIFIED_DATA_CACHE = VerifiedDataCache()
+
+
+class NegativeResultCache(object):
+    """
+    Cache (name, value hash, what) --> error, for lookups that failed.
+    Entries expire after a short TTL.  Since the key includes the name's
+    value hash, an entry no longer applies once the name's zonefile changes.
+
+    Only remember lookups that definitely failed (i.e. every source answered,
+    and none had valid data); lookups that failed because of a transient error
+    (e.g. a driver or RPC error) must be retried.
+    """
+    def __init__(self, ttl=NEGATIVE_RESULT_CACHE_TTL, max_entries=NEGATIVE_RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def get(self, name, value_hash, what):
+        """
+        Get the error from a failed lookup.
+        Return a copy of the error on hit
+        Return None on miss
+        """
+        key = (name, value_hash, what)
+        with self.lock:
+            entry = self.cache.get(key, None)
+            if entry is None:
+                return None
+
+            if entry[1] < time.time():
+                del self.cache[key]
+                return None
+
+        return copy.deepcopy(entry[0])
+
+
+    def put(self, name, value_hash, what, error):
+        """
+        Remember a failed lookup
+        """
+        key = (name, value_hash, what)
+        with self.lock:
+            self.cache.pop(key, None)
+            while len(self.cache) >= self.max_entries:
+                self.cache.popitem(last=False)
+
+            self.cache[key] = (copy.deepcopy(error), time.time() + self.ttl)
+
+
+    def evict(self, name):
+        """
+        Forget all failed lookups for a name
+        """
+        with self.lock:
+            for key in [k for k in self.cache.keys() if k[0] == name]:
+                del self.cache[key]
+
+
+# failed zonefile and profile lookups, shared by every reader in this process
+NEGATIVE_RESULT_CACHE = NegativeResultCache()
+
+
 def get_data_hash(data_txt):
     """
     Generate a hash over data for immutable storage.
@@ -288,6 +422,17 @@ def parse_mutable_data_v2(mutable_data_json_txt, public_key_hex, public_key_hash
     return None
 
 
+def _verified_data_cache_key(mutable_data_json_txt, public_key, public_key_hash, data_hash):
+    """
+    Make the verified data cache key for a piece of signed mutable data
+    """
+    data_txt = mutable_data_json_txt
+    if isinstance(data_txt, unicode):
+        data_txt = data_txt.encode('utf-8')
+
+    return (hashlib.sha256(data_txt).hexdigest(), public_key, public_key_hash, data_hash)
+
+
 def parse_mutable_data(mutable_data_json_txt, public_key, public_key_hash=None, data_hash=None):
     """
     Given the serialized JSON for a piece of mutable data,
@@ -295,7 +440,50 @@ def parse_mutable_data(mutable_data_json_txt, public_key, public_key_hash=None,
     signed by public_key's or public_key_hash's private key.
 
     Try to verify with both keys, if given.
+    Data that has been verified before is served from VERIFIED_DATA_CACHE.
+
+    Return the parsed JSON dict on success
+    Return None on error
+    """
+    key = _verified_data_cache_key(mutable_data_json_txt, public_key, public_key_hash, data_hash)
+    payload = VERIFIED_DATA_CACHE.get(key)
+    if payload is not None:
+        return payload
+
+    payload = _parse_mutable_data(mutable_data_json_txt, public_key, public_key_hash=public_key_hash, data_hash=data_hash)
+    if payload is not None:
+        VERIFIED_DATA_CACHE.put(key, payload, len(mutable_data_json_txt))
+
+    return payload
+
+
+def parse_mutable_data_batch(items):
+    """
+    Verify and parse many pieces of signed mutable data at once.
+    @items is a list of (serialized data, public key, public key hash, data hash) tuples.
+    Identical items are only verified once, and verified items are cached.
+
+    Return a list with the parsed data (or None) for each item, in order.
+    """
+    results = {}
+    ret = []
+
+    for (mutable_data_json_txt, public_key, public_key_hash, data_hash) in items:
+        key = _verified_data_cache_key(mutable_data_json_txt, public_key, public_key_hash, data_hash)
+        if key not in results:
+            results[key] = parse_mutable_data(mutable_data_json_txt, public_key, public_key_hash=public_key_hash, data_hash=data_hash)
+            ret.append(results[key])
 
+        else:
+            # give each caller its own copy
+            ret.append(copy.deepcopy(results[key]))
+
+    return ret
+
+
+def _parse_mutable_data(mutable_data_json_txt, public_key, public_key_hash=None, data_hash=None):
+    """
+    Uncached version of parse_mutable_data()
     Return the parsed JSON dict on success
     Return None on error
     """
@@ -394,7 +582,7 @@ def register_storage(storage_impl):
 
 
 def get_immutable_data(data_hash, data_url=None, hash_func=get_data_hash, fqu=None,
-                       data_id=None, zonefile=False, drivers=None):
+                       data_id=None, zonefile=False, drivers=None, errors=None):
     """
     Given the hash of the data, go through the list of
     immutable data handlers and look it up.
@@ -402,6 +590,9 @@ def get_immutable_data(data_hash, data_url=None, hash_func=get_data_hash, fqu=No
     Optionally pass the fully-qualified name (@fqu), human-readable data ID (data_id),
     and whether or not this is a zonefile request (zonefile) as hints to the driver.
 
+    If @errors is given, a (driver name, error message) pair is appended to it
+    for each driver that failed with an error (as opposed to not having the data).
+
     Return the data (as a dict) on success.
     Return None on failure
     """
@@ -440,6 +631,9 @@ def get_immutable_data(data_hash, data_url=None, hash_func=get_data_hash, fqu=No
                 log.exception(e)
                 msg = 'Failed to load profile from "{}"'
                 log.error(msg.format(data_url))
+                if errors is not None:
+                    errors.append((data_url, str(e)))
+
                 continue
         else:
             # handler
@@ -457,6 +651,9 @@ def get_immutable_data(data_hash, data_url=None, hash_func=get_data_hash, fqu=No
                 log.exception(e)
                 msg = 'Method failed: {}.get_immutable_handler({})'
                 log.debug(msg.format(handler, data_hash))
+                if errors is not None:
+                    errors.append((handler.__name__, str(e)))
+
                 continue
 
         if data is None:
@@ -541,12 +738,15 @@ def get_driver_urls( fq_data_id, storage_drivers ):
 
 
 def get_mutable_data(fq_data_id, data_pubkey, urls=None, data_address=None, data_hash=None,
-                     owner_address=None, blockchain_id=None, drivers=None, decode=True):
+                     owner_address=None, blockchain_id=None, drivers=None, decode=True, errors=None):
     """
     Low-level call to get mutable data, given a fully-qualified data name.
     
     if decode is False, then data_pubkey, data_address, and owner_address are not needed and raw bytes will be returned.
 
+    If @errors is given, a (driver name, error message) pair is appended to it
+    for each driver that failed with an error (as opposed to not having the data).
+
     Return a mutable data dict on success (or raw bytes if decode=False)
     Return None on error
     """
@@ -588,6 +788,9 @@ def get_mutable_data(fq_data_id, data_pubkey, urls=None, data_address=None, data
                 new_url = storage_handler.make_mutable_url(fq_data_id)
             except Exception as e:
                 log.exception(e)
+                if errors is not None:
+                    errors.append((storage_handler.__name__, str(e)))
+
                 continue
 
             if new_url is None:
@@ -620,6 +823,9 @@ def get_mutable_data(fq_data_id, data_pubkey, urls=None, data_address=None, data
                 continue
             except Exception as e:
                 log.exception(e)
+                if errors is not None:
+                    errors.append((storage_handler.__name__, str(e)))
+
                 continue
 
             if data_txt is None:
@@ -662,6 +868,153 @@ def get_mutable_data(fq_data_id, data_pubkey, urls=None, data_address=None, data
     return None
 
 
+def _storage_write_begin(name, data_id):
+    """
+    Register a write to @data_id through driver @name.
+    Return (the Event for the previous write to wait on or None, the Event to set when this write finishes)
+    """
+    global STORAGE_PENDING_WRITES, STORAGE_PENDING_WRITES_LOCK
+
+    done = threading.Event()
+    with STORAGE_PENDING_WRITES_LOCK:
+        prev = STORAGE_PENDING_WRITES.get((name, data_id), None)
+        STORAGE_PENDING_WRITES[(name, data_id)] = done
+
+    return prev, done
+
+
+def _storage_write_end(name, data_id, done):
+    """
+    Mark a write to @data_id through driver @name as finished.
+    """
+    global STORAGE_PENDING_WRITES, STORAGE_PENDING_WRITES_LOCK
+
+    with STORAGE_PENDING_WRITES_LOCK:
+        if STORAGE_PENDING_WRITES.get((name, data_id), None) is done:
+            del STORAGE_PENDING_WRITES[(name, data_id)]
+
+    done.set()
+
+
+def _storage_run_handlers(calls, required, concurrent=False, timings=None, data_id=None, results=None, wait_all=False):
+    """
+    Run a storage operation against a list of drivers.
+    @calls is a list of (driver name, callable), where the callable
+    returns True on success.
+
+    If @concurrent is False, run each call in order, and stop at the
+    first required driver that fails.
+
+    If @concurrent is True, run each call in its own thread, and return
+    as soon as a required driver fails, or as soon as all required drivers
+    (and at least one driver) have succeeded.  Drivers that are still running
+    are left to finish in the background, unless @wait_all is True.
+
+    If @data_id is given, each call is a write to @data_id, and will wait
+    for any earlier write to @data_id through the same driver (including
+    one still running in the background) to finish before it starts.
+
+    If @timings is given, it will be filled in with the number of seconds
+    each driver took (drivers left running in the background fill theirs in when done).
+    If @results is given, it will be filled in the same way with whether or not each driver succeeded.
+
+    Return (number of successful drivers, name of the required driver that failed or None)
+    """
+
+    required = [] if required is None else required
+    timings = {} if timings is None else timings
+    results = {} if results is None else results
+
+    def _run_call(name, call, prev_write=None, this_write=None):
+        rc = False
+        try:
+            if prev_write is not None:
+                log.debug('Wait for earlier write to "{}" with "{}"'.format(data_id, name))
+                prev_write.wait()
+
+            t_start = time.time()
+            try:
+                log.debug('Try "{}"'.format(name))
+                rc = call()
+            except Exception as e:
+                log.exception(e)
+                rc = False
+
+            timings[name] = time.time() - t_start
+            results[name] = bool(rc)
+
+        finally:
+            if this_write is not None:
+                _storage_write_end(name, data_id, this_write)
+
+        return bool(rc)
+
+    # order this batch of writes after the previous ones
+    writes = {}
+    if data_id is not None:
+        for name, _ in calls:
+            writes[name] = _storage_write_begin(name, data_id)
+
+    if not concurrent:
+        successes = 0
+        for i, (name, call) in enumerate(calls):
+            if _run_call(name, call, *writes.get(name, (None, None))):
+                successes += 1
+                continue
+
+            if name in required:
+                # release the writes we won't be doing
+                for skipped_name, _ in calls[i+1:]:
+                    if skipped_name in writes:
+                        prev, done = writes[skipped_name]
+                        if prev is not None:
+                            prev.wait()
+
+                        _storage_write_end(skipped_name, data_id, done)
+
+                return successes, name
+
+        return successes, None
+
+    done_queue = Queue.Queue()
+
+    def _run_thread(name, call):
+        done_queue.put((name, _run_call(name, call, *writes.get(name, (None, None)))))
+
+    for name, call in calls:
+        t = threading.Thread(target=_run_thread, args=(name, call))
+        t.daemon = True
+        t.start()
+
+    pending = set([name for (name, _) in calls])
+    required_pending = pending.intersection(set(required))
+    successes = 0
+    failed_required = None
+
+    while len(pending) > 0:
+        name, rc = done_queue.get()
+        pending.discard(name)
+
+        if rc:
+            successes += 1
+            required_pending.discard(name)
+
+        elif name in required:
+            if not wait_all:
+                return successes, name
+
+            if failed_required is None:
+                failed_required = name
+
+        if len(required_pending) == 0 and successes > 0 and not wait_all:
+            if len(pending) > 0:
+                log.debug("Leaving {} to finish in the background".format(','.join(pending)))
+
+            break
+
+    return successes, failed_required
+
+
 def serialize_immutable_data(data_json):
     """
     Serialize a piece of immutable data
@@ -671,11 +1024,16 @@ def serialize_immutable_data(data_json):
     return json.dumps(data_json, sort_keys=True)
 
 
-def put_immutable_data(data_json, txid, data_hash=None, data_text=None, required=None, skip=None):
+def put_immutable_data(data_json, txid, data_hash=None, data_text=None, required=None, skip=None, concurrent=False, timings=None, results=None, wait_all=False):
     """
     Given a string of data (which can either be data or a zonefile), store it into our immutable data stores.
     Do so in a best-effort manner--this method only fails if *all* storage providers fail.
 
+    If @concurrent is True, write to all storage providers at once (see _storage_run_handlers()).
+    If @wait_all is also True, wait for all of them to finish.
+    If @timings is given, it will be filled with the time each storage provider took.
+    If @results is given, it will be filled with whether or not each storage provider succeeded.
+
     Return the hash of the data on success
     Return None on error
     """
@@ -700,10 +1058,10 @@ def put_immutable_data(data_json, txid, data_hash=None, data_text=None, required
     else:
         data_hash = str(data_hash)
 
-    successes = 0
-    msg = 'put_immutable_data({}), required={}, skip={}'
-    log.debug(msg.format(data_hash, ','.join(required), ','.join(skip)))
+    msg = 'put_immutable_data({}), required={}, skip={}, concurrent={}'
+    log.debug(msg.format(data_hash, ','.join(required), ','.join(skip), concurrent))
 
+    calls = []
     for handler in storage_handlers:
         if handler.__name__ in skip:
             log.debug("Skipping {}".format(handler.__name__))
@@ -717,42 +1075,29 @@ def put_immutable_data(data_json, txid, data_hash=None, data_text=None, required
             log.debug("Storage provider {} is required but does not allow immutable storage".format(handler.__name__))
             return None
 
-        rc = False
+        calls.append((handler.__name__, lambda handler=handler: handler.put_immutable_handler(data_hash, data_text, txid)))
 
-        try:
-            log.debug('Try "{}"'.format(handler.__name__))
-            rc = handler.put_immutable_handler(data_hash, data_text, txid)
-        except Exception as e:
-            log.exception(e)
-            if handler.__name__ not in required:
-                continue
-
-            # fatal
-            log.debug("Failed to replicate to required storage provider {}".format(handler.__name__))
-            return None
-
-        if not rc:
-            log.debug('Failed to replicate with "{}"'.format(handler.__name__))
-            if handler.__name__ not in required:
-                continue
-
-            # fatal
-            return None
-
-        else:
-            log.debug('Replication succeeded with "{}"'.format(handler.__name__))
-            successes += 1
+    successes, failed_required = _storage_run_handlers(calls, required, concurrent=concurrent, timings=timings, results=results, wait_all=wait_all)
+    if failed_required is not None:
+        # fatal
+        log.debug("Failed to replicate to required storage provider {}".format(failed_required))
+        return None
 
     # failed everywhere or succeeded somewhere
     return None if successes == 0 else data_hash
 
 
-def put_mutable_data(fq_data_id, data_text_or_json, privatekey_hex, sign=True, profile=False, blockchain_id=None, required=None, skip=None, required_exclusive=False):
+def put_mutable_data(fq_data_id, data_text_or_json, privatekey_hex, sign=True, profile=False, blockchain_id=None, required=None, skip=None, required_exclusive=False, concurrent=False, timings=None, results=None, wait_all=False):
     """
     Given the unserialized data, store it into our mutable data stores.
     Do so in a best-effort way.  This method fails if all storage providers fail,
     or if a storage provider in required fails.
 
+    If @concurrent is True, write to all storage providers at once (see _storage_run_handlers()).
+    If @wait_all is also True, wait for all of them to finish.
+    If @timings is given, it will be filled with the time each storage provider took.
+    If @results is given, it will be filled with whether or not each storage provider succeeded.
+
     Return True on success
     Return False on error
     """
@@ -781,14 +1126,13 @@ def put_mutable_data(fq_data_id, data_text_or_json, privatekey_hex, sign=True, p
     else:
         serialized_data = data_text_or_json
 
-    successes = 0
-
-    log.debug('put_mutable_data({}), required={}, skip={} required_exclusive={}'.format(fq_data_id, ','.join(required), ','.join(skip), required_exclusive))
+    log.debug('put_mutable_data({}), required={}, skip={} required_exclusive={} concurrent={}'.format(fq_data_id, ','.join(required), ','.join(skip), required_exclusive, concurrent))
     if BLOCKSTACK_TEST:
         log.debug("data: {}".format(serialized_data))
 
     fail_msg = 'Failed to replicate with required storage provider "{}"'
 
+    calls = []
     for handler in storage_handlers:
         if handler.__name__ in skip:
             log.debug("Skipping {}".format(handler.__name__))
@@ -805,29 +1149,11 @@ def put_mutable_data(fq_data_id, data_text_or_json, privatekey_hex, sign=True, p
             log.debug("Skipping non-required driver {}".format(handler.__name__))
             continue
 
-        rc = False
-
-        try:
-            log.debug('Try "{}"'.format(handler.__name__))
-            rc = handler.put_mutable_handler(fq_data_id, serialized_data, fqu=fqu)
-        except Exception as e:
-            log.exception(e)
-            if handler.__name__ not in required:
-                continue
-
-            log.error(fail_msg.format(handler.__name__))
-            return None
-
-        if rc:
-            log.debug("Replicated {} bytes with {}".format(len(serialized_data), handler.__name__))
-            successes += 1
-            continue
-
-        if handler.__name__ not in required:
-            log.debug('Failed to replicate with "{}"'.format(handler.__name__))
-            continue
+        calls.append((handler.__name__, lambda handler=handler: handler.put_mutable_handler(fq_data_id, serialized_data, fqu=fqu)))
 
-        log.error(fail_msg.format(handler.__name__))
+    successes, failed_required = _storage_run_handlers(calls, required, concurrent=concurrent, timings=timings, data_id=fq_data_id, results=results, wait_all=wait_all)
+    if failed_required is not None:
+        log.error(fail_msg.format(failed_required))
         return None
 
     # failed everywhere or succeeded somewhere
@@ -865,12 +1191,15 @@ def delete_immutable_data(data_hash, txid, privkey):
     return True
 
 
-def delete_mutable_data(fq_data_id, privatekey, required=None, required_exclusive=False, skip=None, blockchain_id=None, profile=False):
+def delete_mutable_data(fq_data_id, privatekey, required=None, required_exclusive=False, skip=None, blockchain_id=None, profile=False, concurrent=False, timings=None):
     """
     Given the data ID and private key of a user,
     go and delete the associated mutable data.
 
     The fq_data_id is an opaque identifier that is prefixed with the username.
+
+    If @concurrent is True, delete from all storage providers at once (see _storage_run_handlers()).
+    If @timings is given, it will be filled with the time each storage provider took.
     """
 
     global storage_handlers
@@ -892,6 +1221,7 @@ def delete_mutable_data(fq_data_id, privatekey, required=None, required_exclusiv
     sigb64 = sign_raw_data("delete:" + fq_data_id, privatekey)
 
     # remove data
+    calls = []
     for handler in storage_handlers:
         if handler.__name__ in skip:
             log.debug("Skipping {}".format(handler.__name__))
@@ -904,16 +1234,12 @@ def delete_mutable_data(fq_data_id, privatekey, required=None, required_exclusiv
             log.debug("Skipping non-required driver {}".format(handler.__name__))
             continue
 
-        rc = False
-        try:
-            rc = handler.delete_mutable_handler(fq_data_id, sigb64, fqu=fqu, profile=profile)
-        except Exception as e:
-            log.exception(e)
-            rc = False
+        calls.append((handler.__name__, lambda handler=handler: handler.delete_mutable_handler(fq_data_id, sigb64, fqu=fqu, profile=profile)))
 
-        if not rc and handler.__name__ in required:
-            log.error("Failed to delete from required storage driver {}".format(handler.__name__))
-            return False
+    _, failed_required = _storage_run_handlers(calls, required, concurrent=concurrent, timings=timings, data_id=fq_data_id)
+    if failed_required is not None:
+        log.error("Failed to delete from required storage driver {}".format(failed_required))
+        return False
 
     return True
 
@@ -31,7 +31,7 @@ from .operations import *
 from .constants import CONFIG_PATH, BLOCKSTACK_TEST, BLOCKSTACK_DRY_RUN
 from .config import get_tx_broadcaster, get_logger
 
-from .scripts import tx_sign_all_unsigned_inputs
+from .scripts import tx_sign_all_unsigned_inputs, utxo_cache_invalidate_tx
 
 log = get_logger('blockstack-client')
 
@@ -160,6 +160,9 @@ def broadcast_tx(tx_hex, config_path=CONFIG_PATH, tx_broadcaster=None):
                 resp['error'] = 'Failed to broadcast transaction: {}'.format(tx_hex)
                 return resp
 
+            # cached UTXOs for the addresses involved are now stale
+            utxo_cache_invalidate_tx(tx_hex)
+
     except Exception as e:
         log.exception(e)
         resp['error'] = 'Failed to broadcast transaction: {}'.format(tx_hex)
@@ -25,6 +25,9 @@ import json
 import sys
 import os
 import signal
+import time
+import threading
+import Queue
 
 from config import get_logger
 log = get_logger('blockstack-client')
@@ -155,3 +158,44 @@ def daemonize( logpath, child_wait=None ):
         return -1
 
     return 0
+
+
+def run_parallel( calls, num_workers, error=None, timings=None ):
+    """
+    Run a list of (key, callable) pairs on a pool of up to num_workers threads.
+    If a callable raises an exception, its value is error(key), or
+    {'error': ...} if error is not given.
+    If timings is given, it will be filled with the number of seconds each callable took.
+    Return {key: callable's return value}
+    """
+    results = {}
+    timings = {} if timings is None else timings
+    work = Queue.Queue()
+    for key, call in calls:
+        work.put((key, call))
+
+    def _worker():
+        while True:
+            try:
+                key, call = work.get(False)
+            except Queue.Empty:
+                return
+
+            t1 = time.time()
+            try:
+                res = call()
+            except Exception as e:
+                log.exception(e)
+                res = error(key) if error is not None else {'error': 'Failed to run {}'.format(key)}
+
+            timings[key] = time.time() - t1
+            results[key] = res
+
+    workers = [threading.Thread(target=_worker) for i in xrange(0, min(num_workers, len(calls)))]
+    for w in workers:
+        w.start()
+
+    for w in workers:
+        w.join()
+
+    return results
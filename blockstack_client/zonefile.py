@@ -182,7 +182,7 @@ def decode_name_zonefile(name, zonefile_txt, allow_legacy=False):
     return user_zonefile
 
 
-def load_name_zonefile(name, expected_zonefile_hash, storage_drivers=None, raw_zonefile=False, allow_legacy=False, proxy=None ):
+def load_name_zonefile(name, expected_zonefile_hash, storage_drivers=None, raw_zonefile=False, allow_legacy=False, proxy=None, errors=None ):
     """
     Fetch and load a user zonefile from the storage implementation with the given hex string hash,
     The user zonefile hash should have been loaded from the blockchain, and thereby be the
@@ -191,6 +191,9 @@ def load_name_zonefile(name, expected_zonefile_hash, storage_drivers=None, raw_z
     If raw_zonefile is True, then return the raw zonefile data.  Don't parse it.
     If however, raw_zonefile is False, the zonefile will be parsed.  If name is given, the $ORIGIN will be checked.
 
+    If @errors is given, a (source, error message) pair is appended to it for each
+    source (the Atlas node or a storage driver) that failed with an error, as opposed to not having the zonefile.
+
     Return the user zonefile (as a dict) on success
     Return None on error
     """
@@ -211,10 +214,13 @@ def load_name_zonefile(name, expected_zonefile_hash, storage_drivers=None, raw_z
     # try atlas node first 
     res = get_zonefiles( hostport, [expected_zonefile_hash], proxy=proxy )
     if 'error' in res or expected_zonefile_hash not in res['zonefiles'].keys():
+        if 'error' in res and errors is not None:
+            errors.append((hostport, res['error']))
+
         # fall back to storage drivers if atlas node didn't have it
         zonefile_txt = storage.get_immutable_data(
                 expected_zonefile_hash, hash_func=storage.get_zonefile_data_hash, 
-                fqu=name, zonefile=True, drivers=storage_drivers
+                fqu=name, zonefile=True, drivers=storage_drivers, errors=errors
         )
 
         if zonefile_txt is None:
@@ -306,30 +312,38 @@ def get_name_zonefile(name, storage_drivers=None, proxy=None,
     raw_zonefile_data = None
     user_zonefile_data = None
 
-    if raw_zonefile or include_raw_zonefile:
-        raw_zonefile_data = load_name_zonefile(
-            name, user_zonefile_hash, storage_drivers=storage_drivers,
-            raw_zonefile=True, proxy=proxy, allow_legacy=allow_legacy
-        )
+    # did we recently fail to load or decode this zonefile?
+    decode_kind = 'zonefile-decode-legacy' if allow_legacy else 'zonefile-decode'
+    for kind in ['zonefile'] + ([decode_kind] if not raw_zonefile else []):
+        error = storage.NEGATIVE_RESULT_CACHE.get(name, user_zonefile_hash, kind)
+        if error is not None:
+            log.debug('Zonefile {} for "{}" recently failed to load'.format(user_zonefile_hash, name))
+            return error
+
+    errors = []
+    raw_zonefile_data = load_name_zonefile(
+        name, user_zonefile_hash, storage_drivers=storage_drivers,
+        raw_zonefile=True, proxy=proxy, allow_legacy=allow_legacy, errors=errors
+    )
 
-        if raw_zonefile_data is None:
-            return {'error': 'Failed to load raw name zonefile'}
+    if raw_zonefile_data is None:
+        error = {'error': 'Failed to load raw name zonefile'}
+        if len(errors) == 0:
+            # no one has it
+            storage.NEGATIVE_RESULT_CACHE.put(name, user_zonefile_hash, 'zonefile', error)
 
-        if raw_zonefile:
-            user_zonefile_data = raw_zonefile_data
+        return error
 
-        else:
-            # further decode
-            user_zonefile_data = decode_name_zonefile(name, raw_zonefile_data, allow_legacy=allow_legacy)
-            if user_zonefile_data is None:
-                return {'error': 'Failed to decode name zonefile'}
+    if raw_zonefile:
+        user_zonefile_data = raw_zonefile_data
 
     else:
-        user_zonefile_data = load_name_zonefile(
-            name, user_zonefile_hash, storage_drivers=storage_drivers, proxy=proxy, allow_legacy=allow_legacy
-        )
+        # further decode
+        user_zonefile_data = decode_name_zonefile(name, raw_zonefile_data, allow_legacy=allow_legacy)
         if user_zonefile_data is None:
-            return {'error': 'Failed to load or decode name zonefile'}
+            error = {'error': 'Failed to decode name zonefile'}
+            storage.NEGATIVE_RESULT_CACHE.put(name, user_zonefile_hash, decode_kind, error)
+            return error
 
     ret = {
         'zonefile': user_zonefile_data
@@ -363,6 +377,9 @@ def store_name_zonefile_data(name, user_zonefile_txt, txid, storage_drivers=None
     )
 
     rc = bool(result)
+    if rc and name is not None:
+        # don't remember any past failures to load it
+        storage.NEGATIVE_RESULT_CACHE.evict(name)
 
     return rc, data_hash
 
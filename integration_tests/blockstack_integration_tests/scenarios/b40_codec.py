@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import os
+import re
+import time
+import random
+from binascii import hexlify, unhexlify
+from utilitybelt import charset_to_hex, hex_to_charset
+
+import blockstack.lib.b40 as b40
+import blockstack_client.b40 as client_b40
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NUM_CASES = 100000
+NUM_BENCHMARK_NAMES = 20000
+
+failures = []
+timings = {}
+
+
+# the original charset-based codec
+def ref_is_b40(s):
+    return (isinstance(s, str) and (re.match(b40.B40_REGEX, s) is not None))
+
+
+def ref_b40_to_bin(s):
+    if not ref_is_b40(s):
+        raise ValueError('%s must only contain characters in the b40 char set' % s)
+    return unhexlify(charset_to_hex(s, b40.B40_CHARS))
+
+
+def ref_bin_to_b40(s):
+    if not isinstance(s, str):
+        raise ValueError('%s must be a string' % s)
+    return hex_to_charset(hexlify(s), b40.B40_CHARS)
+
+
+def result(f, arg):
+    """
+    Return value, or the fact that it raised ValueError
+    """
+    try:
+        return ('ok', f(arg))
+    except ValueError:
+        return ('ValueError',)
+
+
+def random_b40(alphabet=b40.B40_CHARS):
+    return ''.join([random.choice(alphabet) for i in xrange(random.randint(0, 40))])
+
+
+def scenario( wallets, **kw ):
+
+    random.seed(0)
+
+    strings = ['', '0', '00', '0a', 'a', 'foo.id', '+', '0' * 40, 'abc\n', 'abc\n\n', '\n', 'ABC', u'abc', 'a b', None, 5]
+    strings += [random_b40() for i in xrange(NUM_CASES)]
+    strings += [random_b40(b40.B40_CHARS + 'A \n\x00\xff') for i in xrange(NUM_CASES / 10)]
+
+    bins = ['', '\x00', '\x00\x00', '\x01', u'ab', None]
+    bins += [os.urandom(random.randint(0, 40)) for i in xrange(NUM_CASES)]
+
+    for codec in [b40, client_b40]:
+        for s in strings:
+            if codec.is_b40(s) != ref_is_b40(s) or result(codec.b40_to_bin, s) != result(ref_b40_to_bin, s):
+                failures.append((codec.__name__, 'b40_to_bin', s))
+
+        for s in bins:
+            if result(codec.bin_to_b40, s) != result(ref_bin_to_b40, s):
+                failures.append((codec.__name__, 'bin_to_b40', s))
+
+    # micro-benchmark on name-sized strings
+    names = [''.join([random.choice(b40.B40_CHARS) for i in xrange(random.randint(3, 37))]) for j in xrange(NUM_BENCHMARK_NAMES)]
+    encoded = [b40.b40_to_bin(name) for name in names]
+
+    for label, to_bin, from_bin in [('charset', ref_b40_to_bin, ref_bin_to_b40), ('b40', b40.b40_to_bin, b40.bin_to_b40)]:
+        t1 = time.time()
+        for name in names:
+            to_bin(name)
+
+        t2 = time.time()
+        for s in encoded:
+            from_bin(s)
+
+        t3 = time.time()
+        timings[label] = ((t2 - t1) * 1e6 / len(names), (t3 - t2) * 1e6 / len(names))
+
+
+def check( state_engine ):
+
+    if len(failures) > 0:
+        print "b40 codec mismatches (first 10): {}".format(failures[:10])
+        return False
+
+    for label, (to_bin_us, from_bin_us) in timings.items():
+        print "{}: b40_to_bin {:.2f}us/name, bin_to_b40 {:.2f}us/name".format(label, to_bin_us, from_bin_us)
+
+    if timings['b40'][0] > timings['charset'][0] or timings['b40'][1] > timings['charset'][1]:
+        print "b40 codec is slower than the charset codec"
+        return False
+
+    return True
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+
+import testlib
+import json
+import threading
+import SocketServer
+import BaseHTTPServer
+
+from blockstack_client.backend import blockchain
+from blockstack_client.constants import TX_CONFIRMATIONS_CACHE_TTL, DEFAULT_POLL_INTERVAL
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+# tx hash: confirmations at the first block height
+TXS = dict([('{:064x}'.format(i), i) for i in xrange(1, 21)])
+MISSING_TX = '{:064x}'.format(0xdeadbeef)
+
+results = {}
+
+
+class MockBitcoindHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Just enough of bitcoind's JSON-RPC interface to answer (batched) getrawtransaction calls
+    """
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        self.server.num_requests += 1
+
+        calls = body if isinstance(body, list) else [body]
+        responses = []
+        for call in calls:
+            assert call['method'] == 'getrawtransaction', call
+            self.server.num_calls += 1
+
+            tx_hash = call['params'][0]
+            if tx_hash in TXS:
+                responses.append({'id': call['id'], 'result': {'txid': tx_hash, 'confirmations': TXS[tx_hash] + self.server.height_offset}, 'error': None})
+            else:
+                responses.append({'id': call['id'], 'result': None, 'error': {'code': -5, 'message': 'No information available about transaction'}})
+
+        data = json.dumps(responses if isinstance(body, list) else responses[0])
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args, **kw):
+        pass
+
+
+class MockBitcoindServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *args, **kw):
+        BaseHTTPServer.HTTPServer.__init__(self, *args, **kw)
+        self.num_requests = 0
+        self.num_calls = 0
+        self.height_offset = 0
+
+
+def scenario( wallets, **kw ):
+
+    srv = MockBitcoindServer(('localhost', 0), MockBitcoindHandler)
+    server_thread = threading.Thread(target=srv.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+
+    bitcoind_opts = {
+        'bitcoind_server': 'localhost',
+        'bitcoind_port': srv.server_address[1],
+        'bitcoind_user': 'blockstack',
+        'bitcoind_passwd': 'blockstacksystem',
+        'bitcoind_use_https': False,
+    }
+
+    get_bitcoind_opts = blockchain.get_bitcoind_opts
+    blockchain.get_bitcoind_opts = lambda config_path=None: bitcoind_opts
+
+    try:
+        with blockchain.TX_CONFIRMATIONS_CACHE_LOCK:
+            blockchain.TX_CONFIRMATIONS_CACHE.clear()
+
+        tx_hashes = TXS.keys() + [MISSING_TX]
+
+        # one batch for all uncached transactions
+        results['first'] = blockchain.get_tx_confirmations_bulk(tx_hashes, block_height=1000)
+        results['first_requests'] = srv.num_requests
+        results['first_calls'] = srv.num_calls
+
+        # same block: everything but the missing tx is cached
+        results['cached'] = blockchain.get_tx_confirmations_bulk(tx_hashes, block_height=1000)
+        results['cached_requests'] = srv.num_requests - results['first_requests']
+        results['cached_calls'] = srv.num_calls - results['first_calls']
+
+        # new block: the cache no longer applies
+        srv.height_offset = 1
+        num_requests = srv.num_requests
+        results['next_block'] = blockchain.get_tx_confirmations_bulk(tx_hashes, block_height=1001)
+        results['next_block_requests'] = srv.num_requests - num_requests
+
+    finally:
+        blockchain.get_bitcoind_opts = get_bitcoind_opts
+        srv.shutdown()
+        srv.server_close()
+
+
+def check( state_engine ):
+
+    if TX_CONFIRMATIONS_CACHE_TTL < DEFAULT_POLL_INTERVAL:
+        print "confirmation cache expires before the next poll ({} < {})".format(TX_CONFIRMATIONS_CACHE_TTL, DEFAULT_POLL_INTERVAL)
+        return False
+
+    for name in ['first', 'cached', 'next_block']:
+        offset = 1 if name == 'next_block' else 0
+        for tx_hash, confirmations in TXS.items():
+            if results[name].get(tx_hash) != confirmations + offset:
+                print "{}: wrong confirmations for {}: {}".format(name, tx_hash, results[name].get(tx_hash))
+                return False
+
+        if results[name].get(MISSING_TX, 'missing') is not None:
+            print "{}: missing tx has confirmations {}".format(name, results[name].get(MISSING_TX, 'missing'))
+            return False
+
+    if results['first_requests'] != 1 or results['first_calls'] != len(TXS) + 1:
+        print "expected 1 batch request with {} calls, got {} requests with {} calls".format(len(TXS) + 1, results['first_requests'], results['first_calls'])
+        return False
+
+    # only the (uncacheable) missing tx is re-queried
+    if results['cached_requests'] != 1 or results['cached_calls'] != 1:
+        print "expected 1 request with 1 call for cached lookup, got {} requests with {} calls".format(results['cached_requests'], results['cached_calls'])
+        return False
+
+    if results['next_block_requests'] != 1:
+        print "expected 1 batch request at the next block, got {}".format(results['next_block_requests'])
+        return False
+
+    return True
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+
+import testlib
+import sys
+import time
+import random
+import traceback
+
+from blockstack_client.data import data_blob_parse, data_blob_serialize
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+    testlib.Wallet( "5KEpiSRr1BrT8vRD7LKGCEmudokTh1iMHbiThMQpLdwBwhDJB1T", 100000000000 )
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NUM_FUZZ_ROUNDS = 2000
+BENCHMARK_DIR_SIZES = [100, 1000, 10000]
+
+# (structure, serialized form) pairs
+GOLDEN = [
+    (0, '3:i:0,'),
+    (-5, '4:i:-5,'),
+    (123456789012345678901234567890, '32:i:123456789012345678901234567890,'),
+    ('', '2:s:,'),
+    ('a:b,c', '7:s:a:b,c,'),
+    ([], '2:l:,'),
+    ({}, '2:d:,'),
+    ([1, 'x', [2]], '25:l:3:i:1,3:s:x,8:l:3:i:2,,,'),
+    ({'b': 1, 'a': ['q', {}]}, '37:d:3:s:a,13:l:3:s:q,2:d:,,3:s:b,3:i:1,,'),
+    ({1: 'one', 2: 'two'}, '30:d:3:i:1,5:s:one,3:i:2,5:s:two,,'),
+]
+
+MALFORMED = [
+    '', ',', ':', '3:i:0', '3:i:0,,', '4:i:0,', '2:i:0,', '1:s,', '-1:s:,', 'x:s:,',
+    '3:x:0,', '3:i:x,', '3:s;0,', '5:d:2:s:,,', '6:l:3:i:1,', '10:l:3:i:1,,,',
+    '12:d:2:l:,2:s:,,', '12:d:2:d:,2:s:,,'
+]
+
+
+def scenario( wallets, **kw ):
+    
+    # nothing to do here
+    pass
+
+
+def random_blob( depth=0 ):
+    """
+    Make a random structure that conforms to DATA_BLOB_SCHEMA
+    """
+    r = random.randint(0, 4 if depth < 4 else 1)
+    if r == 0:
+        return random.randint(-2**64, 2**64)
+
+    elif r == 1:
+        return ''.join( chr(random.randint(0, 255)) for i in xrange(0, random.randint(0, 32)) )
+
+    elif r == 2:
+        return [random_blob(depth+1) for i in xrange(0, random.randint(0, 5))]
+
+    else:
+        # keys are always scalars
+        return dict( (random_blob(4), random_blob(depth+1)) for i in xrange(0, random.randint(0, 5)) )
+
+
+def make_dir_inode( num_children ):
+    """
+    Make a directory inode payload with the given number of children
+    """
+    children = {}
+    for i in xrange(0, num_children):
+        children['file-%s' % i] = {
+            'type': 1,
+            'uuid': '%032x' % i,
+            'version': i,
+        }
+
+    return {'type': 2, 'owner': '1BKufFedDrueBBFBXtiATB2PSdsBGZxf3N', 'readers': [], 'version': 1, 'children': children}
+
+
+def check( state_engine ):
+
+    random.seed(0)
+
+    for blob, serialized in GOLDEN:
+        if data_blob_serialize(blob) != serialized:
+            print >> sys.stderr, "Serialized %r as %r, expected %r" % (blob, data_blob_serialize(blob), serialized)
+            return False
+
+        if data_blob_parse(serialized) != blob:
+            print >> sys.stderr, "Parsed %r as %r, expected %r" % (serialized, data_blob_parse(serialized), blob)
+            return False
+
+        # buffers parse the same way
+        if data_blob_parse(buffer(serialized)) != blob or data_blob_parse(memoryview(serialized)) != blob:
+            print >> sys.stderr, "Failed to parse %r from a buffer" % serialized
+            return False
+
+    for malformed in MALFORMED:
+        try:
+            data_blob_parse(malformed)
+            print >> sys.stderr, "Parsed malformed blob %r" % malformed
+            return False
+        except ValueError:
+            pass
+
+    for i in xrange(0, NUM_FUZZ_ROUNDS):
+        blob = random_blob()
+        serialized = data_blob_serialize(blob)
+        if data_blob_parse(serialized) != blob:
+            print >> sys.stderr, "Round-trip failed for %r" % blob
+            return False
+
+        # corrupt one character; the parser must either return a structure or raise ValueError
+        if len(serialized) > 0:
+            idx = random.randint(0, len(serialized) - 1)
+            corrupted = serialized[:idx] + random.choice(':,0123456789dils') + serialized[idx+1:]
+            try:
+                data_blob_parse(corrupted)
+            except ValueError:
+                pass
+            except Exception, e:
+                traceback.print_exc()
+                print >> sys.stderr, "Unexpected error parsing %r" % corrupted
+                return False
+
+    # benchmark: time should grow linearly with directory size
+    for num_children in BENCHMARK_DIR_SIZES:
+        inode = make_dir_inode(num_children)
+
+        t1 = time.time()
+        serialized = data_blob_serialize(inode)
+        t2 = time.time()
+        parsed = data_blob_parse(serialized)
+        t3 = time.time()
+
+        if parsed != inode:
+            print >> sys.stderr, "Round-trip failed for directory with %s children" % num_children
+            return False
+
+        print "\nDirectory with %s children (%s bytes): serialize %s seconds, parse %s seconds\n" % (num_children, len(serialized), t2 - t1, t3 - t2)
+
+    return True
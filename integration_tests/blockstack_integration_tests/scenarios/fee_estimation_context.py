@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import threading
+import pybitcoin
+
+import blockstack_client
+from blockstack_client import scripts
+from blockstack_client.backend import blockchain, nameops
+from blockstack_client.backend.safety import ScatterGather, get_operation_fees
+from blockstack_client.proxy import get_name_cost as blockstack_get_name_cost
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+OPERATIONS = ['preorder', 'register', 'update']
+
+results = {}
+
+
+class CountingUTXOClient(object):
+    """
+    Wraps a UTXO provider and counts queries
+    """
+    def __init__(self, utxo_client):
+        self.utxo_client = utxo_client
+        self.lock = threading.Lock()
+        self.num_queries = 0
+
+    def get_unspents(self, address):
+        with self.lock:
+            self.num_queries += 1
+
+        return pybitcoin.get_unspents(address, self.utxo_client)
+
+
+get_tx_fee_per_kb = blockchain.get_tx_fee_per_kb
+fee_queries = []
+
+def counting_get_tx_fee_per_kb( *args, **kw ):
+    """
+    Count fee rate queries
+    """
+    fee_queries.append(1)
+    return get_tx_fee_per_kb( *args, **kw )
+
+
+def scenario( wallets, **kw ):
+
+    testlib.blockstack_namespace_preorder( "test", wallets[1].addr, wallets[0].privkey )
+    testlib.next_block( **kw )
+
+    testlib.blockstack_namespace_reveal( "test", wallets[1].addr, 52595, 250, 4, [6,5,4,3,2,1,0,0,0,0,0,0,0,0,0,0], 10, 10, wallets[0].privkey )
+    testlib.next_block( **kw )
+
+    testlib.blockstack_namespace_ready( "test", wallets[1].privkey )
+    testlib.next_block( **kw )
+
+    name = 'foo.test'
+    payment_privkey = wallets[2].privkey
+    payment_addr = wallets[2].addr
+    owner_privkey = wallets[3].privkey
+    owner_addr = wallets[3].addr
+
+    test_proxy = testlib.make_proxy()
+    utxo_client = testlib.get_utxo_client()
+
+    blockchain.get_tx_fee_per_kb = counting_get_tx_fee_per_kb
+    nameops.get_tx_fee_per_kb = counting_get_tx_fee_per_kb
+
+    # each estimator on its own, as before
+    client = CountingUTXOClient(utxo_client)
+    name_cost = blockstack_client.get_name_cost(name, proxy=test_proxy)['satoshis']
+
+    del fee_queries[:]
+    separate = {}
+    separate['preorder'] = nameops.estimate_preorder_tx_fee( name, name_cost, owner_addr, payment_addr, client, owner_privkey_params=(1,1), include_dust=True )
+    separate['register'] = nameops.estimate_register_tx_fee( name, owner_addr, payment_addr, client, owner_privkey_params=(1,1), include_dust=True )
+    separate['update'] = nameops.estimate_update_tx_fee( name, payment_privkey, owner_addr, client, owner_privkey_params=(1,1), payment_address=payment_addr, include_dust=True )
+
+    results['separate'] = separate
+    results['separate_utxo_queries'] = client.num_queries
+    results['separate_fee_queries'] = len(fee_queries)
+
+    # one quote for the whole flow, sharing a context
+    scripts.UTXO_CACHE.clear()
+    client = CountingUTXOClient(utxo_client)
+    fee_context = nameops.FeeEstimationContext(client, proxy=test_proxy)
+
+    del fee_queries[:]
+    sg = ScatterGather()
+    res = get_operation_fees( name, OPERATIONS, sg, payment_privkey, owner_privkey, proxy=test_proxy, fee_context=fee_context )
+    assert 'error' not in res, res
+
+    sg.run_tasks()
+
+    shared = {}
+    for op in OPERATIONS:
+        task_res = sg.get_result('{}_tx_fee'.format(op))
+        assert 'error' not in task_res, task_res
+        shared[op] = task_res['tx_fee']
+
+    results['shared'] = shared
+    results['name_cost'] = (name_cost, sg.get_result('preorder_tx_fee')['name_cost'])
+    results['shared_utxo_queries'] = client.num_queries
+    results['shared_fee_queries'] = len(fee_queries)
+    results['shared_name_cost_queries'] = fee_context.num_name_cost_queries
+
+    blockchain.get_tx_fee_per_kb = get_tx_fee_per_kb
+    nameops.get_tx_fee_per_kb = get_tx_fee_per_kb
+
+    # a slow name cost query must not hold up the tx fee, or other names' costs
+    fee_context = nameops.FeeEstimationContext(utxo_client, proxy=test_proxy)
+    fetching = threading.Event()
+    finish = threading.Event()
+    name_cost_results = {}
+
+    def slow_get_name_cost( name, **kw ):
+        if name == 'foo.test':
+            fetching.set()
+            finish.wait(30)
+
+        return blockstack_get_name_cost( name, **kw )
+
+    def get_name_cost( label, name ):
+        name_cost_results[label] = fee_context.get_name_cost(name)
+
+    nameops.blockstack_get_name_cost = slow_get_name_cost
+    try:
+        threads = [threading.Thread(target=get_name_cost, args=('first', 'foo.test'))]
+        threads[0].start()
+        fetching.wait(30)
+
+        threads.append(threading.Thread(target=get_name_cost, args=('second', 'foo.test')))
+        threads[1].start()
+
+        results['blocked_tx_fee'] = fee_context.get_tx_fee('00' * 100)
+        results['blocked_other_name_cost'] = fee_context.get_name_cost('bar.test')
+        results['blocked_name_cost'] = name_cost_results.has_key('first') or name_cost_results.has_key('second')
+
+        finish.set()
+        for t in threads:
+            t.join()
+
+        results['slow_name_costs'] = (name_cost_results['first'], name_cost_results['second'])
+        results['slow_name_cost_queries'] = fee_context.num_name_cost_queries
+
+    finally:
+        finish.set()
+        nameops.blockstack_get_name_cost = blockstack_get_name_cost
+
+
+def check( state_engine ):
+
+    print "Separate estimators: {} UTXO queries, {} fee queries".format(results['separate_utxo_queries'], results['separate_fee_queries'])
+    print "Shared context: {} UTXO queries, {} fee queries, {} name cost queries".format(results['shared_utxo_queries'], results['shared_fee_queries'], results['shared_name_cost_queries'])
+
+    for op in OPERATIONS:
+        if results['separate'][op] is None or int(results['separate'][op]) != results['shared'][op]:
+            print "{} fee differs: {} != {}".format(op, results['separate'][op], results['shared'][op])
+            return False
+
+    if results['name_cost'][0] != results['name_cost'][1]:
+        print "Name cost differs: {}".format(results['name_cost'])
+        return False
+
+    # one query per address (payment and owner), one fee rate, one name cost
+    if results['shared_utxo_queries'] > 2:
+        print "UTXOs were queried {} times".format(results['shared_utxo_queries'])
+        return False
+
+    if results['shared_fee_queries'] != 1 or results['shared_name_cost_queries'] != 1:
+        print "Fee rate or name cost was queried more than once"
+        return False
+
+    if results['separate_utxo_queries'] <= results['shared_utxo_queries'] or results['separate_fee_queries'] <= results['shared_fee_queries']:
+        print "Shared context did not save any queries"
+        return False
+
+    if results['blocked_tx_fee'] is None or 'error' in results['blocked_other_name_cost'] or results['blocked_name_cost']:
+        print "Fee estimation waited on a name cost query: {} {} {}".format(results['blocked_tx_fee'], results['blocked_other_name_cost'], results['blocked_name_cost'])
+        return False
+
+    # concurrent queries for the same name share one fetch
+    if results['slow_name_costs'][0] != results['slow_name_costs'][1] or 'error' in results['slow_name_costs'][0] or results['slow_name_cost_queries'] != 2:
+        print "Wrong concurrent name costs: {} ({} queries)".format(results['slow_name_costs'], results['slow_name_cost_queries'])
+        return False
+
+    return True
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import sys
+import time
+
+from blockstack_client.data import InodeCache, data_blob_serialize
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+    testlib.Wallet( "5KEpiSRr1BrT8vRD7LKGCEmudokTh1iMHbiThMQpLdwBwhDJB1T", 100000000000 )
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+DATASTORE_ID = '1BKufFedDrueBBFBXtiATB2PSdsBGZxf3N'
+
+
+def scenario( wallets, **kw ):
+
+    # nothing to do here
+    pass
+
+
+def make_inode( inode_uuid, version, payload='' ):
+    """
+    Make a serialized (header, inode) pair
+    """
+    hdr = {'type': 1, 'uuid': inode_uuid, 'owner': DATASTORE_ID, 'version': version, 'data_hash': '00' * 32}
+    inode = dict(hdr)
+    inode['idata'] = payload
+    return data_blob_serialize(hdr), data_blob_serialize(inode)
+
+
+def check( state_engine ):
+
+    cache = InodeCache(max_bytes=10000, ttl=600)
+
+    # miss, then hit at the cached version only
+    hdr_str, inode_str = make_inode('a', 1, 'hello')
+    if cache.get_inode(DATASTORE_ID, 'a', 1) is not None:
+        print >> sys.stderr, "Hit on an empty cache"
+        return False
+
+    cache.put(DATASTORE_ID, 'a', 1, inode_hdr_str=hdr_str, drivers=['disk'])
+    if cache.get_inode(DATASTORE_ID, 'a', 1) is not None:
+        print >> sys.stderr, "Got a full inode when only its header is cached"
+        return False
+
+    res = cache.get_header(DATASTORE_ID, 'a', 1)
+    if res is None or res['inode']['uuid'] != 'a' or res['version'] != 1 or res['drivers'] != ['disk']:
+        print >> sys.stderr, "Wrong cached header: %s" % res
+        return False
+
+    # filling in the data at the same version keeps the header and drivers
+    cache.put(DATASTORE_ID, 'a', 1, inode_data_str=inode_str)
+    res = cache.get_inode(DATASTORE_ID, 'a', 1)
+    if res is None or res['inode']['idata'] != 'hello' or res['version'] != 1:
+        print >> sys.stderr, "Wrong cached inode: %s" % res
+        return False
+
+    res = cache.get_header(DATASTORE_ID, 'a', 1)
+    if res is None or res['drivers'] != ['disk']:
+        print >> sys.stderr, "Lost the cached header: %s" % res
+        return False
+
+    if cache.size != len(hdr_str) + len(inode_str):
+        print >> sys.stderr, "Cache size is %s, expected %s" % (cache.size, len(hdr_str) + len(inode_str))
+        return False
+
+    # callers get their own copies
+    res['inode']['uuid'] = 'modified'
+    res['drivers'].append('modified')
+    res = cache.get_header(DATASTORE_ID, 'a', 1)
+    if res['inode']['uuid'] != 'a' or res['drivers'] != ['disk']:
+        print >> sys.stderr, "Cached header was modified by a caller: %s" % res
+        return False
+
+    # other datastores don't see it
+    if cache.get_inode('1LL4X7wNUBCWoDhfVLA2cHE7xk1ZJMT98Q', 'a', 1) is not None:
+        print >> sys.stderr, "Hit on another datastore's inode"
+        return False
+
+    # older versions are ignored
+    old_hdr_str, old_inode_str = make_inode('a', 0, 'old')
+    cache.put(DATASTORE_ID, 'a', 0, inode_hdr_str=old_hdr_str, inode_data_str=old_inode_str)
+    res = cache.get_inode(DATASTORE_ID, 'a', 1)
+    if res is None or res['inode']['idata'] != 'hello':
+        print >> sys.stderr, "Older version replaced a newer one: %s" % res
+        return False
+
+    # asking for a different version misses, and drops the stale entry
+    if cache.get_inode(DATASTORE_ID, 'a', 2) is not None:
+        print >> sys.stderr, "Hit at the wrong version"
+        return False
+
+    if cache.get_inode(DATASTORE_ID, 'a', 1) is not None or cache.size != 0:
+        print >> sys.stderr, "Stale entry was not dropped (size %s)" % cache.size
+        return False
+
+    # newer versions replace older ones
+    cache.put(DATASTORE_ID, 'a', 1, inode_hdr_str=hdr_str, inode_data_str=inode_str)
+    new_hdr_str, new_inode_str = make_inode('a', 2, 'world')
+    cache.put(DATASTORE_ID, 'a', 2, inode_hdr_str=new_hdr_str, inode_data_str=new_inode_str)
+    res = cache.get_inode(DATASTORE_ID, 'a', 2)
+    if res is None or res['inode']['idata'] != 'world' or cache.size != len(new_hdr_str) + len(new_inode_str):
+        print >> sys.stderr, "Newer version did not replace the older one: %s (size %s)" % (res, cache.size)
+        return False
+
+    # invalidation
+    cache.evict(DATASTORE_ID, 'a')
+    if cache.get_inode(DATASTORE_ID, 'a', 2) is not None or cache.size != 0:
+        print >> sys.stderr, "Evicted inode is still cached (size %s)" % cache.size
+        return False
+
+    # entries expire
+    expiring = InodeCache(max_bytes=10000, ttl=1)
+    expiring.put(DATASTORE_ID, 'a', 1, inode_hdr_str=hdr_str, inode_data_str=inode_str)
+    time.sleep(1.5)
+    if expiring.get_inode(DATASTORE_ID, 'a', 1) is not None:
+        print >> sys.stderr, "Expired inode is still cached"
+        return False
+
+    # least-recently-used inodes are evicted first, to stay under max_bytes
+    entries = dict([(inode_uuid, make_inode(inode_uuid, 1, 'x' * 100)) for inode_uuid in ['b', 'c', 'd', 'e']])
+    entry_size = len(entries['b'][0]) + len(entries['b'][1])
+    bounded = InodeCache(max_bytes=entry_size * 3, ttl=600)
+
+    for inode_uuid in ['b', 'c', 'd']:
+        bounded.put(DATASTORE_ID, inode_uuid, 1, inode_hdr_str=entries[inode_uuid][0], inode_data_str=entries[inode_uuid][1])
+
+    # use 'b', so 'c' is the least recently used
+    if bounded.get_inode(DATASTORE_ID, 'b', 1) is None:
+        print >> sys.stderr, "Missed on 'b'"
+        return False
+
+    bounded.put(DATASTORE_ID, 'e', 1, inode_hdr_str=entries['e'][0], inode_data_str=entries['e'][1])
+
+    cached = [inode_uuid for inode_uuid in ['b', 'c', 'd', 'e'] if bounded.get_header(DATASTORE_ID, inode_uuid, 1) is not None]
+    if cached != ['b', 'd', 'e'] or bounded.size != entry_size * 3:
+        print >> sys.stderr, "Wrong inodes cached after eviction: %s (size %s)" % (cached, bounded.size)
+        return False
+
+    # an inode bigger than the whole cache is never cached, and evicts nothing
+    big_hdr_str, big_inode_str = make_inode('f', 1, 'x' * (entry_size * 3))
+    bounded.put(DATASTORE_ID, 'f', 1, inode_hdr_str=big_hdr_str, inode_data_str=big_inode_str)
+    cached = [inode_uuid for inode_uuid in ['b', 'd', 'e', 'f'] if bounded.get_header(DATASTORE_ID, inode_uuid, 1) is not None]
+    if cached != ['b', 'd', 'e']:
+        print >> sys.stderr, "Oversized inode changed the cache: %s" % cached
+        return False
+
+    return True
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import time
+
+from blockstack_client import data, storage
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+DEVICES = ['device1', 'device2']
+DRIVERS = ['driver1', 'driver2']
+
+# (driver, device): (delay, version or None if not found)
+CASES = {
+    # the newest version is on the slow device
+    'slow_newest': {
+        ('driver1', 'device1'): (0.0, 1),
+        ('driver1', 'device2'): (0.5, 3),
+        ('driver2', 'device1'): (0.0, 1),
+        ('driver2', 'device2'): (0.5, 3),
+    },
+    # one device never wrote to driver2; that is not a driver failure
+    'missing_device': {
+        ('driver1', 'device1'): (0.0, 2),
+        ('driver1', 'device2'): (0.0, 1),
+        ('driver2', 'device1'): (0.3, 2),
+        ('driver2', 'device2'): (0.0, None),
+    },
+    # driver2 has nothing at all
+    'failed_driver': {
+        ('driver1', 'device1'): (0.0, 2),
+        ('driver1', 'device2'): (0.0, 1),
+        ('driver2', 'device1'): (0.0, None),
+        ('driver2', 'device2'): (0.0, None),
+    },
+    # driver2 missed the latest write; its stale data is skipped, but it is not a failure
+    'stale_driver': {
+        ('driver1', 'device1'): (0.0, 2),
+        ('driver1', 'device2'): (0.0, 1),
+        ('driver2', 'device1'): (0.0, 1),
+        ('driver2', 'device2'): (0.0, 1),
+    },
+    # every driver has only stale data
+    'all_stale': {
+        ('driver1', 'device1'): (0.0, 1),
+        ('driver1', 'device2'): (0.0, 1),
+        ('driver2', 'device1'): (0.0, 1),
+        ('driver2', 'device2'): (0.0, None),
+    },
+}
+
+# minimum acceptable version, per case
+VER_MIN = {
+    'stale_driver': 2,
+    'all_stale': 2,
+}
+
+results = {}
+
+
+def scenario( wallets, **kw ):
+
+    old_get_mutable_data = storage.get_mutable_data
+    old_get_mutable_check = data._get_mutable_check
+
+    for case_name, replies in CASES.items():
+
+        def fake_get_mutable_data(fq_data_id, data_pubkey, drivers=None, **kw):
+            device_id = fq_data_id.split(':')[0]
+            delay, version = replies[(drivers[0], device_id)]
+            time.sleep(delay)
+            if version is None:
+                return None
+
+            return str(version)
+
+        def fake_get_mutable_check(data_str, fq_data_id, driver, ver_min=None, **kw):
+            if ver_min is not None and int(data_str) < ver_min:
+                # stale
+                return None
+
+            return {'version': int(data_str), 'fq_data_id': fq_data_id}
+
+        storage.get_mutable_data = fake_get_mutable_data
+        data._get_mutable_check = fake_get_mutable_check
+
+        fq_data_ids = ['{}:foo'.format(device_id) for device_id in DEVICES]
+        results[case_name] = data._get_mutable_all_drivers(fq_data_ids, DRIVERS, None, None, None, None, ver_min=VER_MIN.get(case_name), quorum=len(DRIVERS), deadline=5)
+
+    storage.get_mutable_data = old_get_mutable_data
+    data._get_mutable_check = old_get_mutable_check
+
+
+def check( state_engine ):
+
+    res = results['slow_newest']
+    if 'error' in res or res['data']['version'] != 3 or sorted(res['drivers']) != DRIVERS:
+        print "Did not wait for the newest version: {}".format(res)
+        return False
+
+    res = results['missing_device']
+    if 'error' in res or res['data']['version'] != 2 or sorted(res['drivers']) != DRIVERS:
+        print "A missing device failed a driver: {}".format(res)
+        return False
+
+    res = results['failed_driver']
+    if 'error' not in res:
+        print "Reached quorum without driver2: {}".format(res)
+        return False
+
+    res = results['stale_driver']
+    if 'error' in res or res['data']['version'] != 2 or res['drivers'] != ['driver1']:
+        print "A stale driver failed the lookup: {}".format(res)
+        return False
+
+    res = results['all_stale']
+    if 'error' not in res:
+        print "Got data when every driver was stale: {}".format(res)
+        return False
+
+    return True
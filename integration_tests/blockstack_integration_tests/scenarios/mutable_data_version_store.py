@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+
+import testlib
+import sys
+import os
+import shutil
+import random
+import tempfile
+import traceback
+import multiprocessing
+
+from blockstack_client import data
+from blockstack_client.data import MutableDataVersionStore, serialize_mutable_data_id
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NUM_WRITERS = 8
+NUM_WRITES = 50
+DATA_ID = 'version-store-test'
+DEVICE_IDS = ['device{}'.format(i) for i in xrange(0, 3)]
+
+def scenario( wallets, **kw ):
+
+    # nothing to do here
+    pass
+
+
+def version_writer( metadata_dir, writer_id, result_queue ):
+    """
+    Advance and put versions in random order, from a separate process.
+    Report the highest version written.
+    """
+    try:
+        store = MutableDataVersionStore(metadata_dir)
+        versions = range(writer_id, NUM_WRITERS * NUM_WRITES, NUM_WRITERS)
+        random.shuffle(versions)
+
+        for i, ver in enumerate(versions):
+            if i % 2 == 0:
+                new_version = store.advance_versions(DATA_ID, DEVICE_IDS, ver)
+                assert new_version >= ver, 'advanced to {} < {}'.format(new_version, ver)
+            else:
+                store.put_versions(DATA_ID, {DEVICE_IDS[i % len(DEVICE_IDS)]: ver})
+
+        result_queue.put((writer_id, max(versions)))
+
+    except Exception as e:
+        traceback.print_exc()
+        result_queue.put((writer_id, None))
+
+
+def check( state_engine ):
+
+    metadata_dir = tempfile.mkdtemp( prefix='blockstack-test-versions-' )
+
+    try:
+        # concurrent writers never move a version backwards
+        result_queue = multiprocessing.Queue()
+        writers = [multiprocessing.Process( target=version_writer, args=(metadata_dir, i, result_queue) ) for i in xrange(0, NUM_WRITERS)]
+        for w in writers:
+            w.start()
+
+        results = [result_queue.get() for w in writers]
+        for w in writers:
+            w.join()
+
+        if None in [r[1] for r in results]:
+            print >> sys.stderr, "Writers failed: {}".format(results)
+            return False
+
+        store = MutableDataVersionStore(metadata_dir)
+        versions = store.get_versions(DATA_ID, DEVICE_IDS)
+        expected = max([r[1] for r in results])
+        if max(versions.values()) != expected:
+            print >> sys.stderr, "Expected version {}, got {}".format(expected, versions)
+            return False
+
+        # a stale put is ignored
+        store.put_versions(DATA_ID, dict([(device_id, 0) for device_id in DEVICE_IDS]))
+        if store.get_versions(DATA_ID, DEVICE_IDS) != versions:
+            print >> sys.stderr, "Stale put moved versions back: {}".format(store.get_versions(DATA_ID, DEVICE_IDS))
+            return False
+
+        # another process's write is visible through the cache
+        other_store = MutableDataVersionStore(metadata_dir)
+        other_store.put_versions(DATA_ID, {DEVICE_IDS[0]: expected + 10})
+        if store.get_versions(DATA_ID, [DEVICE_IDS[0]]) != {DEVICE_IDS[0]: expected + 10}:
+            print >> sys.stderr, "Cached version was not refreshed"
+            return False
+
+        # legacy versions are imported once, and their directory is not listed again
+        legacy_id = 'legacy-data'
+        legacy_dir = os.path.join(metadata_dir, serialize_mutable_data_id(legacy_id))
+        os.makedirs(legacy_dir)
+        with open(os.path.join(legacy_dir, '{}.ver'.format(serialize_mutable_data_id(DEVICE_IDS[0]))), 'w') as f:
+            f.write('7')
+
+        listdir = data.os.listdir
+        listed = []
+        def counting_listdir(path):
+            listed.append(path)
+            return listdir(path)
+
+        data.os.listdir = counting_listdir
+        try:
+            if store.get_versions(legacy_id, DEVICE_IDS) != {DEVICE_IDS[0]: 7}:
+                print >> sys.stderr, "Failed to import legacy version: {}".format(store.get_versions(legacy_id, DEVICE_IDS))
+                return False
+
+            for i in xrange(0, 10):
+                # each write from another process drops the cache
+                other_store.put_versions(DATA_ID, {DEVICE_IDS[1]: expected + 10 + i})
+                store.get_versions(legacy_id, DEVICE_IDS)
+
+            # a fresh store (i.e. another process) does not re-list it either
+            MutableDataVersionStore(metadata_dir).get_versions(legacy_id, DEVICE_IDS)
+
+        finally:
+            data.os.listdir = listdir
+
+        if listed.count(legacy_dir) != 1:
+            print >> sys.stderr, "Legacy directory listed {} times".format(listed.count(legacy_dir))
+            return False
+
+    finally:
+        shutil.rmtree( metadata_dir )
+
+    return True
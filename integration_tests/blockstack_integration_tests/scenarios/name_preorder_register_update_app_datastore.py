@@ -185,6 +185,59 @@ def scenario( wallets, **kw ):
             print 'failed to read {}: got "{}"'.format(dpath, res['idata'])
             return False
 
+    # get files in one batch
+    print 'getfiles'
+    res = testlib.blockstack_cli_datastore_getfiles( datastore_id, ['/file1', '/file2', '/dir1/file3', '/dir1/dir3/file4', '/dir1/dir3/dir4/file5', '/dir1/nope', '/dir2/dir5/nope'] )
+    if 'error' in res:
+        print 'failed to getfiles: {}'.format(res['error'])
+        return False
+
+    for dpath in ['/file1', '/file2', '/dir1/file3', '/dir1/dir3/file4', '/dir1/dir3/dir4/file5']:
+        if res['files'].get(dpath, {}).get('idata') != 'hello {}'.format(os.path.basename(dpath)):
+            print 'failed to batch-read {}: got {}'.format(dpath, res['files'].get(dpath))
+            return False
+
+    for dpath in ['/dir1/nope', '/dir2/dir5/nope']:
+        if res['errors'].get(dpath, {}).get('errno') != errno.ENOENT:
+            print 'wrong error for {}: {}'.format(dpath, res['errors'].get(dpath))
+            return False
+
+    # replace files in one batch
+    print 'putfiles'
+    res = testlib.blockstack_cli_datastore_putfiles( 'foo-app.com', dict([(dpath, 'hello again {}'.format(os.path.basename(dpath))) for dpath in ['/file1', '/file2', '/dir1/file3', '/dir1/dir3/file4', '/dir1/dir3/dir4/file5']]) )
+    if 'error' in res or len(res['errors']) > 0:
+        print 'failed to putfiles: {}'.format(res)
+        return False
+
+    # can't create existing files
+    res = testlib.blockstack_cli_datastore_putfiles( 'foo-app.com', {'/file1': 'nope'}, create=True )
+    if 'error' in res or res['errors'].get('/file1', {}).get('errno') != errno.EEXIST:
+        print 'accidentally created /file1: {}'.format(res)
+        return False
+
+    for dpath in ['/file1', '/file2', '/dir1/file3', '/dir1/dir3/file4', '/dir1/dir3/dir4/file5']:
+        print 'getfile {}'.format(dpath)
+        res = testlib.blockstack_cli_datastore_getfile( datastore_id, dpath )
+        if 'error' in res:
+            print 'failed to getfile {}: {}'.format(dpath, res['error'])
+            return False
+
+        if res['file']['idata'] != 'hello again {}'.format(os.path.basename(dpath)):
+            print 'failed to read {}: got "{}"'.format(dpath, res['file']['idata'])
+            return False
+
+    # list all directories at once
+    print 'listdir -R /'
+    res = testlib.blockstack_cli_datastore_listdir_recursive( datastore_id, '/' )
+    if 'error' in res:
+        print 'failed to listdir -R /: {}'.format(res['error'])
+        return False
+
+    for dpath, expected in [('/', ['dir1', 'dir2', 'file1', 'file2']), ('/dir1', ['dir3', 'file3']), ('/dir1/dir3', ['dir4', 'file4']), ('/dir1/dir3/dir4', ['file5']), ('/dir2', [])]:
+        if sorted(res['dirs'].get(dpath, {}).get('idata', {}).keys()) != sorted(expected):
+            print 'invalid directory {}: expected {}, got {}'.format(dpath, expected, res['dirs'].get(dpath))
+            return False
+
     # remove files
     for dpath in ['/file1', '/file2', '/dir1/file3', '/dir1/dir3/file4', '/dir1/dir3/dir4/file5']:
         print 'deletefile {}'.format(dpath)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import blockstack_client
+import blockstack.lib.scripts as scripts
+
+from blockstack_client.proxy import get_names_cost
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+# namespace_id: (coeff, base, buckets, nonalpha_discount, no_vowel_discount)
+NAMESPACES = {
+    'test': (250, 4, [6,5,4,3,2,1,0,0,0,0,0,0,0,0,0,0], 10, 10),
+    'flat': (1, 2, [1]*16, 1, 1),
+    'steep': (255, 15, [15,14,13,12,11,10,9,8,7,6,5,4,3,2,1,0], 2, 3),
+    'cheap': (0, 2, [0]*16, 15, 15),
+}
+
+# short enough that every name in it is valid
+UNKNOWN_NAMESPACE = 'nons'
+
+NAME_PARTS = ['a', 'b', 'c1', 'xyz', 'q-r', 'foo', 'bar_', 'aeiou', 'bcdfg', '0123', 'abcdefghijklmnop', 'abcdefghijklmnopq', 'z' * 30]
+
+batch_costs = {}
+single_costs = {}
+
+
+def scenario( wallets, **kw ):
+
+    for namespace_id, (coeff, base, buckets, nonalpha_discount, no_vowel_discount) in NAMESPACES.items():
+        testlib.blockstack_namespace_preorder( namespace_id, wallets[1].addr, wallets[0].privkey )
+        testlib.next_block( **kw )
+
+        testlib.blockstack_namespace_reveal( namespace_id, wallets[1].addr, 52595, coeff, base, buckets, nonalpha_discount, no_vowel_discount, wallets[0].privkey )
+        testlib.next_block( **kw )
+
+        # leave one namespace revealed but not ready
+        if namespace_id != 'cheap':
+            testlib.blockstack_namespace_ready( namespace_id, wallets[1].privkey )
+            testlib.next_block( **kw )
+
+    names = ['{}.{}'.format(part, namespace_id) for namespace_id in NAMESPACES.keys() + [UNKNOWN_NAMESPACE] for part in NAME_PARTS]
+    test_proxy = testlib.make_proxy()
+
+    # batches of at most 100
+    for i in xrange(0, len(names), 100):
+        res = get_names_cost(names[i:i+100], proxy=test_proxy)
+        assert 'error' not in res, res
+        batch_costs.update(res['satoshis'])
+
+    for name in names:
+        res = blockstack_client.get_name_cost(name, proxy=test_proxy)
+        if 'error' not in res:
+            single_costs[name] = res['satoshis']
+
+    # too many names, all of them valid
+    many_names = ['n{}.test'.format(i) for i in xrange(0, 101)]
+    res = get_names_cost(many_names[:100], proxy=test_proxy)
+    assert 'error' not in res, res
+
+    res = get_names_cost(many_names, proxy=test_proxy)
+    assert 'error' in res, res
+
+
+def check( state_engine ):
+
+    if batch_costs != single_costs:
+        print "Batch prices differ from single prices:\n{}\n{}".format(batch_costs, single_costs)
+        return False
+
+    for namespace_id in NAMESPACES.keys():
+        namespace = state_engine.get_namespace( namespace_id )
+        if namespace is None:
+            namespace = state_engine.get_namespace_reveal( namespace_id )
+
+        if namespace is None:
+            print "No namespace {}".format(namespace_id)
+            return False
+
+        for part in NAME_PARTS:
+            name = '{}.{}'.format(part, namespace_id)
+            if name not in batch_costs:
+                print "No price for {}".format(name)
+                return False
+
+            # cached and uncached prices agree
+            cached = scripts.price_name( part, namespace, state_engine.lastblock )
+            uncached = scripts.price_name( part, namespace, state_engine.lastblock, use_cache=False )
+            if cached != uncached:
+                print "Cached price for {} is {}, but uncached is {}".format(name, cached, uncached)
+                return False
+
+    # a namespace with different pricing parameters never hits another's cached prices
+    namespace = state_engine.get_namespace( 'test' )
+    reprice = dict(namespace)
+    reprice['coeff'] = namespace['coeff'] - 1
+    if scripts.price_name( 'foo', reprice, state_engine.lastblock ) != scripts.price_name( 'foo', reprice, state_engine.lastblock, use_cache=False ):
+        print "Stale cached price"
+        return False
+
+    for part in NAME_PARTS:
+        if '{}.{}'.format(part, UNKNOWN_NAMESPACE) in batch_costs:
+            print "Priced name in nonexistent namespace"
+            return False
+
+    return True
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+
+import testlib
+import hashlib
+
+from blockstack_client import storage, zonefile
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NAME = 'negative-cache.test'
+VALUE_HASH = hashlib.sha1('zonefile 1').hexdigest()
+NEW_VALUE_HASH = hashlib.sha1('zonefile 2').hexdigest()
+
+results = {}
+
+
+class MockDriver(object):
+    """
+    Storage driver that either fails with an error, or has no data
+    """
+    def __init__(self, name, fail=False):
+        self.__name__ = name
+        self.fail = fail
+        self.num_gets = 0
+
+    def _get(self):
+        self.num_gets += 1
+        if self.fail:
+            raise Exception('connection timed out')
+
+        return None
+
+    def get_immutable_handler(self, data_hash, **kw):
+        return self._get()
+
+    def make_mutable_url(self, data_id):
+        return 'mock://{}/{}'.format(self.__name__, data_id)
+
+    def get_mutable_handler(self, url, **kw):
+        return self._get()
+
+
+class MockProxy(object):
+    conf = {'server': 'localhost', 'port': 16264}
+
+
+def scenario( wallets, **kw ):
+
+    flaky = MockDriver('mock_flaky', fail=True)
+    empty = MockDriver('mock_empty')
+
+    storage_handlers = storage.storage_handlers
+    storage.storage_handlers = [flaky, empty]
+
+    get_zonefiles = zonefile.get_zonefiles
+    atlas_replies = []
+    zonefile.get_zonefiles = lambda hostport, hashes, proxy=None: atlas_replies.pop(0)
+
+    try:
+        # driver errors are reported; missing data is not
+        errors = []
+        results['immutable'] = storage.get_immutable_data(VALUE_HASH, errors=errors)
+        results['immutable_errors'] = [driver_name for (driver_name, _) in errors]
+
+        errors = []
+        results['mutable'] = storage.get_mutable_data(NAME, None, decode=False, errors=errors)
+        results['mutable_errors'] = [driver_name for (driver_name, _) in errors]
+
+        storage.NEGATIVE_RESULT_CACHE.evict(NAME)
+        name_record = {'value_hash': VALUE_HASH}
+
+        # a driver error is not remembered
+        atlas_replies.append({'status': True, 'zonefiles': {}})
+        res = zonefile.get_name_zonefile(NAME, name_record=name_record, raw_zonefile=True, proxy=MockProxy(), storage_drivers=['mock_flaky', 'mock_empty'])
+        results['driver_error'] = res
+        results['driver_error_cached'] = storage.NEGATIVE_RESULT_CACHE.get(NAME, VALUE_HASH, 'zonefile')
+
+        # neither is an Atlas RPC error
+        atlas_replies.append({'error': 'Connection refused'})
+        res = zonefile.get_name_zonefile(NAME, name_record=name_record, raw_zonefile=True, proxy=MockProxy(), storage_drivers=['mock_empty'])
+        results['rpc_error'] = res
+        results['rpc_error_cached'] = storage.NEGATIVE_RESULT_CACHE.get(NAME, VALUE_HASH, 'zonefile')
+
+        # no one having it is
+        atlas_replies.append({'status': True, 'zonefiles': {}})
+        res = zonefile.get_name_zonefile(NAME, name_record=name_record, raw_zonefile=True, proxy=MockProxy(), storage_drivers=['mock_empty'])
+        results['not_found'] = res
+        results['not_found_cached'] = storage.NEGATIVE_RESULT_CACHE.get(NAME, VALUE_HASH, 'zonefile')
+
+        # ...and is answered from the cache, without asking again
+        num_gets = empty.num_gets
+        res = zonefile.get_name_zonefile(NAME, name_record=name_record, raw_zonefile=True, proxy=MockProxy(), storage_drivers=['mock_empty'])
+        results['cached'] = res
+        results['cached_gets'] = empty.num_gets - num_gets
+        results['cached_atlas_replies'] = len(atlas_replies)
+
+        # a new zonefile hash is looked up again
+        atlas_replies.append({'status': True, 'zonefiles': {}})
+        num_gets = empty.num_gets
+        zonefile.get_name_zonefile(NAME, name_record={'value_hash': NEW_VALUE_HASH}, raw_zonefile=True, proxy=MockProxy(), storage_drivers=['mock_empty'])
+        results['new_hash_gets'] = empty.num_gets - num_gets
+
+    finally:
+        storage.storage_handlers = storage_handlers
+        zonefile.get_zonefiles = get_zonefiles
+        storage.NEGATIVE_RESULT_CACHE.evict(NAME)
+
+
+def check( state_engine ):
+
+    if results['immutable'] is not None or results['immutable_errors'] != ['mock_flaky']:
+        print "wrong immutable errors: {}".format(results['immutable_errors'])
+        return False
+
+    if results['mutable'] is not None or results['mutable_errors'] != ['mock_flaky']:
+        print "wrong mutable errors: {}".format(results['mutable_errors'])
+        return False
+
+    for kind in ['driver_error', 'rpc_error', 'not_found', 'cached']:
+        if 'error' not in results[kind]:
+            print "{}: expected an error, got {}".format(kind, results[kind])
+            return False
+
+    if results['driver_error_cached'] is not None:
+        print "remembered a failure caused by a driver error"
+        return False
+
+    if results['rpc_error_cached'] is not None:
+        print "remembered a failure caused by an Atlas RPC error"
+        return False
+
+    if results['not_found_cached'] is None:
+        print "did not remember a zonefile that no one has"
+        return False
+
+    if results['cached_gets'] != 0 or results['cached_atlas_replies'] != 0:
+        print "cached failure was looked up again"
+        return False
+
+    if results['new_hash_gets'] != 1:
+        print "failure for the old zonefile hash was applied to the new one"
+        return False
+
+    return True
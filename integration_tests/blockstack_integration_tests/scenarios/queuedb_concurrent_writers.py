@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import traceback
+
+from blockstack_client.backend.queue import queuedb_insertall, queuedb_removeall, queuedb_findall, queuedb_find, queue_removeall, queue_findall
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+    testlib.Wallet( "5KEpiSRr1BrT8vRD7LKGCEmudokTh1iMHbiThMQpLdwBwhDJB1T", 100000000000 )
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NUM_WRITERS = 16
+NUM_ENTRIES = 100
+
+def scenario( wallets, **kw ):
+    
+    # nothing to do here
+    pass
+
+
+def queue_writer( queue_path, writer_id, errors ):
+    """
+    Insert a batch of entries one at a time, and
+    then remove every other one in bulk.
+    """
+    try:
+        for i in xrange(0, NUM_ENTRIES):
+            queuedb_insertall( [("update", "writer%s-%s.test" % (writer_id, i), "%064x" % i, {'writer': writer_id, 'i': i})], path=queue_path )
+
+        queuedb_removeall( [("update", "writer%s-%s.test" % (writer_id, i), "%064x" % i) for i in xrange(0, NUM_ENTRIES, 2)], path=queue_path )
+
+        # bulk-insert into a different queue
+        queuedb_insertall( [("transfer", "writer%s-%s.test" % (writer_id, i), "%064x" % i, {'writer': writer_id, 'i': i}) for i in xrange(0, NUM_ENTRIES)], path=queue_path )
+
+    except Exception, e:
+        traceback.print_exc()
+        errors.append(writer_id)
+
+
+def check( state_engine ):
+
+    queue_dir = tempfile.mkdtemp( prefix='blockstack-test-queuedb-' )
+    queue_path = os.path.join( queue_dir, "queues.db" )
+    errors = []
+
+    try:
+        writers = [threading.Thread( target=queue_writer, args=(queue_path, i, errors) ) for i in xrange(0, NUM_WRITERS)]
+        for w in writers:
+            w.start()
+
+        for w in writers:
+            w.join()
+
+        if len(errors) > 0:
+            print >> sys.stderr, "Writers failed: %s" % errors
+            return False
+
+        updates = queuedb_findall( "update", path=queue_path )
+        if len(updates) != NUM_WRITERS * NUM_ENTRIES / 2:
+            print >> sys.stderr, "Expected %s update entries, got %s" % (NUM_WRITERS * NUM_ENTRIES / 2, len(updates))
+            return False
+
+        for u in updates:
+            i = int(u['fqu'].split('-')[1].split('.')[0])
+            if i % 2 == 0:
+                print >> sys.stderr, "Entry %s was not removed" % u['fqu']
+                return False
+
+        transfers = queue_findall( "transfer", path=queue_path )
+        if len(transfers) != NUM_WRITERS * NUM_ENTRIES:
+            print >> sys.stderr, "Expected %s transfer entries, got %s" % (NUM_WRITERS * NUM_ENTRIES, len(transfers))
+            return False
+
+        # bulk remove through the queue API
+        queue_removeall( transfers, path=queue_path )
+        if len(queuedb_findall( "transfer", path=queue_path )) != 0:
+            print >> sys.stderr, "Failed to remove all transfers"
+            return False
+
+        res = queuedb_find( "update", "writer0-1.test", path=queue_path )
+        if len(res) != 1 or res[0]['tx_hash'] != "%064x" % 1:
+            print >> sys.stderr, "Failed to find writer0-1.test: %s" % res
+            return False
+
+    finally:
+        shutil.rmtree( queue_dir )
+
+    return True
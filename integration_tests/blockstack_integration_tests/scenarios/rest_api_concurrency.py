@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import testlib
+import time
+import threading
+import requests
+import SocketServer
+import BaseHTTPServer
+
+from blockstack_client.rpc import BlockstackAPIEndpointHandler, BlockstackAPIEndpoint, WorkerPoolMixIn
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+# mocked backend: slow requests look like a storage driver fetch
+SLOW_REQUEST_TIME = 0.2
+NUM_SLOW_REQUESTS = 20
+NUM_FAST_REQUESTS = 80
+NUM_CLIENTS = 8
+NUM_WORKERS = 8
+
+# mocked datastore operations
+STORE_REQUEST_TIME = 0.05
+NUM_STORE_REQUESTS = 8
+DATASTORE_IDS = ['datastore-a', 'datastore-b']
+
+# (method, path, expected handler name)
+ROUTES = [
+    ('GET', '/v1/ping', 'GET_ping'),
+    ('GET', '/v1/names', 'GET_names'),
+    ('POST', '/v1/names', 'POST_names'),
+    ('GET', '/v1/names/foo.test', 'GET_name_info'),
+    ('DELETE', '/v1/names/foo.test', 'DELETE_name'),
+    ('GET', '/v1/names/foo.test/history', 'GET_name_history'),
+    ('OPTIONS', '/v1/anything/at/all', 'OPTIONS_preflight'),
+]
+
+route_results = []
+concurrency = {}
+store_concurrency = {}
+
+
+class ConcurrencyCounter(object):
+    """
+    Track how many callers are inside a block at once, overall and per key
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = {}
+        self.max_count = {}
+        self.total = 0
+        self.max_total = 0
+
+    def enter(self, key=None):
+        with self.lock:
+            self.count[key] = self.count.get(key, 0) + 1
+            self.max_count[key] = max(self.max_count.get(key, 0), self.count[key])
+            self.total += 1
+            self.max_total = max(self.max_total, self.total)
+
+    def leave(self, key=None):
+        with self.lock:
+            self.count[key] -= 1
+            self.total -= 1
+
+
+class MockHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Serves /slow and /fast
+    """
+    def do_GET(self):
+        self.server.counter.enter()
+        try:
+            if self.path == '/slow':
+                time.sleep(SLOW_REQUEST_TIME)
+
+        finally:
+            self.server.counter.leave()
+
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write('ok')
+
+    def log_message(self, *args, **kw):
+        pass
+
+
+class MockServer(WorkerPoolMixIn, SocketServer.TCPServer):
+    allow_reuse_address = True
+
+
+def measure(num_workers):
+    """
+    Serve a mix of slow and fast requests from several clients.
+    Return the largest number of requests that were served at once
+    """
+    srv = MockServer(('localhost', 0), MockHandler)
+    srv.counter = ConcurrencyCounter()
+    srv.start_workers(num_workers)
+    port = srv.server_address[1]
+
+    server_thread = threading.Thread(target=srv.serve_forever, kwargs={'poll_interval': 0.05})
+    server_thread.daemon = True
+    server_thread.start()
+
+    paths = ['/slow'] * NUM_SLOW_REQUESTS + ['/fast'] * NUM_FAST_REQUESTS
+    failures = []
+
+    def client(i):
+        for path in paths[i::NUM_CLIENTS]:
+            res = requests.get('http://localhost:{}{}'.format(port, path))
+            if res.status_code != 200:
+                failures.append(path)
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in xrange(0, NUM_CLIENTS)]
+
+    for c in clients:
+        c.start()
+
+    for c in clients:
+        c.join()
+
+    srv.shutdown()
+    srv.stop_workers()
+    srv.server_close()
+
+    assert len(failures) == 0, 'Failed requests: {}'.format(failures)
+    return srv.counter.max_total
+
+
+class MockInternalProxy(object):
+    """
+    Datastore operations that take a while, and count how many run at once per datastore
+    """
+    def __init__(self, counter):
+        self.counter = counter
+
+    def _op(self, app_domain):
+        self.counter.enter(app_domain)
+        try:
+            time.sleep(STORE_REQUEST_TIME)
+        finally:
+            self.counter.leave(app_domain)
+
+        return {'status': True}
+
+    def cli_datastore_putfile(self, app_domain, path, data, do_create, **kw):
+        return self._op(app_domain)
+
+    def cli_datastore_mkdir(self, app_domain, path, **kw):
+        return self._op(app_domain)
+
+    def cli_datastore_deletefile(self, app_domain, path, **kw):
+        return self._op(app_domain)
+
+    def cli_datastore_rmdir(self, app_domain, path, **kw):
+        return self._op(app_domain)
+
+
+class MockEndpoint(object):
+    """
+    Just the parts of BlockstackAPIEndpoint that the store handlers use
+    """
+    get_datastore_lock = BlockstackAPIEndpoint.get_datastore_lock.im_func
+
+    def __init__(self, counter):
+        self.internal_proxy = MockInternalProxy(counter)
+        self.wallet_keys = None
+        self.datastore_locks = {}
+        self.datastore_locks_lock = threading.Lock()
+
+    def get_internal_proxy(self):
+        return self.internal_proxy
+
+
+class MockStoreHandler(object):
+    """
+    Calls the store handlers directly, without HTTP
+    """
+    _create_or_update_store_item = BlockstackAPIEndpointHandler._create_or_update_store_item.im_func
+
+    def __init__(self, server):
+        self.server = server
+        self.replies = []
+
+    def _read_payload(self, *args, **kw):
+        return 'hello world'
+
+    def _reply_json(self, data, status_code=200):
+        self.replies.append((status_code, data))
+
+    def _send_headers(self, status_code=200, **kw):
+        self.replies.append((status_code, None))
+
+
+def run_store_requests():
+    """
+    Issue concurrent mutating requests against two datastores.
+    Return the concurrency counter
+    """
+    counter = ConcurrencyCounter()
+    srv = MockEndpoint(counter)
+    failures = []
+
+    def client(i):
+        datastore_id = DATASTORE_IDS[i % len(DATASTORE_IDS)]
+        ses = {'app_user_id': datastore_id, 'app_domain': datastore_id}
+        path_info = {'qs_values': {'path': '/file{}'.format(i)}}
+        handler = MockStoreHandler(srv)
+
+        try:
+            if i % 4 == 0:
+                BlockstackAPIEndpointHandler.POST_store_item.im_func(handler, ses, path_info, datastore_id, 'files')
+            elif i % 4 == 1:
+                BlockstackAPIEndpointHandler.POST_store_item.im_func(handler, ses, path_info, datastore_id, 'directories')
+            elif i % 4 == 2:
+                BlockstackAPIEndpointHandler.DELETE_store_item.im_func(handler, ses, path_info, datastore_id, 'files')
+            else:
+                BlockstackAPIEndpointHandler.DELETE_store_item.im_func(handler, ses, path_info, datastore_id, 'directories')
+
+        except Exception as e:
+            failures.append((i, e))
+            return
+
+        if handler.replies != [(200, {'status': True})]:
+            failures.append((i, handler.replies))
+
+    clients = [threading.Thread(target=client, args=(i,)) for i in xrange(0, NUM_STORE_REQUESTS * len(DATASTORE_IDS))]
+    for c in clients:
+        c.start()
+
+    for c in clients:
+        c.join()
+
+    assert len(failures) == 0, 'Failed store requests: {}'.format(failures)
+    return counter
+
+
+def scenario( wallets, **kw ):
+
+    global route_results, concurrency, store_concurrency
+
+    # the route table is compiled once, and matches as before
+    route_table = BlockstackAPIEndpointHandler.get_route_table()
+    assert route_table is BlockstackAPIEndpointHandler.get_route_table()
+
+    for method, path, handler_name in ROUTES:
+        class FakeHandler(object):
+            pass
+
+        route_info = BlockstackAPIEndpointHandler._route_match.im_func(FakeHandler(), method, {'path': path}, route_table)
+        route_results.append((method, path, handler_name, route_info['method'].__name__ if route_info is not None else None))
+
+    concurrency['serial'] = measure(0)
+    concurrency['pooled'] = measure(NUM_WORKERS)
+
+    counter = run_store_requests()
+    store_concurrency['per_datastore'] = counter.max_count
+    store_concurrency['total'] = counter.max_total
+
+
+def check( state_engine ):
+
+    for method, path, expected, found in route_results:
+        if expected != found:
+            print "{} {}: expected {}, got {}".format(method, path, expected, found)
+            return False
+
+    print "Concurrency: {} request(s) at once serial, {} with {} workers".format(concurrency['serial'], concurrency['pooled'], NUM_WORKERS)
+
+    if concurrency['serial'] != 1:
+        print "Served {} requests at once without workers".format(concurrency['serial'])
+        return False
+
+    # several clients' slow requests overlap in the worker pool
+    if concurrency['pooled'] < 2 or concurrency['pooled'] > NUM_WORKERS:
+        print "Worker pool served {} requests at once".format(concurrency['pooled'])
+        return False
+
+    # requests that modify the same datastore never overlap
+    for datastore_id in DATASTORE_IDS:
+        if store_concurrency['per_datastore'].get(datastore_id) != 1:
+            print "{} store requests ran at once on {}".format(store_concurrency['per_datastore'].get(datastore_id), datastore_id)
+            return False
+
+    # ...but requests on different datastores can
+    if store_concurrency['total'] < 2:
+        print "Store requests on different datastores did not overlap"
+        return False
+
+    return True
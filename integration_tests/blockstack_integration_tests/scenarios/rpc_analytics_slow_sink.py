@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import time
+import threading
+import blockstack_client
+import blockstack.blockstackd as blockstackd
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+SINK_DELAY = 1.0
+NUM_PINGS = 10
+QUEUE_SIZE = 5
+
+results = {}
+
+
+def scenario( wallets, **kw ):
+
+    sink_events = []
+    def slow_sink(event_type, event_payload):
+        time.sleep(SINK_DELAY)
+        sink_events.append(event_type)
+
+    # RPCs don't wait on a slow sink
+    analytics_thread = blockstackd.analytics_thread
+    assert analytics_thread is not None, "Analytics thread is not running"
+
+    old_sink = analytics_thread.sink
+    analytics_thread.sink = slow_sink
+
+    test_proxy = testlib.make_proxy()
+    t1 = time.time()
+    for i in xrange(0, NUM_PINGS):
+        res = blockstack_client.ping(proxy=test_proxy)
+        assert 'error' not in res, res
+
+    t2 = time.time()
+    results['ping_time'] = (t2 - t1) / NUM_PINGS
+
+    # events are eventually delivered
+    deadline = time.time() + SINK_DELAY * (NUM_PINGS + 5)
+    while len(sink_events) < NUM_PINGS and time.time() < deadline:
+        time.sleep(0.1)
+
+    results['num_delivered'] = sink_events.count('ping')
+    analytics_thread.sink = old_sink
+
+    # a full queue drops and counts events, without blocking
+    blocked = threading.Event()
+    def blocking_sink(event_type, event_payload):
+        blocked.wait()
+
+    small_thread = blockstackd.AnalyticsThread(queue_size=QUEUE_SIZE, sink=blocking_sink)
+    small_thread.start()
+
+    t1 = time.time()
+    queued = [small_thread.enqueue('test', {'i': i}) for i in xrange(0, 2 * QUEUE_SIZE + 1)]
+    t2 = time.time()
+
+    results['enqueue_time'] = t2 - t1
+    results['num_queued'] = queued.count(True)
+    results['stats'] = small_thread.get_stats()
+
+    blocked.set()
+    small_thread.signal_stop()
+    small_thread.join()
+
+
+def check( state_engine ):
+
+    print "Average ping with a {}s analytics sink: {}s".format(SINK_DELAY, results['ping_time'])
+
+    if results['ping_time'] >= SINK_DELAY / 2:
+        print "RPC latency depends on analytics sink latency"
+        return False
+
+    if results['num_delivered'] != NUM_PINGS:
+        print "Delivered {} of {} events".format(results['num_delivered'], NUM_PINGS)
+        return False
+
+    if results['enqueue_time'] >= 1.0:
+        print "Enqueue blocked on a full queue"
+        return False
+
+    # the first event is picked up by the sink, and QUEUE_SIZE more wait in the queue
+    stats = results['stats']
+    if stats['dropped'] + results['num_queued'] != 2 * QUEUE_SIZE + 1 or stats['dropped'] < QUEUE_SIZE - 1:
+        print "Wrong drop accounting: {} queued, {}".format(results['num_queued'], stats)
+        return False
+
+    return True
@@ -55,6 +55,7 @@ all_names_info = None
 namespace_names_info = None
 wallet_info = None
 lookup_info = None
+lookup_profiles_info = None
 update_history = None
 zonefile_history = None
 names_info = None
@@ -62,7 +63,7 @@ names_info = None
 def scenario( wallets, **kw ):
 
     global preorder_info, register_info, update_info, balance_before, balance_after, names_owned_before, names_owned_after, whois, blockchain_record, deposit_info, price_info
-    global blockchain_history, zonefile_info, all_names_info, namespace_names_info, wallet_info, lookup_info, update_history, zonefile_history, names_info
+    global blockchain_history, zonefile_info, all_names_info, namespace_names_info, wallet_info, lookup_info, lookup_profiles_info, update_history, zonefile_history, names_info
 
     testlib.blockstack_namespace_preorder( "test", wallets[1].addr, wallets[0].privkey )
     testlib.next_block( **kw )
@@ -148,6 +149,7 @@ def scenario( wallets, **kw ):
     all_names_info = testlib.blockstack_cli_get_all_names()
     namespace_names_info = testlib.blockstack_cli_get_names_in_namespace("test")
     lookup_info = testlib.blockstack_cli_lookup( "foo.test" )
+    lookup_profiles_info = testlib.blockstack_cli_lookup_profiles( ["foo.test", "nonexistent.test"] )
     update_history = testlib.blockstack_cli_list_update_history( "foo.test" )
     zonefile_history = testlib.blockstack_cli_list_zonefile_history( "foo.test" )
     blockchain_record = testlib.blockstack_cli_get_name_blockchain_record( "foo.test" )
@@ -156,7 +158,7 @@ def scenario( wallets, **kw ):
 def check( state_engine ):
 
     global preorder_info, register_info, update_info, balance_before, balance_after, names_owned_before, names_owned_after, whois, blockchain_record, deposit_info, price_info
-    global blockchain_history, zonefile_info, all_names_info, namespace_names_info, wallet_info, lookup_info, update_history, zonefile_history, names_info
+    global blockchain_history, zonefile_info, all_names_info, namespace_names_info, wallet_info, lookup_info, lookup_profiles_info, update_history, zonefile_history, names_info
 
     # not revealed, but ready 
     ns = state_engine.get_namespace_reveal( "test" )
@@ -338,6 +340,24 @@ def check( state_engine ):
         print "unequal zonefiles:\n%s\n%s" % (json.dumps(lookup_info['zonefile'], indent=4, sort_keys=True), json.dumps(zonefile_info['zonefile'], indent=4, sort_keys=True))
         return False
 
+    # batched profile lookup
+    if 'error' in lookup_profiles_info or 'error' in lookup_profiles_info.get('foo.test', {'error': 'missing'}):
+        print "batched lookup failed\n%s" % json.dumps(lookup_profiles_info, indent=4, sort_keys=True)
+        return False
+
+    if lookup_profiles_info['foo.test']['zonefile'] != lookup_info['zonefile'] or lookup_profiles_info['foo.test']['profile'] != lookup_info['profile']:
+        print "batched lookup mismatch\n%s\n%s" % (json.dumps(lookup_profiles_info, indent=4, sort_keys=True), json.dumps(lookup_info, indent=4, sort_keys=True))
+        return False
+
+    if 'error' not in lookup_profiles_info.get('nonexistent.test', {}):
+        print "batched lookup resolved a nonexistent name\n%s" % json.dumps(lookup_profiles_info, indent=4, sort_keys=True)
+        return False
+
+    for k in ['name_record', 'zonefile', 'profile']:
+        if k not in lookup_profiles_info['foo.test']['timings']:
+            print "missing timing '%s'\n%s" % (k, json.dumps(lookup_profiles_info, indent=4, sort_keys=True))
+            return False
+
     # update history (2 items)
     if len(update_history) != 2 or update_history[1] != blockchain_record['value_hash']:
         print "invalid update history\n%s" % json.dumps(update_history, indent=4, sort_keys=True)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import blockstack.blockstackd as blockstackd
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NUM_PINGS = 10
+NUM_BAD_LOOKUPS = 3
+
+results = {}
+
+
+def scenario( wallets, **kw ):
+
+    test_proxy = testlib.make_proxy()
+
+    # off by default
+    results['disabled'] = test_proxy.get_rpc_stats()
+
+    blockstackd.rpc_stats_start()
+
+    for i in xrange(0, NUM_PINGS):
+        test_proxy.ping()
+
+    for i in xrange(0, NUM_BAD_LOOKUPS):
+        test_proxy.get_name_blockchain_record('not-a-valid-name')
+
+    results['stats'] = test_proxy.get_rpc_stats(True)
+    results['after_reset'] = test_proxy.get_rpc_stats()
+
+    blockstackd.rpc_stats_stop()
+
+
+def check( state_engine ):
+
+    if 'error' not in results['disabled']:
+        print "RPC stats enabled by default: {}".format(results['disabled'])
+        return False
+
+    stats = results['stats']
+    if 'error' in stats:
+        print "Failed to get RPC stats: {}".format(stats)
+        return False
+
+    methods = stats['methods']
+    num_buckets = len(stats['buckets']) + 1
+
+    for method, count, errors in [('ping', NUM_PINGS, 0), ('get_name_blockchain_record', NUM_BAD_LOOKUPS, NUM_BAD_LOOKUPS)]:
+        if method not in methods:
+            print "No stats for {}: {}".format(method, methods.keys())
+            return False
+
+        method_stats = methods[method]
+        if method_stats['count'] != count or method_stats['errors'] != errors:
+            print "Wrong counts for {}: {}".format(method, method_stats)
+            return False
+
+        for hist in ['handler_histogram', 'serialize_histogram']:
+            if len(method_stats[hist]) != num_buckets or sum(method_stats[hist]) != count:
+                print "Wrong {} for {}: {}".format(hist, method, method_stats)
+                return False
+
+        if method_stats['handler_max'] <= 0 or method_stats['handler_time'] < method_stats['handler_max']:
+            print "Wrong handler time for {}: {}".format(method, method_stats)
+            return False
+
+    # only the get_rpc_stats call that did the reset
+    after_reset = results['after_reset']
+    if after_reset['methods'].keys() != ['get_rpc_stats'] or after_reset['since'] <= stats['since']:
+        print "Stats were not reset: {}".format(after_reset)
+        return False
+
+    return True
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import os
+import zlib
+import hashlib
+import threading
+import SocketServer
+import BaseHTTPServer
+
+from blockstack_client.backend.drivers import s3
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+BUCKET = 'blockstack-test-bucket'
+
+# name: payload
+PAYLOADS = {
+    'small': 'hello world',
+    'text': '{"name": "judecn", "bio": "hello world"}' * 1000,
+    'random': os.urandom(100000),
+    'zlib_stream': zlib.compress(os.urandom(100000)),
+    'compressed_text': zlib.compress('hello world' * 10000),
+}
+
+results = {}
+
+
+class MockS3Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Just enough of S3 (path-style addressing) to store objects and their metadata
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self, status, body='', headers={}):
+        self.send_response(status)
+        for (k, v) in headers.items():
+            self.send_header(k, v)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def is_bucket_path(self):
+        return self.path.strip('/') == BUCKET or self.path.startswith('/{}/?'.format(BUCKET)) or self.path.startswith('/{}?'.format(BUCKET))
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.is_bucket_path():
+            return self.reply(200)
+
+        metadata = dict([(k, v) for (k, v) in self.headers.items() if k.lower().startswith('x-amz-meta-')])
+        self.server.objects[self.path] = (body, metadata)
+        return self.reply(200, headers={'ETag': '"{}"'.format(hashlib.md5(body).hexdigest())})
+
+    def do_HEAD(self):
+        return self.reply(200)
+
+    def do_GET(self):
+        if self.is_bucket_path():
+            return self.reply(200, '<?xml version="1.0" encoding="UTF-8"?><ListBucketResult><Name>{}</Name></ListBucketResult>'.format(BUCKET))
+
+        if self.path not in self.server.objects:
+            return self.reply(404, '<?xml version="1.0" encoding="UTF-8"?><Error><Code>NoSuchKey</Code><Message>NoSuchKey</Message></Error>')
+
+        body, metadata = self.server.objects[self.path]
+        return self.reply(200, body, headers=metadata)
+
+    def log_message(self, *args, **kw):
+        pass
+
+
+class MockS3Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *args, **kw):
+        BaseHTTPServer.HTTPServer.__init__(self, *args, **kw)
+        self.objects = {}
+
+
+def object_path(name):
+    return '/{}/{}'.format(BUCKET, name)
+
+
+def scenario( wallets, **kw ):
+
+    srv = MockS3Server(('localhost', 0), MockS3Handler)
+    server_thread = threading.Thread(target=srv.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+
+    s3.AWS_BUCKET = BUCKET
+    s3.AWS_ACCESS_KEY_ID = 'test-key-id'
+    s3.AWS_SECRET_ACCESS_KEY = 'test-key-secret'
+    s3.AWS_ENDPOINT = 'localhost:{}'.format(srv.server_address[1])
+    s3.AWS_IS_SECURE = False
+    s3.S3_CONNECTIONS.invalidate()
+
+    # round-trip each payload, with and without compression
+    for compress in [True, False]:
+        s3.AWS_COMPRESS = compress
+        for name, payload in PAYLOADS.items():
+            path = '{}-{}'.format(name, compress)
+            assert s3.write_chunk(path, payload), 'Failed to write {}'.format(path)
+
+            body, metadata = srv.objects[object_path(path)]
+            results[path] = {
+                'read': s3.read_chunk(path),
+                'encoding': metadata.get('x-amz-meta-' + s3.AWS_ENCODING_METADATA),
+                'stored_len': len(body),
+            }
+
+    # objects written before the encoding was recorded
+    srv.objects[object_path('legacy-compressed')] = (zlib.compress(PAYLOADS['text'], 9), {})
+    srv.objects[object_path('legacy-raw')] = (PAYLOADS['random'], {})
+    results['legacy-compressed'] = {'read': s3.read_chunk('legacy-compressed')}
+    results['legacy-raw'] = {'read': s3.read_chunk('legacy-raw')}
+
+    srv.shutdown()
+    srv.server_close()
+
+
+def check( state_engine ):
+
+    for compress in [True, False]:
+        for name, payload in PAYLOADS.items():
+            path = '{}-{}'.format(name, compress)
+            res = results[path]
+
+            if res['read'] != payload:
+                print "{}: read {} bytes, expected {}".format(path, len(res['read'] or ''), len(payload))
+                return False
+
+            if res['encoding'] not in [s3.AWS_ENCODING_ZLIB, s3.AWS_ENCODING_RAW]:
+                print "{}: encoding not recorded".format(path)
+                return False
+
+            # only compressible payloads get compressed
+            expect_compressed = compress and name == 'text'
+            if (res['encoding'] == s3.AWS_ENCODING_ZLIB) != expect_compressed:
+                print "{}: stored as {}".format(path, res['encoding'])
+                return False
+
+            if expect_compressed and res['stored_len'] >= len(payload):
+                print "{}: not compressed".format(path)
+                return False
+
+    if results['legacy-compressed']['read'] != PAYLOADS['text'] or results['legacy-raw']['read'] != PAYLOADS['random']:
+        print "Failed to read legacy objects"
+        return False
+
+    return True
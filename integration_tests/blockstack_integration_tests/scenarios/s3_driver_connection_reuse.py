@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import testlib
+import hashlib
+import threading
+import SocketServer
+import BaseHTTPServer
+
+from blockstack_client import storage
+from blockstack_client.backend.drivers import s3
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+BUCKET = 'blockstack-test-bucket'
+NUM_CHUNKS = 20
+NUM_THREADS = 4
+NUM_PUTS = 20
+
+results = {}
+
+
+class MockS3Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Just enough of S3 (path-style addressing) for the S3 driver
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self, status, body='', headers={}):
+        self.send_response(status)
+        for (k, v) in headers.items():
+            self.send_header(k, v)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_error(self, status, code):
+        self.reply(status, '<?xml version="1.0" encoding="UTF-8"?><Error><Code>{}</Code><Message>{}</Message></Error>'.format(code, code))
+
+    def check(self):
+        """
+        Count the request, and fail it if we're told to
+        """
+        srv = self.server
+        with srv.lock:
+            srv.num_requests += 1
+            if srv.fail_next > 0:
+                srv.fail_next -= 1
+                self.reply_error(403, 'InvalidAccessKeyId')
+                return False
+
+        return True
+
+    def is_bucket_path(self):
+        return self.path.strip('/') == BUCKET or self.path.startswith('/{}/?'.format(BUCKET)) or self.path.startswith('/{}?'.format(BUCKET))
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.check():
+            return
+
+        if self.is_bucket_path():
+            with self.server.lock:
+                self.server.num_bucket_creates += 1
+
+            return self.reply(200)
+
+        self.server.objects[self.path] = body
+        return self.reply(200, headers={'ETag': '"{}"'.format(hashlib.md5(body).hexdigest())})
+
+    def do_HEAD(self):
+        if not self.check():
+            return
+
+        return self.reply(200)
+
+    def do_GET(self):
+        if not self.check():
+            return
+
+        if self.is_bucket_path():
+            return self.reply(200, '<?xml version="1.0" encoding="UTF-8"?><ListBucketResult><Name>{}</Name></ListBucketResult>'.format(BUCKET))
+
+        if self.path not in self.server.objects:
+            return self.reply_error(404, 'NoSuchKey')
+
+        return self.reply(200, self.server.objects[self.path])
+
+    def do_DELETE(self):
+        if not self.check():
+            return
+
+        self.server.objects.pop(self.path, None)
+        return self.reply(204)
+
+    def log_message(self, *args, **kw):
+        pass
+
+
+class MockS3Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Counts connections, requests, and bucket creations
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *args, **kw):
+        BaseHTTPServer.HTTPServer.__init__(self, *args, **kw)
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.num_connections = 0
+        self.num_requests = 0
+        self.num_bucket_creates = 0
+        self.fail_next = 0
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.num_connections += 1
+
+        return SocketServer.ThreadingMixIn.process_request(self, request, client_address)
+
+
+def scenario( wallets, **kw ):
+
+    global results
+
+    srv = MockS3Server(('localhost', 0), MockS3Handler)
+    server_thread = threading.Thread(target=srv.serve_forever)
+    server_thread.daemon = True
+    server_thread.start()
+
+    # point the driver at the mock endpoint
+    s3.AWS_BUCKET = BUCKET
+    s3.AWS_ACCESS_KEY_ID = 'test-key-id'
+    s3.AWS_SECRET_ACCESS_KEY = 'test-key-secret'
+    s3.AWS_ENDPOINT = 'localhost:{}'.format(srv.server_address[1])
+    s3.AWS_IS_SECURE = False
+    s3.S3_CONNECTIONS.invalidate()
+
+    # many puts/gets/deletes from several threads
+    failures = []
+    def worker(i):
+        for j in xrange(i, NUM_CHUNKS, NUM_THREADS):
+            path = 'chunk/{}'.format(j)
+            data = 'data {}'.format(j) * 100
+
+            if not s3.write_chunk(path, data):
+                failures.append(('write', path))
+
+            if s3.read_chunk(path) != data:
+                failures.append(('read', path))
+
+            if not s3.delete_chunk(path):
+                failures.append(('delete', path))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in xrange(0, NUM_THREADS)]
+    for w in workers:
+        w.start()
+
+    for w in workers:
+        w.join()
+
+    results['failures'] = failures
+    results['num_connections'] = srv.num_connections
+    results['num_requests'] = srv.num_requests
+    results['num_bucket_creates'] = srv.num_bucket_creates
+
+    # storage.put_mutable_data(concurrent=True) calls the driver from a new thread each time;
+    # those threads must reuse pooled connections too
+    s3.S3_CONNECTIONS.invalidate()
+    old_storage_handlers = storage.storage_handlers
+    storage.storage_handlers = [s3]
+
+    try:
+        bucket_creates_before = srv.num_bucket_creates
+        connections_before = srv.num_connections
+
+        put_results = []
+        for i in xrange(0, NUM_PUTS):
+            put_results.append(storage.put_mutable_data('mutable/{}'.format(i), 'data {}'.format(i), None, sign=False, required=[s3.__name__], concurrent=True, wait_all=True))
+
+        # several at once
+        def put_worker(i):
+            for j in xrange(i, NUM_PUTS, NUM_THREADS):
+                put_results.append(storage.put_mutable_data('mutable/concurrent/{}'.format(j), 'data {}'.format(j), None, sign=False, required=[s3.__name__], concurrent=True, wait_all=True))
+
+        workers = [threading.Thread(target=put_worker, args=(i,)) for i in xrange(0, NUM_THREADS)]
+        for w in workers:
+            w.start()
+
+        for w in workers:
+            w.join()
+
+        results['concurrent_puts'] = put_results
+        results['concurrent_put_bucket_creates'] = srv.num_bucket_creates - bucket_creates_before
+        results['concurrent_put_connections'] = srv.num_connections - connections_before
+        results['concurrent_put_objects'] = len([path for path in srv.objects.keys() if 'mutable' in path])
+
+    finally:
+        storage.storage_handlers = old_storage_handlers
+
+    # an auth error drops the cached connection, and the driver reconnects.
+    # connect this thread first, so the error hits a cached connection.
+    results['write_before_auth_error'] = s3.write_chunk('chunk/before-error', 'hello')
+    results['num_bucket_creates_before_auth_error'] = srv.num_bucket_creates
+
+    srv.fail_next = 1
+    results['write_after_auth_error'] = s3.write_chunk('chunk/after-error', 'hello')
+    results['read_after_auth_error'] = s3.read_chunk('chunk/after-error')
+    results['num_bucket_creates_after_auth_error'] = srv.num_bucket_creates
+
+    srv.shutdown()
+    srv.server_close()
+
+
+def check( state_engine ):
+
+    print "S3 mock: {} connections, {} requests, {} bucket creations".format(results['num_connections'], results['num_requests'], results['num_bucket_creates'])
+
+    if len(results['failures']) > 0:
+        print "Failed S3 operations: {}".format(results['failures'])
+        return False
+
+    # at most one bucket handle per concurrent thread, reused for every operation
+    if results['num_bucket_creates'] > NUM_THREADS:
+        print "Bucket handles were not reused"
+        return False
+
+    print "Concurrent storage puts: {} connections, {} bucket creations".format(results['concurrent_put_connections'], results['concurrent_put_bucket_creates'])
+
+    if results['concurrent_puts'] != [True] * (NUM_PUTS * 2) or results['concurrent_put_objects'] != NUM_PUTS * 2:
+        print "Failed concurrent storage puts: {}".format(results['concurrent_puts'])
+        return False
+
+    # a new driver thread per put still reuses pooled connections
+    if results['concurrent_put_bucket_creates'] > NUM_THREADS or results['concurrent_put_connections'] > NUM_THREADS:
+        print "Driver threads did not reuse connections: {} bucket creations, {} connections for {} puts".format(results['concurrent_put_bucket_creates'], results['concurrent_put_connections'], NUM_PUTS * 2)
+        return False
+
+    # connections are kept alive and reused too
+    if results['num_connections'] >= results['num_requests']:
+        print "Connections were not reused"
+        return False
+
+    if not results['write_before_auth_error'] or not results['write_after_auth_error'] or results['read_after_auth_error'] != 'hello':
+        print "Did not recover from auth error"
+        return False
+
+    if results['num_bucket_creates_after_auth_error'] <= results['num_bucket_creates_before_auth_error']:
+        print "Did not reconnect after auth error"
+        return False
+
+    return True
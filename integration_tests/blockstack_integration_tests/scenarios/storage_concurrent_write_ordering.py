@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+
+import testlib
+import time
+import threading
+
+from blockstack_client import storage
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+DATA_ID = 'device1:concurrent-write-ordering'
+
+results = {}
+
+
+class MockDriver(object):
+    """
+    In-memory storage driver, with a per-write delay
+    """
+    def __init__(self, name, delays):
+        self.__name__ = name
+        self.delays = delays
+        self.data = {}
+        self.log = []
+        self.lock = threading.Lock()
+
+    def _delay(self, data):
+        time.sleep(self.delays.get(data, 0))
+
+    def put_mutable_handler(self, data_id, data_txt, **kw):
+        self._delay(data_txt)
+        with self.lock:
+            self.data[data_id] = data_txt
+            self.log.append(('put', data_txt))
+
+        return True
+
+    def delete_mutable_handler(self, data_id, sigb64, **kw):
+        self._delay('delete')
+        with self.lock:
+            self.data.pop(data_id, None)
+            self.log.append(('delete', None))
+
+        return True
+
+
+def scenario( wallets, **kw ):
+
+    # the slow driver takes longer on older writes, so unordered writes would finish out of order
+    fast = MockDriver('mock_fast', {})
+    slow = MockDriver('mock_slow', {'v1': 1.0, 'v2': 0.5, 'v3': 0.1, 'delete': 0.5})
+
+    storage_handlers = storage.storage_handlers
+    storage.storage_handlers = [fast, slow]
+
+    try:
+        # puts return as soon as the required (fast) driver is done
+        for version in ['v1', 'v2', 'v3']:
+            res = storage.put_mutable_data(DATA_ID, version, None, sign=False, required=['mock_fast'], concurrent=True)
+            assert res, 'Failed to put {}'.format(version)
+
+        results['returned_early'] = slow.data.get(DATA_ID, None) is None
+
+        # a sequential put waits for the ones still running in the background
+        res = storage.put_mutable_data(DATA_ID, 'v4', None, sign=False, required=['mock_fast'], concurrent=False)
+        assert res, 'Failed to put v4'
+
+        results['after_puts'] = (fast.data.get(DATA_ID), slow.data.get(DATA_ID))
+        results['put_log'] = list(slow.log)
+
+        # a put issued after a slow delete must not be undone by it
+        res = storage.delete_mutable_data(DATA_ID, wallets[0].privkey, required=['mock_fast'], concurrent=True)
+        assert res, 'Failed to delete'
+
+        res = storage.put_mutable_data(DATA_ID, 'v5', None, sign=False, required=['mock_fast'], concurrent=True)
+        assert res, 'Failed to put v5'
+
+        deadline = time.time() + 10
+        while len(slow.log) < 6 and time.time() < deadline:
+            time.sleep(0.1)
+
+        results['after_delete'] = (fast.data.get(DATA_ID), slow.data.get(DATA_ID))
+        results['log'] = list(slow.log)
+
+        with storage.STORAGE_PENDING_WRITES_LOCK:
+            results['pending'] = len(storage.STORAGE_PENDING_WRITES)
+
+    finally:
+        storage.storage_handlers = storage_handlers
+
+
+def check( state_engine ):
+
+    if not results['returned_early']:
+        print "concurrent puts waited for the slow driver"
+        return False
+
+    if results['after_puts'] != ('v4', 'v4'):
+        print "wrong data after puts: {}".format(results['after_puts'])
+        return False
+
+    if results['put_log'] != [('put', 'v1'), ('put', 'v2'), ('put', 'v3'), ('put', 'v4')]:
+        print "slow driver applied puts out of order: {}".format(results['put_log'])
+        return False
+
+    if results['after_delete'] != ('v5', 'v5'):
+        print "wrong data after delete and put: {}".format(results['after_delete'])
+        return False
+
+    if results['log'][4:] != [('delete', None), ('put', 'v5')]:
+        print "slow driver applied delete and put out of order: {}".format(results['log'])
+        return False
+
+    if results['pending'] != 0:
+        print "{} writes still pending".format(results['pending'])
+        return False
+
+    return True
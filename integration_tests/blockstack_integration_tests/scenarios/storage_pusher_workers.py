@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+
+import testlib
+import os
+import time
+import shutil
+import tempfile
+import threading
+
+import blockstack_client
+from blockstack_client.backend.queue import queue_findall
+from blockstack_client.storage import get_zonefile_data_hash
+from blockstack.blockstackd import BlockstackStoragePusher
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+NUM_ZONEFILES = 10
+NUM_PROFILES = 10
+
+results = {}
+
+
+class MockDriver(object):
+    """
+    In-memory storage driver that counts its writes
+    """
+    def __init__(self, name, fail=False):
+        self.__name__ = name
+        self.fail = fail
+        self.immutable = {}
+        self.mutable = {}
+        self.num_immutable_puts = 0
+        self.num_mutable_puts = 0
+        self.lock = threading.Lock()
+
+    def put_immutable_handler(self, data_hash, data_txt, txid):
+        with self.lock:
+            self.num_immutable_puts += 1
+            if self.fail:
+                return False
+
+            self.immutable[data_hash] = data_txt
+            return True
+
+    def put_mutable_handler(self, data_id, data_txt, **kw):
+        time.sleep(0.05)
+        with self.lock:
+            self.num_mutable_puts += 1
+            if self.fail:
+                return False
+
+            self.mutable[data_id] = data_txt
+            return True
+
+
+class MockMutableOnlyDriver(MockDriver):
+    """
+    Driver that cannot store immutable data
+    """
+    put_immutable_handler = None
+
+
+def scenario( wallets, **kw ):
+
+    queue_dir = tempfile.mkdtemp( prefix='blockstack-test-storage-pusher-' )
+
+    required = MockDriver('mock_required')
+    mutable_only = MockMutableOnlyDriver('mock_mutable_only')
+    failing = MockDriver('mock_failing', fail=True)
+
+    storage_handlers = blockstack_client.storage.storage_handlers
+    blockstack_client.storage.storage_handlers = [required, mutable_only, failing]
+
+    conf = {
+        'zonefile_storage_drivers': 'mock_required',
+        'profile_storage_drivers': 'mock_required',
+        'data_storage_drivers': 'mock_required',
+        'storage_push_workers': 4,
+    }
+
+    pusher = BlockstackStoragePusher(conf, os.path.join(queue_dir, 'queues.db'))
+    try:
+        pusher.start()
+
+        zonefiles = {}
+        for i in xrange(0, NUM_ZONEFILES):
+            zonefile_txt = '$ORIGIN foo{}.test\n$TTL 3600\n'.format(i)
+            zonefile_hash = get_zonefile_data_hash(zonefile_txt)
+            zonefiles[zonefile_hash] = zonefile_txt
+            assert pusher.enqueue_zonefile('{:064x}'.format(i), zonefile_hash, zonefile_txt)
+
+        profiles = {}
+        for i in xrange(0, NUM_PROFILES):
+            profiles['bar{}.test'.format(i)] = '{{"name": "bar{}"}}'.format(i)
+            assert pusher.enqueue_profile('bar{}.test'.format(i), profiles['bar{}.test'.format(i)])
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            remaining = sum([len(queue_findall(queue_id, path=pusher.queue_path)) for queue_id in [pusher.zonefile_queue_id, pusher.profile_queue_id]])
+            if remaining == 0:
+                break
+
+            time.sleep(0.1)
+
+        results['remaining'] = remaining
+        results['zonefiles'] = (required.immutable == zonefiles)
+        results['profiles'] = (required.mutable == profiles and mutable_only.mutable == profiles)
+        results['required_puts'] = (required.num_immutable_puts, required.num_mutable_puts)
+        results['stats'] = pusher.get_driver_stats()
+
+    finally:
+        pusher.signal_stop()
+        pusher.join()
+        blockstack_client.storage.storage_handlers = storage_handlers
+        shutil.rmtree(queue_dir)
+
+
+def check( state_engine ):
+
+    if results['remaining'] != 0:
+        print "{} entries were not pushed".format(results['remaining'])
+        return False
+
+    if not results['zonefiles'] or not results['profiles']:
+        print "Not all zonefiles and profiles were stored"
+        return False
+
+    # one write per entry per driver
+    if results['required_puts'] != (NUM_ZONEFILES, NUM_PROFILES):
+        print "Expected {} immutable and {} mutable writes, got {}".format(NUM_ZONEFILES, NUM_PROFILES, results['required_puts'])
+        return False
+
+    stats = results['stats']
+    expected = {
+        'mock_required': (NUM_ZONEFILES + NUM_PROFILES, 0),
+        'mock_mutable_only': (NUM_PROFILES, 0),    # not asked to store zonefiles, so no failures
+        'mock_failing': (NUM_ZONEFILES + NUM_PROFILES, NUM_ZONEFILES + NUM_PROFILES),
+    }
+
+    for driver_name, (pushes, failures) in expected.items():
+        if driver_name not in stats or (stats[driver_name]['pushes'], stats[driver_name]['failures']) != (pushes, failures):
+            print "{}: expected {} pushes and {} failures, got {}".format(driver_name, pushes, failures, stats.get(driver_name, None))
+            return False
+
+    return True
@@ -818,6 +818,21 @@ def blockstack_cli_lookup( name, config_path=None):
     return cli_lookup( args, config_path=config_path )
 
 
+def blockstack_cli_lookup_profiles( names, config_path=None):
+    """
+    Look up many names' zonefiles/profiles at once
+    """
+    test_proxy = make_proxy(config_path=config_path)
+    blockstack_client.set_default_proxy( test_proxy )
+    config_path = test_proxy.config_path if config_path is None else config_path
+
+    args = CLIArgs()
+
+    args.names = ','.join(names)
+
+    return cli_lookup_profiles( args, config_path=config_path )
+
+
 def blockstack_cli_migrate( name, password, force=False, config_path=None):
     """
     Migrate from legacy zonefile to new zonefile
@@ -1712,6 +1727,56 @@ def blockstack_cli_datastore_putfile( app_domain, path, data, data_path=None, in
     return cli_datastore_putfile( args, config_path=config_path, interactive=interactive, proxy=test_proxy )
 
 
+def blockstack_cli_datastore_listdir_recursive( app_user_id, path, config_path=None, interactive=False, proxy=None):
+    """
+    listdir -R
+    """
+    test_proxy = make_proxy(config_path=config_path)
+    blockstack_client.set_default_proxy( test_proxy )
+    config_path = test_proxy.config_path if config_path is None else config_path
+
+    args = CLIArgs()
+
+    args.app_user_id = app_user_id
+    args.path = path 
+    args.recursive = 'True'
+
+    return cli_datastore_listdir( args, config_path=config_path, interactive=interactive, proxy=test_proxy )
+
+
+def blockstack_cli_datastore_getfiles( app_user_id, paths, config_path=None, interactive=False, proxy=None):
+    """
+    getfiles
+    """
+    test_proxy = make_proxy(config_path=config_path)
+    blockstack_client.set_default_proxy( test_proxy )
+    config_path = test_proxy.config_path if config_path is None else config_path
+
+    args = CLIArgs()
+    
+    args.app_user_id = app_user_id
+    args.paths = json.dumps(paths)
+
+    return cli_datastore_getfiles( args, config_path=config_path, interactive=interactive, proxy=test_proxy )
+
+
+def blockstack_cli_datastore_putfiles( app_domain, files, create=False, interactive=False, proxy=None, config_path=None):
+    """
+    putfiles
+    """
+    test_proxy = make_proxy(config_path=config_path)
+    blockstack_client.set_default_proxy( test_proxy )
+    config_path = test_proxy.config_path if config_path is None else config_path
+
+    args = CLIArgs()
+
+    args.app_domain = app_domain
+    args.files = json.dumps(dict([(path, base64.b64encode(data)) for (path, data) in files.items()]))
+    args.create = str(create)
+
+    return cli_datastore_putfiles( args, config_path=config_path, interactive=interactive, proxy=test_proxy, force_data=True )
+
+
 def blockstack_cli_datastore_deletefile( app_domain, path, interactive=False, proxy=None, config_path=None):
     """
     deletefile
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import time
+import threading
+import pybitcoin
+
+from blockstack_client import scripts
+from blockstack_client.backend import blockchain
+from blockstack_client.backend.nameops import UTXOWrapper
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+    testlib.Wallet( "5KEpiSRr1BrT8vRD7LKGCEmudokTh1iMHbiThMQpLdwBwhDJB1T", 100000000000 )
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+QUERY_DELAY = 0.5
+
+results = {}
+
+
+class CountingUTXOClient(object):
+    """
+    Wraps a UTXO provider, counts queries, and makes each one slow
+    """
+    def __init__(self, utxo_client):
+        self.utxo_client = utxo_client
+        self.lock = threading.Lock()
+        self.num_queries = 0
+
+    def get_unspents(self, address):
+        with self.lock:
+            self.num_queries += 1
+
+        time.sleep(QUERY_DELAY)
+        return pybitcoin.get_unspents(address, self.utxo_client)
+
+
+class BatchUTXOClient(CountingUTXOClient):
+    """
+    Same, but can batch queries
+    """
+    def get_unspents_multi(self, addresses):
+        with self.lock:
+            self.num_queries += 1
+
+        time.sleep(QUERY_DELAY)
+        return dict([(addr, pybitcoin.get_unspents(addr, self.utxo_client)) for addr in addresses])
+
+
+def scenario( wallets, **kw ):
+
+    addresses = [w.addr for w in wallets]
+    utxo_client = testlib.get_utxo_client()
+
+    # long enough to outlive the scenario
+    old_cache_ttl = scripts.UTXO_CACHE_TTL
+    scripts.UTXO_CACHE_TTL = 600
+
+    expected = dict([(addr, blockchain.get_utxos(addr, utxo_client=utxo_client)) for addr in addresses])
+    results['expected'] = expected
+
+    # batch-capable provider: one query
+    scripts.UTXO_CACHE.clear()
+    batch_client = BatchUTXOClient(utxo_client)
+    results['batch'] = blockchain.get_utxos_multi(addresses, utxo_client=batch_client)
+    results['batch_queries'] = batch_client.num_queries
+
+    # no batching: concurrent queries
+    scripts.UTXO_CACHE.clear()
+    single_client = CountingUTXOClient(utxo_client)
+
+    t1 = time.time()
+    results['concurrent'] = blockchain.get_utxos_multi(addresses, utxo_client=single_client)
+    results['concurrent_time'] = time.time() - t1
+    results['concurrent_queries'] = single_client.num_queries
+
+    # cached: no more queries
+    results['balances'] = blockchain.get_balances(addresses, utxo_client=single_client)
+    results['single_balance'] = blockchain.get_balance(addresses[0], utxo_client=single_client)
+    results['cached_queries'] = single_client.num_queries - results['concurrent_queries']
+
+    # a different provider does not see (or overwrite) the first one's cached UTXOs
+    fake_utxo = {'transaction_hash': '00' * 32, 'output_index': 0, 'value': 1, 'script_hex': '', 'confirmations': 100}
+    fake_client = UTXOWrapper()
+    fake_client.add_unspents(addresses[0], [fake_utxo])
+
+    results['fake_utxos'] = [fake_utxo]
+    results['other_provider'] = blockchain.get_utxos_multi([addresses[0]], utxo_client=fake_client)[addresses[0]]
+
+    before = single_client.num_queries
+    results['after_other_provider'] = blockchain.get_utxos_multi(addresses, utxo_client=single_client)
+    results['after_other_provider_queries'] = single_client.num_queries - before
+
+    # a client instantiated from the same config shares cached UTXOs
+    results['same_provider_id'] = scripts.utxo_client_id(utxo_client) == scripts.utxo_client_id(testlib.get_utxo_client())
+
+    # spend from wallets[0] to wallets[1]; both are invalidated, but no one else
+    testlib.send_funds( wallets[0].privkey, 10000, wallets[1].addr )
+    results['cached_after_send'] = sorted([addr for (client_id, addr) in scripts.UTXO_CACHE.keys() if client_id is single_client])
+
+    before = single_client.num_queries
+    results['after_send'] = blockchain.get_utxos_multi(addresses, utxo_client=single_client)
+    results['after_send_queries'] = single_client.num_queries - before
+
+    scripts.UTXO_CACHE_TTL = old_cache_ttl
+    testlib.next_block( **kw )
+
+
+def check( state_engine ):
+
+    addresses = [w.addr for w in wallets]
+
+    for label in ['batch', 'concurrent']:
+        if results[label] != results['expected']:
+            print "{} UTXOs differ:\n{}\n{}".format(label, results[label], results['expected'])
+            return False
+
+    if results['batch_queries'] != 1:
+        print "Batch provider was queried {} times".format(results['batch_queries'])
+        return False
+
+    if results['concurrent_queries'] != len(addresses) or results['concurrent_time'] >= QUERY_DELAY * len(addresses) / 2:
+        print "Queries were not concurrent: {} queries in {}s".format(results['concurrent_queries'], results['concurrent_time'])
+        return False
+
+    if results['cached_queries'] != 0:
+        print "UTXO cache missed {} times".format(results['cached_queries'])
+        return False
+
+    if results['other_provider'] != results['fake_utxos']:
+        print "Another provider got cached UTXOs: {}".format(results['other_provider'])
+        return False
+
+    if results['after_other_provider'] != results['expected'] or results['after_other_provider_queries'] != 0:
+        print "Another provider's UTXOs replaced cached ones: {} ({} queries)".format(results['after_other_provider'], results['after_other_provider_queries'])
+        return False
+
+    if not results['same_provider_id']:
+        print "Clients for the same provider have different IDs"
+        return False
+
+    expected_balances = dict([(addr, sum([u['value'] for u in results['expected'][addr]])) for addr in addresses])
+    if results['balances'] != expected_balances or results['single_balance'] != expected_balances[addresses[0]]:
+        print "Wrong balances: {} {}, expected {}".format(results['balances'], results['single_balance'], expected_balances)
+        return False
+
+    if results['cached_after_send'] != sorted(addresses[2:]):
+        print "Wrong cache invalidation after send: {}".format(results['cached_after_send'])
+        return False
+
+    if results['after_send_queries'] != 2:
+        print "Expected 2 queries after send, got {}".format(results['after_send_queries'])
+        return False
+
+    return True
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import testlib
+import sys
+
+from blockstack_client import storage
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+    testlib.Wallet( "5KEpiSRr1BrT8vRD7LKGCEmudokTh1iMHbiThMQpLdwBwhDJB1T", 100000000000 )
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+
+def scenario( wallets, **kw ):
+
+    # nothing to do here
+    pass
+
+
+def check_cache():
+    """
+    Check VerifiedDataCache on its own
+    """
+    cache = storage.VerifiedDataCache(max_bytes=90)
+
+    if cache.get('a') is not None:
+        print >> sys.stderr, "Hit on an empty cache"
+        return False
+
+    # hits return copies
+    cache.put('a', {'hello': ['world']}, 30)
+    payload = cache.get('a')
+    if payload != {'hello': ['world']}:
+        print >> sys.stderr, "Wrong cached payload: %s" % payload
+        return False
+
+    payload['hello'].append('modified')
+    if cache.get('a') != {'hello': ['world']}:
+        print >> sys.stderr, "Cached payload was modified by a caller: %s" % cache.get('a')
+        return False
+
+    # replacing an entry replaces its size
+    cache.put('a', {'hello': 'again'}, 40)
+    if cache.get('a') != {'hello': 'again'} or cache.size != 40:
+        print >> sys.stderr, "Wrong replaced entry: %s (size %s)" % (cache.get('a'), cache.size)
+        return False
+
+    # least-recently-used entries are evicted first
+    cache.put('b', 'b', 30)
+    cache.get('a')
+    cache.put('c', 'c', 30)
+    cached = [key for key in ['a', 'b', 'c'] if cache.get(key) is not None]
+    if cached != ['a', 'c'] or cache.size != 70:
+        print >> sys.stderr, "Wrong entries after eviction: %s (size %s)" % (cached, cache.size)
+        return False
+
+    # entries bigger than the cache are not cached, and evict nothing
+    cache.put('d', 'd', 91)
+    cached = [key for key in ['a', 'c', 'd'] if cache.get(key) is not None]
+    if cached != ['a', 'c']:
+        print >> sys.stderr, "Oversized entry changed the cache: %s" % cached
+        return False
+
+    cache.clear()
+    if cache.get('a') is not None or cache.get('c') is not None or cache.size != 0:
+        print >> sys.stderr, "Cache is not empty after clear()"
+        return False
+
+    return True
+
+
+def check_parse( verifications ):
+    """
+    Check that parse_mutable_data() and parse_mutable_data_batch()
+    only verify data that they have not verified before.
+    @verifications counts calls to the uncached parser.
+    """
+    data_txt = '{"hello": "world"}'
+    other_data_txt = '{"hello": "again"}'
+    signed = storage.serialize_mutable_data(data_txt, wallets[0].privkey, wallets[0].pubkey_hex)
+    other_signed = storage.serialize_mutable_data(other_data_txt, wallets[0].privkey, wallets[0].pubkey_hex)
+    tampered = signed[:-2] + '}}'
+
+    # verified once, then served from the cache
+    for i in xrange(0, 3):
+        res = storage.parse_mutable_data(signed, wallets[0].pubkey_hex)
+        if res != data_txt:
+            print >> sys.stderr, "Failed to parse signed data: %s" % res
+            return False
+
+    if verifications[0] != 1:
+        print >> sys.stderr, "Verified %s times, expected 1" % verifications[0]
+        return False
+
+    # a different key is a different entry
+    res = storage.parse_mutable_data(signed, None, public_key_hash=wallets[0].addr)
+    if res != data_txt or verifications[0] != 2:
+        print >> sys.stderr, "Failed to verify with a public key hash: %s (%s verifications)" % (res, verifications[0])
+        return False
+
+    # failures are not cached
+    for i in xrange(0, 2):
+        for (data, public_key) in [(signed, wallets[1].pubkey_hex), (tampered, wallets[0].pubkey_hex)]:
+            res = storage.parse_mutable_data(data, public_key)
+            if res is not None:
+                print >> sys.stderr, "Verified bad data: %s" % res
+                return False
+
+    if verifications[0] != 6:
+        print >> sys.stderr, "Verified %s times, expected 6" % verifications[0]
+        return False
+
+    # batches verify each distinct item once, and only if it's not already cached
+    storage.VERIFIED_DATA_CACHE.clear()
+    verifications[0] = 0
+
+    items = [
+        (signed, wallets[0].pubkey_hex, None, None),
+        (other_signed, wallets[0].pubkey_hex, None, None),
+        (signed, wallets[0].pubkey_hex, None, None),
+        (tampered, wallets[0].pubkey_hex, None, None),
+        (signed, wallets[0].pubkey_hex, None, None),
+    ]
+    expected = [data_txt, other_data_txt, data_txt, None, data_txt]
+
+    res = storage.parse_mutable_data_batch(items)
+    if res != expected or verifications[0] != 3:
+        print >> sys.stderr, "Wrong batch results: %s (%s verifications)" % (res, verifications[0])
+        return False
+
+    res = storage.parse_mutable_data_batch(items)
+    if res != expected or verifications[0] != 4:
+        print >> sys.stderr, "Wrong cached batch results: %s (%s verifications)" % (res, verifications[0])
+        return False
+
+    return True
+
+
+def check( state_engine ):
+
+    if not check_cache():
+        return False
+
+    old_parse_mutable_data = storage._parse_mutable_data
+    old_cache = storage.VERIFIED_DATA_CACHE
+    verifications = [0]
+
+    def counting_parse_mutable_data(*args, **kw):
+        verifications[0] += 1
+        return old_parse_mutable_data(*args, **kw)
+
+    storage._parse_mutable_data = counting_parse_mutable_data
+    storage.VERIFIED_DATA_CACHE = storage.VerifiedDataCache()
+
+    try:
+        return check_parse(verifications)
+
+    finally:
+        storage._parse_mutable_data = old_parse_mutable_data
+        storage.VERIFIED_DATA_CACHE = old_cache
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+    Blockstack
+    ~~~~~
+    copyright: (c) 2014-2015 by Halfmoon Labs, Inc.
+    copyright: (c) 2016 by Blockstack.org
+
+    This file is part of Blockstack
+
+    Blockstack is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Blockstack is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with Blockstack. If not, see <http://www.gnu.org/licenses/>.
+""" 
+
+
+import os
+import shutil
+import tempfile
+import testlib
+import virtualchain
+import blockstack.blockstackd as blockstackd
+import blockstack.lib.consensus as consensus_lib
+
+wallets = [
+    testlib.Wallet( "5JesPiN68qt44Hc2nT8qmyZ1JDwHebfoh9KQ52Lazb1m1LaKNj9", 100000000000 ),
+    testlib.Wallet( "5KHqsiU9qa77frZb6hQy9ocV7Sus9RWJcQGYYBJJBb2Efj1o77e", 100000000000 ),
+    testlib.Wallet( "5Kg5kJbQHvk1B64rJniEmgbD83FpZpbw2RjdAZEzTefs9ihN3Bz", 100000000000 ),
+    testlib.Wallet( "5JuVsoS9NauksSkqEjbUZxWwgGDQbMwPsEfoRBSpLpgDX1RtLX7", 100000000000 ),
+    testlib.Wallet( "5KEpiSRr1BrT8vRD7LKGCEmudokTh1iMHbiThMQpLdwBwhDJB1T", 100000000000 )
+]
+
+consensus = "17ac43c1d8549c3181b200f1bf97eb7d"
+
+def scenario( wallets, **kw ):
+
+    testlib.blockstack_namespace_preorder( "test", wallets[1].addr, wallets[0].privkey )
+    testlib.next_block( **kw )
+
+    testlib.blockstack_namespace_reveal( "test", wallets[1].addr, 52595, 250, 4, [6,5,4,3,2,1,0,0,0,0,0,0,0,0,0,0], 10, 10, wallets[0].privkey )
+    testlib.next_block( **kw )
+
+    testlib.blockstack_namespace_ready( "test", wallets[1].privkey )
+    testlib.next_block( **kw )
+
+    for i in xrange(0, 3):
+        testlib.blockstack_name_preorder( "foo_{}.test".format(i), wallets[2].privkey, wallets[3].addr )
+        testlib.next_block( **kw )
+
+        testlib.blockstack_name_register( "foo_{}.test".format(i), wallets[2].privkey, wallets[3].addr )
+        testlib.next_block( **kw )
+
+
+def check( state_engine ):
+
+    lastblock = state_engine.lastblock
+    trusted_consensus_hash = state_engine.get_consensus_at( lastblock )
+    start_block = virtualchain.get_first_block_id()
+
+    # verify a copy of the database, as an untrusted peer would send it
+    untrusted_dir = tempfile.mkdtemp()
+    try:
+        db_path = virtualchain.get_db_filename()
+        snapshots_path = virtualchain.get_snapshots_filename()
+        lastblock_path = virtualchain.get_lastblock_filename()
+        for path in [db_path, snapshots_path, lastblock_path]:
+            shutil.copy( path, os.path.join( untrusted_dir, os.path.basename(path) ) )
+
+        untrusted_db_path = os.path.join( untrusted_dir, os.path.basename(db_path) )
+        untrusted_snapshots_path = os.path.join( untrusted_dir, os.path.basename(snapshots_path) )
+
+        # verifydb --workers reads the .snapshots file next to the db by default,
+        # or the one given by --untrusted-snapshots
+        checkpoints = blockstackd.load_untrusted_checkpoints( untrusted_db_path )
+        if checkpoints is None:
+            print "failed to load checkpoints next to {}".format(untrusted_db_path)
+            return False
+
+        explicit_checkpoints = blockstackd.load_untrusted_checkpoints( os.path.join( untrusted_dir, "missing.db" ), untrusted_snapshots_path=untrusted_snapshots_path )
+        if explicit_checkpoints != checkpoints:
+            print "checkpoints from --untrusted-snapshots differ"
+            return False
+
+        if blockstackd.load_untrusted_checkpoints( os.path.join( untrusted_dir, "missing", "blockstack-server.db" ) ) is not None:
+            print "loaded checkpoints from a missing .snapshots file"
+            return False
+
+        if checkpoints.get( lastblock ) != trusted_consensus_hash:
+            print "checkpoint at {} is {}, expected {}".format(lastblock, checkpoints.get(lastblock), trusted_consensus_hash)
+            return False
+
+        # each worker gets only the checkpoints its range needs
+        range_start = lastblock - 3
+        range_end = lastblock - 1
+        subset = consensus_lib.range_checkpoints( range_start, range_end, checkpoints )
+        needed = set()
+        for block_id in xrange( range_start, range_end+1 ):
+            needed.add( block_id )
+            needed.update( consensus_lib.checkpoint_prev_block_ids( block_id ) )
+
+        if set(subset.keys()) != needed.intersection( checkpoints.keys() ):
+            print "wrong checkpoints for {}-{}: {}".format(range_start, range_end, sorted(subset.keys()))
+            return False
+
+        if len(subset) >= len(checkpoints):
+            print "range checkpoints are not a subset: {} >= {}".format(len(subset), len(checkpoints))
+            return False
+
+        for block_id, consensus_hash in subset.items():
+            if checkpoints[block_id] != consensus_hash:
+                print "range checkpoint {} is {}, expected {}".format(block_id, consensus_hash, checkpoints[block_id])
+                return False
+
+        # parallel verification agrees with the trusted consensus hash,
+        # regardless of how the blocks are split up
+        for num_workers, range_size in [(1, None), (2, None), (3, 1), (4, 5)]:
+            res = consensus_lib.verify_consensus_ranges( lastblock, untrusted_db_path, checkpoints, start_block=start_block, num_workers=num_workers, range_size=range_size )
+            if res != trusted_consensus_hash:
+                print "verify_consensus_ranges(num_workers={}, range_size={}) returned {}, expected {}".format(num_workers, range_size, res, trusted_consensus_hash)
+                return False
+
+        if not blockstackd.verify_database( trusted_consensus_hash, lastblock, untrusted_db_path, start_block=start_block, checkpoints=checkpoints, num_workers=2 ):
+            print "verify_database() with checkpoints failed"
+            return False
+
+        # a tampered checkpoint must fail verification
+        tampered = dict(checkpoints)
+        tampered[ lastblock - 2 ] = "00" * 16
+        res = consensus_lib.verify_consensus_ranges( lastblock, untrusted_db_path, tampered, start_block=start_block, num_workers=2, range_size=2 )
+        if res is not None:
+            print "verified tampered checkpoints: {}".format(res)
+            return False
+
+        # so must a checkpoint that disagrees with the expected snapshots
+        expected_snapshots = { lastblock - 2: "00" * 16 }
+        res = consensus_lib.verify_consensus_ranges( lastblock, untrusted_db_path, checkpoints, start_block=start_block, num_workers=2, expected_snapshots=expected_snapshots )
+        if res is not None:
+            print "verified checkpoints that disagree with the expected snapshots: {}".format(res)
+            return False
+
+        # so must a missing checkpoint
+        missing = dict(checkpoints)
+        del missing[ lastblock - 1 ]
+        res = consensus_lib.verify_consensus_ranges( lastblock, untrusted_db_path, missing, start_block=start_block, num_workers=2 )
+        if res is not None:
+            print "verified with a missing checkpoint: {}".format(res)
+            return False
+
+        # the wrong trusted consensus hash must fail verification
+        if blockstackd.verify_database( "00" * 16, lastblock, untrusted_db_path, start_block=start_block, checkpoints=checkpoints, num_workers=2 ):
+            print "verify_database() accepted the wrong consensus hash"
+            return False
+
+    finally:
+        shutil.rmtree( untrusted_dir )
+
+    return True